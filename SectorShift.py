@@ -1,14 +1,20 @@
 # backend/j_industry_service.py
 from __future__ import annotations
 
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Union
 import re
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from Selector import compute_kdj
-from select_stock import load_data
+_BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.append(str(_BACKEND_DIR))
+
+from panel import CrossSection, Panel, refresh_indicators  # noqa: E402
+from universe import CodeSet, Universe  # noqa: E402
 
 
 def _list_codes_from_data_dir(data_dir: Union[str, Path]) -> List[str]:
@@ -27,47 +33,73 @@ def _list_codes_from_data_dir(data_dir: Union[str, Path]) -> List[str]:
     return sorted(set(codes))
 
 
-def _load_industry_from_stocklist(
-    stocklist_path: Union[str, Path],
-    codes: List[str],
-) -> pd.DataFrame:
-    """从本地 stocklist.csv 读取行业，返回 ['代码','行业']"""
-    stocklist_path = Path(stocklist_path)
-    if not stocklist_path.exists():
-        raise FileNotFoundError(f"stocklist.csv 不存在：{stocklist_path}")
-
-    sl = pd.read_csv(stocklist_path, dtype=str)
-    if sl.empty:
+def _load_industry_from_stocklist(stocklist_path: Union[str, Path]) -> Universe:
+    """从本地 stocklist.csv 读取行业，行业已编码为位图（Universe）"""
+    universe = Universe.from_stocklist(stocklist_path)
+    if not len(universe):
         raise ValueError("stocklist.csv 为空。")
+    if not universe.has_industries:
+        raise ValueError("stocklist.csv 缺少行业列（需要 'industry' 或 '行业'）。")
+    return universe
+
+
+def _stock_pool(codes: List[str], exclude_boards: Iterable[str] = ()) -> CodeSet:
+    """data_dir 中的代码，按板块位图排除 exclude_boards"""
+    return Universe.from_codes(codes).exclude_boards(exclude_boards)
+
 
-    # 提取 6 位代码
-    code_col = next((c for c in ["symbol", "ts_code", "code"] if c in sl.columns), None)
-    if code_col:
-        sl["代码"] = sl[code_col].astype(str).str.extract(r"(\d{6})", expand=False)
+def _parse_trade_date(trade_date: Optional[Union[str, datetime]]) -> Optional[pd.Timestamp]:
+    """解析 YYYYMMDD / YYYY-MM-DD / datetime；None 原样返回"""
+    if not trade_date:
+        return None
+    if isinstance(trade_date, datetime):
+        trade_dt = pd.Timestamp(trade_date.date())
     else:
-        fallback = None
-        for c in sl.columns:
-            m = sl[c].astype(str).str.extract(r"(\d{6})", expand=False)
-            if m.notna().any():
-                fallback = m
-                break
-        if fallback is None:
-            raise ValueError("stocklist.csv 中没有可解析为 6 位证券代码的列。")
-        sl["代码"] = fallback
-
-    # 行业列
-    industry_col = next((c for c in ["industry", "行业"] if c in sl.columns), None)
-    if industry_col is None:
-        raise ValueError("stocklist.csv 缺少行业列（需要 'industry' 或 '行业'）。")
+        s = str(trade_date).strip()
+        # 支持 YYYYMMDD / YYYY-MM-DD
+        if re.match(r"^\d{8}$", s):
+            trade_dt = pd.to_datetime(s, format="%Y%m%d", errors="coerce")
+        else:
+            trade_dt = pd.to_datetime(s, errors="coerce")
+    if pd.isna(trade_dt):
+        raise ValueError(f"无法解析 trade_date: {trade_date}")
+    return trade_dt
 
-    industry_df = (
-        sl.loc[sl["代码"].notna(), ["代码", industry_col]]
-        .rename(columns={industry_col: "行业"})
-        .drop_duplicates(subset=["代码"])
-    )
-    industry_df = industry_df[industry_df["代码"].isin(codes)]
-    industry_df["行业"] = industry_df["行业"].fillna("未知")
-    return industry_df
+
+def build_j_cross_section(
+    *,
+    data_dir: Union[str, Path],
+    stocklist_path: Union[str, Path] = "stocklist.csv",
+    panel_path: Optional[Union[str, Path]] = None,
+) -> CrossSection:
+    """
+    构造带行业分组的截面查询对象
+
+    panel_path 指向已缓存的面板（如每日流水线的 panel.npz）时直接加载，否则读取 data_dir 构造；
+    J 取面板缓存的全历史 KDJ（与对每只股票调用 compute_kdj 相同）。
+    同一对象可反复查询不同日期与阈值，每次只需毫秒级。
+    """
+    codes = _list_codes_from_data_dir(data_dir)
+    if panel_path is not None and Path(panel_path).exists():
+        panel = Panel.load(panel_path)
+        if "J" not in panel.fields:
+            refresh_indicators(panel)
+    else:
+        panel = Panel.from_csv_dir(data_dir, codes)
+        refresh_indicators(panel)
+    universe = _load_industry_from_stocklist(stocklist_path)
+    return CrossSection(panel, groups=universe.industry_map())
+
+
+def _selected(cs: CrossSection, pool: CodeSet, j: np.ndarray, j_threshold: float) -> np.ndarray:
+    """J < 阈值、且在股票池中的股票（面板可能还含其它股票）"""
+    with np.errstate(invalid="ignore"):
+        return (j < j_threshold) & pool.align(cs.panel.codes)
+
+
+def _industry_records(cs: CrossSection, mask: np.ndarray) -> List[Dict]:
+    ranked = cs.ranked_groups(mask).rename(columns={"group": "行业", "count": "股票数"})
+    return ranked.to_dict(orient="records")
 
 
 def compute_j_industry_distribution(
@@ -77,6 +109,9 @@ def compute_j_industry_distribution(
     j_threshold: float = 15.0,
     export_excel_path: Optional[Union[str, Path]] = None,
     trade_date: Optional[Union[str, datetime]] = None,   # ← 新增
+    panel_path: Optional[Union[str, Path]] = None,
+    cross_section: Optional[CrossSection] = None,
+    exclude_boards: Iterable[str] = (),
 ) -> Dict:
     """
     计算“指定交易日(或其之前最近一日)的日线J值 < 阈值”的行业分布，返回汇总JSON（无明细）。
@@ -85,90 +120,94 @@ def compute_j_industry_distribution(
     ----------
     trade_date : str | datetime | None
         指定交易日 (YYYYMMDD / YYYY-MM-DD)。为 None 时使用各股票数据中的最近一行。
+    panel_path : str | Path | None
+        已缓存的面板文件，见 build_j_cross_section。
+    cross_section : CrossSection | None
+        已构造好的截面查询对象；传入时不再读取行情与 stocklist。
+    exclude_boards : Iterable[str]
+        不参与统计的板块（main / gem / star / bj / b）。
     """
     # 0) 解析 trade_date（可空）
-    trade_dt: Optional[pd.Timestamp] = None
-    if trade_date:
-        if isinstance(trade_date, datetime):
-            trade_dt = pd.Timestamp(trade_date.date())
-        else:
-            s = str(trade_date).strip()
-            # 支持 YYYYMMDD / YYYY-MM-DD
-            if re.match(r"^\d{8}$", s):
-                trade_dt = pd.to_datetime(s, format="%Y%m%d", errors="coerce")
-            else:
-                trade_dt = pd.to_datetime(s, errors="coerce")
-        if pd.isna(trade_dt):
-            raise ValueError(f"无法解析 trade_date: {trade_date}")
+    trade_dt = _parse_trade_date(trade_date)
 
     # 1) 扫描代码
-    codes = _list_codes_from_data_dir(data_dir)
-    if not codes:
+    pool = _stock_pool(_list_codes_from_data_dir(data_dir), exclude_boards)
+    if not pool:
         return {
             "meta": {"total_codes": 0, "selected_count": 0, "j_threshold": j_threshold,
                      "trade_date": str(trade_dt.date()) if trade_dt is not None else None},
             "industry_counts": [],
         }
 
-    # 2) 读历史数据
-    frames = load_data(Path(data_dir), codes)
+    # 2) 截面：指定日（或之前最近一日）的 J 值
+    cs = cross_section or build_j_cross_section(
+        data_dir=data_dir, stocklist_path=stocklist_path, panel_path=panel_path)
+    j = cs.values("J", trade_dt)
 
-    # 3) 计算 指定日（或之前最近一日） 的 J 值
-    j_map: Dict[str, float] = {}
-    for code, df_code in frames.items():
-        if df_code is None or df_code.empty:
-            j_map[code] = float("nan")
-            continue
+    # 3) 筛选 + 按行业计数
+    mask = _selected(cs, pool, j, j_threshold)
+    records = _industry_records(cs, mask)
 
-        df = df_code.copy()
-        if "date" not in df.columns:
-            j_map[code] = float("nan")
-            continue
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"]).sort_values("date")
-
-        if trade_dt is not None:
-            # 取 <= 指定日 的最后一行；若没有，视为无数据
-            df = df[df["date"] <= trade_dt]
-            if df.empty:
-                j_map[code] = float("nan")
-                continue
-
-        kd = compute_kdj(df)
-        j_map[code] = float(kd.iloc[-1]["J"]) if (kd is not None and not kd.empty) else float("nan")
-
-    df_j_all = pd.DataFrame({"代码": list(j_map.keys()), "J(日)": list(j_map.values())})
-
-    # 4) 行业
-    industry_df = _load_industry_from_stocklist(stocklist_path, codes)
-
-    # 5) 筛选 + 统计
-    selected_all = df_j_all[df_j_all["J(日)"] < j_threshold].merge(
-        industry_df, on="代码", how="left"
-    )
-    selected_all["行业"] = selected_all["行业"].fillna("未知")
-
-    industry_counts = (
-        selected_all["行业"].value_counts().rename_axis("行业").reset_index(name="股票数")
-    )
-
-    # 6) 可选导出
+    # 4) 可选导出
     if export_excel_path:
         export_excel_path = Path(export_excel_path)
         with pd.ExcelWriter(export_excel_path) as writer:
-            industry_counts.to_excel(writer, sheet_name="行业分布", index=False)
+            pd.DataFrame(records, columns=["行业", "股票数"]).to_excel(writer, sheet_name="行业分布", index=False)
 
     return {
         "meta": {
-            "total_codes": int(len(codes)),
-            "selected_count": int(len(selected_all)),
+            "total_codes": int(len(pool)),
+            "selected_count": int(mask.sum()),
             "j_threshold": float(j_threshold),
             "trade_date": str(trade_dt.date()) if trade_dt is not None else None,
         },
-        "industry_counts": industry_counts.to_dict(orient="records"),
+        "industry_counts": records,
+    }
+
+
+def compute_j_industry_history(
+    *,
+    data_dir: Union[str, Path],
+    stocklist_path: Union[str, Path] = "stocklist.csv",
+    j_threshold: float = 15.0,
+    start_date: Optional[Union[str, datetime]] = None,
+    end_date: Optional[Union[str, datetime]] = None,
+    panel_path: Optional[Union[str, Path]] = None,
+    cross_section: Optional[CrossSection] = None,
+    exclude_boards: Iterable[str] = (),
+) -> Dict:
+    """
+    区间内每个交易日的 J < 阈值 行业分布（口径同 compute_j_industry_distribution 指定 trade_date）
+
+    一次取出 (交易日 × 股票) 的 J 截面并按行业计数，返回：
+    {"meta": {...}, "history": [{"trade_date", "selected_count", "industry_counts"}, ...]}
+    """
+    start_dt, end_dt = _parse_trade_date(start_date), _parse_trade_date(end_date)
+    pool = _stock_pool(_list_codes_from_data_dir(data_dir), exclude_boards)
+    meta = {
+        "total_codes": int(len(pool)),
+        "j_threshold": float(j_threshold),
+        "start_date": str(start_dt.date()) if start_dt is not None else None,
+        "end_date": str(end_dt.date()) if end_dt is not None else None,
     }
-    
+    if not pool:
+        return {"meta": meta, "history": []}
+
+    cs = cross_section or build_j_cross_section(
+        data_dir=data_dir, stocklist_path=stocklist_path, panel_path=panel_path)
+    dates, j = cs.history("J", start_dt, end_dt)
+    mask = _selected(cs, pool, j, j_threshold)
+    history = [
+        {
+            "trade_date": str(d),
+            "selected_count": int(m.sum()),
+            "industry_counts": _industry_records(cs, m),
+        }
+        for d, m in zip(dates, mask)
+    ]
+    return {"meta": meta, "history": history}
+
+
 if __name__ == "__main__":
     import argparse
     import json
@@ -178,6 +217,8 @@ if __name__ == "__main__":
     parser.add_argument("--stocklist", type=str, default="stocklist.csv", help="stocklist.csv 路径")
     parser.add_argument("--j_threshold", type=float, default=15.0, help="J(日) 阈值")
     parser.add_argument("--trade_date", type=str, default=None, help="交易日 (YYYYMMDD / YYYY-MM-DD，可选)")
+    parser.add_argument("--panel", type=str, default=None, help="已缓存的面板文件 panel.npz（可选）")
+    parser.add_argument("--exclude_boards", type=str, default="", help="不参与统计的板块，逗号分隔（如 gem,star,bj）")
     args = parser.parse_args()
 
     result = compute_j_industry_distribution(
@@ -185,6 +226,8 @@ if __name__ == "__main__":
         stocklist_path=args.stocklist,
         j_threshold=args.j_threshold,
         trade_date=args.trade_date,
+        panel_path=args.panel,
+        exclude_boards=[b for b in args.exclude_boards.split(",") if b],
     )
 
     # 只打印行业分布
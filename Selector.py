@@ -1,192 +1,33 @@
-from typing import Dict, List, Optional, Any
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
 
-from scipy.signal import find_peaks
 import numpy as np
 import pandas as pd
 
+_BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.append(str(_BACKEND_DIR))
+
+from screening import PROFILER, FilterPipeline, Stage, prescreens, screened_select  # noqa: E402  PROFILER 默认关闭
+from dsl import compile_expr, select_frames  # noqa: E402
+from indicators import (  # noqa: E402  选股与回测共用的指标库
+    CrossEvents,
+    bbi_deriv_uptrend,
+    compute_bbi,
+    compute_dif,
+    compute_kdj,
+    compute_rsv,
+    compute_zx_lines,
+    followed_by,
+    kernels,
+    last_valid_ma_cross_up,
+    peaks,
+)
 
-# --------------------------- 通用指标 --------------------------- #
-
-def compute_kdj(df: pd.DataFrame, n: int = 9) -> pd.DataFrame:
-    if df.empty:
-        return df.assign(K=np.nan, D=np.nan, J=np.nan)
-
-    low_n = df["low"].rolling(window=n, min_periods=1).min()
-    high_n = df["high"].rolling(window=n, min_periods=1).max()
-    rsv = (df["close"] - low_n) / (high_n - low_n + 1e-9) * 100
-
-    K = np.zeros_like(rsv, dtype=float)
-    D = np.zeros_like(rsv, dtype=float)
-    for i in range(len(df)):
-        if i == 0:
-            K[i] = D[i] = 50.0
-        else:
-            K[i] = 2 / 3 * K[i - 1] + 1 / 3 * rsv.iloc[i]
-            D[i] = 2 / 3 * D[i - 1] + 1 / 3 * K[i]
-    J = 3 * K - 2 * D
-    return df.assign(K=K, D=D, J=J)
-
-
-def compute_bbi(df: pd.DataFrame) -> pd.Series:
-    ma3 = df["close"].rolling(3).mean()
-    ma6 = df["close"].rolling(6).mean()
-    ma12 = df["close"].rolling(12).mean()
-    ma24 = df["close"].rolling(24).mean()
-    return (ma3 + ma6 + ma12 + ma24) / 4
-
-
-def compute_rsv(
-        df: pd.DataFrame,
-        n: int,
-) -> pd.Series:
-    """
-    按公式：RSV(N) = 100 × (C - LLV(L,N)) ÷ (HHV(C,N) - LLV(L,N))
-    - C 用收盘价最高值 (HHV of close)
-    - L 用最低价最低值 (LLV of low)
-    """
-    low_n = df["low"].rolling(window=n, min_periods=1).min()
-    high_close_n = df["close"].rolling(window=n, min_periods=1).max()
-    rsv = (df["close"] - low_n) / (high_close_n - low_n + 1e-9) * 100.0
-    return rsv
-
-
-def compute_dif(df: pd.DataFrame, fast: int = 12, slow: int = 26) -> pd.Series:
-    """计算 MACD 指标中的 DIF (EMA fast - EMA slow)。"""
-    ema_fast = df["close"].ewm(span=fast, adjust=False).mean()
-    ema_slow = df["close"].ewm(span=slow, adjust=False).mean()
-    return ema_fast - ema_slow
-
-
-def bbi_deriv_uptrend(
-        bbi: pd.Series,
-        *,
-        min_window: int,
-        max_window: int | None = None,
-        q_threshold: float = 0.0,
-) -> bool:
-    """
-    判断 BBI 是否“整体上升”。
-
-    令最新交易日为 T，在区间 [T-w+1, T]（w 自适应，w ≥ min_window 且 ≤ max_window）
-    内，先将 BBI 归一化：BBI_norm(t) = BBI(t) / BBI(T-w+1)。
-
-    再计算一阶差分 Δ(t) = BBI_norm(t) - BBI_norm(t-1)。  
-    若 Δ(t) 的前 q_threshold 分位数 ≥ 0，则认为该窗口通过；只要存在
-    **最长** 满足条件的窗口即可返回 True。q_threshold=0 时退化为
-    “全程单调不降”（旧版行为）。
-
-    Parameters
-    ----------
-    bbi : pd.Series
-        BBI 序列（最新值在最后一位）。
-    min_window : int
-        检测窗口的最小长度。
-    max_window : int | None
-        检测窗口的最大长度；None 表示不设上限。
-    q_threshold : float, default 0.0
-        允许一阶差分为负的比例（0 ≤ q_threshold ≤ 1）。
-    """
-    if not 0.0 <= q_threshold <= 1.0:
-        raise ValueError("q_threshold 必须位于 [0, 1] 区间内")
-
-    bbi = bbi.dropna()
-    if len(bbi) < min_window:
-        return False
-
-    longest = min(len(bbi), max_window or len(bbi))
-
-    # 自最长窗口向下搜索，找到任一满足条件的区间即通过
-    for w in range(longest, min_window - 1, -1):
-        seg = bbi.iloc[-w:]  # 区间 [T-w+1, T]
-        norm = seg / seg.iloc[0]  # 归一化
-        diffs = np.diff(norm.values)  # 一阶差分
-        if np.quantile(diffs, q_threshold) >= 0:
-            return True
-    return False
-
-
-def _find_peaks(
-        df: pd.DataFrame,
-        *,
-        column: str = "high",
-        distance: Optional[int] = None,
-        prominence: Optional[float] = None,
-        height: Optional[float] = None,
-        width: Optional[float] = None,
-        rel_height: float = 0.5,
-        **kwargs: Any,
-) -> pd.DataFrame:
-    if column not in df.columns:
-        raise KeyError(f"'{column}' not found in DataFrame columns: {list(df.columns)}")
-
-    y = df[column].to_numpy()
-
-    indices, props = find_peaks(
-        y,
-        distance=distance,
-        prominence=prominence,
-        height=height,
-        width=width,
-        rel_height=rel_height,
-        **kwargs,
-    )
-
-    peaks_df = df.iloc[indices].copy()
-    peaks_df["is_peak"] = True
-
-    # Flatten SciPy arrays into columns (only those with same length as indices)
-    for key, arr in props.items():
-        if isinstance(arr, (list, np.ndarray)) and len(arr) == len(indices):
-            peaks_df[f"peak_{key}"] = arr
-
-    return peaks_df
-
-
-def last_valid_ma_cross_up(
-        close: pd.Series,
-        ma: pd.Series,
-        lookback_n: int | None = None,
-) -> Optional[int]:
-    """
-    查找“有效上穿 MA”的最后一个交易日 T（close[T-1] < ma[T-1] 且 close[T] ≥ ma[T]）。
-    - 返回的是 **整数位置**（iloc 用）。
-    - lookback_n: 仅在最近 N 根内查找；None 则全历史。
-    """
-    n = len(close)
-    start = 1  # 至少要从 1 起，因为要看 T-1
-    if lookback_n is not None:
-        start = max(start, n - lookback_n)
-
-    # 自后向前找最后一次有效上穿
-    for i in range(n - 1, start - 1, -1):
-        if i - 1 < 0:
-            continue
-        c_prev, c_now = close.iloc[i - 1], close.iloc[i]
-        m_prev, m_now = ma.iloc[i - 1], ma.iloc[i]
-        if pd.notna(c_prev) and pd.notna(c_now) and pd.notna(m_prev) and pd.notna(m_now):
-            if c_prev < m_prev and c_now >= m_now:
-                return i
-    return None
-
-
-def compute_zx_lines(
-        df: pd.DataFrame,
-        m1: int = 14, m2: int = 28, m3: int = 57, m4: int = 114
-) -> tuple[pd.Series, pd.Series]:
-    """返回 (ZXDQ, ZXDKX)
-    ZXDQ = EMA(EMA(C,10),10)
-    ZXDKX = (MA(C,14)+MA(C,28)+MA(C,57)+MA(C,114))/4
-    """
-    close = df["close"].astype(float)
-    zxdq = close.ewm(span=10, adjust=False).mean().ewm(span=10, adjust=False).mean()
-
-    ma1 = close.rolling(window=m1, min_periods=m1).mean()
-    ma2 = close.rolling(window=m2, min_periods=m2).mean()
-    ma3 = close.rolling(window=m3, min_periods=m3).mean()
-    ma4 = close.rolling(window=m4, min_periods=m4).mean()
-    zxdkx = (ma1 + ma2 + ma3 + ma4) / 4.0
-    return zxdq, zxdkx
 
+# --------------------------- 通用指标 --------------------------- #
 
 def passes_day_constraints_today(df: pd.DataFrame, pct_limit: float = 0.02, amp_limit: float = 0.07) -> bool:
     """
@@ -271,19 +112,34 @@ class BBIKDJSelector:
         self.bbi_q_threshold = bbi_q_threshold  # ← 原 q_threshold
         self.j_q_threshold = j_q_threshold  # ← 新增
 
+        # 全市场前置过滤（向量化，只剔除确定不满足的股票）
+        self.prescreen = FilterPipeline([
+            Stage("day_constraints", prescreens.day_constraints, cost=1, pass_rate=0.3),
+            Stage("price_range", partial(prescreens.price_range, window=self.max_window,
+                                         pct=self.price_range_pct), cost=2, pass_rate=0.9),
+            Stage("close_above_ma60", partial(prescreens.close_above_ma, n=60), cost=2, pass_rate=0.5),
+            Stage("kdj_j", partial(prescreens.kdj_j, j_threshold=self.j_threshold,
+                                   j_q_threshold=self.j_q_threshold, q_window=self.max_window),
+                  cost=8, pass_rate=0.2),
+        ])
+
     # ---------- 单支股票过滤 ---------- #
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
-        hist = hist.copy()
-        hist["BBI"] = compute_bbi(hist)
-
+        prof = PROFILER.track(self)
         if not passes_day_constraints_today(hist):
-            return False
+            return prof.reject("day_constraints")
+        prof.lap("day_constraints")
 
         # 0. 收盘价波动幅度约束（最近 max_window 根 K 线）
         win = hist.tail(self.max_window)
         high, low = win["close"].max(), win["close"].min()
         if low <= 0 or (high / low - 1) > self.price_range_pct:
-            return False
+            return prof.reject("price_range")
+        prof.lap("price_range")
+
+        hist = hist.copy()
+        hist["BBI"] = compute_bbi(hist)
+        prof.lap("compute_bbi")
 
         # 1. BBI 上升（允许部分回撤）
         if not bbi_deriv_uptrend(
@@ -292,58 +148,59 @@ class BBIKDJSelector:
                 max_window=self.max_window,
                 q_threshold=self.bbi_q_threshold,
         ):
-            return False
+            return prof.reject("bbi_uptrend")
+        prof.lap("bbi_uptrend")
+
+        # —— 2. 60日均线条件（使用通用函数）
+        hist["MA60"] = hist["close"].rolling(window=60, min_periods=1).mean()
 
-        # 2. KDJ 过滤 —— 双重条件
+        # 当前必须在 MA60 上方（保持原条件）
+        if hist["close"].iloc[-1] < hist["MA60"].iloc[-1]:
+            return prof.reject("close_above_ma60")
+        prof.lap("close_above_ma60")
+
+        # 2.5 KDJ 过滤 —— 双重条件
         kdj = compute_kdj(hist)
         j_today = float(kdj.iloc[-1]["J"])
 
         # 最近 max_window 根 K 线的 J 分位
         j_window = kdj["J"].tail(self.max_window).dropna()
         if j_window.empty:
-            return False
+            return prof.reject("kdj_j")
         j_quantile = float(j_window.quantile(self.j_q_threshold))
 
         if not (j_today < self.j_threshold or j_today <= j_quantile):
-            return False
-
-        # —— 2.5 60日均线条件（使用通用函数）
-        hist["MA60"] = hist["close"].rolling(window=60, min_periods=1).mean()
-
-        # 当前必须在 MA60 上方（保持原条件）
-        if hist["close"].iloc[-1] < hist["MA60"].iloc[-1]:
-            return False
+            return prof.reject("kdj_j")
+        prof.lap("kdj_j")
 
         # 寻找最近一次“有效上穿 MA60”的 T（使用 max_window 作为回看长度，避免过旧）
         t_pos = last_valid_ma_cross_up(hist["close"], hist["MA60"], lookback_n=self.max_window)
         if t_pos is None:
-            return False
+            return prof.reject("ma60_cross_up")
+        prof.lap("ma60_cross_up")
 
             # 3. MACD：DIF > 0
         hist["DIF"] = compute_dif(hist)
         if hist["DIF"].iloc[-1] <= 0:
-            return False
+            return prof.reject("dif_positive")
+        prof.lap("dif_positive")
 
         # 4. 当日：收盘>长期线 且 短期线>长期线
         if not zx_condition_at_positions(hist, require_close_gt_long=True, require_short_gt_long=True, pos=None):
-            return False
+            return prof.reject("zx_today")
+        prof.lap("zx_today")
 
-        return True
+        return prof.accept()
 
     # ---------- 多股票批量 ---------- #
+    def history_window(self) -> Tuple[int, int]:
+        """select 所需的 (窗口长度, 最少K线数)：额外预留 20 根 K 线缓冲"""
+        return self.max_window + 20, 1
+
     def select(
             self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]
     ) -> List[str]:
-        picks: List[str] = []
-        for code, df in data.items():
-            hist = df[df["date"] <= date]
-            if hist.empty:
-                continue
-            # 额外预留 20 根 K 线缓冲
-            hist = hist.tail(self.max_window + 20)
-            if self._passes_filters(hist):
-                picks.append(code)
-        return picks
+        return screened_select(self, date, data, *self.history_window())
 
 
 class SuperB1Selector:
@@ -401,20 +258,47 @@ class SuperB1Selector:
         # 为保证给 BBIKDJSelector 提供足够历史，预留额外缓冲
         self._extra_for_bbi = self.bbi_selector.max_window + 20
 
+        self.prescreen = FilterPipeline([
+            Stage("day_constraints", prescreens.day_constraints, cost=1, pass_rate=0.3),
+            Stage("price_drop", partial(prescreens.price_drop, drop_pct=self.price_drop_pct),
+                  cost=1, pass_rate=0.2),
+            Stage("kdj_j", partial(prescreens.kdj_j, j_threshold=self.j_threshold,
+                                   j_q_threshold=self.j_q_threshold, q_window=self.lookback_n),
+                  cost=8, pass_rate=0.2),
+        ])
+
     # 单支股票过滤核心
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
+        prof = PROFILER.track(self)
         if len(hist) < 2:
-            return False
+            return prof.reject("min_length")
 
         # —— 新增：所有战法统一当日过滤
         if not passes_day_constraints_today(hist):
-            return False
+            return prof.reject("day_constraints")
+        prof.lap("day_constraints")
 
         # ---------- Step-0: 数据量判断 ----------
         if len(hist) < self.lookback_n + self._extra_for_bbi:
-            return False
+            return prof.reject("min_length")
+        prof.lap("min_length")
 
-        # ---------- Step-1: 搜索满足 BBIKDJ 的 t_m ----------
+        # ---------- Step-1: 当日相对前一日跌幅（开销小，先判断） ----------
+        close_today, close_prev = hist["close"].iloc[-1], hist["close"].iloc[-2]
+        if close_prev <= 0 or (close_prev - close_today) / close_prev < self.price_drop_pct:
+            return prof.reject("price_drop")
+        prof.lap("price_drop")
+
+        # ---------- Step-2: J 值极低 ----------
+        kdj = compute_kdj(hist)
+        j_today = float(kdj["J"].iloc[-1])
+        j_window = kdj["J"].iloc[-self.lookback_n:].dropna()
+        j_q_val = float(j_window.quantile(self.j_q_threshold)) if not j_window.empty else np.nan
+        if not (j_today < self.j_threshold or j_today <= j_q_val):
+            return prof.reject("kdj_j")
+        prof.lap("kdj_j")
+
+        # ---------- Step-3: 搜索满足 BBIKDJ 的 t_m ----------
         lb_hist = hist.tail(self.lookback_n + 1)  # +1 以排除自身
         tm_idx: int | None = None
         for idx in lb_hist.index[:-1]:
@@ -431,45 +315,29 @@ class SuperB1Selector:
                 else:
                     break
         if tm_idx is None:
-            return False
+            return prof.reject("search_b1_tm")
+        prof.lap("search_b1_tm")
 
         # —— 新增：在 t_m 当日检查【收盘>长期线 且 短期线>长期线】
         tm_pos = hist.index.get_loc(tm_idx)
         if not zx_condition_at_positions(hist, require_close_gt_long=True, require_short_gt_long=True, pos=tm_pos):
-            return False
-
-        # ---------- Step-3: 当日相对前一日跌幅 ----------
-        close_today, close_prev = hist["close"].iloc[-1], hist["close"].iloc[-2]
-        if close_prev <= 0 or (close_prev - close_today) / close_prev < self.price_drop_pct:
-            return False
-
-        # ---------- Step-4: J 值极低 ----------
-        kdj = compute_kdj(hist)
-        j_today = float(kdj["J"].iloc[-1])
-        j_window = kdj["J"].iloc[-self.lookback_n:].dropna()
-        j_q_val = float(j_window.quantile(self.j_q_threshold)) if not j_window.empty else np.nan
-        if not (j_today < self.j_threshold or j_today <= j_q_val):
-            return False
+            return prof.reject("zx_at_tm")
+        prof.lap("zx_at_tm")
 
         # —— 当日仅要求【短期线>长期线】
         if not zx_condition_at_positions(hist, require_close_gt_long=False, require_short_gt_long=True, pos=None):
-            return False
+            return prof.reject("zx_today")
+        prof.lap("zx_today")
 
-        return True
+        return prof.accept()
 
     # 批量选股接口
-    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
-        picks: List[str] = []
+    def history_window(self) -> Tuple[int, int]:
         min_len = self.lookback_n + self._extra_for_bbi
+        return min_len, min_len
 
-        for code, df in data.items():
-            hist = df[df["date"] <= date].tail(min_len)
-            if len(hist) < min_len:
-                continue
-            if self._passes_filters(hist):
-                picks.append(code)
-
-        return picks
+    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
+        return screened_select(self, date, data, *self.history_window())
 
 
 class PeakKDJSelector:
@@ -491,102 +359,81 @@ class PeakKDJSelector:
         self.gap_threshold = gap_threshold  # oc_prev 必须高于区间最低收盘价的比例
         self.j_q_threshold = j_q_threshold
 
+        self.prescreen = FilterPipeline([
+            Stage("day_constraints", prescreens.day_constraints, cost=1, pass_rate=0.3),
+            Stage("kdj_j", partial(prescreens.kdj_j, j_threshold=self.j_threshold,
+                                   j_q_threshold=self.j_q_threshold, q_window=self.max_window),
+                  cost=8, pass_rate=0.2),
+            Stage("peak_pattern", partial(prescreens.peak_pattern, distance=6, prominence=0.5,
+                                          gap_threshold=self.gap_threshold,
+                                          fluc_threshold=self.fluc_threshold),
+                  cost=20, pass_rate=0.1),
+        ])
+
     # ---------- 单支股票过滤 ---------- #
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
+        prof = PROFILER.track(self)
         if hist.empty:
-            return False
+            return prof.reject("empty")
 
         if not passes_day_constraints_today(hist):
-            return False
-
-        hist = hist.copy().sort_values("date")
-        hist["oc_max"] = hist[["open", "close"]].max(axis=1)
-
-        # 1. 提取 peaks
-        peaks_df = _find_peaks(
-            hist,
-            column="oc_max",
-            distance=6,
-            prominence=0.5,
-        )
-
-        # 至少两个峰      
-        date_today = hist.iloc[-1]["date"]
-        peaks_df = peaks_df[peaks_df["date"] < date_today]
-        if len(peaks_df) < 2:
-            return False
-
-        peak_t = peaks_df.iloc[-1]  # 最新一个峰
-        peaks_list = peaks_df.reset_index(drop=True)
-        oc_t = peak_t.oc_max
-        total_peaks = len(peaks_list)
-
-        # 2. 回溯寻找 peak_(t-n)
-        target_peak = None
-        for idx in range(total_peaks - 2, -1, -1):
-            peak_prev = peaks_list.loc[idx]
-            oc_prev = peak_prev.oc_max
-            if oc_t <= oc_prev:  # 要求 peak_t > peak_(t-n)
-                continue
-
-            # 只有当“总峰数 ≥ 3”时才检查区间内其他峰 oc_max
-            if total_peaks >= 3 and idx < total_peaks - 2:
-                inter_oc = peaks_list.loc[idx + 1: total_peaks - 2, "oc_max"]
-                if not (inter_oc < oc_prev).all():
-                    continue
-
-            # 新增： oc_prev 高于区间最低收盘价 gap_threshold
-            date_prev = peak_prev.date
-            mask = (hist["date"] > date_prev) & (hist["date"] < peak_t.date)
-            min_close = hist.loc[mask, "close"].min()
-            if pd.isna(min_close):
-                continue  # 区间无数据
-            if oc_prev <= min_close * (1 + self.gap_threshold):
-                continue
-
-            target_peak = peak_prev
+            return prof.reject("day_constraints")
+        prof.lap("day_constraints")
 
-            break
+        hist = hist.sort_values("date")
 
-        if target_peak is None:
-            return False
-
-        # 3. 当日收盘价波动率
-        close_today = hist.iloc[-1]["close"]
-        fluc_pct = abs(close_today - target_peak.close) / target_peak.close
-        if fluc_pct > self.fluc_threshold:
-            return False
-
-        # 4. KDJ 过滤
+        # 1. KDJ 过滤（开销远小于找峰，先判断）
         kdj = compute_kdj(hist)
         j_today = float(kdj.iloc[-1]["J"])
         j_window = kdj["J"].tail(self.max_window).dropna()
         if j_window.empty:
-            return False
+            return prof.reject("kdj_j")
         j_quantile = float(j_window.quantile(self.j_q_threshold))
         if not (j_today < self.j_threshold or j_today <= j_quantile):
-            return False
+            return prof.reject("kdj_j")
+        prof.lap("kdj_j")
 
+        # 2. 当日：收盘>长期线 且 短期线>长期线
         if not zx_condition_at_positions(hist, require_close_gt_long=True, require_short_gt_long=True, pos=None):
-            return False
+            return prof.reject("zx_today")
+        prof.lap("zx_today")
 
-        return True
+        close = hist["close"].to_numpy(dtype=np.float64)
+        oc_max = np.fmax(hist["open"].to_numpy(dtype=np.float64), close)
+
+        # 3. 提取 peaks（整数位置）
+        peak_idx = peaks.find_peaks(oc_max, distance=6, prominence=0.5)
+
+        # 至少两个峰（峰不会落在当日）
+        if len(peak_idx) < 2:
+            return prof.reject("find_peaks")
+        prof.lap("find_peaks")
+
+        # 4. 回溯寻找 peak_(t-n)：低于最新峰、高于两者之间的各峰，
+        #    且高于区间最低收盘价 gap_threshold（稀疏表 O(1) 查询）
+        target = peaks.prior_peak(oc_max, peak_idx, peaks.SparseTable(close), self.gap_threshold)
+        if target < 0:
+            return prof.reject("target_peak")
+        prof.lap("target_peak")
+
+        # 5. 当日收盘价波动率
+        fluc_pct = abs(close[-1] - close[target]) / close[target]
+        if fluc_pct > self.fluc_threshold:
+            return prof.reject("fluctuation")
+        prof.lap("fluctuation")
+
+        return prof.accept()
 
     # ---------- 多股票批量 ---------- #
+    def history_window(self) -> Tuple[int, int]:
+        return self.max_window + 20, 1  # 额外缓冲
+
     def select(
             self,
             date: pd.Timestamp,
             data: Dict[str, pd.DataFrame],
     ) -> List[str]:
-        picks: List[str] = []
-        for code, df in data.items():
-            hist = df[df["date"] <= date]
-            if hist.empty:
-                continue
-            hist = hist.tail(self.max_window + 20)  # 额外缓冲
-            if self._passes_filters(hist):
-                picks.append(code)
-        return picks
+        return screened_select(self, date, data, *self.history_window())
 
 
 class BBIShortLongSelector:
@@ -616,13 +463,20 @@ class BBIShortLongSelector:
         self.upper_rsv_threshold = upper_rsv_threshold
         self.lower_rsv_threshold = lower_rsv_threshold
 
+        self.prescreen = FilterPipeline([
+            Stage("day_constraints", prescreens.day_constraints, cost=1, pass_rate=0.3),
+        ])
+
     # ---------- 单支股票过滤 ---------- #
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
+        prof = PROFILER.track(self)
+        if not passes_day_constraints_today(hist):
+            return prof.reject("day_constraints")
+        prof.lap("day_constraints")
+
         hist = hist.copy()
         hist["BBI"] = compute_bbi(hist)
-
-        if not passes_day_constraints_today(hist):
-            return False
+        prof.lap("compute_bbi")
 
             # 1. BBI 上升（允许部分回撤）
         if not bbi_deriv_uptrend(
@@ -631,14 +485,15 @@ class BBIShortLongSelector:
                 max_window=self.max_window,
                 q_threshold=self.bbi_q_threshold,
         ):
-            return False
+            return prof.reject("bbi_uptrend")
+        prof.lap("bbi_uptrend")
 
         # 2. 计算短/长期 RSV -----------------
         hist["RSV_short"] = compute_rsv(hist, self.n_short)
         hist["RSV_long"] = compute_rsv(hist, self.n_long)
 
         if len(hist) < self.m:
-            return False  # 数据不足
+            return prof.reject("rsv_pattern")  # 数据不足
 
         win = hist.iloc[-self.m:]  # 最近 m 天
         long_ok = (win["RSV_long"] >= self.upper_rsv_threshold).all()  # 长期 RSV 全 ≥ upper_rsv_threshold
@@ -650,52 +505,43 @@ class BBIShortLongSelector:
         mask_upper = short_series >= self.upper_rsv_threshold
         mask_lower = short_series < self.lower_rsv_threshold
 
-        has_upper_then_lower = False
-        if mask_upper.any():
-            upper_indices = np.where(mask_upper.to_numpy())[0]
-            for i in upper_indices:
-                # 只检查 i 之后的日子
-                if i + 1 < len(short_series) and mask_lower.iloc[i + 1:].any():
-                    has_upper_then_lower = True
-                    break
+        has_upper_then_lower = followed_by(mask_upper.to_numpy(), mask_lower.to_numpy())
 
         end_ok = short_series.iloc[-1] >= self.upper_rsv_threshold
 
         if not (long_ok and has_upper_then_lower and end_ok):
-            return False
+            return prof.reject("rsv_pattern")
+        prof.lap("rsv_pattern")
 
         # 3. MACD：DIF > 0 -------------------
         hist["DIF"] = compute_dif(hist)
         if hist["DIF"].iloc[-1] <= 0:
-            return False
+            return prof.reject("dif_positive")
+        prof.lap("dif_positive")
 
         # 4. 新增：知行情形
         if not zx_condition_at_positions(hist, require_close_gt_long=True, require_short_gt_long=True, pos=None):
-            return False
+            return prof.reject("zx_today")
+        prof.lap("zx_today")
 
-        return True
+        return prof.accept()
 
     # ---------- 多股票批量 ---------- #
+    def history_window(self) -> Tuple[int, int]:
+        # 预留足够长度：RSV 计算窗口 + BBI 检测窗口 + m
+        need_len = (
+                max(self.n_short, self.n_long)
+                + self.bbi_min_window
+                + self.m
+        )
+        return max(need_len, self.max_window), 1
+
     def select(
             self,
             date: pd.Timestamp,
             data: Dict[str, pd.DataFrame],
     ) -> List[str]:
-        picks: List[str] = []
-        for code, df in data.items():
-            hist = df[df["date"] <= date]
-            if hist.empty:
-                continue
-            # 预留足够长度：RSV 计算窗口 + BBI 检测窗口 + m
-            need_len = (
-                    max(self.n_short, self.n_long)
-                    + self.bbi_min_window
-                    + self.m
-            )
-            hist = hist.tail(max(need_len, self.max_window))
-            if self._passes_filters(hist):
-                picks.append(code)
-        return picks
+        return screened_select(self, date, data, *self.history_window())
 
 
 class MA60CrossVolumeWaveSelector:
@@ -731,15 +577,22 @@ class MA60CrossVolumeWaveSelector:
         self.ma60_slope_days = ma60_slope_days
         self.max_window = max_window
 
+        self.prescreen = FilterPipeline([
+            Stage("day_constraints", prescreens.day_constraints, cost=1, pass_rate=0.3),
+            Stage("close_above_ma60", partial(prescreens.close_above_ma, n=60), cost=2, pass_rate=0.5),
+            Stage("kdj_j", partial(prescreens.kdj_j, j_threshold=self.j_threshold,
+                                   j_q_threshold=self.j_q_threshold, q_window=self.max_window),
+                  cost=8, pass_rate=0.2),
+        ])
+
     @staticmethod
     def _ma_slope_positive(series: pd.Series, days: int) -> bool:
         """对最近 days 个点做一阶线性回归，斜率 > 0 判为正"""
         seg = series.dropna().tail(days)
         if len(seg) < days:
             return False
-        x = np.arange(len(seg), dtype=float)
-        # 线性回归（最小二乘）：斜率 k
-        k, _ = np.polyfit(x, seg.values.astype(float), 1)
+        # 线性回归（最小二乘）：斜率 k，闭式解
+        k = kernels.slope(seg.to_numpy(dtype=float), days)[-1]
         return bool(k > 0)
 
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
@@ -747,43 +600,49 @@ class MA60CrossVolumeWaveSelector:
         hist：按日期升序，最后一行是目标交易日
         需包含列：date, open, high, low, close, volume
         """
+        prof = PROFILER.track(self)
         if hist.empty:
-            return False
+            return prof.reject("min_length")
 
         hist = hist.copy().sort_values("date")
         # 至少要有 60 日用于 MA60，再加 lookback/slope 的缓冲
         min_len = max(60 + self.lookback_n + self.ma60_slope_days, self.max_window + 5)
         if len(hist) < min_len:
-            return False
+            return prof.reject("min_length")
+        prof.lap("min_length")
 
         if not passes_day_constraints_today(hist):
-            return False
+            return prof.reject("day_constraints")
+        prof.lap("day_constraints")
+
+        # 1) 当日收盘在 MA60 上方（开销小，先于 KDJ 判断）
+        hist["MA60"] = hist["close"].rolling(window=60, min_periods=1).mean()
+        if hist["close"].iloc[-1] < hist["MA60"].iloc[-1]:
+            return prof.reject("close_above_ma60")
+        prof.lap("close_above_ma60")
 
-        # --- 计算指标 ---
+        # 2) 当日 J 绝对低或相对低
         kdj = compute_kdj(hist)
         j_today = float(kdj["J"].iloc[-1])
         j_window = kdj["J"].tail(self.max_window).dropna()
         if j_window.empty:
-            return False
+            return prof.reject("kdj_j")
         j_q_val = float(j_window.quantile(self.j_q_threshold))
-
-        # 1) 当日 J 绝对低或相对低
         if not (j_today < self.j_threshold or j_today <= j_q_val):
-            return False
+            return prof.reject("kdj_j")
+        prof.lap("kdj_j")
 
-        # 2) MA60 及有效上穿（使用通用函数）
-        hist["MA60"] = hist["close"].rolling(window=60, min_periods=1).mean()
-        if hist["close"].iloc[-1] < hist["MA60"].iloc[-1]:
-            return False
+        # 3) 有效上穿 MA60（使用通用函数）
 
         t_pos = last_valid_ma_cross_up(hist["close"], hist["MA60"], lookback_n=self.lookback_n)
         if t_pos is None:
-            return False
+            return prof.reject("ma60_cross_up")
+        prof.lap("ma60_cross_up")
 
         # === [T, today] 内以 High 最大值的交易日为 Tmax ===
         seg_T_to_today = hist.iloc[t_pos:]
         if seg_T_to_today.empty:
-            return False
+            return prof.reject("volume_wave")
 
         # 若并列最高，默认取“第一次”出现的那天；要“最后一次”可改见注释
         tmax_label = seg_T_to_today["high"].idxmax()
@@ -791,49 +650,48 @@ class MA60CrossVolumeWaveSelector:
         int_pos_Tmax = hist.index.get_loc(tmax_label)
 
         if int_pos_Tmax < int_pos_T:
-            return False
+            return prof.reject("volume_wave")
 
         # 上涨波段 [T, Tmax]（含端点）
         wave = hist.iloc[int_pos_T: int_pos_Tmax + 1]
         wave_len = len(wave)
         if wave_len < 3:
-            return False
+            return prof.reject("volume_wave")
 
         # 等长前置窗口 [T - wave_len, T-1]
         pre_start_pos = max(0, int_pos_T - min(wave_len, 10))
         pre = hist.iloc[pre_start_pos:int_pos_T]
         if len(pre) < max(5, min(10, wave_len)):
-            return False
+            return prof.reject("volume_wave")
 
         # 成交量均值对比
         wave_avg_vol = float(wave["volume"].replace(0, np.nan).dropna().mean())
         pre_avg_vol = float(pre["volume"].replace(0, np.nan).dropna().mean())
         if not (np.isfinite(wave_avg_vol) and np.isfinite(pre_avg_vol) and pre_avg_vol > 0):
-            return False
+            return prof.reject("volume_wave")
 
         if wave_avg_vol < self.vol_multiple * pre_avg_vol:
-            return False
+            return prof.reject("volume_wave")
+        prof.lap("volume_wave")
 
-        # 3) MA60 斜率 > 0（保留原实现）
+        # 4) MA60 斜率 > 0（保留原实现）
         if not self._ma_slope_positive(hist["MA60"], self.ma60_slope_days):
-            return False
+            return prof.reject("ma60_slope")
+        prof.lap("ma60_slope")
 
         if not zx_condition_at_positions(hist, require_close_gt_long=True, require_short_gt_long=True, pos=None):
-            return False
+            return prof.reject("zx_today")
+        prof.lap("zx_today")
 
-        return True
+        return prof.accept()
 
-    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
-        picks: List[str] = []
+    def history_window(self) -> Tuple[int, int]:
         # 给足 60 日均线与量能比较的历史长度
         need_len = max(60 + self.lookback_n + self.ma60_slope_days, self.max_window + 20)
-        for code, df in data.items():
-            hist = df[df["date"] <= date].tail(need_len)
-            if len(hist) < need_len:
-                continue
-            if self._passes_filters(hist):
-                picks.append(code)
-        return picks
+        return need_len, need_len
+
+    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
+        return screened_select(self, date, data, *self.history_window())
 
 
 class BigBullishVolumeSelector:
@@ -871,6 +729,12 @@ class BigBullishVolumeSelector:
         self.eps = float(1e-12)
         self.min_history = int(min_history) if min_history is not None else (self.vol_lookback_n + 2)
 
+        stages = [Stage("pct_change", partial(prescreens.pct_change_above, threshold=self.up_pct_threshold),
+                        cost=1, pass_rate=0.1)]
+        if self.require_bullish_close:
+            stages.append(Stage("bullish_close", prescreens.bullish_close, cost=1, pass_rate=0.5))
+        self.prescreen = FilterPipeline(stages)
+
     @staticmethod
     def _to_float(x) -> float:
         try:
@@ -882,15 +746,17 @@ class BigBullishVolumeSelector:
         return (h - max(o, c)) / max(o, c)
 
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
+        prof = PROFILER.track(self)
         if hist is None or hist.empty:
-            return False
+            return prof.reject("min_length")
 
         hist = hist.sort_values("date").copy()
 
         if len(hist) < self.min_history:
-            return False
+            return prof.reject("min_length")
         if len(hist) < (self.vol_lookback_n + 2):
-            return False  # 至少需要：T、T-1、以及 T-1 往前 n 天
+            return prof.reject("min_length")  # 至少需要：T、T-1、以及 T-1 往前 n 天
+        prof.lap("min_length")
 
         today = hist.iloc[-1]
         prev = hist.iloc[-2]
@@ -906,28 +772,32 @@ class BigBullishVolumeSelector:
         # 基础合法性
         if not (np.isfinite(oT) and np.isfinite(hT) and np.isfinite(lT) and np.isfinite(cT) and np.isfinite(
                 vT) and np.isfinite(cP)):
-            return False
+            return prof.reject("bar_sanity")
         if cP <= 0 or cT <= 0:
-            return False
+            return prof.reject("bar_sanity")
         if hT < max(oT, cT) or lT > min(oT, cT):
             # K线数据异常（不一定必需，但建议保持严谨）
-            return False
+            return prof.reject("bar_sanity")
+        prof.lap("bar_sanity")
 
         # (可选) 要求当日收阳
         if self.require_bullish_close and not (cT >= oT):
-            return False
+            return prof.reject("bullish_close")
+        prof.lap("bullish_close")
 
         # 1) 长阳：涨幅 > 阈值
         pct_chg = cT / cP - 1.0
         if pct_chg <= self.up_pct_threshold:
-            return False
+            return prof.reject("pct_change")
+        prof.lap("pct_change")
 
         # 2) 上影线百分比 < 阈值
         wick_pct = self._upper_wick_pct(oT, hT, cT)
         if not np.isfinite(wick_pct):
-            return False
+            return prof.reject("upper_wick")
         if wick_pct >= self.upper_wick_pct_max:
-            return False
+            return prof.reject("upper_wick")
+        prof.lap("upper_wick")
 
         # 3) 放量：当日成交量 > 前 n 日均量 * 倍数
         vol_hist = hist["volume"].iloc[-(self.vol_lookback_n + 1):-1].astype(float)  # T-n ... T-1
@@ -936,14 +806,15 @@ class BigBullishVolumeSelector:
 
         if len(vol_hist) < max(3, int(self.vol_lookback_n * 0.6)):
             # 有效样本过少就不做判断（你也可以改成直接 False 或严格要求=vol_lookback_n）
-            return False
+            return prof.reject("volume_surge")
 
         avg_vol = float(vol_hist.mean())
         if not (np.isfinite(avg_vol) and avg_vol > 0):
-            return False
+            return prof.reject("volume_surge")
 
         if vT < self.vol_multiple * avg_vol:
-            return False
+            return prof.reject("volume_surge")
+        prof.lap("volume_surge")
 
         # 4) 偏离短线小于阈值
         try:
@@ -953,27 +824,20 @@ class BigBullishVolumeSelector:
             zxdq_T = float("nan")
 
         if not np.isfinite(zxdq_T):
-            return False
+            return prof.reject("close_below_zxdq")
         else:
             if not (cT < zxdq_T * self.close_lt_zxdq_mult):
-                return False
+                return prof.reject("close_below_zxdq")
+        prof.lap("close_below_zxdq")
 
-        return True
+        return prof.accept()
 
-    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
-        picks: List[str] = []
+    def history_window(self) -> Tuple[int, int]:
         need_len = max(self.min_history, self.vol_lookback_n + 2)
+        return need_len, need_len
 
-        for code, df in data.items():
-            if df is None or df.empty:
-                continue
-            hist = df[df["date"] <= date].tail(need_len)
-            if len(hist) < need_len:
-                continue
-            if self._passes_filters(hist):
-                picks.append(code)
-
-        return picks
+    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
+        return screened_select(self, date, data, *self.history_window())
 
 
 class Down20:
@@ -1222,66 +1086,36 @@ class GlodAcross:
             hist = hist.sort_values('date')
 
             # 计算 MACD 指标
-            # DIF = EMA(CLOSE,12) - EMA(CLOSE,26)
-            ema12 = hist['close'].ewm(span=12, adjust=False).mean()
-            ema26 = hist['close'].ewm(span=26, adjust=False).mean()
-            dif = ema12 - ema26
-            
-            # DEA = EMA(DIF,9)
-            dea = dif.ewm(span=9, adjust=False).mean()
-
-            # 检测金叉 (DIF 上穿 DEA)
-            # CROSS(DIF, DEA) 表示前一天 DIF < DEA，今天 DIF >= DEA
-            cross_up = (dif.shift(1) < dea.shift(1)) & (dif >= dea)
-            
-            # 检测死叉 (DEA 上穿 DIF)
-            cross_down = (dea.shift(1) < dif.shift(1)) & (dea >= dif)
-
-            # 找到所有金叉的位置
-            cross_up_positions = cross_up[cross_up].index
-            if len(cross_up_positions) < 2:  # 需要至少两次金叉
-                continue
-
-            # 当前金叉（最后一次金叉）
-            current_cross_pos = cross_up_positions[-1]
-            current_cross_idx = hist.index.get_loc(current_cross_pos)
+            # DIF = EMA(CLOSE,12) - EMA(CLOSE,26)，DEA = EMA(DIF,9)
+            dif, dea, _ = kernels.macd(hist['close'].to_numpy(dtype=float))
 
-            # 前一次金叉（倒数第二次金叉）
-            prev_cross_pos = cross_up_positions[-2]
-            prev_cross_idx = hist.index.get_loc(prev_cross_pos)
+            # 金叉 CROSS(DIF, DEA)：前一天 DIF < DEA，今天 DIF >= DEA；死叉：前一天 DIF > DEA，今天 DIF <= DEA
+            events = CrossEvents(dif, dea)
 
-            # 计算前一次金叉到当前金叉的天数
-            bars_since_prev_cross = current_cross_idx - prev_cross_idx
+            # 1. 当前金叉（最后一次金叉就在今天）
+            current_cross_idx = events.last("up")
+            if current_cross_idx != len(hist) - 1:
+                continue
 
-            # 检查条件：
-            # 1. 当前金叉
-            if not cross_up.iloc[-1]:
+            # 前一次金叉（倒数第二次金叉），需要至少两次金叉
+            prev_cross_idx = events.last("up", at=current_cross_idx - 1)
+            if prev_cross_idx < 0:
                 continue
 
             # 2. 水上条件：当前 DIF > 0 AND DEA > 0
-            current_dif = dif.iloc[-1]
-            current_dea = dea.iloc[-1]
-            if not (current_dif > 0 and current_dea > 0):
+            if not (dif[-1] > 0 and dea[-1] > 0):
                 continue
 
             # 3. 前一次金叉到当前金叉的天数 <= 30
-            if bars_since_prev_cross > 30:
+            if current_cross_idx - prev_cross_idx > 30:
                 continue
 
             # 4. 前一次金叉也在水上：前一次金叉时 DIF > 0 AND DEA > 0
-            prev_dif_at_cross = dif.iloc[prev_cross_idx]
-            prev_dea_at_cross = dea.iloc[prev_cross_idx]
-            if not (prev_dif_at_cross > 0 and prev_dea_at_cross > 0):
+            if not (dif[prev_cross_idx] > 0 and dea[prev_cross_idx] > 0):
                 continue
 
             # 5. 中间有死叉：在前一次金叉到当前金叉之间存在死叉
-            # 检查前一次金叉之后到当前金叉之前的时间段
-            if prev_cross_idx + 1 < current_cross_idx:
-                has_dead_cross = cross_down.iloc[prev_cross_idx+1:current_cross_idx].any()
-                if not has_dead_cross:
-                    continue
-            else:
-                # 没有足够的时间间隔，跳过
+            if events.none_between("down", prev_cross_idx, current_cross_idx):
                 continue
 
             # 所有条件都满足，添加到选股列表
@@ -1375,3 +1209,30 @@ class B3:
             return False
 
         return True
+
+
+class ExpressionSelector:
+    """
+    表达式选股器：条件用选股表达式描述，在全部股票上一次向量化求值
+
+    例如 ``J < 15 & close > ZXDKX & slope(MA60, 5) > 0 & any(cross_up(close, MA60), 25)``，
+    语法与可用指标见 backend/dsl。configs.json 中写法::
+
+        {"class": "ExpressionSelector", "alias": "...", "params": {"expr": "..."}}
+    """
+
+    def __init__(
+            self,
+            expr: str,
+            window: int | None = None,
+            definitions: Optional[Dict[str, str]] = None,
+    ) -> None:
+        # 编译期即校验语法与指标名，配置错误在实例化时报出
+        self.expr = compile_expr(expr, definitions)
+        self.window = window  # 每只股票只取最近 window 根K线；None 为全部历史
+        # 调用方可设置已缓存的高周期面板 {"W": ..., "M": ...}（如每日流水线的 panel_W / panel_M），
+        # 省去每次由日线聚合；结果与不设置时一致
+        self.timeframes: Optional[Dict[str, Any]] = None
+
+    def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
+        return select_frames(self.expr, date, data, window=self.window, timeframes=self.timeframes)
@@ -1,192 +1,29 @@
 import os
+import sys
+from pathlib import Path
 from typing import Dict, List, Optional, Any
 
-from scipy.signal import find_peaks
 import numpy as np
 import pandas as pd
 
-# --------------------------- 通用指标 --------------------------- #
-
-def compute_kdj(df: pd.DataFrame, n: int = 9) -> pd.DataFrame:
-    if df.empty:
-        return df.assign(K=np.nan, D=np.nan, J=np.nan)
-
-    low_n = df["low"].rolling(window=n, min_periods=1).min()
-    high_n = df["high"].rolling(window=n, min_periods=1).max()
-    rsv = (df["close"] - low_n) / (high_n - low_n + 1e-9) * 100
-
-    K = np.zeros_like(rsv, dtype=float)
-    D = np.zeros_like(rsv, dtype=float)
-    for i in range(len(df)):
-        if i == 0:
-            K[i] = D[i] = 50.0
-        else:
-            K[i] = 2 / 3 * K[i - 1] + 1 / 3 * rsv.iloc[i]
-            D[i] = 2 / 3 * D[i - 1] + 1 / 3 * K[i]
-    J = 3 * K - 2 * D
-    return df.assign(K=K, D=D, J=J)
-
-
-def compute_bbi(df: pd.DataFrame) -> pd.Series:
-    ma3 = df["close"].rolling(3).mean()
-    ma6 = df["close"].rolling(6).mean()
-    ma12 = df["close"].rolling(12).mean()
-    ma24 = df["close"].rolling(24).mean()
-    return (ma3 + ma6 + ma12 + ma24) / 4
-
-
-def compute_rsv(
-    df: pd.DataFrame,
-    n: int,
-) -> pd.Series:
-    """
-    按公式：RSV(N) = 100 × (C - LLV(L,N)) ÷ (HHV(C,N) - LLV(L,N))
-    - C 用收盘价最高值 (HHV of close)
-    - L 用最低价最低值 (LLV of low)
-    """
-    low_n = df["low"].rolling(window=n, min_periods=1).min()
-    high_close_n = df["close"].rolling(window=n, min_periods=1).max()
-    rsv = (df["close"] - low_n) / (high_close_n - low_n + 1e-9) * 100.0
-    return rsv
-
-
-def compute_dif(df: pd.DataFrame, fast: int = 12, slow: int = 26) -> pd.Series:
-    """计算 MACD 指标中的 DIF (EMA fast - EMA slow)。"""
-    ema_fast = df["close"].ewm(span=fast, adjust=False).mean()
-    ema_slow = df["close"].ewm(span=slow, adjust=False).mean()
-    return ema_fast - ema_slow
-
-
-def bbi_deriv_uptrend(
-    bbi: pd.Series,
-    *,
-    min_window: int,
-    max_window: int | None = None,
-    q_threshold: float = 0.0,
-) -> bool:
-    """
-    判断 BBI 是否“整体上升”。
-
-    令最新交易日为 T，在区间 [T-w+1, T]（w 自适应，w ≥ min_window 且 ≤ max_window）
-    内，先将 BBI 归一化：BBI_norm(t) = BBI(t) / BBI(T-w+1)。
-
-    再计算一阶差分 Δ(t) = BBI_norm(t) - BBI_norm(t-1)。  
-    若 Δ(t) 的前 q_threshold 分位数 ≥ 0，则认为该窗口通过；只要存在
-    **最长** 满足条件的窗口即可返回 True。q_threshold=0 时退化为
-    “全程单调不降”（旧版行为）。
-
-    Parameters
-    ----------
-    bbi : pd.Series
-        BBI 序列（最新值在最后一位）。
-    min_window : int
-        检测窗口的最小长度。
-    max_window : int | None
-        检测窗口的最大长度；None 表示不设上限。
-    q_threshold : float, default 0.0
-        允许一阶差分为负的比例（0 ≤ q_threshold ≤ 1）。
-    """
-    if not 0.0 <= q_threshold <= 1.0:
-        raise ValueError("q_threshold 必须位于 [0, 1] 区间内")
-
-    bbi = bbi.dropna()
-    if len(bbi) < min_window:
-        return False
-
-    longest = min(len(bbi), max_window or len(bbi))
-
-    # 自最长窗口向下搜索，找到任一满足条件的区间即通过
-    for w in range(longest, min_window - 1, -1):
-        seg = bbi.iloc[-w:]                # 区间 [T-w+1, T]
-        norm = seg / seg.iloc[0]           # 归一化
-        diffs = np.diff(norm.values)       # 一阶差分
-        if np.quantile(diffs, q_threshold) >= 0:
-            return True
-    return False
-
-
-def _find_peaks(
-    df: pd.DataFrame,
-    *,
-    column: str = "high",
-    distance: Optional[int] = None,
-    prominence: Optional[float] = None,
-    height: Optional[float] = None,
-    width: Optional[float] = None,
-    rel_height: float = 0.5,
-    **kwargs: Any,
-) -> pd.DataFrame:
-
-    if column not in df.columns:
-        raise KeyError(f"'{column}' not found in DataFrame columns: {list(df.columns)}")
-
-    y = df[column].to_numpy()
-
-    indices, props = find_peaks(
-        y,
-        distance=distance,
-        prominence=prominence,
-        height=height,
-        width=width,
-        rel_height=rel_height,
-        **kwargs,
-    )
-
-    peaks_df = df.iloc[indices].copy()
-    peaks_df["is_peak"] = True
-
-    # Flatten SciPy arrays into columns (only those with same length as indices)
-    for key, arr in props.items():
-        if isinstance(arr, (list, np.ndarray)) and len(arr) == len(indices):
-            peaks_df[f"peak_{key}"] = arr
-
-    return peaks_df
-
-def last_valid_ma_cross_up(
-    close: pd.Series,
-    ma: pd.Series,
-    lookback_n: int | None = None,
-) -> Optional[int]:
-    """
-    查找“有效上穿 MA”的最后一个交易日 T（close[T-1] < ma[T-1] 且 close[T] ≥ ma[T]）。
-    - 返回的是 **整数位置**（iloc 用）。
-    - lookback_n: 仅在最近 N 根内查找；None 则全历史。
-    """
-    n = len(close)
-    start = 1  # 至少要从 1 起，因为要看 T-1
-    if lookback_n is not None:
-        start = max(start, n - lookback_n)
-
-    # 自后向前找最后一次有效上穿
-    for i in range(n - 1, start - 1, -1):
-        if i - 1 < 0:
-            continue
-        c_prev, c_now = close.iloc[i - 1], close.iloc[i]
-        m_prev, m_now = ma.iloc[i - 1], ma.iloc[i]
-        if pd.notna(c_prev) and pd.notna(c_now) and pd.notna(m_prev) and pd.notna(m_now):
-            if c_prev < m_prev and c_now >= m_now:
-                return i
-    return None
-
-
-def compute_zx_lines(
-    df: pd.DataFrame,
-    m1: int = 14, m2: int = 28, m3: int = 57, m4: int = 114
-) -> tuple[pd.Series, pd.Series]:
-    """返回 (ZXDQ, ZXDKX)
-    ZXDQ = EMA(EMA(C,10),10)
-    ZXDKX = (MA(C,14)+MA(C,28)+MA(C,57)+MA(C,114))/4
-    """
-    close = df["close"].astype(float)
-    zxdq = close.ewm(span=10, adjust=False).mean().ewm(span=10, adjust=False).mean()
-
-    ma1 = close.rolling(window=m1, min_periods=m1).mean()
-    ma2 = close.rolling(window=m2, min_periods=m2).mean()
-    ma3 = close.rolling(window=m3, min_periods=m3).mean()
-    ma4 = close.rolling(window=m4, min_periods=m4).mean()
-    zxdkx = (ma1 + ma2 + ma3 + ma4) / 4.0
-    return zxdq, zxdkx
+_BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.append(str(_BACKEND_DIR))
+
+from indicators import (  # noqa: E402  选股与回测共用的指标库
+    bbi_deriv_uptrend,
+    compute_bbi,
+    compute_dif,
+    compute_kdj,
+    compute_rsv,
+    compute_zx_lines,
+    followed_by,
+    kernels,
+    last_valid_ma_cross_up,
+    peaks,
+)
 
+# --------------------------- 通用指标 --------------------------- #
 
 def passes_day_constraints_today(df: pd.DataFrame, pct_limit: float = 0.02, amp_limit: float = 0.07) -> bool:
     """
@@ -505,61 +342,25 @@ class PeakKDJSelector:
         if not passes_day_constraints_today(hist):
             return False
 
-        hist = hist.copy().sort_values("date")
-        hist["oc_max"] = hist[["open", "close"]].max(axis=1)
-
-        # 1. 提取 peaks
-        peaks_df = _find_peaks(
-            hist,
-            column="oc_max",
-            distance=6,
-            prominence=0.5,
-        )
-
-        # 至少两个峰      
-        date_today = hist.iloc[-1]["date"]
-        peaks_df = peaks_df[peaks_df["date"] < date_today]
-        if len(peaks_df) < 2:
-            return False
-
-        peak_t = peaks_df.iloc[-1]          # 最新一个峰
-        peaks_list = peaks_df.reset_index(drop=True)
-        oc_t = peak_t.oc_max
-        total_peaks = len(peaks_list)
-
-        # 2. 回溯寻找 peak_(t-n)
-        target_peak = None
-        for idx in range(total_peaks - 2, -1, -1):
-            peak_prev = peaks_list.loc[idx]
-            oc_prev = peak_prev.oc_max
-            if oc_t <= oc_prev:             # 要求 peak_t > peak_(t-n)
-                continue
+        hist = hist.sort_values("date")
+        close = hist["close"].to_numpy(dtype=np.float64)
+        oc_max = np.fmax(hist["open"].to_numpy(dtype=np.float64), close)
 
-            # 只有当“总峰数 ≥ 3”时才检查区间内其他峰 oc_max
-            if total_peaks >= 3 and idx < total_peaks - 2:
-                inter_oc = peaks_list.loc[idx + 1 : total_peaks - 2, "oc_max"]
-                if not (inter_oc < oc_prev).all():
-                    continue
+        # 1. 提取 peaks（整数位置）
+        peak_idx = peaks.find_peaks(oc_max, distance=6, prominence=0.5)
 
-            # 新增： oc_prev 高于区间最低收盘价 gap_threshold
-            date_prev = peak_prev.date
-            mask = (hist["date"] > date_prev) & (hist["date"] < peak_t.date)
-            min_close = hist.loc[mask, "close"].min()
-            if pd.isna(min_close):
-                continue                    # 区间无数据
-            if oc_prev <= min_close * (1 + self.gap_threshold):
-                continue
-
-            target_peak = peak_prev
-
-            break
+        # 至少两个峰（峰不会落在当日）
+        if len(peak_idx) < 2:
+            return False
 
-        if target_peak is None:
+        # 2. 回溯寻找 peak_(t-n)：低于最新峰、高于两者之间的各峰，
+        #    且高于区间最低收盘价 gap_threshold（稀疏表 O(1) 查询）
+        target = peaks.prior_peak(oc_max, peak_idx, peaks.SparseTable(close), self.gap_threshold)
+        if target < 0:
             return False
 
         # 3. 当日收盘价波动率
-        close_today = hist.iloc[-1]["close"]
-        fluc_pct = abs(close_today - target_peak.close) / target_peak.close
+        fluc_pct = abs(close[-1] - close[target]) / close[target]
         if fluc_pct > self.fluc_threshold:
             return False
 
@@ -655,14 +456,7 @@ class BBIShortLongSelector:
         mask_upper = short_series >= self.upper_rsv_threshold
         mask_lower = short_series < self.lower_rsv_threshold
 
-        has_upper_then_lower = False
-        if mask_upper.any():
-            upper_indices = np.where(mask_upper.to_numpy())[0]
-            for i in upper_indices:
-                # 只检查 i 之后的日子
-                if i + 1 < len(short_series) and mask_lower.iloc[i + 1 :].any():
-                    has_upper_then_lower = True
-                    break
+        has_upper_then_lower = followed_by(mask_upper.to_numpy(), mask_lower.to_numpy())
 
         end_ok = short_series.iloc[-1] >= self.upper_rsv_threshold
 
@@ -1010,9 +804,8 @@ class MA60CrossVolumeWaveSelector:
         seg = series.dropna().tail(days)
         if len(seg) < days:
             return False
-        x = np.arange(len(seg), dtype=float)
-        # 线性回归（最小二乘）：斜率 k
-        k, _ = np.polyfit(x, seg.values.astype(float), 1)
+        # 线性回归（最小二乘）：斜率 k，闭式解
+        k = kernels.slope(seg.to_numpy(dtype=float), days)[-1]
         return bool(k > 0)
 
     def _passes_filters(self, hist: pd.DataFrame) -> bool:
@@ -2,6 +2,7 @@ import backtrader as bt
 import pandas as pd
 import os
 
+from backtest.cache import BacktestCache, backtest_key, run_outcome
 from backtrader4Lu.strategy.double_line_b1_strategy import DoubleLineStrategy
 from backtrader4Lu.strategy.buy import B1BuyStrategy
 
@@ -36,6 +37,7 @@ def run_backtest(
     plot=False,
     buy_strategies=None,
     sell_strategies=None,
+    cache_dir=None,
 ):
     data_path = f"data/stock_kline_data/{stock_code}.csv"
     if not os.path.exists(data_path):
@@ -53,27 +55,43 @@ def run_backtest(
     end_date_dt = pd.to_datetime(end_date)
     df = df.loc[start_date_dt:end_date_dt]
 
-    cerebro = bt.Cerebro()
+    # 指定 cache_dir 时，K线、策略与参数都没变就直接取缓存的结果（绘图仍需完整运行）
+    cache = BacktestCache(cache_dir) if cache_dir and not plot else None
+    outcome = key = None
+    if cache is not None:
+        key = backtest_key(
+            df, strategy, buy_strategies, sell_strategies,
+            initial_cash=initial_cash, commission=commission, start_date=start_date, end_date=end_date,
+            execute_start_date=execute_start_date, execute_end_date=execute_end_date,
+        )
+        outcome = cache.get(key)
 
-    cerebro.adddata(StockPandasData(dataname=df))
+    if outcome is None:
+        cerebro = bt.Cerebro()
 
-    cerebro.addstrategy(
-        strategy,
-        start_date=start_date,
-        end_date=end_date,
-        execute_start_date=execute_start_date,
-        execute_end_date=execute_end_date,
-        buy_strategies=buy_strategies,
-        sell_strategies=sell_strategies,
-    )
+        cerebro.adddata(StockPandasData(dataname=df))
+
+        cerebro.addstrategy(
+            strategy,
+            start_date=start_date,
+            end_date=end_date,
+            execute_start_date=execute_start_date,
+            execute_end_date=execute_end_date,
+            buy_strategies=buy_strategies,
+            sell_strategies=sell_strategies,
+        )
 
-    cerebro.broker.setcash(initial_cash)
+        cerebro.broker.setcash(initial_cash)
 
-    cerebro.broker.setcommission(commission=commission)
+        cerebro.broker.setcommission(commission=commission)
 
-    cerebro.broker.set_coc(True)
+        cerebro.broker.set_coc(True)
 
-    results = cerebro.run()
+        outcome = run_outcome(cerebro, cerebro.run()[0])
+        if cache is not None:
+            cache.put(key, outcome)
+
+    final_value = outcome["final_value"]
     print(
         "==============================================================================================="
     )
@@ -81,16 +99,13 @@ def run_backtest(
     print(f"初始资金: {initial_cash:.2f}")
     print(f"数据行数: {len(df)}")
     print(f"回测日期范围: {start_date} 到 {end_date}")
-    print(f"最终资金: {cerebro.broker.getvalue():.2f}")
-    print(f"总收益率: {(cerebro.broker.getvalue() / initial_cash - 1) * 100:.2f}%")
+    print(f"最终资金: {final_value:.2f}")
+    print(f"总收益率: {(final_value / initial_cash - 1) * 100:.2f}%")
     print(
         "==============================================================================================="
     )
 
-    strategy_instance = results[0]
-    all_signals = getattr(strategy_instance, "all_signals", [])
-
-    result = {"all_signals": all_signals}
+    result = {"all_signals": outcome["all_signals"]}
 
     if plot:
         try:
@@ -0,0 +1,19 @@
+"""组合回测、绩效指标、单股回测结果缓存与接续回测"""
+from .cache import BacktestCache, backtest_key, run_outcome
+from .incremental import WARMUP_BARS, checkpoint_slot, simulate
+from .metrics import METRIC_COLUMNS, compute_metrics
+from .portfolio import build_signal_matrix, load_signal_table, run_portfolio_backtest
+
+__all__ = [
+    "BacktestCache",
+    "METRIC_COLUMNS",
+    "WARMUP_BARS",
+    "backtest_key",
+    "build_signal_matrix",
+    "checkpoint_slot",
+    "compute_metrics",
+    "load_signal_table",
+    "run_outcome",
+    "run_portfolio_backtest",
+    "simulate",
+]
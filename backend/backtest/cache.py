@@ -0,0 +1,180 @@
+"""
+单股回测结果缓存
+
+按内容寻址：键是 送入回测引擎的K线 + 策略类（含所在源文件）+ 策略与指标库源码（BACKTEST_SOURCES）
++ 参数（资金、手续费、起止日期等）的哈希，任一输入变化都会得到新键，不存在“失效”问题；
+旧条目按总大小淘汰最久未用的。
+
+    cache = BacktestCache("./.backtest_cache", max_bytes=512 * 2**20)
+    key = backtest_key(df, DoubleLineStrategy, buy, sell, initial_cash=500000, commission=0.0002,
+                       start_date="2024-09-24", end_date="2026-02-12")
+    result = cache.get(key)
+    if result is None:
+        result = run_outcome(cerebro, cerebro.run()[0])
+        cache.put(key, result)
+
+布局：root/<键前两位>/<键>.pkl，写临时文件后改名，多个进程 / 线程可共用同一目录。
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from fingerprint import file_digest, module_digest
+
+logger = logging.getLogger(__name__)
+
+# 回测引擎读取的K线列（PandasData 的缺省映射）
+KLINE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# 回测结果依赖的模块 / 包：策略（指标、买卖点、辅助模块）、共享指标库与接续回测
+BACKTEST_SOURCES = ("backtrader4Lu.strategy", "indicators", "backtest.incremental")
+
+
+def _sources_fingerprint() -> Dict[str, str]:
+    """BACKTEST_SOURCES 中各模块 / 包的哈希：修改指标、基类等公共代码后旧结果同样不再命中"""
+    return {m: module_digest(m) for m in BACKTEST_SOURCES}
+
+
+def _class_fingerprint(cls: type) -> str:
+    """类的限定名 + 所在源文件的哈希：修改策略代码后旧结果自然不再命中"""
+    path = getattr(sys.modules.get(cls.__module__), "__file__", None)
+    digest = file_digest(path) if path and os.path.exists(path) else ""
+    return f"{cls.__module__}.{cls.__qualname__}:{digest}"
+
+
+def _strategy_fingerprint(
+    strategy: type,
+    buy_strategies: Optional[Dict[str, type]] = None,
+    sell_strategies: Optional[Dict[str, type]] = None,
+) -> Dict[str, str]:
+    """策略类与各买卖点类的指纹（按名字排序），结果键与检查点键共用"""
+    classes = {"strategy": _class_fingerprint(strategy)}
+    for kind, strategies in (("buy", buy_strategies), ("sell", sell_strategies)):
+        for name, cls in sorted((strategies or {}).items()):
+            classes[f"{kind}:{name}"] = _class_fingerprint(cls)
+    return classes
+
+
+def backtest_key(
+    df: pd.DataFrame,
+    strategy: type,
+    buy_strategies: Optional[Dict[str, type]] = None,
+    sell_strategies: Optional[Dict[str, type]] = None,
+    **params: Any,
+) -> str:
+    """
+    一次单股回测的内容哈希
+
+    df 为送入回测引擎的K线（以日期为索引）；params 为影响结果的其余参数
+    （initial_cash、commission、start_date、end_date 等），按名字排序后计入。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(df.index.to_numpy(dtype="datetime64[ns]")).tobytes())
+    for col in KLINE_COLUMNS:
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    classes = _strategy_fingerprint(strategy, buy_strategies, sell_strategies)
+    h.update(json.dumps([classes, _sources_fingerprint(), params], sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def run_outcome(cerebro, strat) -> Dict[str, Any]:
+    """一次 cerebro.run() 中可缓存的结果（DoubleLineStrategy 记录的各项）"""
+    return {
+        "final_value": cerebro.broker.getvalue(),
+        "all_signals": list(getattr(strat, "all_signals", [])),
+        "trade_records": list(getattr(strat, "trade_records", [])),
+        "equity_curve": np.frombuffer(getattr(strat, "equity_curve", b""), dtype=np.float64).copy(),
+        "trade_pnls": np.frombuffer(getattr(strat, "trade_pnls", b""), dtype=np.float64).copy(),
+        "equity_start_date": getattr(strat, "equity_start_date", None),
+        "equity_end_date": getattr(strat, "equity_end_date", None),
+    }
+
+
+class BacktestCache:
+    """本地磁盘上的回测结果缓存，总大小超过 max_bytes 时淘汰最久未用的条目"""
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = 512 * 2**20):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def _entries(self):
+        return list(self.root.glob("*/*.pkl")) if self.root.exists() else []
+
+    @property
+    def size(self) -> int:
+        """缓存占用的字节数（首次访问时扫描目录，之后随写入累加）"""
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._entries())
+        return self._size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with path.open("rb") as f:
+                result = pickle.load(f)
+            os.utime(path)  # 访问时间记在 mtime 上，供淘汰使用
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        nbytes = tmp.stat().st_size
+        os.replace(tmp, path)
+        with self._lock:
+            self._size = self.size + nbytes
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """按 mtime 从旧到新删除，直到总大小降到上限的 90%"""
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, p))
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, nbytes, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= nbytes
+            removed += 1
+        self._size = total
+        logger.info("回测缓存淘汰 %d 个条目，剩余 %.1f MB", removed, total / 2**20)
+
+    def clear(self) -> None:
+        for p in self._entries():
+            p.unlink(missing_ok=True)
+        self._size = 0
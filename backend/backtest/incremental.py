@@ -0,0 +1,111 @@
+"""
+接续回测
+
+每天收盘后把单股回测延长一根K线时不必从头重跑：上一轮回测在最近一次空仓（无持仓、无挂单）的K线收盘后
+留下检查点（DoubleLineStrategy.checkpoint()），新一轮从检查点次日起执行交易逻辑。
+引擎中只送入检查点之前 warmup 根预热K线及之后的K线，更早的K线挂在数据源的 history 上，
+指标在完整序列上接续计算（indicators.lines），结果与整段回测逐位一致。
+
+    outcome, ckpt = simulate(df, DoubleLineStrategy, buy, sell, initial_cash=500000, commission=0.0002,
+                             start_date="2024-09-24", end_date="2026-02-12")
+    ...  # 新K线到达
+    outcome, ckpt = simulate(df, DoubleLineStrategy, buy, sell, initial_cash=500000, commission=0.0002,
+                             start_date="2024-09-24", end_date="2026-02-13", checkpoint=ckpt)
+
+检查点只取在空仓时：此时没有 backtrader 的持仓、订单与未平仓交易对象，状态只有现金、已记录的结果与
+买入统计，可直接 pickle。检查点带有截至检查点日期的K线与参数的哈希，K线被改写（如前复权除权）、
+策略代码或参数变化时不再适用，自动退回整段回测。
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import backtrader as bt
+import pandas as pd
+
+from .cache import KLINE_COLUMNS, _sources_fingerprint, _strategy_fingerprint, backtest_key, run_outcome
+
+# 预热K线数：策略逐根回看数据源的最长距离（lookback_n 等）之上留足余量；指标线不受此限制
+WARMUP_BARS = 120
+
+
+def checkpoint_slot(
+    code: str,
+    strategy: type,
+    buy_strategies: Optional[Dict[str, type]] = None,
+    sell_strategies: Optional[Dict[str, type]] = None,
+    **params: Any,
+) -> str:
+    """
+    一只股票在给定策略与参数下的检查点存放键（与K线无关），可与结果共用 BacktestCache
+
+    params 为影响检查点的参数（initial_cash、commission、start_date），不含 end_date。
+    """
+    classes = _strategy_fingerprint(strategy, buy_strategies, sell_strategies)
+    payload = json.dumps(["checkpoint", code, classes, _sources_fingerprint(), params],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _resume_row(df: pd.DataFrame, checkpoint: Optional[Dict[str, Any]], key_args: Dict[str, Any], end_date) -> int:
+    """检查点日期在 df 中的行号；检查点不适用（K线或参数变化、晚于 end_date）时为 -1"""
+    if not checkpoint:
+        return -1
+    date = pd.Timestamp(checkpoint["date"])
+    if end_date is not None and date > pd.Timestamp(end_date):
+        return -1
+    pos = int(df.index.searchsorted(date, side="right")) - 1
+    if pos < 0 or df.index[pos] != date:
+        return -1
+    if backtest_key(df.iloc[:pos + 1], **key_args) != checkpoint.get("key"):
+        return -1
+    return pos
+
+
+def simulate(
+    df: pd.DataFrame,
+    strategy: type,
+    buy_strategies: Dict[str, type],
+    sell_strategies: Dict[str, type],
+    initial_cash: float,
+    commission: float,
+    start_date=None,
+    end_date=None,
+    checkpoint: Optional[Dict[str, Any]] = None,
+    warmup: int = WARMUP_BARS,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    单股回测，可从检查点接续，返回 (run_outcome 结果, 新检查点)
+
+    df 为以日期为索引的K线；strategy 需支持 checkpoint 参数与 checkpoint()（如 DoubleLineStrategy）。
+    检查点不适用时整段回测；回测期间从未空仓过时新检查点为 None。
+    """
+    key_args = dict(strategy=strategy, buy_strategies=buy_strategies, sell_strategies=sell_strategies,
+                    initial_cash=initial_cash, commission=commission, start_date=start_date)
+    pos = _resume_row(df, checkpoint, key_args, end_date)
+
+    cerebro = bt.Cerebro(stdstats=False)
+    kwargs = dict(start_date=start_date, end_date=end_date,
+                  buy_strategies=buy_strategies, sell_strategies=sell_strategies)
+    if pos >= 0:
+        first = max(pos + 1 - warmup, 0)
+        feed = bt.feeds.PandasData(dataname=df.iloc[first:], openinterest=None)
+        feed.history = {col: df[col].to_numpy(dtype="float64")[:first] for col in KLINE_COLUMNS}
+        kwargs.update(checkpoint=checkpoint,
+                      execute_start_date=pd.Timestamp(checkpoint["date"]) + pd.Timedelta(days=1))
+        cash = checkpoint["cash"]
+    else:
+        feed = bt.feeds.PandasData(dataname=df, openinterest=None)
+        cash = initial_cash
+    cerebro.adddata(feed)
+    cerebro.addstrategy(strategy, **kwargs)
+    cerebro.broker.setcash(cash)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.broker.set_coc(True)
+    strat = cerebro.run()[0]
+
+    new_checkpoint = strat.checkpoint()
+    if new_checkpoint is not None:
+        row = int(df.index.searchsorted(pd.Timestamp(new_checkpoint["date"]), side="right"))
+        new_checkpoint["key"] = backtest_key(df.iloc[:row], **key_args)
+    return run_outcome(cerebro, strat), new_checkpoint
@@ -0,0 +1,119 @@
+"""
+回测绩效指标
+
+输入为每只股票的资金曲线（每根K线一个账户总值）与已平仓交易的净盈亏，
+把所有曲线按行补齐为一个二维数组后一次性向量化计算，不依赖 backtrader 的 analyzer。
+指标口径与 init_DDL.sql 中 backtest_results 表一致，百分比字段均以 % 表示。
+"""
+import warnings
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+METRIC_COLUMNS = [
+    "total_return",
+    "annual_return",
+    "sharpe_ratio",
+    "max_drawdown",
+    "win_rate",
+    "profit_loss_ratio",
+    "total_trades",
+    "winning_trades",
+    "losing_trades",
+]
+
+
+def _stack(arrays: Sequence[np.ndarray]) -> np.ndarray:
+    """把不等长的一维数组按行补齐为二维数组，末尾以 NaN 填充"""
+    width = max((len(a) for a in arrays), default=0)
+    out = np.full((len(arrays), width), np.nan, dtype=np.float64)
+    for i, a in enumerate(arrays):
+        out[i, :len(a)] = a
+    return out
+
+
+def compute_metrics(
+    equity_curves: Sequence[np.ndarray],
+    trade_pnls: Optional[Sequence[np.ndarray]] = None,
+    initial_cash: Union[float, Sequence[float], None] = None,
+    risk_free_rate: float = 0.0,
+    periods_per_year: int = TRADING_DAYS,
+) -> pd.DataFrame:
+    """
+    批量计算绩效指标
+
+    参数：
+    - equity_curves: 每只股票的资金曲线
+    - trade_pnls: 每只股票已平仓交易的净盈亏（含手续费），缺省视为无交易
+    - initial_cash: 初始资金（标量或逐只），缺省取曲线首个值
+    - risk_free_rate: 年化无风险利率（小数）
+
+    返回：
+    - 行与输入一一对应、列为 METRIC_COLUMNS 的 DataFrame
+    """
+    n = len(equity_curves)
+    if n == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+
+    eq = _stack(equity_curves)
+    lengths = np.array([len(a) for a in equity_curves])
+    valid = lengths > 0
+    last = np.where(valid, eq[np.arange(n), np.maximum(lengths - 1, 0)], np.nan)
+
+    if initial_cash is None:
+        start = eq[:, 0] if eq.shape[1] else np.full(n, np.nan)
+    else:
+        start = np.broadcast_to(np.asarray(initial_cash, dtype=np.float64), (n,))
+
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        total = last / start - 1.0
+
+        # 年化收益：按曲线实际长度折算
+        years = np.maximum(lengths - 1, 1) / periods_per_year
+        annual = np.sign(1.0 + total) * np.abs(1.0 + total) ** (1.0 / years) - 1.0
+
+        # 夏普比率：日收益率的均值/标准差再年化
+        rets = eq[:, 1:] / eq[:, :-1] - 1.0
+        rets -= risk_free_rate / periods_per_year
+        cnt = np.sum(~np.isnan(rets), axis=1)
+        mean = np.nanmean(rets, axis=1) if rets.shape[1] else np.full(n, np.nan)
+        std = np.nanstd(rets, axis=1, ddof=1) if rets.shape[1] else np.full(n, np.nan)
+        sharpe = np.where((cnt > 1) & (std > 0), mean / std * np.sqrt(periods_per_year), 0.0)
+
+        # 最大回撤
+        peak = np.fmax.accumulate(eq, axis=1)
+        dd = 1.0 - eq / peak
+        max_dd = np.where(valid, np.nanmax(np.where(np.isnan(dd), 0.0, dd), axis=1), 0.0)
+
+    if trade_pnls is None:
+        trade_pnls = [np.empty(0)] * n
+    pnl = _stack(trade_pnls)
+    total_trades = np.sum(~np.isnan(pnl), axis=1)
+    win_mask = pnl > 0
+    winning = win_mask.sum(axis=1)
+    losing = total_trades - winning
+    gross_profit = np.where(win_mask, pnl, 0.0).sum(axis=1)
+    gross_loss = -np.where(~win_mask & ~np.isnan(pnl), pnl, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        win_rate = np.where(total_trades > 0, winning / total_trades * 100, 0.0)
+        pl_ratio = np.where(
+            gross_loss > 0,
+            gross_profit / gross_loss,
+            np.where(gross_profit > 0, np.inf, 0.0),
+        )
+
+    return pd.DataFrame({
+        "total_return": total * 100,
+        "annual_return": annual * 100,
+        "sharpe_ratio": sharpe,
+        "max_drawdown": max_dd * 100,
+        "win_rate": win_rate,
+        "profit_loss_ratio": pl_ratio,
+        "total_trades": total_trades.astype(np.int64),
+        "winning_trades": winning.astype(np.int64),
+        "losing_trades": losing.astype(np.int64),
+    })
@@ -0,0 +1,367 @@
+"""
+组合回测引擎
+
+与 ``run_backtest`` / ``batch_backtest`` 逐只股票独立回测不同，这里用一个共享资金池
+按日期推进：每个交易日先处理卖出，再按排名在空余仓位内买入当日出现信号的股票。
+
+所有计算都在 (交易日 × 股票) 的二维数组上按日向量化完成，不为每只股票创建
+Cerebro，内存占用只与面板大小成正比。成交价沿用 ``set_coc(True)`` 的口径：
+信号当日收盘价成交。
+"""
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from panel import Panel
+from panel.panel import _ffill_axis0
+
+from .metrics import compute_metrics
+
+logger = logging.getLogger(__name__)
+
+ALLOCATIONS = ("equal_slot", "equal_cash")
+
+
+# --------------------------- 信号表 --------------------------- #
+
+def load_signal_table(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    读取信号表，返回列 ['date', 'stock_code'(, 'score')] 的 DataFrame
+
+    支持两种格式：
+    - buy_point_lu.py 输出的 JSON：[{"stock_code": ..., "buy_point": {"date": ...}}, ...]
+    - CSV：至少包含 date、stock_code 两列，可选 score 列
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with path.open(encoding="utf-8") as f:
+            records = json.load(f)
+        rows = []
+        for rec in records:
+            bp = rec.get("buy_point", {})
+            rows.append({
+                "date": bp.get("date", rec.get("date")),
+                "stock_code": str(rec["stock_code"]).zfill(6),
+                "score": rec.get("score", bp.get("score", np.nan)),
+            })
+        df = pd.DataFrame(rows, columns=["date", "stock_code", "score"])
+    else:
+        df = pd.read_csv(path, dtype={"stock_code": str})
+        df["stock_code"] = df["stock_code"].str.zfill(6)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def build_signal_matrix(
+    panel: Panel,
+    signals: pd.DataFrame,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把长表信号映射到面板坐标，返回 (信号布尔矩阵, 得分矩阵)，形状均为 (交易日 × 股票)。
+    不在面板日历/股票池内的信号会被丢弃；得分缺失记为 0。
+    """
+    sig = np.zeros((panel.n_dates, panel.n_codes), dtype=bool)
+    score = np.zeros((panel.n_dates, panel.n_codes), dtype=np.float64)
+    if signals is None or signals.empty:
+        return sig, score
+
+    code_pos = pd.Series(np.arange(panel.n_codes), index=panel.codes)
+    cols = code_pos.reindex(signals["stock_code"].astype(str).to_numpy()).to_numpy()
+    days = pd.to_datetime(signals["date"]).to_numpy().astype("datetime64[D]")
+    rows = np.searchsorted(panel.calendar, days)
+    ok = ~np.isnan(cols) & (rows < panel.n_dates)
+    ok[ok] &= panel.calendar[rows[ok]] == days[ok]
+
+    rows, cols = rows[ok], cols[ok].astype(np.int64)
+    sig[rows, cols] = True
+    if "score" in signals.columns:
+        vals = signals["score"].to_numpy(dtype=np.float64)[ok]
+        score[rows, cols] = np.nan_to_num(vals, nan=0.0)
+    return sig, score
+
+
+# --------------------------- 引擎 --------------------------- #
+
+def run_portfolio_backtest(
+    panel: Panel,
+    signals: pd.DataFrame,
+    exit_signals: Optional[pd.DataFrame] = None,
+    initial_cash: float = 1_000_000,
+    commission: float = 0.0002,
+    max_positions: int = 10,
+    allocation: str = "equal_slot",
+    rank_by: Optional[str] = "score",
+    ascending: bool = False,
+    max_hold_days: Optional[int] = None,
+    stop_loss: Optional[float] = None,
+    take_profit: Optional[float] = None,
+    lot_size: int = 100,
+    start_date=None,
+    end_date=None,
+) -> Dict:
+    """
+    共享资金池的组合回测
+
+    参数：
+    - signals: 买入信号长表 ['date', 'stock_code'(, 'score')]
+    - exit_signals: 卖出信号长表（可选），格式同上
+    - max_positions: 最大同时持仓数
+    - allocation: 资金分配方式
+        equal_slot —— 每个仓位目标金额为 总权益 / max_positions
+        equal_cash —— 当日可用现金平均分给当日买入的股票
+    - rank_by: 当日候选的买入顺序；"score" 使用信号表得分，
+      其它取值为面板字段名（按当日值排序），None 则按股票代码顺序。
+      按此顺序逐个买入，剩余现金买不起（或目标金额不够一手）的候选跳过，由后面的候选补上空余仓位
+    - max_hold_days / stop_loss / take_profit: 可选的持有期、止损、止盈（比例，如 0.08）
+
+    返回：
+    - {"equity_curve": DataFrame, "trades": DataFrame, "statistics": dict}
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"allocation 必须是: {', '.join(ALLOCATIONS)}")
+    if max_positions < 1:
+        raise ValueError("max_positions 应 ≥ 1")
+
+    close = panel.dense("close")
+    mark = _ffill_axis0(close)
+    sig, score = build_signal_matrix(panel, signals)
+    if exit_signals is not None:
+        exit_sig, _ = build_signal_matrix(panel, exit_signals)
+    else:
+        exit_sig = None
+    if rank_by not in (None, "score"):
+        score = panel.dense(rank_by)
+        score = np.where(np.isnan(score), -np.inf if not ascending else np.inf, score)
+
+    t0 = 0 if start_date is None else max(panel.date_pos(start_date, side="left") + 1, 0)
+    t1 = panel.n_dates - 1 if end_date is None else panel.date_pos(end_date)
+    n_days = max(t1 - t0 + 1, 0)
+
+    n = panel.n_codes
+    shares = np.zeros(n, dtype=np.float64)
+    entry_price = np.zeros(n, dtype=np.float64)
+    entry_cost = np.zeros(n, dtype=np.float64)
+    entry_day = np.full(n, -1, dtype=np.int64)
+    held = np.zeros(n, dtype=bool)
+    cash = float(initial_cash)
+
+    equity = np.empty(n_days, dtype=np.float64)
+    cash_curve = np.empty(n_days, dtype=np.float64)
+    pos_count = np.empty(n_days, dtype=np.int32)
+    trade_parts: List[Tuple[np.ndarray, ...]] = []
+
+    for k, t in enumerate(range(t0, t1 + 1)):
+        px = close[t]
+        tradable = ~np.isnan(px)
+
+        # ---------- 1) 卖出 ---------- #
+        if held.any():
+            can_sell = held & tradable & (entry_day < t)
+            want = np.zeros(n, dtype=bool)
+            reason = np.zeros(n, dtype=np.int8)
+            if exit_sig is not None:
+                hit = exit_sig[t] & can_sell
+                reason[hit & ~want] = 1
+                want |= hit
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ret = px / entry_price - 1.0
+            if stop_loss is not None:
+                hit = can_sell & (ret <= -stop_loss)
+                reason[hit & ~want] = 2
+                want |= hit
+            if take_profit is not None:
+                hit = can_sell & (ret >= take_profit)
+                reason[hit & ~want] = 3
+                want |= hit
+            if max_hold_days is not None:
+                hit = can_sell & (t - entry_day >= max_hold_days)
+                reason[hit & ~want] = 4
+                want |= hit
+
+            out = np.flatnonzero(want & can_sell)
+            if out.size:
+                gross = shares[out] * px[out]
+                proceeds = gross * (1 - commission)
+                cash += float(proceeds.sum())
+                pnl = proceeds - entry_cost[out]
+                trade_parts.append((
+                    out, entry_day[out].copy(), np.full(out.size, t), entry_price[out].copy(),
+                    px[out].copy(), shares[out].copy(), pnl, pnl / entry_cost[out], reason[out],
+                ))
+                held[out] = False
+                shares[out] = 0.0
+                entry_day[out] = -1
+
+        # ---------- 2) 买入 ---------- #
+        slots = max_positions - int(held.sum())
+        if slots > 0:
+            cand = np.flatnonzero(sig[t] & ~held & tradable)
+            if cand.size:
+                if rank_by is not None and cand.size > 1:
+                    key = score[t, cand]
+                    order = np.argsort(key if ascending else -key, kind="stable")
+                    cand = cand[order]
+
+                price = px[cand]
+                if allocation == "equal_slot":
+                    equity_now = cash + float(np.nansum(shares[held] * mark[t, held]))
+                    budget = equity_now / max_positions
+                else:
+                    budget = cash / min(cand.size, slots)
+                lots = np.floor(budget / (price * (1 + commission)) / lot_size)
+                qty = lots * lot_size
+                cost = qty * price * (1 + commission)
+                # 按排名依次占用现金：现金不足或不够一手的候选跳过（不占用现金与仓位），
+                # 由排在后面的候选补上，直到仓位用完
+                take = np.zeros(cand.size, dtype=bool)
+                left, n_take = cash, 0
+                for i in np.flatnonzero(qty > 0):
+                    if n_take == slots:
+                        break
+                    if cost[i] <= left + 1e-6:
+                        take[i] = True
+                        left -= cost[i]
+                        n_take += 1
+                cand, price, qty, cost = cand[take], price[take], qty[take], cost[take]
+                if cand.size:
+                    cash -= float(cost.sum())
+                    held[cand] = True
+                    shares[cand] = qty
+                    entry_price[cand] = price
+                    entry_cost[cand] = cost
+                    entry_day[cand] = t
+
+        market_value = float(np.nansum(shares[held] * mark[t, held])) if held.any() else 0.0
+        equity[k] = cash + market_value
+        cash_curve[k] = cash
+        pos_count[k] = int(held.sum())
+
+    dates = pd.to_datetime(panel.calendar[t0:t1 + 1])
+    equity_curve = pd.DataFrame({
+        "date": dates,
+        "cash": cash_curve,
+        "market_value": equity - cash_curve,
+        "equity": equity,
+        "positions": pos_count,
+    })
+    trades = _trades_frame(panel, trade_parts)
+    statistics = _summarize(equity_curve, trades, initial_cash, held, panel)
+    return {"equity_curve": equity_curve, "trades": trades, "statistics": statistics}
+
+
+_EXIT_REASONS = np.array(["", "exit_signal", "stop_loss", "take_profit", "max_hold_days"])
+
+
+def _trades_frame(panel: Panel, parts: List[Tuple[np.ndarray, ...]]) -> pd.DataFrame:
+    columns = [
+        "stock_code", "entry_date", "exit_date", "entry_price", "exit_price",
+        "shares", "profit", "return_rate", "reason",
+    ]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    cols = [np.concatenate(p) for p in zip(*parts)]
+    code_i, d_in, d_out, p_in, p_out, qty, pnl, ret, reason = cols
+    return pd.DataFrame({
+        "stock_code": panel.codes[code_i],
+        "entry_date": pd.to_datetime(panel.calendar[d_in]),
+        "exit_date": pd.to_datetime(panel.calendar[d_out]),
+        "entry_price": p_in,
+        "exit_price": p_out,
+        "shares": qty.astype(np.int64),
+        "profit": pnl,
+        "return_rate": ret * 100,
+        "reason": _EXIT_REASONS[reason],
+    })
+
+
+def _summarize(
+    equity_curve: pd.DataFrame,
+    trades: pd.DataFrame,
+    initial_cash: float,
+    held: np.ndarray,
+    panel: Panel,
+) -> Dict:
+    eq = equity_curve["equity"].to_numpy()
+    final_value = float(eq[-1]) if len(eq) else float(initial_cash)
+    pnl = trades["profit"].to_numpy(dtype=np.float64)
+    m = compute_metrics([eq], [pnl], initial_cash=initial_cash).iloc[0]
+    return {
+        "initial_cash": float(initial_cash),
+        "final_value": final_value,
+        "return_rate": (final_value / initial_cash - 1) * 100,
+        "annual_return": float(m["annual_return"]) if len(eq) else 0.0,
+        "sharpe_ratio": float(m["sharpe_ratio"]),
+        "max_drawdown": float(m["max_drawdown"]),
+        "total_trades": int(m["total_trades"]),
+        "winning_trades": int(m["winning_trades"]),
+        "losing_trades": int(m["losing_trades"]),
+        "win_rate": float(m["win_rate"]),
+        "profit_loss_ratio": float(m["profit_loss_ratio"]),
+        "open_positions": panel.codes[held].tolist(),
+    }
+
+
+# --------------------------- 命令行 --------------------------- #
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    p = argparse.ArgumentParser(description="按信号表进行共享资金池的组合回测")
+    p.add_argument("--signals", required=True, help="信号表（buy_point_lu 输出的 JSON 或 CSV）")
+    p.add_argument("--exit-signals", help="卖出信号表（可选）")
+    p.add_argument("--data-dir", default="data/stock_kline_data", help="CSV 行情目录")
+    p.add_argument("--initial-cash", type=float, default=1_000_000)
+    p.add_argument("--commission", type=float, default=0.0002)
+    p.add_argument("--max-positions", type=int, default=10)
+    p.add_argument("--allocation", choices=ALLOCATIONS, default="equal_slot")
+    p.add_argument("--rank-by", default="score", help="排序依据：score / 面板字段名 / none")
+    p.add_argument("--max-hold-days", type=int)
+    p.add_argument("--stop-loss", type=float)
+    p.add_argument("--take-profit", type=float)
+    p.add_argument("--start-date")
+    p.add_argument("--end-date")
+    args = p.parse_args()
+
+    panel = Panel.from_csv_dir(args.data_dir)
+    signals = load_signal_table(args.signals)
+    exit_signals = load_signal_table(args.exit_signals) if args.exit_signals else None
+
+    result = run_portfolio_backtest(
+        panel,
+        signals,
+        exit_signals=exit_signals,
+        initial_cash=args.initial_cash,
+        commission=args.commission,
+        max_positions=args.max_positions,
+        allocation=args.allocation,
+        rank_by=None if args.rank_by.lower() == "none" else args.rank_by,
+        max_hold_days=args.max_hold_days,
+        stop_loss=args.stop_loss,
+        take_profit=args.take_profit,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+
+    stats = result["statistics"]
+    print("=" * 100)
+    print("组合回测结果")
+    print("=" * 100)
+    print(f"初始资金: {stats['initial_cash']:.2f}")
+    print(f"最终资金: {stats['final_value']:.2f}")
+    print(f"总收益率: {stats['return_rate']:.2f}%")
+    print(f"年化收益率: {stats['annual_return']:.2f}%")
+    print(f"夏普比率: {stats['sharpe_ratio']:.2f}")
+    print(f"最大回撤: {stats['max_drawdown']:.2f}%")
+    print(f"交易次数: {stats['total_trades']}（盈利 {stats['winning_trades']} / 亏损 {stats['losing_trades']}）")
+    print(f"胜率: {stats['win_rate']:.2f}%")
+    print(f"盈亏比: {stats['profit_loss_ratio']:.2f}")
+    print(f"期末持仓: {', '.join(stats['open_positions']) or '无'}")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
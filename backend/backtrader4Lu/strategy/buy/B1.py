@@ -35,11 +35,8 @@ class B1BuyStrategy(BuyStrategy):
             t = max_vol_idx
 
             if len(self.strategy.vol_ma5) >= t + 4:
-                vol_ma5_values = [self.strategy.vol_ma5[-i] for i in range(1, t + 1)]
-                vol_ma5_values = vol_ma5_values[::-1]
-                vol_slope = self.calculate_slope(
-                    vol_ma5_values, len(vol_ma5_values)
-                )
+                # 自最近放量日至昨日的成交量MA5回归斜率（前缀和 O(1) 读取）
+                vol_slope = self.strategy.vol_ma5_slope.window_slope(t, ago=1)
                 condition4 = vol_slope < 0
             else:
                 condition4 = False
@@ -48,16 +45,7 @@ class B1BuyStrategy(BuyStrategy):
             condition4 = False
 
         if len(self.strategy.double_line.ma1) >= self.strategy.params.ma60_slope_days:
-            ma60_values = [
-                self.strategy.double_line.ma1[-i] for i in range(0, self.strategy.params.ma60_slope_days)
-            ]
-            ma60_values = ma60_values[::-1]
-            # if len(self) % 50 == 0:
-            #     dates = [self.datas[0].datetime.date(-i) for i in range(0, self.params.ma60_slope_days)]
-            #     pairs = list(zip(dates, ma60_values))
-            #     log_str = "MA1计算: " + ", ".join([f"{d.isoformat()}:{v:.2f}" for d, v in pairs])
-            #     self.log(log_str)
-            ma60_slope = self.calculate_slope(ma60_values, len(ma60_values))
+            ma60_slope = self.strategy.ma60_slope[0]
             condition5 = ma60_slope > 0
         else:
             condition5 = False
@@ -1,5 +1,7 @@
 import numpy as np
 
+from indicators import kernels
+
 
 class BuyStrategy:
     """
@@ -35,7 +37,9 @@ class BuyStrategy:
 
     def calculate_slope(self, data_array, n):
         """
-        计算数据序列的线性回归斜率
+        计算数据序列的线性回归斜率（闭式最小二乘，同 np.polyfit(..., 1)[0]）
+
+        回测中逐根K线取斜率时，优先读取策略里预先算好的 RollingSlope / SlopeSums 指标线。
 
         参数：
         - data_array: 数据序列
@@ -48,15 +52,11 @@ class BuyStrategy:
             return 0
         if n < 2:
             return 0
-        x = np.arange(n)
-        y = np.array(data_array[-n:])
+        y = np.array(data_array[-n:], dtype=float)
         if np.any(np.isnan(y)):
             return 0
-        try:
-            slope = np.polyfit(x, y, 1)[0]
-        except (np.linalg.LinAlgError, ValueError):
-            slope = 0
-        return slope
+        slope = kernels.slope(y, n)[-1]
+        return 0 if np.isnan(slope) else slope
 
     def update_trade_stats(self, pnlcomm, buy_date=None):
         """
@@ -76,6 +76,26 @@ class BuyStrategy:
             self.losing_trades += 1
             self.total_loss += abs(pnlcomm)
 
+    # 接续回测时随检查点保存 / 恢复的统计量
+    STATE_FIELDS = ("total_trades", "winning_trades", "losing_trades", "total_profit", "total_loss",
+                    "buy_dates", "total_commission", "current_trade_commission")
+
+    def get_state(self):
+        """
+        统计量的快照（可 pickle）
+        """
+        state = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        state["buy_dates"] = list(self.buy_dates)
+        return state
+
+    def set_state(self, state):
+        """
+        从 get_state() 的快照恢复统计量
+        """
+        for name in self.STATE_FIELDS:
+            setattr(self, name, state[name])
+        self.buy_dates = list(state["buy_dates"])
+
     def get_stats(self):
         """
         获取交易统计信息
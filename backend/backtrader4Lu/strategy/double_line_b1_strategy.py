@@ -1,7 +1,11 @@
+from array import array
+
 import backtrader as bt
 import numpy as np
 import pandas as pd
 
+from indicators.lines import MovingAverage, RollingSlope, SlopeSums
+
 from .helper import *
 from .indicator import DoubleLineIndicator, KDJIndicator
 
@@ -16,6 +20,7 @@ class DoubleLineStrategy(bt.Strategy):
     参数说明：
     - lookback_n: 回溯周期，用于判断历史条件和最大成交量，默认25
     - ma60_slope_days: MA60斜率计算周期，默认10
+    - checkpoint: 接续回测的起点状态（checkpoint() 的返回值，见 backtest.incremental），默认None
     """
 
     params = (
@@ -27,6 +32,7 @@ class DoubleLineStrategy(bt.Strategy):
         ("execute_end_date", None),
         ("buy_strategies", None),
         ("sell_strategies", None),
+        ("checkpoint", None),
     )
 
 
@@ -40,6 +46,9 @@ class DoubleLineStrategy(bt.Strategy):
         self.order = None
         self.buyprice = None
         self.buycomm = None
+        # 当前持仓尚未分摊到卖出记录的买入手续费与股数（分批卖出时按股数比例分摊）
+        self.open_comm = 0.0
+        self.open_size = 0.0
 
         self.start_date = pd.to_datetime(self.p.start_date).date() if self.p.start_date else None
         self.end_date = pd.to_datetime(self.p.end_date).date() if self.p.end_date else None
@@ -49,10 +58,13 @@ class DoubleLineStrategy(bt.Strategy):
 
         self.double_line = DoubleLineIndicator(self.datas[0])
 
-        self.vol_ma5 = bt.indicators.SMA(self.datas[0].volume, period=5)
-        self.vol_ma5.plotinfo.plot = False
-        self.vol_ma10 = bt.indicators.SMA(self.datas[0].volume, period=10)
-        self.vol_ma10.plotinfo.plot = False
+        # 成交量均线与 bt.indicators.SMA 逐位一致；由内核计算，接续回测时能接上未送入引擎的历史K线
+        self.vol_ma5 = MovingAverage(self.datas[0].volume, period=5)
+        self.vol_ma10 = MovingAverage(self.datas[0].volume, period=10)
+
+        # 买点用到的回归斜率整段预先算好：MA60 固定窗口斜率线、成交量MA5 任意窗口斜率的前缀和
+        self.ma60_slope = RollingSlope(self.double_line.ma1, period=self.p.ma60_slope_days)
+        self.vol_ma5_slope = SlopeSums(self.vol_ma5)
 
         self.kdj = KDJIndicator(self.datas[0])
         self.buy_date = None
@@ -65,6 +77,20 @@ class DoubleLineStrategy(bt.Strategy):
         
         self.all_signals = []
 
+        # 资金曲线与已平仓交易净盈亏（紧凑的 float 数组，供批量计算绩效指标）
+        self.equity_curve = array("d")
+        self.trade_pnls = array("d")
+        self.equity_start_date = None
+        self.equity_end_date = None
+
+        # 成交明细（字段与 trade_details 表一致）
+        self.trade_records = []
+
+        # 最近一次空仓且无挂单时的状态（日期、现金、各记录的长度、买入统计），供 checkpoint() 使用
+        self._flat_state = None
+        if self.p.checkpoint is not None:
+            self.restore(self.p.checkpoint)
+
     def notify_order(self, order):
         """
         订单状态变化回调函数
@@ -83,8 +109,17 @@ class DoubleLineStrategy(bt.Strategy):
                 )
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
+                self.open_comm += order.executed.comm
+                self.open_size += abs(order.executed.size)
                 self.buy_date = self.datas[0].datetime.date(0)
                 self.signal_generator.buy_strategy.current_trade_commission = order.executed.comm
+                self.trade_records.append({
+                    "trade_type": "buy",
+                    "trade_date": self.buy_date,
+                    "trade_price": order.executed.price,
+                    "trade_quantity": abs(order.executed.size),
+                    "trade_amount": order.executed.value,
+                })
             else:
                 sell_date = self.datas[0].datetime.date(0)
                 self.log(
@@ -94,6 +129,23 @@ class DoubleLineStrategy(bt.Strategy):
                     f"执行日期: {sell_date}"
                 )
                 self.signal_generator.buy_strategy.current_trade_commission += order.executed.comm
+                # 净盈亏：毛利扣除本次卖出的手续费及按卖出股数分摊的买入手续费，
+                # 同一笔交易各次卖出之和与 notify_trade 记录的 trade.pnlcomm 一致
+                size = abs(order.executed.size)
+                buy_comm = self.open_comm * min(size / self.open_size, 1.0) if self.open_size else 0.0
+                self.open_comm -= buy_comm
+                self.open_size = max(self.open_size - size, 0.0)
+                pnl = order.executed.pnl - buy_comm - order.executed.comm
+                cost = order.executed.value
+                self.trade_records.append({
+                    "trade_type": "sell",
+                    "trade_date": sell_date,
+                    "trade_price": order.executed.price,
+                    "trade_quantity": abs(order.executed.size),
+                    "trade_amount": order.executed.price * abs(order.executed.size),
+                    "profit_loss": pnl,
+                    "profit_loss_rate": pnl / cost * 100 if cost else None,
+                })
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
             self.log(f"订单取消/拒绝/保证金不足, 状态: {order.getstatusname()}")
 
@@ -113,6 +165,7 @@ class DoubleLineStrategy(bt.Strategy):
         self.signal_generator.buy_strategy.total_commission += self.signal_generator.buy_strategy.current_trade_commission
         self.signal_generator.buy_strategy.current_trade_commission = 0
         self.signal_generator.buy_strategy.update_trade_stats(trade.pnlcomm, self.buy_date)
+        self.trade_pnls.append(trade.pnlcomm)
 
     def next(self):
         """
@@ -120,18 +173,16 @@ class DoubleLineStrategy(bt.Strategy):
 
         包含买入和卖出条件的判断与执行
         """
-        if self.order:
+        current_date = self.datas[0].datetime.date(0)
+        if self.execute_start_date is not None and current_date < self.execute_start_date:
+            return
+        if self.execute_end_date is not None and current_date > self.execute_end_date:
             return
 
-        if self.execute_start_date is not None:
-            current_date = self.datas[0].datetime.date(0)
-            if current_date < self.execute_start_date:
-                return
+        self.record_equity(current_date)
 
-        if self.execute_end_date is not None:
-            current_date = self.datas[0].datetime.date(0)
-            if current_date > self.execute_end_date:
-                return
+        if self.order:
+            return
 
 
         is_buy_signal, size, signal_info = self.signal_generator.check_buy_signal()
@@ -147,6 +198,58 @@ class DoubleLineStrategy(bt.Strategy):
                 self.log(f"卖出信号, 将以收盘价 {sell_price:.2f} 执行")
                 self.order = self.close(size=size)
 
+        if not self.position and self.order is None:
+            self._flat_state = (
+                current_date, self.broker.getcash(), len(self.all_signals), len(self.trade_records),
+                len(self.equity_curve), len(self.trade_pnls), self.signal_generator.buy_strategy.get_state(),
+            )
+
+    def checkpoint(self):
+        """
+        接续回测的检查点：最近一次空仓且无挂单的K线收盘后的全部状态
+
+        空仓时没有持仓、挂单与未平仓交易，状态只有现金、已记录的信号 / 成交 / 资金曲线与买入统计，
+        可直接 pickle；回测期间从未空仓过时返回 None。
+        """
+        if self._flat_state is None:
+            return None
+        date, cash, n_signals, n_records, n_equity, n_pnls, buy_stats = self._flat_state
+        return {
+            "date": date,
+            "cash": cash,
+            "all_signals": self.all_signals[:n_signals],
+            "trade_records": self.trade_records[:n_records],
+            "equity_curve": np.frombuffer(self.equity_curve, dtype=np.float64)[:n_equity].copy(),
+            "trade_pnls": np.frombuffer(self.trade_pnls, dtype=np.float64)[:n_pnls].copy(),
+            "equity_start_date": self.equity_start_date,
+            "buy_stats": buy_stats,
+        }
+
+    def restore(self, state):
+        """
+        从 checkpoint() 的检查点恢复记录与买入统计（现金由调用方设置到 broker）
+        """
+        self.all_signals = list(state["all_signals"])
+        self.trade_records = list(state["trade_records"])
+        self.equity_curve = array("d", state["equity_curve"])
+        self.trade_pnls = array("d", state["trade_pnls"])
+        self.equity_start_date = state["equity_start_date"]
+        self.equity_end_date = state["date"]
+        self.signal_generator.buy_strategy.set_state(state["buy_stats"])
+        self._flat_state = (
+            state["date"], state["cash"], len(self.all_signals), len(self.trade_records),
+            len(self.equity_curve), len(self.trade_pnls), state["buy_stats"],
+        )
+
+    def record_equity(self, current_date):
+        """
+        记录当前K线的账户总值
+        """
+        self.equity_curve.append(self.broker.getvalue())
+        if self.equity_start_date is None:
+            self.equity_start_date = current_date
+        self.equity_end_date = current_date
+
     def log(self, txt, dt=None):
         """
         日志输出函数
@@ -1,10 +1,8 @@
-import backtrader as bt
-import pandas as pd
-from .tdx_ema import TDXEMA
-from .tdx_sma import TDXSMA
+from indicators import compute_zx_lines, kernels
+from indicators.lines import KernelIndicator
 
 
-class DoubleLineIndicator(bt.Indicator):
+class DoubleLineIndicator(KernelIndicator):
     """
     双线指标类
 
@@ -28,6 +26,7 @@ class DoubleLineIndicator(bt.Indicator):
         ("ma60_period", 60),
         ("ema13_period", 13),
     )
+    fields = ("close",)
 
     plotinfo = dict(subplot=False, plotname="DoubleLines")
 
@@ -37,24 +36,10 @@ class DoubleLineIndicator(bt.Indicator):
         ma1=dict(color="green", _name="MA60", linewidth=1.0),
     )
 
-    def compute_zx_lines(
-        df: pd.DataFrame, m1: int = 14, m2: int = 28, m3: int = 57, m4: int = 114
-    ) -> tuple[pd.Series, pd.Series]:
-        """返回 (ZXDQ, ZXDKX)
-        ZXDQ = EMA(EMA(C,10),10)
-        ZXDKX = (MA(C,14)+MA(C,28)+MA(C,57)+MA(C,114))/4
-        """
-        close = df["close"].astype(float)
-        zxdq = close.ewm(span=10, adjust=False).mean().ewm(span=10, adjust=False).mean()
-
-        ma1 = close.rolling(window=m1, min_periods=m1).mean()
-        ma2 = close.rolling(window=m2, min_periods=m2).mean()
-        ma3 = close.rolling(window=m3, min_periods=m3).mean()
-        ma4 = close.rolling(window=m4, min_periods=m4).mean()
-        zxdkx = (ma1 + ma2 + ma3 + ma4) / 4.0
-        return zxdq, zxdkx
+    # 选股口径（pandas）的知行线，与 Selector.compute_zx_lines 相同
+    compute_zx_lines = staticmethod(compute_zx_lines)
 
-    def __init__(self):
+    def compute(self, close):
         """
         trend_line:EMA(EMA(C,10),10),COLORFFFFFF,LINETHICK1;
         MA1:=MA(CLOSE,60);
@@ -67,13 +52,13 @@ class DoubleLineIndicator(bt.Indicator):
 
         duokong_line:(MA(CLOSE,M1)+MA(CLOSE,M2)+MA(CLOSE,M3)+MA(CLOSE,M4))/4;
         """
-        ema1 = TDXEMA(self.data.close, period=self.p.ema_period)
-        self.lines.trend_line = TDXEMA(ema1, period=self.p.ema_period)
+        ema1 = kernels.tdx_ema(close, self.p.ema_period)
+        trend_line = kernels.tdx_ema(ema1, self.p.ema_period)
 
-        ma1 = TDXSMA(self.data.close, period=self.p.ma1_period)
-        ma2 = TDXSMA(self.data.close, period=self.p.ma2_period)
-        ma3 = TDXSMA(self.data.close, period=self.p.ma3_period)
-        ma4 = TDXSMA(self.data.close, period=self.p.ma4_period)
-        self.lines.duokong_line = (ma1 + ma2 + ma3 + ma4) / 4.0
+        ma1 = kernels.tdx_sma(close, self.p.ma1_period)
+        ma2 = kernels.tdx_sma(close, self.p.ma2_period)
+        ma3 = kernels.tdx_sma(close, self.p.ma3_period)
+        ma4 = kernels.tdx_sma(close, self.p.ma4_period)
+        duokong_line = (ma1 + ma2 + ma3 + ma4) / 4.0
 
-        self.lines.ma1 = TDXSMA(self.data.close, period=self.p.ma60_period)
+        return trend_line, duokong_line, kernels.tdx_sma(close, self.p.ma60_period)
@@ -1,7 +1,8 @@
-import backtrader as bt
+from indicators import kernels
+from indicators.lines import KernelIndicator
 
 
-class KDJIndicator(bt.Indicator):
+class KDJIndicator(KernelIndicator):
     """
     KDJ指标类
 
@@ -35,6 +36,7 @@ class KDJIndicator(bt.Indicator):
         ("period_k", 3),
         ("period_d", 3),
     )
+    fields = ("close", "high", "low")
 
     plotinfo = dict(subplot=True, plotname="KDJ")
 
@@ -48,26 +50,17 @@ class KDJIndicator(bt.Indicator):
         """
         初始化方法
 
-        设置KDJ指标的计算基础：
-        1. 计算指定周期内的最低价
-        2. 计算指定周期内的最高价
-        3. 计算RSV值（未成熟随机值）
+        满 period 根K线后才有RSV，指标最小周期与之一致。
 
         RSV计算公式：
         RSV = (收盘价 - 周期内最低价) / (周期内最高价 - 周期内最低价) * 100
         """
-        self.low_n = bt.indicators.Lowest(self.data.low, period=self.p.period)
-        self.high_n = bt.indicators.Highest(self.data.high, period=self.p.period)
-        self.rsv = (
-            (self.data.close - self.low_n) / (self.high_n - self.low_n + 1e-9) * 100
-        )
+        self.addminperiod(self.p.period)
 
-    def next(self):
+    def compute(self, close, high, low):
         """
-        每个K线周期调用一次
-
-        计算当前K线的KDJ值：
-        1. 计算RSV值，处理最高价等于最低价的特殊情况
+        整段计算KDJ值（kernels.kdj_tdx）：
+        1. 计算RSV值，处理最高价等于最低价的特殊情况（RSV = 50）
         2. 计算K值：K = (1/period_k)*RSV + ((period_k-1)/period_k)*前一期K值
         3. 计算D值：D = (1/period_d)*K + ((period_d-1)/period_d)*前一期D值
         4. 计算J值：J = 3*K - 2*D
@@ -76,27 +69,4 @@ class KDJIndicator(bt.Indicator):
         - 当数据长度不足计算周期时，不进行计算
         - 当首次计算时，K、D值都设为RSV值
         """
-        if len(self) < self.p.period:
-            return
-
-        low_val = self.low_n[0]
-        high_val = self.high_n[0]
-        close_val = self.data.close[0]
-
-        if high_val == low_val:
-            rsv_val = 50.0
-        else:
-            rsv_val = (close_val - low_val) / (high_val - low_val) * 100
-
-        if len(self) == self.p.period:
-            self.lines.K[0] = rsv_val
-            self.lines.D[0] = rsv_val
-        else:
-            self.lines.K[0] = (
-                1 * rsv_val + (self.p.period_k - 1) * self.lines.K[-1]
-            ) / self.p.period_k
-            self.lines.D[0] = (
-                1 * self.lines.K[0] + (self.p.period_d - 1) * self.lines.D[-1]
-            ) / self.p.period_d
-
-        self.lines.J[0] = 3 * self.lines.K[0] - 2 * self.lines.D[0]
+        return kernels.kdj_tdx(close, high, low, self.p.period, self.p.period_k, self.p.period_d)
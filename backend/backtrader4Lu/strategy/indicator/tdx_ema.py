@@ -1,8 +1,8 @@
-import backtrader as bt
-import numpy as np
+from indicators import kernels
+from indicators.lines import KernelIndicator
 
 
-class TDXEMA(bt.Indicator):
+class TDXEMA(KernelIndicator):
     """
     TDXEMA 指标类
 
@@ -27,30 +27,10 @@ class TDXEMA(bt.Indicator):
     params = (("period", 10),)
     plotinfo = dict(plot=False)
 
-    def __init__(self):
+    def compute(self, x):
         """
-        初始化方法
-
-        计算EMA的平滑系数α
-        """
-        self.alpha = 2.0 / (self.p.period + 1)
-
-    def next(self):
-        """
-        每个K线周期调用一次
-
-        计算当前K线的EMA值：
+        整段计算EMA值（kernels.tdx_ema）：
         - 第一条K线时，EMA值等于当前价格
-        - 后续K线时，使用标准EMA公式计算
-        - 处理前一期EMA值为NaN的情况
+        - 后续K线时，使用标准EMA公式计算，α = 2 / (周期 + 1)
         """
-        if len(self) == 1:
-            self.lines.ema[0] = self.data[0]
-        else:
-            prev_ema = self.lines.ema[-1]
-            if np.isnan(prev_ema):
-                self.lines.ema[0] = self.data[0]
-            else:
-                self.lines.ema[0] = (
-                    self.alpha * self.data[0] + (1 - self.alpha) * prev_ema
-                )
+        return (kernels.tdx_ema(x, self.p.period),)
@@ -1,7 +1,8 @@
-import backtrader as bt
+from indicators import kernels
+from indicators.lines import KernelIndicator
 
 
-class TDXSMA(bt.Indicator):
+class TDXSMA(KernelIndicator):
     """
     TDXSMA 指标类
 
@@ -10,7 +11,8 @@ class TDXSMA(bt.Indicator):
     功能说明：
     - 计算指定周期的简单移动平均线
     - 采用标准SMA计算公式：SMA = 最近N期价格之和 / N
-    - 当数据长度不足周期时，使用实际可用的数据长度计算
+    - 最近N期不含当根K线（即 MA(REF(X,1), N)）
+    - 当数据长度不足周期时，使用实际可用的数据长度计算，首根K线为 NaN
 
     指标线：
     - sma: 简单移动平均线值
@@ -26,23 +28,6 @@ class TDXSMA(bt.Indicator):
     params = (("period", 14),)
     plotinfo = dict(plot=False)
 
-    def next(self):
-        """
-        每个K线周期调用一次
-
-        计算当前K线的SMA值：
-        - 获取当前数据长度
-        - 当数据长度为0时，直接返回
-        - 计算实际使用的数据长度（不超过设定周期）
-        - 收集最近N期的数据值
-        - 计算平均值作为SMA值
-        """
-        current_len = len(self)
-        period = self.p.period
-
-        if current_len == 0:
-            return
-
-        n = min(current_len, period)
-        values = [self.data[-i] for i in range(1, n + 1)]
-        self.lines.sma[0] = sum(values) / n
+    def compute(self, x):
+        """整段计算SMA值（kernels.tdx_sma）"""
+        return (kernels.tdx_sma(x, self.p.period),)
@@ -0,0 +1,4 @@
+"""性能基准与合成行情"""
+from .synthetic import generate_market, generate_minute_feed, write_csv_dir
+
+__all__ = ["generate_market", "generate_minute_feed", "write_csv_dir"]
@@ -0,0 +1,323 @@
+"""
+性能基准
+
+在合成行情上测量指标函数、各 Selector、行情加载与单股回测的耗时，结果写入 JSON，
+便于跨版本对比。用法（在 backend 目录下）：
+
+    python -m benchmarks.run --stocks 500 --days 750 --output bench.json
+    python -m benchmarks.run --compare bench_old.json --output bench_new.json
+"""
+import argparse
+import contextlib
+import datetime as dt
+import importlib
+import inspect
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from panel.memory import frames_nbytes
+
+from .synthetic import generate_market, write_csv_dir
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ROOT_DIR = BACKEND_DIR.parent
+GROUPS = ("indicators", "selectors", "loaders", "backtest")
+
+
+def _ensure_root_on_path() -> None:
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 3, number: int = 1) -> Dict[str, float]:
+    """重复执行 repeat 轮、每轮 number 次，返回单次调用耗时（秒）的统计"""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+def _selector_classes(module) -> Dict[str, type]:
+    return {
+        name: cls for name, cls in inspect.getmembers(module, inspect.isclass)
+        if cls.__module__ == module.__name__ and callable(getattr(cls, "select", None))
+    }
+
+
+def _selector_params(config_path: Path) -> Dict[str, Dict[str, Any]]:
+    """configs.json 中每个 Selector 类的第一组参数（含未启用的配置）"""
+    if not config_path.exists():
+        return {}
+    with config_path.open(encoding="utf-8") as f:
+        raw = json.load(f)
+    cfgs = raw.get("selectors", []) if isinstance(raw, dict) else raw
+    params: Dict[str, Dict[str, Any]] = {}
+    for cfg in cfgs:
+        params.setdefault(cfg.get("class"), cfg.get("params", {}))
+    return params
+
+
+# --------------------------- 各组基准 --------------------------- #
+
+def bench_indicators(frames: Dict[str, pd.DataFrame], repeat: int) -> Dict[str, Dict]:
+    _ensure_root_on_path()
+    import Selector as S
+    from scipy.signal import find_peaks
+
+    # 取历史最长的一只作为代表
+    df = max(frames.values(), key=len).reset_index(drop=True)
+    bbi = S.compute_bbi(df)
+    oc_max = df[["open", "close"]].max(axis=1).to_numpy()
+    cases = {
+        "compute_kdj": lambda: S.compute_kdj(df),
+        "compute_bbi": lambda: S.compute_bbi(df),
+        "bbi_deriv_uptrend": lambda: S.bbi_deriv_uptrend(bbi, min_window=20, max_window=120, q_threshold=0.2),
+        "scipy.find_peaks": lambda: find_peaks(oc_max, distance=6, prominence=0.5),  # 参照实现
+        "peaks.find_peaks": lambda: S.peaks.find_peaks(oc_max, distance=6, prominence=0.5),
+    }
+    out = {}
+    for name, fn in cases.items():
+        out[name] = {**time_call(fn, repeat=repeat, number=10), "rows": len(df)}
+    return out
+
+
+def bench_selectors(frames: Dict[str, pd.DataFrame], repeat: int, config_path: Path) -> Dict[str, Dict]:
+    _ensure_root_on_path()
+    import Selector as S
+
+    trade_date = max(df["date"].iloc[-1] for df in frames.values())
+    params = _selector_params(config_path)
+    # configs.json 未配置且无默认参数的 Selector
+    params.setdefault("SuperB1Selector", {"B1_params": params.get("BBIKDJSelector", {})})
+    out = {}
+    for name, cls in _selector_classes(S).items():
+        try:
+            selector = cls(**params.get(name, {}))
+        except Exception as e:
+            logger.warning("跳过 %s：无法实例化 (%s)", name, e)
+            continue
+        picks: List[str] = []
+
+        def run():
+            picks[:] = selector.select(trade_date, frames)
+
+        stats = time_call(run, repeat=repeat)
+        out[name] = {**stats, "stocks": len(frames), "picks": len(picks),
+                     "per_stock_ms": stats["median"] / len(frames) * 1000}
+    return out
+
+
+def bench_loaders(data_dir: Path, codes: List[str], repeat: int) -> Dict[str, Dict]:
+    _ensure_root_on_path()
+    # select_stock 在导入时会在当前目录创建日志文件，导入期间切到数据目录
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        select_stock = importlib.import_module("select_stock")
+    finally:
+        os.chdir(cwd)
+    logging.getLogger("select").setLevel(logging.ERROR)
+    out: Dict[str, Dict] = {}
+    for name, compact in (("load_data", False), ("load_data_compact", True)):
+        frames: Dict[str, pd.DataFrame] = {}
+
+        def run():
+            frames.clear()
+            frames.update(select_stock.load_data(data_dir, codes, compact=compact))
+
+        stats = time_call(run, repeat=repeat)
+        out[name] = {**stats, "stocks": len(codes), "per_stock_ms": stats["median"] / len(codes) * 1000,
+                     "memory_mb": frames_nbytes(frames) / 2**20}
+    return out
+
+
+def bench_backtest(work_dir: Path, codes: List[str], repeat: int, start_date: str, end_date: str) -> Dict[str, Dict]:
+    from back_test_lu import run_backtest
+    from backtrader4Lu.strategy.buy import B1BuyStrategy
+    from backtrader4Lu.strategy.sell import (
+        CloseBelowDuokongSellStrategy,
+        StandardTopWindmillSellStrategy,
+        SuspectedTopWindmillSellStrategy,
+    )
+
+    kwargs = dict(
+        start_date=start_date,
+        end_date=end_date,
+        buy_strategies={"B1": B1BuyStrategy},
+        sell_strategies={
+            "close_below_duokong": CloseBelowDuokongSellStrategy,
+            "standard_top_windmill": StandardTopWindmillSellStrategy,
+            "suspected_top_windmill": SuspectedTopWindmillSellStrategy,
+        },
+    )
+
+    def run():
+        # run_backtest 按相对路径 data/stock_kline_data 读取，且逐笔打印日志
+        with contextlib.redirect_stdout(io.StringIO()):
+            for code in codes:
+                run_backtest(stock_code=code, **kwargs)
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        stats = time_call(run, repeat=repeat)
+    finally:
+        os.chdir(cwd)
+    return {"run_backtest": {**stats, "stocks": len(codes), "per_stock_ms": stats["median"] / len(codes) * 1000}}
+
+
+# --------------------------- 主流程 --------------------------- #
+
+def run_benchmarks(
+    n_stocks: int = 500,
+    n_days: int = 750,
+    seed: int = 42,
+    repeat: int = 3,
+    groups=GROUPS,
+    backtest_stocks: int = 5,
+    config_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """生成合成行情并依次运行各组基准，返回可 JSON 序列化的结果"""
+    config_path = Path(config_path or ROOT_DIR / "configs.json")
+    t0 = time.perf_counter()
+    frames = generate_market(n_stocks=n_stocks, n_days=n_days, seed=seed)
+    gen_seconds = time.perf_counter() - t0
+    codes = sorted(frames)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {"stocks": n_stocks, "days": n_days, "seed": seed, "repeat": repeat,
+                       "backtest_stocks": backtest_stocks},
+            "generate_seconds": gen_seconds,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        work_dir = Path(tmp)
+        data_dir = work_dir / "data" / "stock_kline_data"
+        if {"loaders", "backtest"} & set(groups):
+            write_csv_dir(frames, data_dir)
+
+        for group in groups:
+            logger.info("运行基准: %s", group)
+            if group == "indicators":
+                res = bench_indicators(frames, repeat)
+            elif group == "selectors":
+                res = bench_selectors(frames, repeat, config_path)
+            elif group == "loaders":
+                res = bench_loaders(data_dir, codes, repeat)
+            elif group == "backtest":
+                cal = frames[codes[0]]["date"]
+                start = cal.iloc[min(150, len(cal) - 1)].strftime("%Y-%m-%d")
+                end = cal.iloc[-1].strftime("%Y-%m-%d")
+                res = bench_backtest(work_dir, codes[:backtest_stocks], repeat, start, end)
+            else:
+                raise ValueError(f"未知的基准组: {group}")
+            report["results"][group] = res
+    return report
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按 median 对比两份结果，ratio > 1 表示变慢"""
+    rows = []
+    for group, items in current["results"].items():
+        for name, stats in items.items():
+            base = baseline.get("results", {}).get(group, {}).get(name)
+            if base:
+                rows.append({
+                    "benchmark": f"{group}.{name}",
+                    "baseline": base["median"],
+                    "current": stats["median"],
+                    "ratio": stats["median"] / base["median"] if base["median"] else float("nan"),
+                })
+    return rows
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    p = argparse.ArgumentParser(description="在合成行情上运行性能基准")
+    p.add_argument("--stocks", type=int, default=500, help="股票数量")
+    p.add_argument("--days", type=int, default=750, help="交易日数量")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--groups", default=",".join(GROUPS), help=f"逗号分隔，可选 {', '.join(GROUPS)}")
+    p.add_argument("--backtest-stocks", type=int, default=5, help="回测基准使用的股票数")
+    p.add_argument("--config", help="Selector 参数来源，默认项目根目录 configs.json")
+    p.add_argument("--output", help="结果 JSON 路径，默认 benchmark_results/bench_<时间>.json")
+    p.add_argument("--compare", help="与之对比的历史结果 JSON")
+    args = p.parse_args()
+
+    report = run_benchmarks(
+        n_stocks=args.stocks,
+        n_days=args.days,
+        seed=args.seed,
+        repeat=args.repeat,
+        groups=[g.strip() for g in args.groups.split(",") if g.strip()],
+        backtest_stocks=args.backtest_stocks,
+        config_path=args.config,
+    )
+
+    output = Path(args.output or f"benchmark_results/bench_{dt.datetime.now():%Y%m%d_%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("=" * 100)
+    print(f"{'基准':<40}{'median(ms)':>14}{'min(ms)':>14}")
+    for group, items in report["results"].items():
+        for name, stats in items.items():
+            print(f"{group + '.' + name:<40}{stats['median'] * 1000:>14.2f}{stats['min'] * 1000:>14.2f}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("-" * 100)
+        print(f"{'对比':<40}{'baseline(ms)':>14}{'current(ms)':>14}{'ratio':>10}")
+        for row in compare(report, baseline):
+            print(f"{row['benchmark']:<40}{row['baseline'] * 1000:>14.2f}{row['current'] * 1000:>14.2f}{row['ratio']:>10.2f}")
+    print("=" * 100)
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+确定性的合成行情生成器
+
+生成与 fetch_kline 输出格式一致的日线数据（date, open, close, high, low, volume），
+包含 A 股常见的不规则之处：节假日造成的全市场缺口、个股停牌、上市晚于样本起点、
+跳空缺口与 ±10% 涨跌停。同一 seed 下结果完全一致；每只股票使用独立的子随机流，
+增加股票数不会改变已有股票的数据。
+
+generate_minute_feed 逐日产出全市场 1 分钟线，作为分钟行情源的替身。
+"""
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+# 代码段：深市主板、中小板、创业板、沪市主板、科创板
+CODE_PREFIXES = ("000", "002", "300", "600", "688")
+# 1 分钟线的结束时刻（距零点分钟数）：09:31-11:30、13:01-15:00
+SESSION_MINUTES = np.r_[571:691, 781:901]
+
+
+def trading_calendar(n_days: int, start: str = "2021-01-04", seed: int = 0, holiday_rate: float = 0.02) -> pd.DatetimeIndex:
+    """工作日日历中随机剔除约 holiday_rate 比例的日期（模拟节假日休市）"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, periods=int(n_days * (1 + holiday_rate * 2)) + 10)
+    keep = rng.random(len(days)) >= holiday_rate
+    return days[keep][:n_days]
+
+
+def make_code(i: int) -> str:
+    prefix = CODE_PREFIXES[i % len(CODE_PREFIXES)]
+    return f"{prefix}{i // len(CODE_PREFIXES) + 1:03d}"
+
+
+def generate_stock(
+    calendar: pd.DatetimeIndex,
+    rng: np.random.Generator,
+    suspension_rate: float = 0.002,
+    gap_rate: float = 0.01,
+    late_listing_rate: float = 0.1,
+) -> pd.DataFrame:
+    """生成单只股票的日线"""
+    n = len(calendar)
+    vol = rng.uniform(0.015, 0.035)
+    drift = rng.normal(0.0002, 0.0005)
+    ret = rng.normal(drift, vol, n)
+    # 偶发跳空缺口
+    gaps = rng.random(n) < gap_rate
+    ret[gaps] += rng.choice([-1, 1], gaps.sum()) * rng.uniform(0.03, 0.08, gaps.sum())
+    ret = np.clip(ret, -0.1, 0.1)  # 涨跌停
+
+    close = rng.uniform(3, 60) * np.exp(np.cumsum(ret))
+    prev = np.concatenate([[close[0] / np.exp(ret[0])], close[:-1]])
+    open_ = prev * np.exp(ret * rng.uniform(0, 0.6, n) + rng.normal(0, vol / 4, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, vol / 2, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, vol / 2, n)))
+    volume = rng.lognormal(np.log(rng.uniform(2e4, 5e5)), 0.4, n) * (1 + 20 * np.abs(ret))
+
+    keep = np.ones(n, dtype=bool)
+    # 停牌：若干段连续缺失
+    starts = np.flatnonzero(rng.random(n) < suspension_rate)
+    for s in starts:
+        keep[s:s + int(rng.integers(1, 20))] = False
+    # 晚上市
+    if rng.random() < late_listing_rate:
+        keep[: int(rng.integers(1, n // 2))] = False
+    keep[-1] = True  # 保证最新交易日有数据
+
+    df = pd.DataFrame({
+        "date": calendar,
+        "open": open_.round(2),
+        "close": close.round(2),
+        "high": high.round(2),
+        "low": low.round(2),
+        "volume": volume.round(0),
+    })
+    return df[keep].reset_index(drop=True)
+
+
+def generate_market(
+    n_stocks: int = 500,
+    n_days: int = 750,
+    seed: int = 42,
+    start: str = "2021-01-04",
+    suspension_rate: float = 0.002,
+    gap_rate: float = 0.01,
+    late_listing_rate: float = 0.1,
+) -> Dict[str, pd.DataFrame]:
+    """
+    生成全市场合成行情
+
+    返回：
+    - {code: DataFrame}，与 select_stock.load_data 的返回结构一致
+    """
+    calendar = trading_calendar(n_days, start=start, seed=seed)
+    children = np.random.SeedSequence(seed).spawn(n_stocks)
+    return {
+        make_code(i): generate_stock(
+            calendar,
+            np.random.default_rng(children[i]),
+            suspension_rate=suspension_rate,
+            gap_rate=gap_rate,
+            late_listing_rate=late_listing_rate,
+        )
+        for i in range(n_stocks)
+    }
+
+
+def write_csv_dir(frames: Dict[str, pd.DataFrame], out_dir: Union[str, Path]) -> Path:
+    """按 fetch_kline 的格式写出 {code}.csv"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for code, df in frames.items():
+        out = df.copy()
+        out["date"] = out["date"].dt.strftime("%Y-%m-%d")
+        out.to_csv(out_dir / f"{code}.csv", index=False)
+    return out_dir
+
+
+def generate_minute_feed(
+    n_stocks: int = 100,
+    n_days: int = 20,
+    seed: int = 42,
+    start: str = "2021-01-04",
+) -> Iterator[pd.DataFrame]:
+    """
+    逐交易日生成全市场 1 分钟线
+
+    每次产出一个长表 DataFrame（code, datetime, open, close, high, low, volume），
+    行按 时刻、代码 排列，与实时行情源推送的顺序一致；价格逐日延续。
+    """
+    calendar = trading_calendar(n_days, start=start, seed=seed)
+    rng = np.random.default_rng(seed)
+    codes = np.array([make_code(i) for i in range(n_stocks)])
+    price = rng.uniform(3, 60, n_stocks)
+    vol = rng.uniform(0.0008, 0.002, n_stocks)[:, None]
+    n_bars = len(SESSION_MINUTES)
+    for date in calendar:
+        close = price[:, None] * np.exp(np.cumsum(rng.normal(0, 1, (n_stocks, n_bars)) * vol, axis=1))
+        open_ = np.concatenate([price[:, None], close[:, :-1]], axis=1)
+        wick = np.abs(rng.normal(0, 1, (2, n_stocks, n_bars))) * vol / 2
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = rng.lognormal(np.log(2e3), 0.8, (n_stocks, n_bars)).round(0)
+        price = close[:, -1]
+        stamps = np.datetime64(date, "m") + SESSION_MINUTES.astype("timedelta64[m]")
+        yield pd.DataFrame({
+            "code": np.tile(codes, n_bars),
+            "datetime": np.repeat(stamps, n_stocks),
+            "open": open_.T.ravel().round(2),
+            "close": close.T.ravel().round(2),
+            "high": high.T.ravel().round(2),
+            "low": low.T.ravel().round(2),
+            "volume": volume.T.ravel(),
+        })
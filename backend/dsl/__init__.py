@@ -0,0 +1,5 @@
+"""选股表达式：解析、编译并在全市场面板上向量化求值"""
+from .engine import EvalContext, Expression, compile_expr, select_frames
+from .parser import ExpressionError, parse
+
+__all__ = ["EvalContext", "Expression", "ExpressionError", "compile_expr", "parse", "select_frames"]
@@ -0,0 +1,335 @@
+"""
+表达式编译与全市场求值
+
+    expr = compile_expr("J < 15 & close > ZXDKX & slope(MA60, 5) > 0 & any(cross_up(close, MA60), 25)")
+    ctx = EvalContext(panel)
+    picks = ctx.select(expr, "2025-06-30")          # 某日选股
+    signals = ctx.signal_table(expr)               # 全部交易日的信号长表，可直接用于组合回测
+
+EvalContext 把面板展开为“K线序号 × 股票”的二维数组，所有股票一次向量化求值；
+每个规范化子表达式只计算一次并缓存在 EvalContext 中，同一上下文里的多条表达式
+（如多个策略）共享公共子表达式与指标。
+
+任一指标加后缀 ``_weekly`` / ``_monthly`` 即在周线 / 月线上计算并对齐回日线（如
+``J_weekly < 20 & J < 15``）：高周期面板由日线聚合（或使用传入的缓存面板），
+每个交易日（含最新交易日）只取所在周期之前已走完的最后一根，当日结果不随之后的K线变化
+（对齐规则见 panel.timeframe）。
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from panel import TIMEFRAMES, Panel, align_rows, resample_panel
+
+from . import functions as F
+from .parser import ExpressionError, Node, parse
+
+BASE_FIELDS = ("open", "close", "high", "low", "volume")
+# 复合指标：变量名 -> (缓存键, 结果元组中的位置)
+_COMPOSITE = {
+    "K": ("kdj", 0), "D": ("kdj", 1), "J": ("kdj", 2),
+    "DIF": ("macd", 0), "DEA": ("macd", 1), "MACD": ("macd", 2),
+    "ZXDQ": ("zx", 0), "ZXDKX": ("zx", 1),
+    "BBI": ("bbi", None),
+}
+_MA_RE = re.compile(r"^MA(\d+)$")
+_VMA_RE = re.compile(r"^VMA(\d+)$")
+_TIMEFRAME_RE = re.compile(r"^(\w+?)_(%s)$" % "|".join(TIMEFRAMES.values()))
+_SUFFIX_FREQ = {suffix: freq for freq, suffix in TIMEFRAMES.items()}
+
+
+def _is_base_var(name: str) -> bool:
+    return name in BASE_FIELDS or name in _COMPOSITE or bool(_MA_RE.match(name) or _VMA_RE.match(name))
+
+
+def _check(node: Node, text: str) -> str:
+    """校验语义并返回结果类型 'num' / 'bool'"""
+    kind = node[0]
+    if kind == "num":
+        return "num"
+    if kind == "var":
+        name = node[1]
+        m = _TIMEFRAME_RE.match(name)
+        if _is_base_var(m.group(1) if m else name):
+            return "num"
+        raise ExpressionError(f"未知指标 {name!r}")
+    if kind == "neg":
+        if _check(node[1], text) != "num":
+            raise ExpressionError("负号只能作用于数值")
+        return "num"
+    if kind == "not":
+        if _check(node[1], text) != "bool":
+            raise ExpressionError("~ 只能作用于条件")
+        return "bool"
+    if kind == "op":
+        op, a, b = node[1], _check(node[2], text), _check(node[3], text)
+        if op in ("&", "|"):
+            if a != "bool" or b != "bool":
+                raise ExpressionError(f"{op} 两侧必须是条件")
+            return "bool"
+        if a != "num" or b != "num":
+            raise ExpressionError(f"{op} 两侧必须是数值")
+        return "bool" if op in ("<", "<=", "==", "!=") else "num"
+    if kind == "call":
+        name, args = node[1], node[2:]
+        if name not in F.FUNCTIONS:
+            raise ExpressionError(f"未知函数 {name}()")
+        _, sig, ret = F.FUNCTIONS[name]
+        if len(args) != len(sig):
+            raise ExpressionError(f"{name}() 需要 {len(sig)} 个参数，实际 {len(args)} 个")
+        for arg, t in zip(args, sig):
+            if t == "n":
+                if arg[0] != "num" or arg[1] < 1 or arg[1] != int(arg[1]):
+                    raise ExpressionError(f"{name}() 的窗口参数必须是正整数常量")
+            elif _check(arg, text) != ("bool" if t == "c" else "num"):
+                raise ExpressionError(f"{name}() 的参数类型不符（应为{'条件' if t == 'c' else '数值'}）")
+        return ret
+    raise ExpressionError(f"无法识别的节点 {kind}")
+
+
+def _timeframes_used(node: Node) -> frozenset:
+    if node[0] == "var":
+        m = _TIMEFRAME_RE.match(node[1])
+        return frozenset((_SUFFIX_FREQ[m.group(2)],)) if m else frozenset()
+    return frozenset().union(*(_timeframes_used(child) for child in node[1:] if isinstance(child, tuple)))
+
+
+class Expression:
+    """已编译的选股表达式（结果必须是条件）"""
+
+    def __init__(self, text: str, tree: Node):
+        self.text = text
+        self.tree = tree
+        self.timeframes = _timeframes_used(tree)  # 用到的高周期，如 {"W"}
+
+    def evaluate(self, ctx: "EvalContext") -> np.ndarray:
+        return ctx.evaluate(self)
+
+    def __repr__(self) -> str:
+        return f"Expression({self.text!r})"
+
+
+@lru_cache(maxsize=256)
+def _compile_cached(text: str, definitions: Tuple[Tuple[str, str], ...]) -> Expression:
+    defs: Dict[str, Node] = {}
+    for name, body in definitions:
+        defs[name] = parse(body, defs)
+    tree = parse(text, defs)
+    if _check(tree, text) != "bool":
+        raise ExpressionError("表达式结果必须是条件（如 J < 15）")
+    return Expression(text, tree)
+
+
+def compile_expr(text: str, definitions: Optional[Dict[str, str]] = None) -> Expression:
+    """
+    编译表达式
+
+    definitions：自定义指标 {名字: 表达式}（如 indicators 表的 calculation_formula），
+    按给定顺序解析，后面的定义可以引用前面的。
+    """
+    return _compile_cached(text, tuple((definitions or {}).items()))
+
+
+class EvalContext:
+    """
+    在一个面板上求值表达式，并缓存全部中间结果
+
+    timeframes：已缓存的高周期面板 {"W": 周线, "M": 月线}；缺省时首次用到再由日线聚合。
+    """
+
+    def __init__(self, panel: Panel, timeframes: Optional[Dict[str, Panel]] = None):
+        self.panel = panel
+        self._timeframe_panels = dict(timeframes or {})
+        self._timeframes: Dict[str, "EvalContext"] = {}
+        counts = np.diff(panel.offsets)
+        self.n_bars = int(counts.max()) if len(counts) else 0
+        # 每行K线在本股票内的序号
+        self._bar = (np.arange(panel.n_rows) - panel.offsets[panel.row_code]).astype(np.int64)
+        self._cache: Dict[object, object] = {}
+        self._bar_date = self._to_bars(panel.date_idx.astype(np.float64))
+
+    @property
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def _to_bars(self, values: np.ndarray) -> np.ndarray:
+        out = np.full((self.n_bars, self.panel.n_codes), np.nan)
+        out[self._bar, self.panel.row_code] = values
+        return out
+
+    # ---------- 变量 ---------- #
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def field(self, name: str) -> np.ndarray:
+        return self._cached(("field", name), lambda: self._to_bars(self.panel.fields[name]))
+
+    def timeframe(self, freq: str) -> "EvalContext":
+        """周线（"W"）/ 月线（"M"）面板上的求值上下文"""
+        if freq not in self._timeframes:
+            panel = self._timeframe_panels.get(freq)
+            self._timeframes[freq] = EvalContext(panel if panel is not None else resample_panel(self.panel, freq))
+        return self._timeframes[freq]
+
+    def _from_timeframe(self, freq: str, name: str) -> np.ndarray:
+        """高周期上的指标对齐回日线：每行取同一股票所在周期之前的最后一根高周期K线"""
+        ctx = self.timeframe(freq)
+        values = np.broadcast_to(ctx._var(name), (ctx.n_bars, ctx.panel.n_codes))
+        rows = self._cached(("timeframe_rows", freq), lambda: align_rows(self.panel, ctx.panel, freq))
+        ok = rows >= 0
+        flat = np.full(self.panel.n_rows, np.nan)
+        flat[ok] = values[ctx._bar[rows[ok]], ctx.panel.row_code[rows[ok]]]
+        return self._to_bars(flat)
+
+    def _composite(self, key: str):
+        if key == "kdj":
+            return self._cached("kdj", lambda: F.kdj(self.field("close"), self.field("high"), self.field("low")))
+        if key == "macd":
+            return self._cached("macd", lambda: F.macd(self.field("close")))
+        if key == "zx":
+            return self._cached("zx", lambda: F.zx_lines(self.field("close")))
+        return self._cached("bbi", lambda: F.bbi(self.field("close")))
+
+    def _var(self, name: str) -> np.ndarray:
+        m = _TIMEFRAME_RE.match(name)
+        if m:
+            return self._from_timeframe(_SUFFIX_FREQ[m.group(2)], m.group(1))
+        if name in BASE_FIELDS:
+            return self.field(name)
+        if name in _COMPOSITE:
+            key, i = _COMPOSITE[name]
+            res = self._composite(key)
+            return res if i is None else res[i]
+        m = _MA_RE.match(name)
+        if m:
+            # 同 Selector 中 MA60 的口径：min_periods=1
+            return F.rolling_mean(self.field("close"), int(m.group(1)), min_periods=1)
+        m = _VMA_RE.match(name)
+        return F.rolling_mean(self.field("volume"), int(m.group(1)), min_periods=1)
+
+    # ---------- 求值 ---------- #
+    def _eval(self, node: Node):
+        if node in self._cache:
+            return self._cache[node]
+        kind = node[0]
+        if kind == "num":
+            return node[1]
+        if kind == "var":
+            out = self._var(node[1])
+        elif kind == "neg":
+            out = -self._eval(node[1])
+        elif kind == "not":
+            out = ~self._eval(node[1])
+        elif kind == "op":
+            op, a, b = node[1], self._eval(node[2]), self._eval(node[3])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out = {
+                    "&": np.logical_and, "|": np.logical_or,
+                    "<": np.less, "<=": np.less_equal, "==": np.equal, "!=": np.not_equal,
+                    "+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide,
+                }[op](a, b)
+        else:
+            name, args = node[1], node[2:]
+            func, sig, _ = F.FUNCTIONS[name]
+            values = [int(a[1]) if t == "n" else self._eval(a) for a, t in zip(args, sig)]
+            shape = (self.n_bars, self.panel.n_codes)
+            values = [
+                np.full(shape, float(v)) if t == "x" and np.isscalar(v) else v
+                for v, t in zip(values, sig)
+            ]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out = func(*values)
+        self._cache[node] = out
+        return out
+
+    def evaluate(self, expr: "Expression | str") -> np.ndarray:
+        """返回“K线序号 × 股票”的布尔数组"""
+        if isinstance(expr, str):
+            expr = compile_expr(expr)
+        out = np.asarray(self._eval(expr.tree), dtype=bool)
+        return np.broadcast_to(out, (self.n_bars, self.panel.n_codes))
+
+    # ---------- 结果 ---------- #
+    def dense(self, expr: "Expression | str") -> np.ndarray:
+        """(交易日 × 股票) 的布尔信号矩阵，停牌日为 False"""
+        mask = self.evaluate(expr)
+        out = np.zeros((self.panel.n_dates, self.panel.n_codes), dtype=bool)
+        out[self.panel.date_idx, self.panel.row_code] = mask[self._bar, self.panel.row_code]
+        return out
+
+    def select(self, expr: "Expression | str", date) -> List[str]:
+        """
+        某交易日的选股结果
+
+        与各 Selector 一致：每只股票取其 <= date 的最后一根K线判断（停牌股看最近一根）。
+        """
+        mask = self.evaluate(expr)
+        d = self.panel.date_pos(date)
+        if d < 0:
+            return []
+        with np.errstate(invalid="ignore"):
+            pos = (self._bar_date <= d).sum(axis=0) - 1
+        cols = np.flatnonzero(pos >= 0)
+        hit = mask[pos[cols], cols]
+        return [str(c) for c in self.panel.codes[cols[hit]]]
+
+    def signal_table(self, expr: "Expression | str", start=None, end=None) -> pd.DataFrame:
+        """信号长表 ['date', 'stock_code']，格式同 backtest.load_signal_table"""
+        sig = self.dense(expr)
+        days, cols = np.nonzero(sig)
+        df = pd.DataFrame({
+            "date": pd.to_datetime(self.panel.calendar[days]),
+            "stock_code": self.panel.codes[cols],
+        })
+        if start is not None:
+            df = df[df["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["date"] <= pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+
+
+def select_frames(
+    expr: "Expression | str",
+    date,
+    data: Dict[str, pd.DataFrame],
+    window: Optional[int] = None,
+    timeframes: Optional[Dict[str, Panel]] = None,
+) -> List[str]:
+    """
+    对 {code: DataFrame} 直接求值（供 Selector 接口使用）
+
+    window：每只股票只取 <= date 的最近 window 根K线（与其他 Selector 的 tail 口径一致），
+    None 表示全部历史。
+    timeframes：已缓存的高周期面板（如每日流水线维护的 panel_W / panel_M），须由全部历史聚合且
+    覆盖到 date；缺省时由 <= date 的全部历史聚合。高周期指标始终在全部历史上计算，不受 window 截断，
+    因此传入与否结果一致。
+    """
+    ts = pd.Timestamp(date)
+    if isinstance(expr, str):
+        expr = compile_expr(expr)
+    frames, full = {}, {}
+    for code, df in data.items():
+        if df is None or df.empty:
+            continue
+        hist = df[df["date"] <= ts]
+        if hist.empty:
+            continue
+        full[code] = hist
+        frames[code] = hist.tail(window) if window is not None else hist
+    if not frames:
+        return []
+    panel = Panel.from_frames(frames)
+    # 缓存面板覆盖全市场，只取本次参与求值的股票
+    timeframes = {freq: tf.take(frames) for freq, tf in (timeframes or {}).items() if freq in expr.timeframes}
+    missing = [freq for freq in expr.timeframes if freq not in timeframes]
+    if missing:
+        daily = panel if window is None else Panel.from_frames(full)
+        timeframes.update({freq: resample_panel(daily, freq) for freq in missing})
+    picks = set(EvalContext(panel, timeframes=timeframes).select(expr, ts))
+    return [code for code in frames if code in picks]
+
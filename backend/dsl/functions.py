@@ -0,0 +1,64 @@
+"""
+表达式求值用的向量化算子
+
+所有算子作用于“K线序号 × 股票”的二维数组（每列是一只股票自己的K线序列，
+左对齐、尾部以 NaN 补齐），沿 axis=0 计算，只回看历史，因此尾部补齐不影响有效行。
+数值内核来自共享指标库 indicators.kernels，口径与 Selector.py 中的同名指标一致
+（KDJ、BBI、MACD、知行线均按全历史递推）。
+"""
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from indicators.kernels import (
+    bbi,
+    cross_down,
+    cross_up,
+    ema,
+    kdj,
+    macd,
+    rolling_max,
+    rolling_mean,
+    rolling_min,
+    rolling_std,
+    rolling_sum,
+    shift,
+    slope,
+    zx_lines,
+)
+
+
+def any_within(cond: np.ndarray, n: int) -> np.ndarray:
+    """最近 n 根（含当根）内至少一根为真"""
+    return rolling_sum(cond.astype(np.float64), n) > 0
+
+
+def all_within(cond: np.ndarray, n: int) -> np.ndarray:
+    """最近 n 根（含当根）全部为真，且历史满 n 根"""
+    return rolling_sum(cond.astype(np.float64), n, min_periods=n) >= n
+
+
+def count_within(cond: np.ndarray, n: int) -> np.ndarray:
+    return rolling_sum(cond.astype(np.float64), n)
+
+
+# ---------- 函数表：名字 -> (实现, 参数类型) ---------- #
+# 参数类型：x 数值序列，c 条件序列，n 正整数常量
+FUNCTIONS: Dict[str, Tuple[Callable, str, str]] = {
+    "ma": (lambda x, n: rolling_mean(x, n), "xn", "num"),
+    "ema": (ema, "xn", "num"),
+    "sum": (rolling_sum, "xn", "num"),
+    "std": (rolling_std, "xn", "num"),
+    "hhv": (rolling_max, "xn", "num"),
+    "llv": (rolling_min, "xn", "num"),
+    "ref": (shift, "xn", "num"),
+    "slope": (slope, "xn", "num"),
+    "abs": (np.abs, "x", "num"),
+    "max": (np.fmax, "xx", "num"),
+    "min": (np.fmin, "xx", "num"),
+    "cross_up": (cross_up, "xx", "bool"),
+    "cross_down": (cross_down, "xx", "bool"),
+    "any": (any_within, "cn", "bool"),
+    "all": (all_within, "cn", "bool"),
+    "count": (count_within, "cn", "num"),
+}
@@ -0,0 +1,180 @@
+"""
+选股表达式的词法/语法分析
+
+语法（优先级由低到高）::
+
+    expr    := and ( '|' and )*
+    and     := not ( '&' not )*
+    not     := ( '~' | '!' | 'not' ) not | cmp
+    cmp     := add [ ( '<' | '<=' | '>' | '>=' | '==' | '!=' ) add ]
+    add     := mul ( ( '+' | '-' ) mul )*
+    mul     := unary ( ( '*' | '/' ) unary )*
+    unary   := '-' unary | primary
+    primary := NUMBER | NAME | NAME '(' args ')' | '(' expr ')'
+
+``and``/``or`` 可代替 ``&``/``|``。与 Python 不同，``&``/``|`` 的优先级低于比较运算，
+因此 ``J < 15 & close > ZXDKX`` 无需加括号。
+
+解析结果是规范化的嵌套元组（可哈希），相同子表达式得到相同的键，供求值时复用：
+
+- ``("num", 15.0)`` / ``("var", "J")``
+- ``("call", "slope", arg1, arg2, ...)``
+- ``("op", "<", a, b)``；``>``/``>=`` 统一改写为 ``<``/``<=``，
+  ``& | + * == !=`` 的操作数按键排序
+- ``("neg", a)`` / ``("not", a)``
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+Node = Tuple
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<num>\d+\.\d*|\.\d+|\d+)|(?P<name>[A-Za-z_][A-Za-z_0-9]*)"
+    r"|(?P<op><=|>=|==|!=|&&|\|\||[<>+\-*/&|~!(),]))"
+)
+_KEYWORDS = {"and": "&", "or": "|", "not": "~"}
+_ALIASES = {"&&": "&", "||": "|", "!": "~"}
+_COMMUTATIVE = {"&", "|", "+", "*", "==", "!="}
+_FLIP = {">": "<", ">=": "<="}
+
+
+class ExpressionError(ValueError):
+    """表达式语法或语义错误"""
+
+    def __init__(self, message: str, text: str = "", pos: Optional[int] = None):
+        if pos is not None and text:
+            message = f"{message}（位置 {pos}）：{text[:pos]}⟨{text[pos:pos + 1]}⟩{text[pos + 1:]}"
+        super().__init__(message)
+        self.pos = pos
+
+
+def tokenize(text: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ExpressionError("无法识别的字符", text, pos)
+        kind = m.lastgroup
+        value = m.group(kind)
+        start = m.start(kind)
+        if kind == "name" and value.lower() in _KEYWORDS:
+            kind, value = "op", _KEYWORDS[value.lower()]
+        elif kind == "op":
+            value = _ALIASES.get(value, value)
+        tokens.append((kind, value, start))
+        pos = m.end()
+    tokens.append(("end", "", len(text)))
+    return tokens
+
+
+def _make_op(op: str, a: Node, b: Node) -> Node:
+    if op in _FLIP:
+        op, a, b = _FLIP[op], b, a
+    if op in _COMMUTATIVE and repr(b) < repr(a):
+        a, b = b, a
+    return ("op", op, a, b)
+
+
+class _Parser:
+    def __init__(self, text: str, definitions: Dict[str, Node]):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.i = 0
+        self.definitions = definitions
+
+    def peek(self) -> Tuple[str, str, int]:
+        return self.tokens[self.i]
+
+    def take(self, value: Optional[str] = None) -> Tuple[str, str, int]:
+        tok = self.tokens[self.i]
+        if value is not None and tok[1] != value:
+            raise ExpressionError(f"此处应为 '{value}'", self.text, tok[2])
+        self.i += 1
+        return tok
+
+    def parse(self) -> Node:
+        node = self.expr()
+        tok = self.peek()
+        if tok[0] != "end":
+            raise ExpressionError("多余的内容", self.text, tok[2])
+        return node
+
+    def _binary(self, sub, ops) -> Node:
+        node = sub()
+        while self.peek()[0] == "op" and self.peek()[1] in ops:
+            op = self.take()[1]
+            node = _make_op(op, node, sub())
+        return node
+
+    def expr(self) -> Node:
+        return self._binary(self.and_, ("|",))
+
+    def and_(self) -> Node:
+        return self._binary(self.not_, ("&",))
+
+    def not_(self) -> Node:
+        tok = self.peek()
+        if tok[0] == "op" and tok[1] == "~":
+            self.take()
+            return ("not", self.not_())
+        return self.cmp()
+
+    def cmp(self) -> Node:
+        node = self.add()
+        tok = self.peek()
+        if tok[0] == "op" and tok[1] in ("<", "<=", ">", ">=", "==", "!="):
+            self.take()
+            node = _make_op(tok[1], node, self.add())
+            nxt = self.peek()
+            if nxt[0] == "op" and nxt[1] in ("<", "<=", ">", ">=", "==", "!="):
+                raise ExpressionError("不支持连续比较，请用 & 连接", self.text, nxt[2])
+        return node
+
+    def add(self) -> Node:
+        return self._binary(self.mul, ("+", "-"))
+
+    def mul(self) -> Node:
+        return self._binary(self.unary, ("*", "/"))
+
+    def unary(self) -> Node:
+        tok = self.peek()
+        if tok[0] == "op" and tok[1] == "-":
+            self.take()
+            node = self.unary()
+            if node[0] == "num":
+                return ("num", -node[1])
+            return ("neg", node)
+        return self.primary()
+
+    def primary(self) -> Node:
+        kind, value, pos = self.take()
+        if kind == "num":
+            return ("num", float(value))
+        if kind == "name":
+            if self.peek()[1] == "(":
+                self.take("(")
+                args = []
+                if self.peek()[1] != ")":
+                    args.append(self.expr())
+                    while self.peek()[1] == ",":
+                        self.take(",")
+                        args.append(self.expr())
+                self.take(")")
+                return ("call", value.lower(), *args)
+            if value in self.definitions:
+                return self.definitions[value]
+            return ("var", value)
+        if value == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        raise ExpressionError("此处应为数值、指标名或括号", self.text, pos)
+
+
+def parse(text: str, definitions: Optional[Dict[str, Node]] = None) -> Node:
+    """把表达式解析为规范化的语法树；definitions 中的名字按已解析的子树内联展开"""
+    if not text or not text.strip():
+        raise ExpressionError("表达式为空")
+    return _Parser(text, definitions or {}).parse()
@@ -170,15 +170,20 @@ def _get_start_date(out_dir: Path) -> str:
         return "20190101"
 
 
-def fetch_latest_kline():
-    """获取最新股票K线的主函数"""
+def fetch_latest_kline() -> bool:
+    """
+    获取最新股票K线的主函数
+
+    返回：
+    - 抓取是否执行：数据已是最新或抓取完成为 True；Tushare 初始化失败、股票列表缺失或为空为 False
+    """
     global pro
     
     logger.info("开始执行定时任务：获取最新股票K线")
     
     # 初始化Tushare API
     if not _init_tushare():
-        return
+        return False
     
     # 创建输出目录
     out_dir = config.out_dir
@@ -187,7 +192,7 @@ def fetch_latest_kline():
     # 确定起始日期
     start = _get_start_date(out_dir)
     if start is None:
-        return
+        return True
     
     end = dt.date.today().strftime("%Y%m%d")
     
@@ -195,13 +200,13 @@ def fetch_latest_kline():
     stocklist_path = config.stocklist_path
     if not stocklist_path.exists():
         logger.error(f"股票列表文件不存在: {stocklist_path}")
-        return
+        return False
     
     codes = load_codes_from_stocklist(stocklist_path, config.exclude_boards)
     
     if not codes:
         logger.error("stocklist 为空或被过滤后无代码，请检查。")
-        return
+        return False
     
     logger.info(
         "开始抓取 %d 支股票 | 数据源:Tushare(日线,qfq) | 日期:%s → %s",
@@ -250,3 +255,4 @@ def fetch_latest_kline():
         except:
             pass
     gc.collect()
+    return True
@@ -3,7 +3,7 @@ from pathlib import Path
 from typing import List, Set
 import logging
 
-from .utils import _filter_by_boards_stocklist
+from universe import Universe
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +22,8 @@ def validate(df: pd.DataFrame) -> pd.DataFrame:
 
 def load_codes_from_stocklist(stocklist_csv: Path, exclude_boards: Set[str]) -> List[str]:
     """从股票列表文件加载代码"""
-    df = pd.read_csv(stocklist_csv)
-    df = _filter_by_boards_stocklist(df, exclude_boards)
-    codes = df["symbol"].astype(str).str.zfill(6).tolist()
-    codes = list(dict.fromkeys(codes))  # 去重
+    universe = Universe.from_stocklist(stocklist_csv)
+    codes = universe.exclude_boards(exclude_boards).codes()  # 已去重，保持 stocklist 顺序
     logger.info("从 %s 读取到 %d 只股票（排除板块：%s）",
                 stocklist_csv, len(codes), ",".join(sorted(exclude_boards)) or "无")
     return codes
@@ -2,6 +2,8 @@ import random
 import time
 from typing import Set
 
+from universe import Universe
+
 # 常量定义
 COOLDOWN_SECS = 600
 BAN_PATTERNS = (
@@ -49,17 +51,10 @@ def _filter_by_boards_stocklist(df, exclude_boards: Set[str]):
     exclude_boards 子集：{'gem','star','bj'}
     - gem  : 创业板 300/301（.SZ）
     - star : 科创板 688（.SH）
-    - bj   : 北交所（.BJ 或 4/8 开头）
-    """
-    code = df["symbol"].astype(str)
-    ts_code = df["ts_code"].astype(str).str.upper()
-    mask = df.index.to_series().apply(lambda x: True)
+    - bj   : 北交所（.BJ 或 4/8/92 开头）
 
-    if "gem" in exclude_boards:
-        mask &= ~code.str.startswith(("300", "301"))
-    if "star" in exclude_boards:
-        mask &= ~code.str.startswith(("688",))
-    if "bj" in exclude_boards:
-        mask &= ~(ts_code.str.endswith(".BJ") | code.str.startswith(("4", "8")))
-
-    return df[mask].copy()
+    板块由 Universe 一次编码成位图，这里只按位图取行（代码按 6 位补零后判断）。
+    """
+    universe = Universe.from_stocklist(df)
+    keep = universe.exclude_boards(exclude_boards)
+    return df[keep.align(df["symbol"].tolist())].copy()
@@ -0,0 +1,4 @@
+"""源码指纹：缓存键中的模块 / 源文件哈希，修改代码后旧结果自然失效"""
+from .sources import file_digest, module_digest
+
+__all__ = ["file_digest", "module_digest"]
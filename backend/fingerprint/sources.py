@@ -0,0 +1,41 @@
+"""
+源文件与模块的哈希
+
+选股缓存（screening.cache）与回测缓存（backtest.cache）都把相关源码的哈希计入键；
+同一进程内每个文件 / 模块只读取一次。
+"""
+import hashlib
+import importlib.util
+import os
+from functools import lru_cache
+from pathlib import Path
+
+
+@lru_cache(maxsize=None)
+def file_digest(path: str) -> str:
+    """单个源文件的哈希"""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def module_digest(module: str) -> str:
+    """模块源文件的哈希；包为其下全部 .py 文件（含相对路径）的哈希；找不到为空串"""
+    try:
+        spec = importlib.util.find_spec(module)
+    except ModuleNotFoundError:
+        return ""
+    if spec is None:
+        return ""
+    if spec.submodule_search_locations:
+        files = sorted((p.relative_to(loc).as_posix(), p)
+                       for loc in spec.submodule_search_locations for p in Path(loc).rglob("*.py"))
+    elif spec.origin and os.path.exists(spec.origin):
+        files = [(Path(spec.origin).name, Path(spec.origin))]
+    else:
+        return ""
+    h = hashlib.blake2b(digest_size=8)
+    for name, path in files:
+        h.update(name.encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()
@@ -0,0 +1,31 @@
+"""
+共享指标库：NumPy 内核 + pandas 适配层
+
+选股（Selector.py / Selector4Lu.py）、表达式引擎、面板缓存与前置过滤都调用 kernels；
+找峰与区间最值见 indicators.peaks；backtrader 指标见 indicators.lines（需要 backtrader）。
+"""
+from . import kernels, peaks
+from .events import CrossEvents, followed_by
+from .frames import (
+    bbi_deriv_uptrend,
+    compute_bbi,
+    compute_dif,
+    compute_kdj,
+    compute_rsv,
+    compute_zx_lines,
+    last_valid_ma_cross_up,
+)
+
+__all__ = [
+    "CrossEvents",
+    "bbi_deriv_uptrend",
+    "compute_bbi",
+    "compute_dif",
+    "compute_kdj",
+    "compute_rsv",
+    "compute_zx_lines",
+    "followed_by",
+    "kernels",
+    "last_valid_ma_cross_up",
+    "peaks",
+]
@@ -0,0 +1,101 @@
+"""
+交叉事件
+
+    ev = CrossEvents(close, ma60)              # 一维序列或“K线 × 股票”面板
+    ev.last("up", within=25)                   # 最近 25 根内最后一次上穿的位置，没有为 -1
+    ev.count("down", prev + 1, cur - 1)        # 两次金叉之间的死叉次数
+
+上穿/下穿位置、每根K线的“最近一次事件”以及事件计数的前缀和在构造时一次算好，
+之后的查询都是 O(1) 的数组索引，不再逐K线回溯。
+"""
+from typing import Optional, Union
+
+import numpy as np
+
+from . import kernels
+
+IntOrArray = Union[int, np.ndarray]
+
+
+def _take(arr: np.ndarray, idx) -> np.ndarray:
+    """沿 axis 0 取第 idx 行；面板输入时 idx 可以每列一个"""
+    if arr.ndim == 1:
+        return arr[idx]
+    idx = np.broadcast_to(idx, arr.shape[1:])
+    return arr[idx, np.arange(arr.shape[1])]
+
+
+class CrossEvents:
+    """
+    a 与 b 的交叉事件（沿 axis 0）
+
+    - up[t]：a[t-1] < b[t-1] 且 a[t] >= b[t]
+    - down[t]：a[t-1] > b[t-1] 且 a[t] <= b[t]
+
+    含 NaN 的K线不构成交叉。面板输入时各查询对每列（每只股票）分别给出结果。
+    """
+
+    def __init__(self, a, b):
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        self.up = kernels.cross_up(a, b)
+        self.down = kernels.cross_down(a, b)
+        self.n_bars = len(self.up)
+        self._last = {k: kernels.last_true_index(m) for k, m in (("up", self.up), ("down", self.down))}
+        self._cum = {k: np.cumsum(m, axis=0) for k, m in (("up", self.up), ("down", self.down))}
+
+    def _kind(self, kind: str) -> str:
+        if kind not in self._last:
+            raise ValueError(f"kind 必须是 'up' 或 'down'，实际为 {kind!r}")
+        return kind
+
+    def positions(self, kind: str = "up") -> np.ndarray:
+        """一维输入时全部事件的位置（升序）"""
+        return np.flatnonzero(getattr(self, self._kind(kind)))
+
+    def last(self, kind: str = "up", at: IntOrArray = -1, within: Optional[int] = None) -> IntOrArray:
+        """
+        at（含）及之前最后一次事件的位置，没有为 -1
+
+        at：负数表示从末尾倒数；within：只看 [at-within+1, at] 这 within 根K线。
+        """
+        last = self._last[self._kind(kind)]
+        at = np.asarray(at)
+        at = np.where(at < 0, at + self.n_bars, at)
+        valid = at >= 0
+        pos = np.where(valid, _take(last, np.maximum(at, 0)), -1)
+        if within is not None:
+            pos = np.where(pos > at - within, pos, -1)
+        return int(pos) if pos.ndim == 0 else pos
+
+    def count(self, kind: str, start: IntOrArray, end: IntOrArray) -> IntOrArray:
+        """位置 [start, end]（含两端）内的事件次数；区间为空时为 0"""
+        cum = self._cum[self._kind(kind)]
+        start = np.asarray(start)
+        end = np.asarray(end)
+        empty = end < start
+        hi = np.clip(end, 0, self.n_bars - 1)
+        lo = start - 1
+        out = _take(cum, hi) - np.where(lo >= 0, _take(cum, np.maximum(lo, 0)), 0)
+        out = np.where(empty | (end < 0), 0, out)
+        return int(out) if out.ndim == 0 else out
+
+    def none_between(self, kind: str, start: IntOrArray, end: IntOrArray) -> Union[bool, np.ndarray]:
+        """开区间 (start, end) 内没有 kind 事件"""
+        out = np.asarray(self.count(kind, np.asarray(start) + 1, np.asarray(end) - 1)) == 0
+        return bool(out) if out.ndim == 0 else out
+
+
+def followed_by(first: np.ndarray, then: np.ndarray) -> Union[bool, np.ndarray]:
+    """
+    是否存在 i < j 使 first[i] 且 then[j]（沿 axis 0）
+
+    等价于 first 首次为真的位置早于 then 最后一次为真的位置。
+    """
+    first = np.asarray(first, dtype=bool)
+    then = np.asarray(then, dtype=bool)
+    n = len(first)
+    first_pos = np.where(first.any(axis=0), first.argmax(axis=0), n)
+    last_pos = np.where(then.any(axis=0), n - 1 - then[::-1].argmax(axis=0), -1)
+    out = first_pos < last_pos
+    return bool(out) if np.ndim(out) == 0 else out
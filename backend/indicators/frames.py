@@ -0,0 +1,112 @@
+"""
+选股用的 pandas 适配层
+
+函数签名与返回值（索引、列名）与原 Selector.py / Selector4Lu.py 中的同名函数一致，
+计算全部委托给 kernels。
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from . import kernels as K
+from .events import CrossEvents
+
+
+def _col(df: pd.DataFrame, name: str) -> np.ndarray:
+    return df[name].to_numpy(dtype=np.float64)
+
+
+def compute_kdj(df: pd.DataFrame, n: int = 9) -> pd.DataFrame:
+    if df.empty:
+        return df.assign(K=np.nan, D=np.nan, J=np.nan)
+    k, d, j = K.kdj(_col(df, "close"), _col(df, "high"), _col(df, "low"), n)
+    return df.assign(K=k, D=d, J=j)
+
+
+def compute_bbi(df: pd.DataFrame) -> pd.Series:
+    return pd.Series(K.bbi(_col(df, "close")), index=df.index, name="close")
+
+
+def compute_rsv(
+        df: pd.DataFrame,
+        n: int,
+) -> pd.Series:
+    """
+    按公式：RSV(N) = 100 × (C - LLV(L,N)) ÷ (HHV(C,N) - LLV(L,N))
+    - C 用收盘价最高值 (HHV of close)
+    - L 用最低价最低值 (LLV of low)
+    """
+    close = _col(df, "close")
+    return pd.Series(K.rsv(close, close, _col(df, "low"), n), index=df.index)
+
+
+def compute_dif(df: pd.DataFrame, fast: int = 12, slow: int = 26) -> pd.Series:
+    """计算 MACD 指标中的 DIF (EMA fast - EMA slow)。"""
+    close = _col(df, "close")
+    return pd.Series(K.ema(close, fast) - K.ema(close, slow), index=df.index, name="close")
+
+
+def compute_zx_lines(
+        df: pd.DataFrame,
+        m1: int = 14, m2: int = 28, m3: int = 57, m4: int = 114
+) -> tuple[pd.Series, pd.Series]:
+    """返回 (ZXDQ, ZXDKX)
+    ZXDQ = EMA(EMA(C,10),10)
+    ZXDKX = (MA(C,14)+MA(C,28)+MA(C,57)+MA(C,114))/4
+    """
+    zxdq, zxdkx = K.zx_lines(_col(df, "close"), m1, m2, m3, m4)
+    return (pd.Series(zxdq, index=df.index, name="close"),
+            pd.Series(zxdkx, index=df.index, name="close"))
+
+
+def bbi_deriv_uptrend(
+        bbi: pd.Series,
+        *,
+        min_window: int,
+        max_window: Optional[int] = None,
+        q_threshold: float = 0.0,
+) -> bool:
+    """
+    判断 BBI 是否“整体上升”。
+
+    令最新交易日为 T，在区间 [T-w+1, T]（w 自适应，w ≥ min_window 且 ≤ max_window）
+    内，先将 BBI 归一化：BBI_norm(t) = BBI(t) / BBI(T-w+1)。
+
+    再计算一阶差分 Δ(t) = BBI_norm(t) - BBI_norm(t-1)。
+    若 Δ(t) 的前 q_threshold 分位数 ≥ 0，则认为该窗口通过；只要存在
+    **最长** 满足条件的窗口即可返回 True。q_threshold=0 时退化为
+    “全程单调不降”（旧版行为）。
+
+    Parameters
+    ----------
+    bbi : pd.Series
+        BBI 序列（最新值在最后一位）。
+    min_window : int
+        检测窗口的最小长度。
+    max_window : int | None
+        检测窗口的最大长度；None 表示不设上限。
+    q_threshold : float, default 0.0
+        允许一阶差分为负的比例（0 ≤ q_threshold ≤ 1）。
+    """
+    if not 0.0 <= q_threshold <= 1.0:
+        raise ValueError("q_threshold 必须位于 [0, 1] 区间内")
+    values = bbi.to_numpy(dtype=np.float64)
+    return K.deriv_uptrend(values[~np.isnan(values)], min_window, max_window, q_threshold)
+
+
+def last_valid_ma_cross_up(
+        close: pd.Series,
+        ma: pd.Series,
+        lookback_n: int | None = None,
+) -> Optional[int]:
+    """
+    查找“有效上穿 MA”的最后一个交易日 T（close[T-1] < ma[T-1] 且 close[T] ≥ ma[T]）。
+    - 返回的是 **整数位置**（iloc 用）。
+    - lookback_n: 仅在最近 N 根内查找；None 则全历史。
+    """
+    if len(close) == 0:
+        return None
+    pos = CrossEvents(close.to_numpy(dtype=np.float64), ma.to_numpy(dtype=np.float64)).last(
+        "up", within=lookback_n)
+    return None if pos < 0 else pos
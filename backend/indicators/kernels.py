@@ -0,0 +1,301 @@
+"""
+指标的 NumPy 内核
+
+所有内核沿 axis=0 计算，既接受单只股票的一维序列，也接受“K线序号 × 股票”的二维数组
+（每列一只股票，左对齐、尾部 NaN 补齐）；只回看历史，因此尾部补齐不影响有效行。
+滚动类内核与 pandas rolling / ewm 的口径（含 min_periods）逐位一致。
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+
+def _frame(x: np.ndarray):
+    x = np.asarray(x, dtype=np.float64)
+    return pd.DataFrame(x, copy=False) if x.ndim == 2 else pd.Series(x, copy=False)
+
+
+# ---------- 滚动窗口 ---------- #
+def rolling_mean(x: np.ndarray, n: int, min_periods: Optional[int] = None) -> np.ndarray:
+    return _frame(x).rolling(n, min_periods=min_periods).mean().to_numpy()
+
+
+def rolling_sum(x: np.ndarray, n: int, min_periods: Optional[int] = 1) -> np.ndarray:
+    return _frame(x).rolling(n, min_periods=min_periods).sum().to_numpy()
+
+
+def rolling_std(x: np.ndarray, n: int) -> np.ndarray:
+    return _frame(x).rolling(n).std().to_numpy()
+
+
+def rolling_max(x: np.ndarray, n: int, min_periods: Optional[int] = 1) -> np.ndarray:
+    return _frame(x).rolling(n, min_periods=min_periods).max().to_numpy()
+
+
+def rolling_min(x: np.ndarray, n: int, min_periods: Optional[int] = 1) -> np.ndarray:
+    return _frame(x).rolling(n, min_periods=min_periods).min().to_numpy()
+
+
+def fsum_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """
+    满 n 根的滚动均值，窗口和用 math.fsum（与 backtrader SMA 逐位一致），不足 n 根为 NaN
+
+    只接受一维序列；逐窗口精确求和，只用于回测中需要与 backtrader 结果逐位对齐的场合。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = [math.fsum(w) / n for w in np.lib.stride_tricks.sliding_window_view(x, n)]
+    return out
+
+
+def shift(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full_like(x, np.nan, dtype=np.float64)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+
+# ---------- 回归斜率 ---------- #
+def slope_sums(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    回归斜率的前缀和 (Σx, Σk·x, Σ缺失)，第 k 行为 0..k 行的累计
+
+    x 先按列减去首个有效值（斜率不受平移影响），缩小 Σk·x 的量级以减少相减时的舍入误差，
+    且序列变长时已有前缀和不变；缺失值按 0 累加并单独计数。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    miss = np.isnan(x)
+    ref = 0.0
+    if len(x):
+        first = np.argmax(~miss, axis=0)
+        ref = x[first, np.arange(x.shape[1])] if x.ndim == 2 else x[first]
+    xc = np.where(miss, 0.0, x - np.nan_to_num(ref))
+    k = np.arange(len(x), dtype=np.float64)
+    if x.ndim == 2:
+        k = k[:, None]
+    return np.cumsum(xc, axis=0), np.cumsum(k * xc, axis=0), np.cumsum(miss, axis=0, dtype=np.float64)
+
+
+def ols_slope(s_x, s_kx, start, n):
+    """由窗口内 Σx、Σk·x（k 为全局序号）求斜率，start 为窗口首行的全局序号"""
+    # 以窗口起点为 0 的局部序号 t = k - start
+    s_tx = s_kx - start * s_x
+    st = n * (n - 1) / 2
+    stt = (n - 1) * n * (2 * n - 1) / 6
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (n * s_tx - st * s_x) / (n * stt - st * st)
+
+
+def window_slope(sums: Tuple[np.ndarray, np.ndarray, np.ndarray], end, n) -> np.ndarray:
+    """
+    由 slope_sums 的结果取窗口 [end-n+1, end] 对序号做最小二乘的斜率（同 np.polyfit(..., 1)[0]）
+
+    end / n 为整数或等长整数数组（沿 axis 0），每个窗口 O(1)；
+    窗口越界、n < 2 或窗口内有缺失值时为 NaN。
+    """
+    sx, skx, nn = sums
+    end = np.asarray(end, dtype=np.int64)
+    n = np.asarray(n, dtype=np.int64)
+    end, n = np.broadcast_arrays(end, n)
+    start = end - n + 1
+    ok = (n >= 2) & (start >= 0) & (end < len(sx))
+    hi = np.where(ok, end, 0)
+    lo = np.where(ok, start - 1, -1)
+
+    def total(p):
+        return p[hi] - np.where((lo >= 0).reshape(lo.shape + (1,) * (p.ndim - 1)), p[np.maximum(lo, 0)], 0.0)
+
+    if sx.ndim == 2:
+        ok, start, n = ok[..., None], start[..., None], n[..., None]
+    out = ols_slope(total(sx), total(skx), start, n)
+    return np.where(ok & (total(nn) == 0), out, np.nan)
+
+
+def slope(x: np.ndarray, n: int) -> np.ndarray:
+    """每根K线最近 n 个点（含当根）的回归斜率，不足 n 点或含缺失值为 NaN；整段 O(len)"""
+    return window_slope(slope_sums(x), np.arange(len(x)), n)
+
+
+# ---------- 平滑 ---------- #
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """同 pandas ewm(span, adjust=False)：首值为 x[0]，之后 y = α·x + (1-α)·y'，α = 2/(span+1)"""
+    return _frame(x).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def tdx_ema(x: np.ndarray, period: int) -> np.ndarray:
+    """通达信 EMA：输入无缺失时与 ema 相同，缺失的K线输出 NaN"""
+    out = ema(x, period)
+    out[np.isnan(x)] = np.nan
+    return out
+
+
+def tdx_sma(x: np.ndarray, period: int) -> np.ndarray:
+    """
+    backtrader TDXSMA 的口径：不含当根的前 min(已有根数, period) 根均值
+
+    即 MA(REF(X,1), N)，历史不足 N 根时用已有部分，首根为 NaN。
+    """
+    return shift(rolling_mean(x, period, min_periods=1), 1)
+
+
+def smooth(x: np.ndarray, m: int, init) -> np.ndarray:
+    """
+    通达信 SMA(X, m, 1) 递推：y = (x + (m-1)·y') / m
+
+    init 为 y' 的初值（标量或每列一个），输出与 x 同形状，x[0] 已参与递推。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) == 0:
+        return x.copy()
+    a = (m - 1) / m
+    zi = np.broadcast_to(np.asarray(init, dtype=np.float64) * a, (1,) + x.shape[1:]).copy()
+    y, _ = lfilter([1 / m], [1, -a], x, axis=0, zi=zi)
+    return y
+
+
+# ---------- KDJ ---------- #
+def rsv(close: np.ndarray, high: np.ndarray, low: np.ndarray, n: int = 9) -> np.ndarray:
+    """RSV = (C - LLV(L,n)) / (HHV(H,n) - LLV(L,n) + 1e-9) × 100，历史不足 n 根时用已有部分"""
+    low_n = rolling_min(low, n)
+    high_n = rolling_max(high, n)
+    return (close - low_n) / (high_n - low_n + 1e-9) * 100
+
+
+def kdj(close: np.ndarray, high: np.ndarray, low: np.ndarray, n: int = 9,
+        m1: int = 3, m2: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """选股口径：K0 = D0 = 50，自第二根起 K = SMA(RSV, m1, 1)、D = SMA(K, m2, 1)"""
+    r = rsv(close, high, low, n)
+    K = np.full_like(r, 50.0)
+    D = np.full_like(r, 50.0)
+    if len(r) > 1:
+        K[1:] = smooth(r[1:], m1, 50.0)
+        D[1:] = smooth(K[1:], m2, 50.0)
+    return K, D, 3 * K - 2 * D
+
+
+def kdj_tdx(close: np.ndarray, high: np.ndarray, low: np.ndarray, n: int = 9,
+            m1: int = 3, m2: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    回测口径（backtrader KDJIndicator）：
+
+    - 满 n 根才有 RSV，最高价等于最低价时 RSV 取 50
+    - 第 n 根 K = D = RSV，之前为 NaN
+    """
+    low_n = rolling_min(low, n, min_periods=n)
+    high_n = rolling_max(high, n, min_periods=n)
+    span = high_n - low_n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(span == 0, 50.0, (close - low_n) / span * 100)
+    K = np.full_like(r, np.nan)
+    D = np.full_like(r, np.nan)
+    if len(r) >= n:
+        seed = r[n - 1]
+        K[n - 1] = D[n - 1] = seed
+        K[n:] = smooth(r[n:], m1, seed)
+        D[n:] = smooth(K[n:], m2, seed)
+    return K, D, 3 * K - 2 * D
+
+
+# ---------- 均线组合 ---------- #
+def bbi(close: np.ndarray) -> np.ndarray:
+    return (rolling_mean(close, 3) + rolling_mean(close, 6)
+            + rolling_mean(close, 12) + rolling_mean(close, 24)) / 4
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26,
+         signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    dif = ema(close, fast) - ema(close, slow)
+    dea = ema(dif, signal)
+    return dif, dea, 2 * (dif - dea)
+
+
+def zx_lines(close: np.ndarray, m1: int = 14, m2: int = 28, m3: int = 57,
+             m4: int = 114) -> Tuple[np.ndarray, np.ndarray]:
+    """(ZXDQ, ZXDKX)：ZXDQ = EMA(EMA(C,10),10)，ZXDKX = (MA14+MA28+MA57+MA114)/4"""
+    zxdq = ema(ema(close, 10), 10)
+    zxdkx = (rolling_mean(close, m1) + rolling_mean(close, m2)
+             + rolling_mean(close, m3) + rolling_mean(close, m4)) / 4.0
+    return zxdq, zxdkx
+
+
+# ---------- 交叉 ---------- #
+def cross_up(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """上穿：前一根 a < b 且当根 a >= b；含 NaN 的比较为 False，首根恒为 False"""
+    out = np.zeros(np.broadcast(a, b).shape, dtype=bool)
+    a = np.broadcast_to(a, out.shape)
+    b = np.broadcast_to(b, out.shape)
+    with np.errstate(invalid="ignore"):
+        out[1:] = (a[:-1] < b[:-1]) & (a[1:] >= b[1:])
+    return out
+
+
+def cross_down(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """下穿：前一根 a > b 且当根 a <= b"""
+    out = np.zeros(np.broadcast(a, b).shape, dtype=bool)
+    a = np.broadcast_to(a, out.shape)
+    b = np.broadcast_to(b, out.shape)
+    with np.errstate(invalid="ignore"):
+        out[1:] = (a[:-1] > b[:-1]) & (a[1:] <= b[1:])
+    return out
+
+
+def last_true_index(mask: np.ndarray) -> np.ndarray:
+    """每根K线（含当根）之前最近一次为真的位置，尚未出现为 -1"""
+    mask = np.asarray(mask, dtype=bool)
+    idx = np.arange(len(mask))
+    if mask.ndim == 2:
+        idx = idx[:, None]
+    return np.maximum.accumulate(np.where(mask, idx, -1), axis=0)
+
+
+# ---------- 趋势判断 ---------- #
+# 相对幅度小于此值的下跌差分在归一化后可能舍入为 0，交给逐窗口精确判断
+_NEG_RTOL = 1e-9
+
+
+def _uptrend_window(y: np.ndarray, w: int, q: float) -> bool:
+    seg = y[-w:]
+    return bool(np.quantile(np.diff(seg / seg[0]), q) >= 0)
+
+
+def deriv_uptrend(y: np.ndarray, min_window: int, max_window: Optional[int] = None,
+                  q: float = 0.0) -> bool:
+    """
+    bbi_deriv_uptrend 的内核（y 已去掉缺失值）
+
+    窗口 w 通过当且仅当归一化一阶差分的 q 分位数 ≥ 0。差分的符号不随归一化改变，
+    因此先用“末尾 w-1 个差分中的负数个数”一次判定全部窗口：分位点左侧已非负即通过，
+    右侧仍为负即不通过；只有分位点恰好落在正负交界的窗口才逐个精确计算。
+    """
+    y = np.asarray(y, dtype=np.float64)
+    L = len(y)
+    if L < min_window:
+        return False
+    longest = min(L, max_window or L)
+    ws = np.arange(longest, min_window - 1, -1)
+    if len(ws) == 0:
+        return False
+    if ws[-1] < 2 or (y[L - ws] <= 0).any():
+        return any(_uptrend_window(y, int(w), q) for w in ws)
+
+    d = np.diff(y)
+    scale = np.maximum(np.abs(y[1:]), np.abs(y[:-1]))
+    # 末尾 m 个差分中“必为负”与“可能为负”的个数
+    sure = np.concatenate([[0], np.cumsum((d < -_NEG_RTOL * scale)[::-1])])
+    maybe = np.concatenate([[0], np.cumsum((d < 0)[::-1])])
+    m = ws - 1
+    c_lo, c_hi = sure[m], maybe[m]
+    pos = q * (m - 1)
+    prev = np.floor(pos).astype(np.int64)
+    gamma = pos - prev
+    nxt = np.minimum(prev + 1, m - 1)
+
+    passed = prev >= c_hi
+    if passed.any():
+        return True
+    failed = np.where(gamma > 0, nxt < c_lo, prev < c_lo)
+    return any(_uptrend_window(y, int(w), q) for w in ws[~failed])
@@ -0,0 +1,155 @@
+"""
+backtrader 适配层
+
+KernelIndicator 把输入序列整段交给 kernels 计算，再写回各条 line：
+
+- runonce 模式（Cerebro 默认）：once() 一次算完全部K线
+- 逐根模式：next() 在输入变长时重算并缓存；预加载的数据源只算一次
+- 最小周期之前的K线同样写入内核结果
+
+内核只回看历史，整段计算不会引入未来数据。
+
+接续回测（backtest.incremental）只把最近一段K线送入引擎，更早的K线挂在数据源的
+history 属性上（{line 名: 数组}）：指标在 history + 引擎中K线 的完整序列上计算、只写回后一段，
+递推类指标（EMA、KDJ）与整段回测逐位一致。
+
+本模块依赖 backtrader，不由 indicators 包自动导入。
+"""
+from array import array
+from typing import List, Optional, Sequence
+
+import backtrader as bt
+import numpy as np
+
+from . import kernels
+
+
+class KernelIndicator(bt.Indicator):
+    """
+    由向量化内核整段计算的指标基类
+
+    子类设置 fields（数据源的 line 名，如 ("close", "high", "low")；为空表示直接用输入的
+    第一条 line，适用于指标套指标），并实现 compute(*arrays) 返回每条 line 一个数组。
+
+    数据源带 history 时，offset 为引擎首根K线之前的历史K线数，prefix_lines() 为各条 line 在这段历史上的值。
+    """
+
+    fields: Sequence[str] = ()
+    offset: int = 0
+    _cache: Optional[List[np.ndarray]] = None
+    _prefix: Optional[List[np.ndarray]] = None
+
+    def compute(self, *arrays: np.ndarray):
+        raise NotImplementedError
+
+    # ---------- 内部 ---------- #
+    def _sources(self):
+        if not self.fields:
+            return [self.data.lines[0]]
+        return [getattr(self.data.lines, f) for f in self.fields]
+
+    def _history(self) -> List[np.ndarray]:
+        """各输入在引擎首根K线之前的历史，没有时为空数组"""
+        if self.fields:
+            history = getattr(self.data, "history", None) or {}
+            return [np.asarray(history.get(f, ()), dtype=np.float64) for f in self.fields]
+        # 指标套指标：输入是上游指标（或其某条 line）/ 数据源的某条 line
+        owner = self.data._owner if isinstance(self.data, bt.lineseries.LineSeriesStub) else self.data
+        line = self.data.lines[0]
+        k = next(i for i in range(owner.lines.size()) if owner.lines[i] is line)
+        if isinstance(owner, KernelIndicator):
+            return [owner.prefix_lines()[k]]
+        history = getattr(owner, "history", None) or {}
+        return [np.asarray(history.get(owner.lines._getlinealias(k), ()), dtype=np.float64)]
+
+    def prefix_lines(self) -> List[np.ndarray]:
+        """各条 line 在历史部分（全局序号 0..offset-1）上的值"""
+        if self._prefix is None:
+            self._compute_all()
+        return self._prefix
+
+    def _compute_all(self) -> List[np.ndarray]:
+        history = self._history()
+        arrays = [np.concatenate([h, np.array(src.array, dtype=np.float64)])
+                  for h, src in zip(history, self._sources())]
+        n = min(len(a) for a in arrays)
+        values = [np.asarray(v, dtype=np.float64) for v in self.compute(*(a[:n] for a in arrays))]
+        self.offset = len(history[0])
+        self._prefix = [v[:self.offset] for v in values]
+        return [v[self.offset:] for v in values]
+
+    def once(self, start, end):
+        for k, values in enumerate(self._compute_all()):
+            self.lines[k].array[start:end] = array("d", values[start:end])
+
+    # 最小周期之前也写入内核结果（多为 NaN），前缀和等指标需要完整的历史
+    def preonce(self, start, end):
+        self.once(start, end)
+
+    def prenext(self):
+        self.next()
+
+    def next(self):
+        i = len(self) - 1
+        if self._cache is None or len(self._cache[0]) <= i:
+            self._cache = self._compute_all()
+        for k, values in enumerate(self._cache):
+            self.lines[k][0] = values[i]
+
+
+class RollingSlope(KernelIndicator):
+    """最近 period 根（含当根）的回归斜率，不足 period 根或含缺失值为 NaN"""
+
+    lines = ("slope",)
+    params = (("period", 5),)
+    plotinfo = dict(plot=False)
+
+    def compute(self, x):
+        return (kernels.slope(x, self.p.period),)
+
+
+class SlopeSums(KernelIndicator):
+    """
+    回归斜率的前缀和，供任意长度窗口 O(1) 取斜率
+
+    窗口长度随K线变化时（如“自最近放量日至昨日”）无法预先算成一条斜率线，
+    先算好前缀和，再用 window_slope(n, ago) 读取。
+    """
+
+    lines = ("sx", "skx", "missing")
+    plotinfo = dict(plot=False)
+
+    def compute(self, x):
+        return kernels.slope_sums(x)
+
+    def _value(self, k: int, g: int) -> float:
+        """第 k 条 line 在全局序号 g 处的值（g < 0 为 0，落在历史部分时读 prefix_lines）"""
+        if g < 0:
+            return 0.0
+        if g < self.offset:
+            return float(self.prefix_lines()[k][g])
+        return self.lines[k][g - self.offset - (len(self) - 1)]
+
+    def window_slope(self, n: int, ago: int = 0) -> float:
+        """以 ago 根之前的K线为终点、长 n 根的窗口斜率；窗口越界、n < 2 或含缺失值为 NaN"""
+        end = self.offset + len(self) - 1 - ago
+        if n < 2 or end - n + 1 < 0:
+            return float("nan")
+        s_x, s_kx, s_missing = (self._value(k, end) - self._value(k, end - n) for k in range(3))
+        if s_missing:
+            return float("nan")
+        return float(kernels.ols_slope(s_x, s_kx, end - n + 1, n))
+
+
+class MovingAverage(KernelIndicator):
+    """满 period 根的简单均线，与 bt.indicators.SMA 逐位一致（内核计算，可接在历史K线之后）"""
+
+    lines = ("sma",)
+    params = (("period", 30),)
+    plotinfo = dict(plot=False)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+
+    def compute(self, x):
+        return (kernels.fsum_mean(x, self.p.period),)
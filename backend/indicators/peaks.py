@@ -0,0 +1,213 @@
+"""
+批量找峰与区间最值
+
+    peaks = find_peaks(oc_max, distance=6, prominence=0.5)   # 一维 -> 峰位置数组
+    peaks = find_peaks(panel, distance=6, prominence=0.5)    # “K线 × 股票” -> 每列一个数组
+    low = SparseTable(close)                                  # 区间最小值，O(1) 查询
+    low.query(lo, hi)
+
+find_peaks 与 scipy.signal.find_peaks 在 distance / prominence 两个参数下逐位一致：
+局部极大值（含平台取中点）与突出度对整个面板向量化计算，突出度的左右边界用稀疏表
+倍增查找；distance 的按高度贪心只在候选峰上逐列进行。
+NaN 视同序列边界，因此右对齐、左侧 NaN 补齐的面板与逐股截取的结果相同。
+"""
+from math import ceil
+from typing import List, Optional, Union
+
+import numpy as np
+
+
+def _as_panel(x) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return x.reshape(len(x), -1)
+
+
+# ---------- 稀疏表 ---------- #
+class SparseTable:
+    """
+    沿 axis 0 的区间最值稀疏表：O(n log n) 预处理，任意闭区间 [lo, hi] O(1) 查询
+
+    func 为满足幂等与结合律的二元 ufunc：np.fmin / np.fmax 忽略 NaN（同 pandas 的 min/max），
+    np.minimum / np.maximum 遇 NaN 即为 NaN。
+    """
+
+    def __init__(self, x, func=np.fmin):
+        x = np.asarray(x, dtype=np.float64)
+        self.ndim = x.ndim
+        self.func = func
+        panel = _as_panel(x)
+        self.n = len(panel)
+        levels = [panel]
+        step = 1
+        while 2 * step <= self.n:
+            prev = levels[-1]
+            levels.append(func(prev[:-step], prev[step:]))
+            step *= 2
+        # levels[k][i] = func(x[i : i + 2**k])，各层右侧补 NaN 对齐成一个数组
+        self.table = np.full((len(levels),) + panel.shape, np.nan)
+        for k, level in enumerate(levels):
+            self.table[k, :len(level)] = level
+
+    def query(self, lo, hi, col=0):
+        """
+        闭区间 [lo, hi] 的区间值；lo > hi 或越界的空区间为 NaN
+
+        lo / hi / col 可以是等长数组（批量查询），col 为面板的列号。
+        """
+        lo = np.maximum(np.asarray(lo, dtype=np.int64), 0)
+        hi = np.minimum(np.asarray(hi, dtype=np.int64), self.n - 1)
+        empty = hi < lo
+        length = np.where(empty, 1, hi - lo + 1)
+        k = np.frexp(length)[1] - 1
+        lo = np.where(empty, 0, lo)
+        right = np.where(empty, 0, hi - (1 << k) + 1)
+        out = self.func(self.table[k, lo, col], self.table[k, right, col])
+        return np.where(empty, np.nan, out)
+
+
+# ---------- 局部极大值 ---------- #
+def local_maxima(x) -> np.ndarray:
+    """
+    与 scipy 口径一致的局部极大值掩码（沿 axis 0）
+
+    相等值连成的平台两侧都严格更低才算峰，峰位于平台中点（偏左）；
+    首尾K线与紧邻 NaN 的平台不算峰。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    panel = _as_panel(x)
+    n = len(panel)
+    if n < 3:
+        return np.zeros(x.shape, dtype=bool)
+    idx = np.arange(n)[:, None]
+    start = np.ones(panel.shape, dtype=bool)
+    start[1:] = panel[1:] != panel[:-1]      # NaN 各自成段
+    end = np.ones(panel.shape, dtype=bool)
+    end[:-1] = start[1:]
+    left = np.maximum.accumulate(np.where(start, idx, 0), axis=0)
+    right = np.minimum.accumulate(np.where(end, idx, n - 1)[::-1], axis=0)[::-1]
+    before = np.take_along_axis(panel, np.maximum(left - 1, 0), axis=0)
+    after = np.take_along_axis(panel, np.minimum(right + 1, n - 1), axis=0)
+    mask = (
+        (idx == (left + right) // 2)
+        & (left >= 1) & (right <= n - 2)
+        & (before < panel) & (after < panel)
+    )
+    return mask.reshape(x.shape)
+
+
+# ---------- 突出度 ---------- #
+def _extent(upper: SparseTable, pos: np.ndarray, col: np.ndarray, height: np.ndarray,
+            step_sign: int) -> np.ndarray:
+    """从 pos 向一侧扩展，直到遇到严格更高的值或 NaN，返回最远可达位置（倍增查找）"""
+    cur = pos.copy()
+    for k in range(len(upper.table) - 1, -1, -1):
+        span = 1 << k
+        start = cur - span if step_sign < 0 else cur + 1
+        ok = (start >= 0) & (start + span <= upper.n)
+        val = upper.table[k, np.where(ok, start, 0), col]
+        ok &= val <= height
+        cur = np.where(ok, cur + step_sign * span, cur)
+    return cur
+
+
+def prominences(x, pos, col=0, low: Optional[SparseTable] = None,
+                upper: Optional[SparseTable] = None) -> np.ndarray:
+    """
+    峰的突出度（同 scipy.signal.peak_prominences，wlen=None）
+
+    pos / col 为峰所在的行 / 列；low、upper 可传入已建好的最小值 / 最大值稀疏表复用。
+    """
+    panel = _as_panel(x)
+    pos = np.asarray(pos, dtype=np.int64)
+    col = np.broadcast_to(np.asarray(col, dtype=np.int64), pos.shape)
+    if low is None:
+        low = SparseTable(panel, np.fmin)
+    if upper is None:
+        upper = SparseTable(panel, np.maximum)
+    height = panel[pos, col]
+    left = _extent(upper, pos, col, height, -1)
+    right = _extent(upper, pos, col, height, 1)
+    base = np.maximum(low.query(left, pos, col), low.query(pos, right, col))
+    return height - base
+
+
+# ---------- 找峰 ---------- #
+def _select_by_distance(peaks: np.ndarray, priority: np.ndarray, distance: int) -> np.ndarray:
+    """scipy 的 distance 筛选：按高度从高到低保留峰，剔除其左右 distance 以内的其余峰"""
+    keep = [True] * len(peaks)
+    pos = peaks.tolist()
+    for j in np.argsort(priority)[::-1].tolist():
+        if not keep[j]:
+            continue
+        k = j - 1
+        while k >= 0 and pos[j] - pos[k] < distance:
+            keep[k] = False
+            k -= 1
+        k = j + 1
+        while k < len(pos) and pos[k] - pos[j] < distance:
+            keep[k] = False
+            k += 1
+    return np.asarray(keep, dtype=bool)
+
+
+def find_peaks(
+        x,
+        distance: Optional[float] = None,
+        prominence: Optional[float] = None,
+) -> Union[np.ndarray, List[np.ndarray]]:
+    """
+    找峰（沿 axis 0）
+
+    一维输入返回峰位置数组；二维“K线 × 股票”输入返回每列一个升序的峰位置数组。
+    结果与逐列调用 scipy.signal.find_peaks(col, distance=..., prominence=...) 相同。
+    """
+    if distance is not None and distance < 1:
+        raise ValueError("distance 必须 ≥ 1")
+    x = np.asarray(x, dtype=np.float64)
+    panel = _as_panel(x)
+    col, pos = np.nonzero(local_maxima(panel).T)   # 按列、再按位置排序
+
+    if distance is not None and len(pos):
+        dist = ceil(distance)
+        bounds = np.flatnonzero(np.diff(col)) + 1
+        keep = np.ones(len(pos), dtype=bool)
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(pos)]):
+            if hi - lo > 1:
+                seg = pos[lo:hi]
+                keep[lo:hi] = _select_by_distance(seg, panel[seg, col[lo]], dist)
+        col, pos = col[keep], pos[keep]
+
+    if prominence is not None and len(pos):
+        keep = prominences(panel, pos, col) >= prominence
+        col, pos = col[keep], pos[keep]
+
+    pos = pos.astype(np.intp)
+    if x.ndim == 1:
+        return pos
+    bounds = np.searchsorted(col, np.arange(1, panel.shape[1]))
+    return np.split(pos, bounds)
+
+
+def prior_peak(x, peaks: np.ndarray, low: SparseTable, gap: float = 0.0, col: int = 0) -> int:
+    """
+    以最后一个峰 t 为基准，向前回溯第一个满足条件的峰，返回其位置（没有为 -1）：
+
+    - x[p] < x[t]，且 x[p] 高于 p 与 t 之间的全部峰
+    - x[p] > 开区间 (p, t) 内 low 的最小值 × (1 + gap)；区间内无有效值则不满足
+
+    x 为该列的一维序列，low 为同一面板上的最小值稀疏表（np.fmin），每个候选 O(1)。
+    """
+    if len(peaks) < 2:
+        return -1
+    heights = np.asarray(x, dtype=np.float64)[peaks]
+    prev = peaks[:-1]
+    oc_prev = heights[:-1]
+    # between[i]：第 i 个峰与最后一个峰之间各峰的最高值
+    between = np.full(len(prev), -np.inf)
+    if len(prev) > 1:
+        between[:-1] = np.maximum.accumulate(heights[-2:0:-1])[::-1]
+    floor = low.query(prev + 1, peaks[-1] - 1, col)
+    with np.errstate(invalid="ignore"):
+        ok = (oc_prev < heights[-1]) & (between < oc_prev) & (oc_prev > floor * (1 + gap))
+    hit = np.flatnonzero(ok)
+    return int(prev[hit[-1]]) if len(hit) else -1
@@ -0,0 +1,28 @@
+"""分钟线：按交易日分区的列式存储、导入与多周期重采样"""
+from .ingest import ingest_csv, ingest_frames, normalize_bars
+from .resample import (
+    FREQS,
+    iter_resampled,
+    iter_resampled_frames,
+    resample_day,
+    resample_frames,
+    session_index,
+    session_minute,
+)
+from .store import MINUTE_FIELDS, MinuteDay, MinuteStore
+
+__all__ = [
+    "FREQS",
+    "MINUTE_FIELDS",
+    "MinuteDay",
+    "MinuteStore",
+    "ingest_csv",
+    "ingest_frames",
+    "iter_resampled",
+    "iter_resampled_frames",
+    "normalize_bars",
+    "resample_day",
+    "resample_frames",
+    "session_index",
+    "session_minute",
+]
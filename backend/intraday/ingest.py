@@ -0,0 +1,109 @@
+"""
+分钟线导入
+
+数据源是本地 CSV（逐股文件或含 code 列的长表）或任意产出 DataFrame 的行情源（迭代器），
+逐块读入、攒到 batch_rows 行后按交易日拆分写入 MinuteStore，内存占用与数据总量无关：
+
+    store = MinuteStore("./minute")
+    ingest_csv(store, "./minute_csv")             # 目录下的 {code}.csv 或长表文件
+    ingest_frames(store, feed)                    # feed 逐次产出长表 DataFrame
+    store.compact()                               # 可选：合并各交易日的多个 part
+
+列名兼容：时刻取 datetime / trade_time / time / date，代码取 code / ts_code / symbol，
+成交量 volume 或 vol；代码统一为 6 位。
+"""
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from universe import normalize_code
+
+from .store import MINUTE_FIELDS, MinuteDay, MinuteStore
+
+logger = logging.getLogger(__name__)
+
+_TIME_COLS = ("datetime", "trade_time", "time", "date")
+_CODE_COLS = ("code", "ts_code", "symbol")
+
+
+def normalize_bars(df: pd.DataFrame, code: Optional[str] = None) -> pd.DataFrame:
+    """统一为 code, datetime, open, close, high, low, volume；没有代码列时用 code 参数"""
+    df = df.rename(columns={"vol": "volume"})
+    time_col = next((c for c in _TIME_COLS if c in df.columns), None)
+    if time_col is None:
+        raise ValueError(f"分钟线缺少时刻列（需要 {' / '.join(_TIME_COLS)}）")
+    code_col = next((c for c in _CODE_COLS if c in df.columns), None)
+    if code_col is not None:
+        raw = df[code_col].astype(str)
+        mapping = {c: normalize_code(c) for c in pd.unique(raw)}
+        codes = raw.map(mapping)
+    elif code is not None:
+        codes = pd.Series(normalize_code(code), index=df.index)
+    else:
+        raise ValueError("分钟线缺少代码列，且未指定 code")
+    missing = [f for f in MINUTE_FIELDS if f not in df.columns]
+    if missing:
+        raise ValueError(f"分钟线缺少字段：{', '.join(missing)}")
+    out = pd.DataFrame({"code": codes, "datetime": pd.to_datetime(df[time_col])})
+    for f in MINUTE_FIELDS:
+        out[f] = pd.to_numeric(df[f], errors="coerce")
+    return out[out["code"].notna() & out["datetime"].notna()]
+
+
+def _flush(store: MinuteStore, batch: List[pd.DataFrame]) -> int:
+    df = pd.concat(batch, ignore_index=True)
+    ts = df["datetime"].to_numpy(dtype="datetime64[m]")
+    day = ts.astype("datetime64[D]")
+    minute = (ts - day).astype(np.int64)
+    days, inverse = np.unique(day, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(days) + 1))
+    codes = df["code"].to_numpy()
+    fields = {f: df[f].to_numpy() for f in MINUTE_FIELDS}
+    for k, d in enumerate(days):
+        rows = order[bounds[k]:bounds[k + 1]]
+        store.write(MinuteDay.from_rows(d, codes[rows], minute[rows], {f: v[rows] for f, v in fields.items()}))
+    return len(df)
+
+
+def ingest_frames(store: MinuteStore, frames: Iterable[pd.DataFrame], batch_rows: int = 2_000_000) -> int:
+    """导入一系列长表 DataFrame（每攒够 batch_rows 行写一次），返回导入的行数"""
+    batch: List[pd.DataFrame] = []
+    pending = total = 0
+    for df in frames:
+        df = normalize_bars(df)
+        batch.append(df)
+        pending += len(df)
+        if pending >= batch_rows:
+            total += _flush(store, batch)
+            batch, pending = [], 0
+    if batch:
+        total += _flush(store, batch)
+    logger.info("分钟线导入完成：%d 行", total)
+    return total
+
+
+def _csv_chunks(paths: List[Path], chunksize: int) -> Iterator[pd.DataFrame]:
+    for path in paths:
+        dtype = {c: str for c in _CODE_COLS}
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtype):
+            # 逐股文件没有代码列时取文件名
+            yield chunk if any(c in chunk.columns for c in _CODE_COLS) else chunk.assign(code=path.stem)
+
+
+def ingest_csv(
+    store: MinuteStore,
+    source: Union[str, Path, Iterable[Union[str, Path]]],
+    chunksize: int = 500_000,
+    batch_rows: int = 2_000_000,
+) -> int:
+    """导入本地 CSV：单个文件、目录（其中全部 *.csv）或文件列表"""
+    if isinstance(source, (str, Path)):
+        source = Path(source)
+        paths = sorted(source.glob("*.csv")) if source.is_dir() else [source]
+    else:
+        paths = [Path(p) for p in source]
+    return ingest_frames(store, _csv_chunks(paths, chunksize), batch_rows)
@@ -0,0 +1,159 @@
+"""
+分钟线重采样
+
+A 股连续竞价为 09:30-11:30、13:00-15:00，共 240 根 1 分钟线（按结束时刻标记 09:31 … 15:00）。
+把每根分钟线映射为当日第 k 根（0..239），按 k // n 分桶：5/15/30/60 分钟线在上下午各自
+对齐（60 分钟线为 10:30 / 11:30 / 14:00 / 15:00），"D" 为整日一根。
+9:25 集合竞价并入第一根，15:00 之后的盘后数据并入最后一根。
+
+全部股票在一次 reduceat 中完成（数据已按 股票、时刻 排序），不逐股 groupby：
+
+    day_5m = resample_day(store.read("2024-01-02"), "5min")
+    frames = resample_frames(store, "30min", start="2024-01-01")   # {code: DataFrame}，可直接交给 Selector
+    for frames in iter_resampled_frames(store, "1min", batch_size=500):   # 全市场长区间：按股票分批
+        ...
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .store import MINUTE_FIELDS, MinuteDay, MinuteStore
+
+SESSION_MINUTES = 240
+FREQS = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60, "D": SESSION_MINUTES}
+
+_AM_FIRST, _PM_FIRST = 9 * 60 + 31, 13 * 60 + 1  # 上午、下午第一根的结束时刻
+_NOON = 12 * 60 + 30
+
+
+def _freq_minutes(freq: Union[str, int]) -> int:
+    n = FREQS.get(freq) if isinstance(freq, str) else int(freq)
+    # 分桶不能跨越午休：周期须整除半日的 120 分钟，或为整日
+    if n is None or not (n == SESSION_MINUTES or (n >= 1 and 120 % n == 0)):
+        raise ValueError(f"不支持的周期 {freq!r}，可选：{', '.join(FREQS)}")
+    return n
+
+
+def session_index(minute: np.ndarray) -> np.ndarray:
+    """bar 结束时刻（距零点分钟数）-> 当日第几根分钟线（0..239）"""
+    m = np.asarray(minute, dtype=np.int64)
+    am = np.clip(m - _AM_FIRST, 0, 119)
+    pm = 120 + np.clip(m - _PM_FIRST, 0, 119)
+    return np.where(m < _NOON, am, pm)
+
+
+def session_minute(index: np.ndarray) -> np.ndarray:
+    """session_index 的反函数：第 k 根分钟线的结束时刻"""
+    k = np.asarray(index, dtype=np.int64)
+    return np.where(k < 120, _AM_FIRST + k, _PM_FIRST + k - 120).astype(np.int16)
+
+
+def resample_day(day: MinuteDay, freq: Union[str, int]) -> MinuteDay:
+    """单个交易日的分钟线重采样为 freq 周期（open 取首根、close 取末根、high/low 取极值、volume 求和）"""
+    n = _freq_minutes(freq)
+    if len(day) == 0:
+        return day
+    bucket = session_index(day.minute) // n
+    key = day.row_code.astype(np.int64) * (SESSION_MINUTES // n + 1) + bucket
+    starts = np.flatnonzero(np.concatenate([[True], key[1:] != key[:-1]]))
+    ends = np.concatenate([starts[1:], [len(key)]]) - 1
+    f = day.fields
+    fields = {
+        "open": f["open"][starts],
+        "close": f["close"][ends],
+        "high": np.maximum.reduceat(f["high"], starts),
+        "low": np.minimum.reduceat(f["low"], starts),
+        "volume": np.add.reduceat(f["volume"], starts),
+    }
+    last = np.minimum((bucket[starts] + 1) * n, SESSION_MINUTES) - 1
+    counts = np.bincount(day.row_code[starts], minlength=len(day.codes))
+    return MinuteDay(day.date, day.codes, np.concatenate([[0], np.cumsum(counts)]),
+                     session_minute(last), fields)
+
+
+# 按股票分批时每批的股票数
+BATCH_SIZE = 500
+
+
+def iter_resampled(
+    store: MinuteStore,
+    freq: Union[str, int],
+    start=None,
+    end=None,
+    codes: Optional[Iterable[str]] = None,
+) -> Iterator[MinuteDay]:
+    """逐日读取并重采样，同一时刻只有一个交易日的分钟线与其重采样结果在内存中"""
+    _freq_minutes(freq)
+    for day in store.iter_days(start, end, codes):
+        yield resample_day(day, freq)
+
+
+def _collect(days: Iterable[MinuteDay], daily: bool) -> Dict[str, pd.DataFrame]:
+    """把逐日的重采样结果按股票拼接为 {code: DataFrame}"""
+    code_parts: List[np.ndarray] = []
+    date_parts: List[np.ndarray] = []
+    value_parts: Dict[str, List[np.ndarray]] = {f: [] for f in MINUTE_FIELDS}
+    for bars in days:
+        code_parts.append(np.repeat(bars.codes, np.diff(bars.offsets)))
+        date_parts.append(np.full(len(bars), np.datetime64(bars.date, "m")) if daily else bars.timestamps())
+        for name, parts in value_parts.items():
+            parts.append(bars.fields[name])
+    if not code_parts:
+        return {}
+
+    code_arr = np.concatenate(code_parts)
+    order = np.argsort(code_arr, kind="stable")  # 同一股票内保持时间顺序
+    code_arr = code_arr[order]
+    dates = pd.to_datetime(np.concatenate(date_parts)[order])
+    values = {name: np.concatenate(parts)[order] for name, parts in value_parts.items()}
+    names, first = np.unique(code_arr, return_index=True)
+    bounds = np.concatenate([first, [len(code_arr)]])
+    frames: Dict[str, pd.DataFrame] = {}
+    for i, code in enumerate(names.tolist()):
+        sl = slice(bounds[i], bounds[i + 1])
+        frames[code] = pd.DataFrame({"date": dates[sl], **{k: v[sl] for k, v in values.items()}})
+    return frames
+
+
+def resample_frames(
+    store: MinuteStore,
+    freq: Union[str, int],
+    start=None,
+    end=None,
+    codes: Optional[Iterable[str]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    [start, end] 内的分钟线逐日读取、重采样后按股票拼接
+
+    返回 {code: DataFrame(date, open, close, high, low, volume)}，与 load_data 的结构一致；
+    "D" 周期的 date 为交易日，其余为 bar 结束时刻。分钟线逐日读取，但返回值包含区间内
+    全部股票的全部重采样K线（"1min" 即整个区间的分钟线）；全市场的长区间请用
+    :func:`iter_resampled_frames` 按股票分批处理。
+    """
+    daily = _freq_minutes(freq) >= SESSION_MINUTES
+    return _collect(iter_resampled(store, freq, start, end, codes), daily)
+
+
+def iter_resampled_frames(
+    store: MinuteStore,
+    freq: Union[str, int],
+    start=None,
+    end=None,
+    codes: Optional[Iterable[str]] = None,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[Dict[str, pd.DataFrame]]:
+    """
+    按股票分批产出 resample_frames 的结果（每批最多 batch_size 只，按代码升序）
+
+    内存中只有一个交易日的分钟线和本批股票在整个区间的重采样K线，全市场数月的 1 分钟线也能
+    在有限内存内逐批交给 Selector；代价是每批都要重新逐日读取区间内的分区。
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size 应 ≥ 1")
+    daily = _freq_minutes(freq) >= SESSION_MINUTES
+    codes = sorted(codes) if codes is not None else store.codes(start, end).tolist()
+    for i in range(0, len(codes), batch_size):
+        frames = _collect(iter_resampled(store, freq, start, end, codes[i:i + batch_size]), daily)
+        if frames:
+            yield frames
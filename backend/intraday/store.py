@@ -0,0 +1,180 @@
+"""
+分钟线存储（按交易日分区的列式布局）
+
+    root/
+      2024-01-02/
+        part-00000.npz      codes, offsets, minute, open, close, high, low, volume
+        part-00001.npz      同一交易日的后续写入（compact 后合并为一个）
+      2024-01-03/
+        ...
+
+每个 part 与 Panel 相同的稀疏布局：各股票的分钟线按时刻升序首尾相接，第 i 只股票的行区间为
+``offsets[i]:offsets[i+1]``；minute 为 bar 结束时刻距零点的分钟数（09:31 -> 571）。
+价格存 float32、成交量存 float64。读取一次只载入一个交易日，全市场单日约 40 MB，
+几个月的分钟线也可以逐日流式处理。
+"""
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MINUTE_FIELDS = ("open", "close", "high", "low", "volume")
+_DTYPES = {"open": np.float32, "close": np.float32, "high": np.float32, "low": np.float32, "volume": np.float64}
+
+
+def _day(date) -> str:
+    return pd.Timestamp(date).strftime("%Y-%m-%d")
+
+
+class MinuteDay:
+    """单个交易日全部股票的分钟线（按股票连续存放）"""
+
+    def __init__(self, date, codes: np.ndarray, offsets: np.ndarray, minute: np.ndarray,
+                 fields: Dict[str, np.ndarray]):
+        self.date = pd.Timestamp(date).normalize()
+        self.codes = np.asarray(codes).astype(str)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.minute = np.asarray(minute, dtype=np.int16)
+        self.fields = fields
+        self._code_pos = {c: i for i, c in enumerate(self.codes)}
+
+    def __len__(self) -> int:
+        return len(self.minute)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._code_pos
+
+    @property
+    def row_code(self) -> np.ndarray:
+        """每一行所属股票的序号"""
+        return np.repeat(np.arange(len(self.codes)), np.diff(self.offsets))
+
+    @classmethod
+    def from_rows(cls, date, codes: np.ndarray, minute: np.ndarray, fields: Dict[str, np.ndarray]) -> "MinuteDay":
+        """
+        由逐行数据构造：按 (股票, 时刻) 排序，重复的 (股票, 时刻) 保留最后出现的一行
+        """
+        names, code_id = np.unique(np.asarray(codes).astype(str), return_inverse=True)
+        minute = np.asarray(minute, dtype=np.int16)
+        order = np.lexsort((minute, code_id))  # 稳定排序：相同键保持原有先后
+        code_id, minute = code_id[order], minute[order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (code_id[1:] != code_id[:-1]) | (minute[1:] != minute[:-1])
+        order, code_id, minute = order[last], code_id[last], minute[last]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(code_id, minlength=len(names)))])
+        return cls(date, names, offsets, minute,
+                   {f: np.asarray(fields[f], dtype=_DTYPES.get(f))[order] for f in fields})
+
+    def select(self, codes: Iterable[str]) -> "MinuteDay":
+        """只保留给定股票（不在当日数据中的忽略）"""
+        keep = [self._code_pos[c] for c in codes if c in self._code_pos]
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in keep]) if keep \
+            else np.array([], dtype=np.int64)
+        lengths = np.diff(self.offsets)[keep] if keep else np.array([], dtype=np.int64)
+        return MinuteDay(self.date, self.codes[keep], np.concatenate([[0], np.cumsum(lengths)]),
+                         self.minute[rows], {f: arr[rows] for f, arr in self.fields.items()})
+
+    def timestamps(self) -> np.ndarray:
+        return np.datetime64(self.date, "m") + self.minute.astype("timedelta64[m]")
+
+    def to_frame(self) -> pd.DataFrame:
+        """长表：code, date（bar 结束时刻）, 各字段"""
+        data = {"code": np.repeat(self.codes, np.diff(self.offsets)), "date": self.timestamps()}
+        data.update(self.fields)
+        return pd.DataFrame(data)
+
+
+class MinuteStore:
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def dates(self, start=None, end=None) -> List[pd.Timestamp]:
+        """已有分区的交易日（升序），可按 [start, end] 截取"""
+        out = []
+        for p in sorted(self.root.iterdir()):
+            if not p.is_dir() or not any(p.glob("part-*.npz")):
+                continue
+            try:
+                d = pd.Timestamp(p.name)
+            except ValueError:
+                continue
+            if (start is None or d >= pd.Timestamp(start)) and (end is None or d <= pd.Timestamp(end)):
+                out.append(d)
+        return out
+
+    def _parts(self, date) -> List[Path]:
+        return sorted((self.root / _day(date)).glob("part-*.npz"))
+
+    def codes(self, start=None, end=None) -> np.ndarray:
+        """[start, end] 内出现过的全部股票代码（升序）；只读取各 part 的 codes 数组"""
+        seen: List[np.ndarray] = []
+        for date in self.dates(start, end):
+            for path in self._parts(date):
+                with np.load(path, allow_pickle=False) as z:
+                    seen.append(z["codes"])
+        return np.unique(np.concatenate(seen)) if seen else np.array([], dtype=str)
+
+    # ---------- 写入 ---------- #
+    def write(self, day: MinuteDay) -> Path:
+        """追加一个 part（写临时文件后改名，读者不会看到半个文件）"""
+        part_dir = self.root / _day(day.date)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        parts = self._parts(day.date)
+        seq = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        path = part_dir / f"part-{seq:05d}.npz"
+        tmp = part_dir / f".part-{seq:05d}.tmp.npz"
+        np.savez(tmp, codes=day.codes, offsets=day.offsets, minute=day.minute, **day.fields)
+        os.replace(tmp, path)
+        return path
+
+    def delete(self, date) -> None:
+        shutil.rmtree(self.root / _day(date), ignore_errors=True)
+
+    # ---------- 读取 ---------- #
+    @staticmethod
+    def _load(path: Path) -> MinuteDay:
+        with np.load(path, allow_pickle=False) as z:
+            fields = {f: z[f] for f in MINUTE_FIELDS if f in z.files}
+            return MinuteDay(pd.Timestamp(path.parent.name), z["codes"], z["offsets"], z["minute"], fields)
+
+    def read(self, date, codes: Optional[Iterable[str]] = None) -> MinuteDay:
+        """读取一个交易日；多个 part 时合并，同一 (股票, 时刻) 以后写入的为准"""
+        parts = [self._load(p) for p in self._parts(date)]
+        if not parts:
+            raise FileNotFoundError(f"没有 {_day(date)} 的分钟线")
+        day = parts[0] if len(parts) == 1 else MinuteDay.from_rows(
+            date,
+            np.concatenate([np.repeat(p.codes, np.diff(p.offsets)) for p in parts]),
+            np.concatenate([p.minute for p in parts]),
+            {f: np.concatenate([p.fields[f] for p in parts]) for f in parts[0].fields},
+        )
+        return day if codes is None else day.select(codes)
+
+    def iter_days(self, start=None, end=None, codes: Optional[Iterable[str]] = None) -> Iterator[MinuteDay]:
+        """逐日读取（同一时刻只有一个交易日的数据在内存中）"""
+        codes = list(codes) if codes is not None else None
+        for date in self.dates(start, end):
+            yield self.read(date, codes)
+
+    def compact(self, start=None, end=None) -> int:
+        """把多 part 的分区合并为一个 part，返回合并的分区数"""
+        merged = 0
+        for date in self.dates(start, end):
+            parts = self._parts(date)
+            if len(parts) < 2:
+                continue
+            day = self.read(date)
+            path = self.write(day)
+            for p in parts:
+                p.unlink()
+            os.replace(path, path.with_name("part-00000.npz"))
+            merged += 1
+        logger.info("分钟线分区合并完成：%d 个交易日", merged)
+        return merged
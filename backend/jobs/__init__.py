@@ -0,0 +1,18 @@
+"""选股 / 回测任务的进程池执行与进度推送"""
+from .manager import (
+    Job,
+    JobManager,
+    ProgressReporter,
+    get_job_manager,
+    start_job_manager,
+    stop_job_manager,
+)
+
+__all__ = [
+    "Job",
+    "JobManager",
+    "ProgressReporter",
+    "get_job_manager",
+    "start_job_manager",
+    "stop_job_manager",
+]
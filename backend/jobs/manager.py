@@ -0,0 +1,343 @@
+"""
+任务管理器
+
+选股、批量回测等 CPU 密集任务被拆成若干执行单元提交到进程池，Web 进程只做调度：
+- 子进程通过 ProgressReporter 把进度/部分结果写入跨进程队列；
+- 主进程的分发线程读取队列，追加到任务的事件列表，并推送给 SSE / WebSocket 订阅者；
+- 所有单元完成后合并结果，任务结束。
+事件循环中只做字典读写和队列投递，不会被计算阻塞。
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 任务状态，与 task_executions.status 取值一致
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class ProgressReporter:
+    """
+    子进程内的进度上报器
+
+    queue 为 None 时所有调用都是空操作，便于在普通脚本中直接调用任务函数。
+    """
+
+    def __init__(self, queue=None, job_id: Optional[str] = None):
+        self.queue = queue
+        self.job_id = job_id
+
+    def _put(self, event: Dict[str, Any]) -> None:
+        if self.queue is not None:
+            event["job_id"] = self.job_id
+            self.queue.put(event)
+
+    def progress(self, n: int = 1, stage: Optional[str] = None) -> None:
+        """完成 n 个工作量单位"""
+        self._put({"type": "progress", "n": n, "stage": stage})
+
+    def stage(self, stage: str) -> None:
+        self._put({"type": "progress", "n": 0, "stage": stage})
+
+    def partial(self, data: Any) -> None:
+        """上报部分结果"""
+        self._put({"type": "partial", "data": data})
+
+    def log(self, message: str) -> None:
+        self._put({"type": "log", "message": message})
+
+
+class Job:
+    """一个已提交的任务及其事件记录"""
+
+    def __init__(self, kind: str, params: Dict[str, Any], total: int):
+        self.job_id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params
+        self.status = PENDING
+        self.total = max(int(total), 1)
+        self.done = 0
+        self.stage: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self.futures: List[Future] = []
+        self.unit_results: List[Any] = []
+        self.units_left = 0
+        self.combine: Optional[Callable[[List[Any]], Any]] = None
+        self.on_finish: Optional[Callable[[], None]] = None
+        self.subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    @property
+    def progress(self) -> float:
+        return round(min(self.done / self.total, 1.0) * 100, 2)
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "done": self.done,
+            "total": self.total,
+            "stage": self.stage,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """
+    进程池任务管理器
+
+    使用方式：
+        manager = JobManager(max_workers=4)
+        manager.start()
+        job = manager.submit("backtest", units=[(fn, kwargs), ...], total=n_stocks)
+        ...
+        manager.shutdown()
+
+    fn 必须是模块级函数，签名为 fn(reporter, **kwargs)。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_jobs: int = 200):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.RLock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._mp_manager = None
+        self._queue = None
+        self._dispatcher: Optional[threading.Thread] = None
+
+    # ---------- 生命周期 ---------- #
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._mp_manager = multiprocessing.Manager()
+        self._queue = self._mp_manager.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+        logger.info("任务进程池已启动，进程数: %d", self.max_workers)
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        for job in list(self.jobs.values()):
+            if job.status not in FINISHED_STATES:
+                self.cancel(job.job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._queue.put(None)
+        self._dispatcher.join(timeout=5)
+        self._mp_manager.shutdown()
+        self._executor = None
+        logger.info("任务进程池已停止")
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    # ---------- 提交与查询 ---------- #
+    def submit(
+        self,
+        kind: str,
+        units: List[Tuple[Callable, Dict[str, Any]]],
+        total: int,
+        params: Optional[Dict[str, Any]] = None,
+        combine: Optional[Callable[[List[Any]], Any]] = None,
+        on_finish: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        """
+        提交任务；units 中的单元并行执行，combine 用于合并各单元的返回值
+
+        on_finish 在任务结束（完成、失败或取消）后调用一次，用于释放任务独占的资源（如共享面板）。
+        """
+        if self._executor is None:
+            raise RuntimeError("任务管理器未启动")
+        job = Job(kind, params or {}, total)
+        job.combine = combine
+        job.on_finish = on_finish
+        job.units_left = len(units)
+        job.unit_results = [None] * len(units)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._evict_finished()
+
+        reporter = ProgressReporter(self._queue, job.job_id)
+        for i, (fn, kwargs) in enumerate(units):
+            future = self._executor.submit(fn, reporter, **kwargs)
+            future.add_done_callback(lambda f, i=i: self._on_unit_done(job, i, f))
+            job.futures.append(future)
+        if not units:
+            self._finish(job, COMPLETED, result=combine([]) if combine else [])
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """取消尚未开始的执行单元；已在运行的单元无法中断，其结果会被丢弃"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        for f in job.futures:
+            f.cancel()
+        self._finish(job, CANCELLED)
+        return True
+
+    def _evict_finished(self) -> None:
+        """超过 max_jobs 时丢弃最早结束的任务"""
+        if len(self.jobs) <= self.max_jobs:
+            return
+        finished = sorted(
+            (j for j in self.jobs.values() if j.status in FINISHED_STATES),
+            key=lambda j: j.finished_at or 0,
+        )
+        for job in finished[: len(self.jobs) - self.max_jobs]:
+            del self.jobs[job.job_id]
+
+    # ---------- 事件 ---------- #
+    def subscribe(self, job: Job, since: int = 0) -> Tuple[List[Dict[str, Any]], Optional[asyncio.Queue]]:
+        """
+        订阅任务事件（须在事件循环中调用）
+
+        返回：
+        - (since 之后的历史事件, 新事件队列)；任务已结束时队列为 None
+        """
+        with self._lock:
+            history = job.events[since:]
+            if job.status in FINISHED_STATES:
+                return history, None
+            q: asyncio.Queue = asyncio.Queue()
+            job.subscribers.append((asyncio.get_running_loop(), q))
+            return history, q
+
+    def unsubscribe(self, job: Job, q: Optional[asyncio.Queue]) -> None:
+        with self._lock:
+            job.subscribers = [(loop, s) for loop, s in job.subscribers if s is not q]
+
+    def _emit(self, job: Job, event: Dict[str, Any]) -> None:
+        with self._lock:
+            event["seq"] = len(job.events)
+            job.events.append(event)
+            for loop, q in job.subscribers:
+                loop.call_soon_threadsafe(q.put_nowait, event)
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            try:
+                event = self._queue.get()
+            except (EOFError, OSError, queue.Empty):
+                return
+            if event is None:
+                return
+            job = self.jobs.get(event.pop("job_id", None))
+            if job is None or job.status in FINISHED_STATES:
+                continue
+            if event["type"] == "unit_done":
+                job.units_left -= 1
+                if job.units_left == 0:
+                    self._on_all_units_done(job)
+                continue
+            if job.status == PENDING:
+                job.status = RUNNING
+                job.started_at = time.time()
+            if event["type"] == "progress":
+                job.done += event.get("n", 0)
+                if event.get("stage"):
+                    job.stage = event["stage"]
+                event.update(progress=job.progress, done=job.done, total=job.total)
+            self._emit(job, event)
+
+    def _on_unit_done(self, job: Job, index: int, future: Future) -> None:
+        if future.cancelled() or job.status in FINISHED_STATES:
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error("任务 %s 执行失败: %s", job.job_id, exc)
+            for f in job.futures:
+                f.cancel()
+            self._finish(job, FAILED, error=f"{type(exc).__name__}: {exc}")
+            return
+        job.unit_results[index] = future.result()
+        # 子进程的进度事件先于返回值入队，经同一队列发送完成标记可保证 done 事件最后发出
+        self._queue.put({"type": "unit_done", "job_id": job.job_id})
+
+    def _on_all_units_done(self, job: Job) -> None:
+        try:
+            result = job.combine(job.unit_results) if job.combine else job.unit_results
+        except Exception as e:
+            self._finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+            return
+        self._finish(job, COMPLETED, result=result)
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            job.started_at = job.started_at or job.finished_at
+            self._emit(job, {"type": "done", "status": status, "error": error})
+            job.subscribers = []
+        if job.on_finish is not None:
+            try:
+                job.on_finish()
+            except Exception as e:
+                logger.warning("任务 %s 释放资源失败: %s", job.job_id, e)
+
+
+_manager: Optional[JobManager] = None
+
+
+def start_job_manager(max_workers: Optional[int] = None) -> JobManager:
+    """启动全局任务管理器"""
+    global _manager
+    if _manager is not None and _manager.running:
+        logger.warning("任务管理器已经在运行中")
+        return _manager
+    _manager = JobManager(max_workers=max_workers)
+    _manager.start()
+    return _manager
+
+
+def stop_job_manager() -> None:
+    """停止全局任务管理器"""
+    global _manager
+    if _manager is not None:
+        _manager.shutdown()
+    _manager = None
+
+
+def get_job_manager() -> JobManager:
+    if _manager is None or not _manager.running:
+        raise RuntimeError("任务管理器未启动")
+    return _manager
@@ -0,0 +1,295 @@
+"""
+进程池中执行的任务函数
+
+所有函数均为模块级函数（可被子进程导入），第一个参数为 ProgressReporter。
+选股与批量回测都按股票分块：每块在一个子进程中独立完成，最后由主进程合并。
+传入 shared（SharedPanel 的名字）时从共享面板取K线，否则逐只读取 data_dir 下的 CSV。
+"""
+import contextlib
+import importlib
+import io
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.cache import BacktestCache, backtest_key
+from backtest.incremental import checkpoint_slot, simulate
+from backtest.metrics import compute_metrics
+from backtrader4Lu.strategy.buy import B1BuyStrategy, B1WithMA60BuyStrategy
+from backtrader4Lu.strategy.double_line_b1_strategy import DoubleLineStrategy
+from backtrader4Lu.strategy.sell import (
+    CloseBelowDuokongSellStrategy,
+    StandardTopWindmillSellStrategy,
+    SuspectedTopWindmillSellStrategy,
+)
+from panel import CSV_DTYPES, Panel, attach_panel
+from screening import SelectionCache, data_versions, run_cached
+from universe import Universe
+
+from .manager import ProgressReporter
+
+# 项目根目录（Selector.py 所在位置）
+ROOT_DIR = Path(__file__).resolve().parents[2]
+# 选股结果缓存目录（与 select_stock.py 共用）
+SELECTION_CACHE_DIR = ROOT_DIR / ".select_cache"
+# 单股回测结果缓存目录
+BACKTEST_CACHE_DIR = ROOT_DIR / ".backtest_cache"
+
+BUY_STRATEGIES = {
+    "B1": B1BuyStrategy,
+    "B1_with_ma60": B1WithMA60BuyStrategy,
+}
+
+SELL_STRATEGIES = {
+    "close_below_duokong": CloseBelowDuokongSellStrategy,
+    "standard_top_windmill": StandardTopWindmillSellStrategy,
+    "suspected_top_windmill": SuspectedTopWindmillSellStrategy,
+}
+
+
+def chunked(items: List[Any], size: int) -> List[List[Any]]:
+    size = max(int(size), 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def list_codes(data_dir: str, exclude_boards=("bj", "b")) -> List[str]:
+    """数据目录下的全部股票代码（与 select_stock.py 相同，缺省排除北交所与 B 股）"""
+    return Universe.from_data_dir(data_dir).exclude_boards(exclude_boards).codes()
+
+
+def load_frames(codes: List[str], data_dir: str, shared: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    读取一组股票的日线（按日期升序）；缺失的股票不在结果中
+
+    K线为紧凑的 float32，与发布到共享内存的紧凑面板一致，两种来源的选股结果相同。
+    """
+    if shared is not None:
+        panel = attach_panel(shared)
+        return {code: panel.frame(code) for code in codes if code in panel}
+    data: Dict[str, pd.DataFrame] = {}
+    for code in codes:
+        fp = Path(data_dir) / f"{code}.csv"
+        if fp.exists():
+            data[code] = pd.read_csv(fp, parse_dates=["date"], dtype=CSV_DTYPES).sort_values("date")
+    return data
+
+
+def latest_trade_date(data_dir: str) -> str:
+    """数据目录中任一 CSV 的最后日期（与 select_stock.py 的取法一致）"""
+    csv_files = sorted(Path(data_dir).glob("*.csv"))
+    if not csv_files:
+        raise FileNotFoundError(f"数据目录 {data_dir} 中没有 CSV 文件")
+    return str(pd.read_csv(csv_files[0]).iloc[-1, 0])
+
+
+# --------------------------- 选股 --------------------------- #
+
+def run_selection_chunk(
+    reporter: ProgressReporter,
+    codes: List[str],
+    data_dir: str,
+    selectors: List[Dict[str, Any]],
+    trade_date: str,
+    shared: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    timeframes: Optional[Dict[str, str]] = None,
+) -> Dict[str, List[str]]:
+    """
+    对一组股票运行全部已启用的 Selector
+
+    cache_dir 不为空时使用选股结果缓存（screening.cache）：只加载并重算数据有变化的股票。
+    timeframes 为共享高周期面板的名字 {"W": ..., "M": ...}（SharedPanel.name），
+    交给支持的 Selector（带 timeframes 属性，如 ExpressionSelector）代替由日线聚合。
+
+    返回：
+    - {alias: [code, ...]}
+    """
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    module = importlib.import_module("Selector")
+    tf_panels = {freq: attach_panel(name) for freq, name in (timeframes or {}).items()}
+    if cache_dir is not None:
+        return _run_selection_cached(reporter, codes, data_dir, selectors, trade_date, shared, cache_dir,
+                                     module, tf_panels)
+
+    data = load_frames(codes, data_dir, shared)
+    reporter.progress(len(codes), stage="加载行情")
+
+    date = pd.Timestamp(trade_date)
+    picks: Dict[str, List[str]] = {}
+    for cfg in selectors:
+        alias = cfg.get("alias", cfg["class"])
+        selector = _make_selector(module, cfg, tf_panels)
+        picks[alias] = selector.select(date, data)
+        reporter.progress(len(codes), stage=alias)
+        if picks[alias]:
+            reporter.partial({"selector": alias, "picks": picks[alias]})
+    return picks
+
+
+def _run_selection_cached(
+    reporter: ProgressReporter,
+    codes: List[str],
+    data_dir: str,
+    selectors: List[Dict[str, Any]],
+    trade_date: str,
+    shared: Optional[str],
+    cache_dir: str,
+    module,
+    tf_panels: Dict[str, Panel],
+) -> Dict[str, List[str]]:
+    """命中缓存的股票不加载行情；多个执行单元各自写入自己的 part，可并发共用同一缓存目录"""
+    date = pd.Timestamp(trade_date)
+
+    def compute(todo: List[str], cfgs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        data = load_frames(todo, data_dir, shared)
+        return {
+            cfg.get("alias", cfg["class"]): _make_selector(module, cfg, tf_panels).select(date, data)
+            for cfg in cfgs
+        }
+
+    picks = run_cached(SelectionCache(cache_dir), selectors, date, data_versions(data_dir, codes), compute)
+    reporter.progress(len(codes) * (1 + len(selectors)), stage="选股")
+    for alias, codes_picked in picks.items():
+        if codes_picked:
+            reporter.partial({"selector": alias, "picks": codes_picked})
+    return picks
+
+
+def _make_selector(module, cfg: Dict[str, Any], tf_panels: Dict[str, Panel]):
+    selector = getattr(module, cfg["class"])(**cfg.get("params", {}))
+    if tf_panels and hasattr(selector, "timeframes"):
+        selector.timeframes = tf_panels
+    return selector
+
+
+def merge_selection(parts: List[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    merged: Dict[str, List[str]] = {}
+    for part in parts:
+        for alias, codes in part.items():
+            merged.setdefault(alias, []).extend(codes)
+    return {alias: sorted(codes) for alias, codes in merged.items()}
+
+
+# --------------------------- 批量回测 --------------------------- #
+
+def run_backtest_chunk(
+    reporter: ProgressReporter,
+    codes: List[str],
+    data_dir: str,
+    start_date: str,
+    end_date: str,
+    initial_cash: float = 500000,
+    commission: float = 0.0002,
+    buy_strategies: Optional[List[str]] = None,
+    sell_strategies: Optional[List[str]] = None,
+    min_data_rows: int = 100,
+    shared: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    对一组股票逐只运行 DoubleLineStrategy 回测，块内向量化计算绩效指标
+
+    cache_dir 不为空时使用回测结果缓存（backtest.cache）：K线、策略与参数都没变的股票不再重新回测；
+    只追加了新K线的股票从上次留下的检查点接续（backtest.incremental），只回测检查点之后的K线。
+
+    返回：
+    - 每只股票的结果字典（status 为 success / skipped / error）
+    """
+    buy = {name: BUY_STRATEGIES[name] for name in (buy_strategies or ["B1"])}
+    sell = {name: SELL_STRATEGIES[name] for name in (sell_strategies or list(SELL_STRATEGIES))}
+
+    results: List[Dict[str, Any]] = []
+    curves: List[np.ndarray] = []
+    pnls: List[np.ndarray] = []
+    panel = attach_panel(shared) if shared is not None else None
+    cache = BacktestCache(cache_dir) if cache_dir is not None else None
+    for code in codes:
+        fp = Path(data_dir) / f"{code}.csv"
+        missing = code not in panel if panel is not None else not fp.exists()
+        if missing:
+            results.append({"stock_code": code, "status": "skipped", "reason": "数据文件不存在"})
+            reporter.progress(1)
+            continue
+        try:
+            if panel is not None:
+                df = panel.frame(code).set_index("date")
+            else:
+                df = pd.read_csv(fp, parse_dates=["date"]).set_index("date")
+            if len(df) < min_data_rows:
+                results.append({"stock_code": code, "status": "skipped", "reason": f"数据行数不足 ({len(df)})"})
+                reporter.progress(1)
+                continue
+
+            key = outcome = slot = checkpoint = None
+            if cache is not None:
+                key = backtest_key(df, DoubleLineStrategy, buy, sell, initial_cash=initial_cash,
+                                   commission=commission, start_date=start_date, end_date=end_date)
+                outcome = cache.get(key)
+            if outcome is None:
+                if cache is not None:
+                    slot = checkpoint_slot(code, DoubleLineStrategy, buy, sell, initial_cash=initial_cash,
+                                           commission=commission, start_date=start_date)
+                    checkpoint = cache.get(slot)
+                # 策略逐笔打印交易日志，子进程中丢弃
+                with contextlib.redirect_stdout(io.StringIO()):
+                    outcome, checkpoint = simulate(df, DoubleLineStrategy, buy, sell, initial_cash, commission,
+                                                   start_date, end_date, checkpoint=checkpoint)
+                if cache is not None:
+                    cache.put(key, outcome)
+                    if checkpoint is not None:
+                        cache.put(slot, checkpoint)
+
+            final_value = outcome["final_value"]
+            start, end = outcome["equity_start_date"], outcome["equity_end_date"]
+            results.append({
+                "stock_code": code,
+                "status": "success",
+                "initial_cash": initial_cash,
+                "final_value": final_value,
+                "return_rate": (final_value / initial_cash - 1) * 100,
+                "profit": final_value - initial_cash,
+                "signal_count": len(outcome["all_signals"]),
+                "data_rows": len(df),
+                "backtest_start_date": str(start) if start else None,
+                "backtest_end_date": str(end) if end else None,
+                "trades": [
+                    {k: (str(v) if k == "trade_date" else v) for k, v in t.items()}
+                    for t in outcome["trade_records"]
+                ],
+            })
+            curves.append(outcome["equity_curve"])
+            pnls.append(outcome["trade_pnls"])
+        except Exception as e:
+            results.append({"stock_code": code, "status": "error", "reason": str(e)})
+        reporter.progress(1)
+
+    ok = [r for r in results if r["status"] == "success"]
+    metrics = compute_metrics(curves, pnls, initial_cash=initial_cash)
+    for r, m in zip(ok, metrics.to_dict("records")):
+        r.update({k: (None if isinstance(v, float) and not np.isfinite(v) else v) for k, v in m.items()})
+    if ok:
+        reporter.partial([{k: v for k, v in r.items() if k != "trades"} for r in ok])
+    return results
+
+
+def merge_backtest(parts: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    results = [r for part in parts for r in part]
+    ok = [r for r in results if r["status"] == "success"]
+    statistics = None
+    if ok:
+        df = pd.DataFrame(ok)
+        statistics = {
+            "valid_stocks": len(ok),
+            "skipped_stocks": len(results) - len(ok),
+            "avg_return_rate": float(df["return_rate"].mean()),
+            "median_return_rate": float(df["return_rate"].median()),
+            "win_rate": float((df["return_rate"] > 0).mean() * 100),
+            "avg_annual_return": float(df["annual_return"].mean()),
+            "avg_sharpe_ratio": float(df["sharpe_ratio"].mean()),
+            "avg_max_drawdown": float(df["max_drawdown"].mean()),
+        }
+    return {"results": results, "statistics": statistics}
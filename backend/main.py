@@ -2,7 +2,8 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth
+from jobs import start_job_manager, stop_job_manager
+from routers import auth, jobs
 from scheduler import start_scheduler, stop_scheduler
 
 
@@ -10,8 +11,10 @@ from scheduler import start_scheduler, stop_scheduler
 async def lifespan(app: FastAPI):
     # 启动时
     start_scheduler()
+    start_job_manager()
     yield
     # 关闭时
+    stop_job_manager()
     stop_scheduler()
 
 
@@ -26,6 +29,7 @@ app.add_middleware(
 )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 
 @app.get("/")
 async def root():
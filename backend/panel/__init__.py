@@ -0,0 +1,13 @@
+"""全市场行情面板"""
+from .cross_section import CrossSection
+from .indicators import INDICATOR_FIELDS, refresh_indicators
+from .memory import CSV_DTYPES, categorize, compact_frame, format_nbytes, frames_nbytes
+from .panel import FIELDS, Panel
+from .price_index import PriceIndex
+from .shared import SharedPanel, attach_panel
+from .state import IndicatorState
+from .timeframe import TIMEFRAMES, align_rows, resample_panel, update_resampled
+
+__all__ = ["CSV_DTYPES", "CrossSection", "FIELDS", "INDICATOR_FIELDS", "IndicatorState", "Panel", "PriceIndex",
+           "SharedPanel", "TIMEFRAMES", "align_rows", "attach_panel", "categorize", "compact_frame",
+           "format_nbytes", "frames_nbytes", "refresh_indicators", "resample_panel", "update_resampled"]
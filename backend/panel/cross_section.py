@@ -0,0 +1,110 @@
+"""
+面板上的截面查询
+
+    cs = CrossSection(panel, groups=code_to_industry)
+    j = cs.values("J", "2025-06-30")               # 每只股票在该日（或之前最近一日）的 J
+    cs.group_counts(j < 15)                        # 各行业满足条件的股票数
+    dates, hist = cs.history("J", start, end)      # (交易日 × 股票)，一次取出一段区间
+
+按日取值用“股票号 × 交易日”组合键上的二分查找定位每只股票截至该日的最后一行，
+分组计数用预先编码好的 股票 → 分组号 数组做 bincount，都不需要逐股还原 DataFrame。
+"""
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .panel import Panel
+
+
+class CrossSection:
+    """
+    面板的截面查询
+
+    groups 为 股票代码 → 分组名（如行业）的映射，不在其中的股票归入 default_group。
+    """
+
+    def __init__(
+        self,
+        panel: Panel,
+        groups: Optional[Mapping[str, str]] = None,
+        default_group: str = "未知",
+    ):
+        self.panel = panel
+        # 行按（股票, 交易日）有序，组合键单调递增
+        self._stride = panel.n_dates + 1
+        self._key = panel.row_code.astype(np.int64) * self._stride + panel.date_idx
+        self._base = np.arange(panel.n_codes, dtype=np.int64) * self._stride
+        labels = [(groups or {}).get(c, default_group) for c in panel.codes]
+        names, ids = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        self.group_names: np.ndarray = names
+        self.group_ids: np.ndarray = ids.astype(np.int64)
+
+    # ---------- 定位 ---------- #
+    def _rows_at(self, pos: np.ndarray) -> np.ndarray:
+        """交易日历位置 pos（可为数组）处每只股票截至当日的最后一行，shape = pos.shape + (n_codes,)"""
+        pos = np.asarray(pos, dtype=np.int64)
+        q = pos[..., None] + self._base
+        rows = np.searchsorted(self._key, q, side="right") - 1
+        ok = (pos[..., None] >= 0) & (rows >= self.panel.offsets[:-1])
+        return np.where(ok, rows, -1)
+
+    def rows(self, date=None) -> np.ndarray:
+        """每只股票截至 date 的最后一行行号，没有为 -1；date 为 None 时取各自的最后一行"""
+        if date is None:
+            last = self.panel.offsets[1:] - 1
+            return np.where(np.diff(self.panel.offsets) > 0, last, -1)
+        return self._rows_at(self.panel.date_pos(date))
+
+    def dates_between(self, start=None, end=None) -> np.ndarray:
+        """面板交易日历中落在 [start, end] 内的交易日"""
+        cal = self.panel.calendar
+        lo = 0 if start is None else int(np.searchsorted(
+            cal, np.datetime64(pd.Timestamp(start).date(), "D"), side="left"))
+        hi = len(cal) if end is None else int(np.searchsorted(
+            cal, np.datetime64(pd.Timestamp(end).date(), "D"), side="right"))
+        return cal[lo:max(lo, hi)]
+
+    # ---------- 取值 ---------- #
+    def _take(self, field: str, rows: np.ndarray) -> np.ndarray:
+        values = self.panel.fields[field]
+        return np.where(rows >= 0, values[np.maximum(rows, 0)] if len(values) else np.nan, np.nan)
+
+    def values(self, field: str, date=None) -> np.ndarray:
+        """每只股票截至 date 最后一行的字段值，没有为 NaN"""
+        return self._take(field, self.rows(date))
+
+    def history(self, field: str, start=None, end=None) -> Tuple[np.ndarray, np.ndarray]:
+        """区间内每个交易日的截面值，返回 (交易日, (交易日 × 股票) 数组)"""
+        dates = self.dates_between(start, end)
+        pos = np.searchsorted(self.panel.calendar, dates)
+        return dates, self._take(field, self._rows_at(pos))
+
+    # ---------- 分组 ---------- #
+    def group_counts(self, mask: np.ndarray) -> np.ndarray:
+        """
+        各分组中 mask 为 True 的股票数
+
+        mask 为按股票的一维布尔数组时返回 (分组,)；为 (交易日 × 股票) 时返回 (交易日 × 分组)。
+        """
+        mask = np.asarray(mask, dtype=bool)
+        n_groups = len(self.group_names)
+        if mask.ndim == 1:
+            return np.bincount(self.group_ids[mask], minlength=n_groups)
+        ids = self.group_ids + n_groups * np.arange(len(mask))[:, None]
+        return np.bincount(ids[mask], minlength=len(mask) * n_groups).reshape(len(mask), n_groups)
+
+    def ranked_groups(self, mask: np.ndarray) -> pd.DataFrame:
+        """
+        mask 为 True 的股票按分组计数，返回 [group, count]，只列出计数 > 0 的分组
+
+        排序与对各股票分组名调用 value_counts() 相同：分组按首次出现的顺序排列后按计数降序排序。
+        """
+        mask = np.asarray(mask, dtype=bool)
+        counts = self.group_counts(mask)
+        first = np.full(len(counts), len(mask), dtype=np.int64)
+        np.minimum.at(first, self.group_ids[mask], np.flatnonzero(mask))
+        present = np.flatnonzero(counts)
+        present = present[np.argsort(first[present], kind="stable")]
+        ranked = pd.Series(counts[present], index=self.group_names[present]).sort_values(ascending=False)
+        return pd.DataFrame({"group": ranked.index.to_numpy(), "count": ranked.to_numpy()})
@@ -0,0 +1,98 @@
+"""
+面板上的缓存指标
+
+指标作为面板字段（K、D、J、BBI、MA60、ZXDQ、ZXDKX、DIF）与K线一起保存。
+每日增量更新时，与面板衔接的股票由 :class:`IndicatorState` 逐根 O(1) 递推新增行；
+新股票、状态缺失或新增行过多的股票按全历史重算并重建状态。
+口径与 indicators.kernels（即 Selector.compute_kdj / compute_bbi / compute_zx_lines /
+compute_dif）在全历史上的结果一致。
+"""
+from typing import Optional
+
+import numpy as np
+
+from indicators import kernels
+
+from .panel import Panel
+from .state import KDJ_N, IndicatorState
+
+INDICATOR_FIELDS = ("K", "D", "J", "BBI", "MA60", "ZXDQ", "ZXDKX", "DIF")
+# 新增行超过该数的股票直接全量重算，避免少数股票拖长逐根递推的轮数
+MAX_STEPS = 30
+
+
+def _full_history(close: np.ndarray, high: np.ndarray, low: np.ndarray):
+    K, D, J = kernels.kdj(close, high, low, KDJ_N)
+    zxdq, zxdkx = kernels.zx_lines(close)
+    return {
+        "K": K,
+        "D": D,
+        "J": J,
+        "BBI": kernels.bbi(close),
+        "MA60": kernels.rolling_mean(close, 60),
+        "ZXDQ": zxdq,
+        "ZXDKX": zxdkx,
+        "DIF": kernels.ema(close, 12) - kernels.ema(close, 26),
+    }
+
+
+def refresh_indicators(
+    panel: Panel,
+    first_new: Optional[np.ndarray] = None,
+    state: Optional[IndicatorState] = None,
+) -> int:
+    """
+    计算面板新增行的指标并写回面板字段
+
+    参数：
+    - first_new: Panel.append 返回的每只股票首个新行行号；None 表示全量重算
+    - state: 上次运行保存的指标状态，就地对齐到面板的股票顺序并推进；
+      None 时有新行的股票均按全历史重算
+
+    返回：
+    - 计算的行数
+    """
+    n = panel.n_rows
+    for f in INDICATOR_FIELDS:
+        if f not in panel.fields or len(panel.fields[f]) != n:
+            panel.fields[f] = np.full(n, np.nan)
+            first_new = None
+    if first_new is None:
+        first_new = panel.offsets[:-1].copy()
+        first_new[np.diff(panel.offsets) == 0] = -1
+    if state is None:
+        state = IndicatorState(panel.codes)
+    elif not np.array_equal(state.codes, panel.codes):
+        state.align(panel.codes)
+
+    starts = panel.offsets[:-1]
+    pending = np.flatnonzero(first_new >= 0)
+    n_old = first_new[pending] - starts[pending]
+    n_new = panel.offsets[pending + 1] - first_new[pending]
+    last_old = panel.calendar[panel.date_idx[np.maximum(first_new[pending] - 1, 0)]]
+    step = state.matches(pending, n_old, last_old) & (n_new <= MAX_STEPS)
+
+    close_all, high_all, low_all = panel.fields["close"], panel.fields["high"], panel.fields["low"]
+    computed = 0
+
+    # ---------- 逐根递推 ---------- #
+    codes, rows, left = pending[step], first_new[pending[step]], n_new[step]
+    while len(codes):
+        values = state.update(codes, close_all[rows], high_all[rows], low_all[rows],
+                                panel.calendar[panel.date_idx[rows]])
+        for f, v in values.items():
+            panel.fields[f][rows] = v
+        computed += len(rows)
+        more = left > 1
+        codes, rows, left = codes[more], rows[more] + 1, left[more] - 1
+
+    # ---------- 全量重算 ---------- #
+    for i in pending[~step]:
+        a, b = int(panel.offsets[i]), int(panel.offsets[i + 1])
+        close, high, low = close_all[a:b], high_all[a:b], low_all[a:b]
+        for f, v in _full_history(close, high, low).items():
+            panel.fields[f][a:b] = v
+        state.rebuild(i, close, high, low, panel.calendar[panel.date_idx[b - 1]])
+        computed += b - a
+
+    return computed
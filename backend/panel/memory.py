@@ -0,0 +1,48 @@
+"""
+逐股 DataFrame 的紧凑表示与内存统计
+
+    frames = {code: compact_frame(df) for code, df in frames.items()}   # 价格 / 成交量转 float32
+    sl = categorize(stocklist, ["industry", "market"])                  # 重复字符串转 category
+    logger.info("行情占用 %s", format_nbytes(frames_nbytes(frames)))
+
+date 列仍为 datetime64（各 Selector 按日期比较与截取）；需要 int32 交易日下标时用 Panel。
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from .panel import FIELDS
+
+PRICE_DTYPE = np.float32
+# pd.read_csv(dtype=...) 用：读取时直接解析为 float32，不经 float64 中转
+CSV_DTYPES = {f: PRICE_DTYPE for f in FIELDS}
+
+
+def compact_frame(df: pd.DataFrame, fields: Iterable[str] = FIELDS, dtype=PRICE_DTYPE) -> pd.DataFrame:
+    """K线字段转为 dtype（默认 float32）；不含的字段忽略，已是该类型时不复制"""
+    cols = {f: dtype for f in fields if f in df.columns and df[f].dtype != dtype}
+    return df.astype(cols, copy=False) if cols else df
+
+
+def categorize(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+    """把存在的字符串列转为 category（行业、板块等取值有限的列）"""
+    cols = {c: "category" for c in columns if c in df.columns and df[c].dtype == object}
+    return df.astype(cols) if cols else df
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrame 实际占用的字节数（含索引与字符串对象）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def frames_nbytes(frames: Dict[str, pd.DataFrame]) -> int:
+    return sum(frame_nbytes(df) for df in frames.values())
+
+
+def format_nbytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.2f} GB"
@@ -0,0 +1,368 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# K线字段（与 fetch_kline 输出的 CSV 列一致）
+FIELDS = ("open", "close", "high", "low", "volume")
+
+
+class Panel:
+    """
+    全市场日线面板（按股票连续存储的稀疏布局）
+
+    所有股票的K线首尾相接存放在一维数组中，第 i 只股票的行区间为
+    ``offsets[i]:offsets[i+1]``；每行的交易日用 ``date_idx`` 指向共享交易日历
+    ``calendar``。停牌日不占行，因此内存只与实际K线数量成正比。
+
+    需要按日期向量化计算时，用 :meth:`dense` 展开成 (交易日 × 股票) 的二维数组，
+    缺失处为 NaN。
+
+    字段缺省为 float64；:meth:`compact` 把K线字段转为 float32，内存约减半，
+    指标计算在内核中仍按 float64 进行。
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        calendar: np.ndarray,
+        offsets: np.ndarray,
+        date_idx: np.ndarray,
+        fields: Dict[str, np.ndarray],
+    ):
+        self.codes = np.asarray(codes).astype(str)
+        self.calendar = np.asarray(calendar).astype("datetime64[D]")
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.date_idx = np.asarray(date_idx, dtype=np.int32)
+        self.fields = dict(fields)
+        self._code_pos = {c: i for i, c in enumerate(self.codes)}
+        self._row_code: Optional[np.ndarray] = None
+
+    # ---------- 基本属性 ---------- #
+    @property
+    def n_codes(self) -> int:
+        return len(self.codes)
+
+    @property
+    def n_dates(self) -> int:
+        return len(self.calendar)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.date_idx)
+
+    @property
+    def row_code(self) -> np.ndarray:
+        """每一行所属股票的列号"""
+        if self._row_code is None:
+            self._row_code = np.repeat(
+                np.arange(self.n_codes, dtype=np.int32), np.diff(self.offsets)
+            )
+        return self._row_code
+
+    def code_pos(self, code: str) -> int:
+        return self._code_pos[code]
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._code_pos
+
+    def date_pos(self, date, side: str = "right") -> int:
+        """
+        返回交易日历中 <= date 的最后一个位置（side="right"），
+        没有则返回 -1。
+        """
+        d = np.datetime64(pd.Timestamp(date).date(), "D")
+        pos = int(np.searchsorted(self.calendar, d, side=side)) - 1
+        return pos
+
+    # ---------- 构造 ---------- #
+    @classmethod
+    def from_frames(
+        cls,
+        frames: Dict[str, pd.DataFrame],
+        fields: Iterable[str] = FIELDS,
+        dtype=np.float64,
+    ) -> "Panel":
+        """由 ``load_data`` 返回的 {code: DataFrame} 构造面板；dtype 为各字段的存储类型"""
+        fields = tuple(fields)
+        codes: List[str] = []
+        date_parts: List[np.ndarray] = []
+        value_parts: Dict[str, List[np.ndarray]] = {f: [] for f in fields}
+
+        for code, df in frames.items():
+            if df is None or df.empty:
+                continue
+            df = df.sort_values("date")
+            dates = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")
+            codes.append(code)
+            date_parts.append(dates)
+            for f in fields:
+                value_parts[f].append(df[f].to_numpy(dtype=dtype))
+
+        if not codes:
+            return cls(
+                np.array([], dtype=str),
+                np.array([], dtype="datetime64[D]"),
+                np.zeros(1, dtype=np.int64),
+                np.array([], dtype=np.int32),
+                {f: np.array([], dtype=dtype) for f in fields},
+            )
+
+        all_dates = np.concatenate(date_parts)
+        calendar, date_idx = np.unique(all_dates, return_inverse=True)
+        lengths = np.array([len(d) for d in date_parts], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        values = {f: np.concatenate(parts) for f, parts in value_parts.items()}
+        return cls(np.array(codes), calendar, offsets, date_idx.astype(np.int32), values)
+
+    @classmethod
+    def from_csv_dir(
+        cls,
+        data_dir: Union[str, Path],
+        codes: Optional[Iterable[str]] = None,
+        max_workers: int = 8,
+        dtype=np.float64,
+    ) -> "Panel":
+        """并发读取 data_dir 下的 {code}.csv 构造面板；dtype=np.float32 时为紧凑面板"""
+        data_dir = Path(data_dir)
+        if codes is None:
+            codes = sorted(f.stem for f in data_dir.glob("*.csv") if f.stem.isdigit())
+        codes = list(codes)
+
+        def _read(code: str) -> Optional[pd.DataFrame]:
+            fp = data_dir / f"{code}.csv"
+            if not fp.exists():
+                return None
+            try:
+                return pd.read_csv(fp, parse_dates=["date"])
+            except Exception as e:
+                logger.warning("读取 %s 失败: %s", fp.name, e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            dfs = list(executor.map(_read, codes))
+
+        frames = {c: df for c, df in zip(codes, dfs) if df is not None}
+        panel = cls.from_frames(frames, dtype=dtype)
+        logger.info(
+            "面板加载完成：%d 只股票，%d 个交易日，%d 行，%.1f MB",
+            panel.n_codes, panel.n_dates, panel.n_rows, panel.memory_usage()["total"] / 2**20,
+        )
+        return panel
+
+    # ---------- 增量更新 ---------- #
+    def append(self, new_frames: Dict[str, pd.DataFrame]) -> Tuple["Panel", np.ndarray]:
+        """
+        追加新K线，返回 (新面板, first_new)
+
+        每只股票只保留晚于其已有最后日期的行；first_new[i] 为第 i 只股票首个新行在
+        新面板中的行号，没有新行时为 -1。新行中不在 new_frames 里的字段（如已缓存的
+        指标列）记为 NaN，由调用方补算。
+        """
+        new_codes = sorted(c for c in new_frames if c not in self._code_pos)
+        codes = np.concatenate([self.codes, np.array(new_codes, dtype=self.codes.dtype)])
+
+        added: Dict[int, Tuple[np.ndarray, Dict[str, np.ndarray]]] = {}
+        for code, df in new_frames.items():
+            if df is None or df.empty:
+                continue
+            i = self._code_pos.get(code)
+            dates = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")
+            order = np.argsort(dates, kind="stable")
+            dates = dates[order]
+            if i is not None and self.offsets[i + 1] > self.offsets[i]:
+                last = self.calendar[self.date_idx[self.offsets[i + 1] - 1]]
+                keep = dates > last
+            else:
+                keep = np.ones(len(dates), dtype=bool)
+            if not keep.any():
+                continue
+            pos = i if i is not None else self.n_codes + new_codes.index(code)
+            values = {
+                f: (df[f].to_numpy(dtype=self.fields[f].dtype)[order][keep] if f in df.columns
+                    else np.full(int(keep.sum()), np.nan, dtype=self.fields[f].dtype))
+                for f in self.fields
+            }
+            added[pos] = (dates[keep], values)
+
+        if not added:
+            return self, np.full(self.n_codes, -1, dtype=np.int64)
+
+        calendar = np.union1d(self.calendar, np.concatenate([d for d, _ in added.values()]))
+        old_dates = self.calendar[self.date_idx]
+
+        date_parts: List[np.ndarray] = []
+        value_parts: Dict[str, List[np.ndarray]] = {f: [] for f in self.fields}
+        lengths = np.zeros(len(codes), dtype=np.int64)
+        first_new = np.full(len(codes), -1, dtype=np.int64)
+        row = 0
+        for pos in range(len(codes)):
+            if pos < self.n_codes:
+                sl = slice(self.offsets[pos], self.offsets[pos + 1])
+                date_parts.append(old_dates[sl])
+                for f in self.fields:
+                    value_parts[f].append(self.fields[f][sl])
+                lengths[pos] += sl.stop - sl.start
+            if pos in added:
+                dates, values = added[pos]
+                first_new[pos] = row + lengths[pos]
+                date_parts.append(dates)
+                for f in self.fields:
+                    value_parts[f].append(values[f])
+                lengths[pos] += len(dates)
+            row += lengths[pos]
+
+        all_dates = np.concatenate(date_parts)
+        date_idx = np.searchsorted(calendar, all_dates).astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        # 保持各字段原有的存储类型（紧凑面板追加后仍为 float32）
+        fields = {
+            f: np.concatenate(parts).astype(self.fields[f].dtype, copy=False)
+            for f, parts in value_parts.items()
+        }
+        return type(self)(codes, calendar, offsets, date_idx, fields), first_new
+
+    def refresh_from_csv_dir(
+        self,
+        data_dir: Union[str, Path],
+        max_workers: int = 8,
+    ) -> Tuple["Panel", np.ndarray]:
+        """
+        从 CSV 目录读取新增K线并追加（fetch_one 以追加方式写 CSV）
+
+        已缓存 k 行的股票只解析第 k 行之后的内容；若文件被重写（行数变少或衔接不上），
+        则整只重读，仍只追加晚于缓存最后日期的行。
+        """
+        data_dir = Path(data_dir)
+        codes = sorted(f.stem for f in data_dir.glob("*.csv") if f.stem.isdigit())
+        counts = np.diff(self.offsets)
+
+        def _read(code: str) -> Optional[pd.DataFrame]:
+            fp = data_dir / f"{code}.csv"
+            i = self._code_pos.get(code)
+            n_cached = int(counts[i]) if i is not None else 0
+            try:
+                if n_cached:
+                    df = pd.read_csv(fp, skiprows=range(1, n_cached + 1))
+                    if df.empty:
+                        return None
+                    last = self.calendar[self.date_idx[self.offsets[i + 1] - 1]]
+                    if np.datetime64(pd.Timestamp(df["date"].iloc[0]).date(), "D") > last:
+                        return df
+                return pd.read_csv(fp)
+            except Exception as e:
+                logger.warning("读取 %s 失败: %s", fp.name, e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            dfs = list(executor.map(_read, codes))
+        frames = {c: df for c, df in zip(codes, dfs) if df is not None}
+        panel, first_new = self.append(frames)
+        logger.info(
+            "面板增量更新：%d 只股票有新K线，新增 %d 行",
+            int((first_new >= 0).sum()), panel.n_rows - self.n_rows,
+        )
+        return panel, first_new
+
+    # ---------- 取数 ---------- #
+    def series(self, code: str, field: str) -> np.ndarray:
+        i = self._code_pos[code]
+        return self.fields[field][self.offsets[i]:self.offsets[i + 1]]
+
+    def frame(self, code: str) -> pd.DataFrame:
+        """还原单只股票的 DataFrame（列与 CSV 一致）"""
+        i = self._code_pos[code]
+        sl = slice(self.offsets[i], self.offsets[i + 1])
+        data = {"date": pd.to_datetime(self.calendar[self.date_idx[sl]])}
+        for f, arr in self.fields.items():
+            data[f] = arr[sl]
+        return pd.DataFrame(data)
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        return {code: self.frame(code) for code in self.codes}
+
+    def take(self, codes: Iterable[str]) -> "Panel":
+        """只含给定股票（按给定顺序，面板中没有的跳过）的新面板，交易日历不变"""
+        pos = np.array([self._code_pos[c] for c in codes if c in self._code_pos], dtype=np.int64)
+        starts, ends = self.offsets[pos], self.offsets[pos + 1]
+        rows = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)] + [np.array([], dtype=np.int64)])
+        offsets = np.concatenate([[0], np.cumsum(ends - starts)])
+        return type(self)(
+            self.codes[pos], self.calendar, offsets, self.date_idx[rows],
+            {f: v[rows] for f, v in self.fields.items()},
+        )
+
+    def dense(self, field: str, ffill: bool = False) -> np.ndarray:
+        """
+        展开为 (交易日 × 股票) 二维数组，缺失为 NaN。
+        ffill=True 时按列向前填充（停牌日沿用最近价格，用于估值）。
+        """
+        out = np.full((self.n_dates, self.n_codes), np.nan, dtype=np.float64)
+        out[self.date_idx, self.row_code] = self.fields[field]
+        if ffill:
+            out = _ffill_axis0(out)
+        return out
+
+    # ---------- 存储类型与内存 ---------- #
+    def compact(self, fields: Iterable[str] = FIELDS, dtype=np.float32) -> "Panel":
+        """
+        返回K线字段转为 dtype（默认 float32）的新面板，其余字段与索引数组共享不复制
+
+        A 股价格为两位小数、成交量以手计，float32 的 7 位有效数字足以表示；
+        指标字段保持 float64，指标内核读取时统一转为 float64 计算。
+        """
+        converted = {
+            f: (v.astype(dtype, copy=False) if f in fields else v) for f, v in self.fields.items()
+        }
+        return type(self)(self.codes, self.calendar, self.offsets, self.date_idx, converted)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """各数组占用的字节数，total 为合计"""
+        usage = {
+            "codes": self.codes.nbytes,
+            "calendar": self.calendar.nbytes,
+            "offsets": self.offsets.nbytes,
+            "date_idx": self.date_idx.nbytes,
+        }
+        usage.update({f: v.nbytes for f, v in self.fields.items()})
+        usage["total"] = sum(usage.values())
+        return usage
+
+    # ---------- 持久化 ---------- #
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            codes=self.codes,
+            calendar=self.calendar.astype("int64"),
+            offsets=self.offsets,
+            date_idx=self.date_idx,
+            **{f"field_{k}": v for k, v in self.fields.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Panel":
+        with np.load(path, allow_pickle=False) as z:
+            fields = {k[len("field_"):]: z[k] for k in z.files if k.startswith("field_")}
+            return cls(
+                z["codes"],
+                z["calendar"].astype("datetime64[D]"),
+                z["offsets"],
+                z["date_idx"],
+                fields,
+            )
+
+
+def _ffill_axis0(arr: np.ndarray) -> np.ndarray:
+    """二维数组按列向前填充 NaN"""
+    mask = np.isnan(arr)
+    idx = np.where(~mask, np.arange(arr.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    out = arr[idx, np.arange(arr.shape[1])[None, :]]
+    return out
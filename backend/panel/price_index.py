@@ -0,0 +1,137 @@
+"""
+价格索引
+
+每个价格字段一组按价格升序排列的扁平数组 (price, code_id, date_id)，由面板一次构建并可落盘。
+“目标价 ± 容差”的查找是两次 searchsorted 取出的一段切片，可再按交易日区间过滤，
+不再逐股扫描全部K线。
+
+    index = PriceIndex.from_panel(panel)          # 或 PriceIndex.load("price_index.npz")
+    index.query(12.34, tolerance=0.01, field="close", start="2024-01-01", end="2024-06-30")
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .panel import Panel
+
+PRICE_FIELDS = ("close", "high", "low")
+
+
+class PriceIndex:
+    """
+    按价格排序的K线索引
+
+    code_id / date_id 分别指向 codes 与交易日历 calendar；各字段独立排序，互不影响。
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        calendar: np.ndarray,
+        columns: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        source: str = "",
+    ):
+        self.codes = np.asarray(codes).astype(str)
+        self.calendar = np.asarray(calendar).astype("datetime64[D]")
+        # field -> (price 升序, code_id, date_id)
+        self.columns = columns
+        # 构建所用数据的版本（由调用方给出，如数据文件的大小与修改时间），随索引落盘，用于判断索引是否过期
+        self.source = source
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(self.columns)
+
+    # ---------- 构造 ---------- #
+    @classmethod
+    def from_panel(cls, panel: Panel, fields: Iterable[str] = PRICE_FIELDS) -> "PriceIndex":
+        columns = {}
+        for f in fields:
+            price = panel.fields[f]
+            order = np.argsort(price, kind="stable")     # NaN 排在最后，查不到
+            columns[f] = (
+                price[order],
+                panel.row_code[order].astype(np.int32),
+                panel.date_idx[order].astype(np.int32),
+            )
+        return cls(panel.codes, panel.calendar, columns)
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame],
+                    fields: Iterable[str] = PRICE_FIELDS) -> "PriceIndex":
+        """由 {code: DataFrame} 构建（DataFrame 需含 date 与各价格字段）"""
+        fields = tuple(fields)
+        return cls.from_panel(Panel.from_frames(frames, fields=fields), fields)
+
+    # ---------- 查询 ---------- #
+    def _date_bounds(self, start, end) -> Tuple[int, int]:
+        """[start, end] 对应的交易日历位置区间 [lo, hi)"""
+        lo, hi = 0, len(self.calendar)
+        if start is not None:
+            d = np.datetime64(pd.Timestamp(start).date(), "D")
+            lo = int(np.searchsorted(self.calendar, d, side="left"))
+        if end is not None:
+            d = np.datetime64(pd.Timestamp(end).date(), "D")
+            hi = int(np.searchsorted(self.calendar, d, side="right"))
+        return lo, hi
+
+    def query_rows(
+        self,
+        target: float,
+        tolerance: float = 0.0,
+        field: str = "close",
+        start=None,
+        end=None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """价格落在 [target - tolerance, target + tolerance] 内的 (price, code_id, date_id)，按价格升序"""
+        if field not in self.columns:
+            raise ValueError(f"价格类型必须是: {', '.join(self.columns)}")
+        price, code_id, date_id = self.columns[field]
+        i = np.searchsorted(price, target - tolerance, side="left")
+        j = np.searchsorted(price, target + tolerance, side="right")
+        price, code_id, date_id = price[i:j], code_id[i:j], date_id[i:j]
+        if start is not None or end is not None:
+            lo, hi = self._date_bounds(start, end)
+            keep = (date_id >= lo) & (date_id < hi)
+            price, code_id, date_id = price[keep], code_id[keep], date_id[keep]
+        return price, code_id, date_id
+
+    def query(
+        self,
+        target: float,
+        tolerance: float = 0.0,
+        field: str = "close",
+        start=None,
+        end=None,
+    ) -> pd.DataFrame:
+        """同 query_rows，返回 [code, <field>, date] 并按代码、日期排序"""
+        price, code_id, date_id = self.query_rows(target, tolerance, field, start, end)
+        codes = self.codes[code_id]
+        order = np.lexsort((date_id, codes))
+        return pd.DataFrame({
+            "code": codes[order],
+            field: price[order],
+            "date": pd.to_datetime(self.calendar[date_id[order]]),
+        })
+
+    # ---------- 持久化 ---------- #
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {}
+        for f, (price, code_id, date_id) in self.columns.items():
+            arrays[f"{f}_price"], arrays[f"{f}_code"], arrays[f"{f}_date"] = price, code_id, date_id
+        np.savez(path, codes=self.codes, calendar=self.calendar.astype("int64"),
+                 fields=np.array(self.fields), source=np.array(self.source), **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "PriceIndex":
+        with np.load(path, allow_pickle=False) as z:
+            columns = {
+                f: (z[f"{f}_price"], z[f"{f}_code"], z[f"{f}_date"]) for f in z["fields"].astype(str)
+            }
+            source = str(z["source"]) if "source" in z.files else ""
+            return cls(z["codes"], z["calendar"].astype("datetime64[D]"), columns, source)
+
@@ -0,0 +1,117 @@
+"""
+进程间共享的只读面板
+
+父进程把面板的各个数组写入内存文件系统（/dev/shm，不存在时为系统临时目录）下的一个目录，
+子进程按目录名以 np.load(mmap_mode="r") 挂载：各进程映射同一组页面，不经 pickle、不复制。
+
+    with SharedPanel(panel, fields=FIELDS) as shared:        # 父进程发布一次
+        executor.submit(task, shared.name, ...)              # 只传递名字
+    ...
+    panel = attach_panel(name)                               # 子进程中挂载（按名字缓存）
+
+发布者负责生命周期：close() / 退出 with 块 / 对象被回收 / 解释器退出时删除目录。
+已挂载的进程在目录删除后仍可读到原数据，映射随进程结束释放。
+"""
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from .panel import Panel
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "stockpanel-"
+# 每个进程最多保留的已挂载面板数
+_MAX_ATTACHED = 4
+_attached: "OrderedDict[str, Panel]" = OrderedDict()
+
+
+def _default_root() -> Optional[str]:
+    shm = Path("/dev/shm")
+    return str(shm) if shm.is_dir() and os.access(shm, os.W_OK) else None
+
+
+class SharedPanel:
+    """
+    发布到共享内存的面板（发布者一侧）
+
+    fields 缺省为面板的全部字段；只需要K线时传入 FIELDS 可减少共享的数据量。
+    """
+
+    def __init__(
+        self,
+        panel: Panel,
+        fields: Optional[Iterable[str]] = None,
+        root: Optional[Union[str, Path]] = None,
+    ):
+        fields = tuple(panel.fields if fields is None else fields)
+        self.name = tempfile.mkdtemp(prefix=_PREFIX, dir=str(root) if root else _default_root())
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.name, True)
+        try:
+            path = Path(self.name)
+            np.save(path / "codes.npy", panel.codes)
+            np.save(path / "calendar.npy", panel.calendar)
+            np.save(path / "offsets.npy", panel.offsets)
+            np.save(path / "date_idx.npy", panel.date_idx)
+            for f in fields:
+                np.save(path / f"field_{f}.npy", panel.fields[f])
+        except BaseException:
+            self.close()
+            raise
+        self.nbytes = sum(p.stat().st_size for p in path.iterdir())
+        logger.info("面板已发布到共享内存 %s：%d 只股票，%.1f MB", self.name, panel.n_codes, self.nbytes / 2**20)
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """删除共享数据；可重复调用"""
+        self._finalizer()
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __reduce__(self):
+        raise TypeError("SharedPanel 只能在发布进程中使用，向子进程传递 .name")
+
+
+def attach_panel(name: str) -> Panel:
+    """
+    按名字挂载共享面板（只读，零拷贝）
+
+    同一进程内重复挂载同一名字直接返回缓存的面板，进程池中的子进程跨任务复用。
+    """
+    panel = _attached.get(name)
+    if panel is not None:
+        _attached.move_to_end(name)
+        return panel
+
+    path = Path(name)
+    if not path.is_dir():
+        raise FileNotFoundError(f"共享面板不存在或已释放: {name}")
+    fields = {
+        p.stem[len("field_"):]: np.load(p, mmap_mode="r")
+        for p in sorted(path.glob("field_*.npy"))
+    }
+    panel = Panel(
+        np.load(path / "codes.npy"),
+        np.load(path / "calendar.npy"),
+        np.load(path / "offsets.npy", mmap_mode="r"),
+        np.load(path / "date_idx.npy", mmap_mode="r"),
+        fields,
+    )
+    _attached[name] = panel
+    while len(_attached) > _MAX_ATTACHED:
+        _attached.popitem(last=False)
+    return panel
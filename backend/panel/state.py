@@ -0,0 +1,190 @@
+"""
+面板指标的递推状态
+
+每只股票一行，保存推进到其最后一根K线时的指标状态：KDJ 的 K、D，各条 EMA 的当前值，
+各均线窗口的滚动和（带补偿项），以及收盘价 / 最高价 / 最低价的环形缓冲。
+追加一根K线只需 O(1) 更新状态即可得到新行的全部指标，且对一批股票向量化进行。
+
+状态与面板一起持久化（indicator_state.npz），只有与面板衔接得上的股票才走递推，
+其余（新股票、状态缺失或过期）由 refresh_indicators 全量重算后重建状态。
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+import numpy as np
+
+from indicators import kernels
+
+KDJ_N = 9
+# 各均线窗口：BBI 用 3/6/12/24，ZXDKX 用 14/28/57/114，另有 MA60
+MA_WINDOWS = (3, 6, 12, 14, 24, 28, 57, 60, 114)
+# EMA 状态：ZXDQ = EMA(EMA(C,10),10)，DIF = EMA(C,12) - EMA(C,26)
+EMA_SPANS = {"ema10": 10, "zxdq": 10, "ema12": 12, "ema26": 26}
+RING = max(MA_WINDOWS)
+
+_ARRAYS = ("count", "last_date", "K", "D", "ema", "sums", "comp", "close_ring", "high_ring", "low_ring")
+
+
+def _alpha(span: int) -> float:
+    return 2.0 / (span + 1)
+
+
+class IndicatorState:
+    """
+    按股票对齐的指标状态表
+
+    codes 与面板的股票顺序无关，使用前用 :meth:`align` 对齐到面板；
+    count 为已推进的K线根数，last_date 为最后一根的交易日。
+    """
+
+    def __init__(self, codes: Iterable[str], **arrays: np.ndarray):
+        self.codes = np.asarray(list(codes)).astype(str)
+        n = len(self.codes)
+        defaults = {
+            "count": np.zeros(n, dtype=np.int64),
+            "last_date": np.full(n, np.datetime64("NaT"), dtype="datetime64[D]"),
+            "K": np.full(n, 50.0),
+            "D": np.full(n, 50.0),
+            "ema": np.full((n, len(EMA_SPANS)), np.nan),
+            "sums": np.zeros((n, len(MA_WINDOWS))),
+            "comp": np.zeros((n, len(MA_WINDOWS))),
+            "close_ring": np.full((n, RING), np.nan),
+            "high_ring": np.full((n, KDJ_N), np.nan),
+            "low_ring": np.full((n, KDJ_N), np.nan),
+        }
+        for name in _ARRAYS:
+            value = arrays.get(name)
+            setattr(self, name, defaults[name] if value is None else np.array(value, dtype=defaults[name].dtype))
+        self._code_pos = {c: i for i, c in enumerate(self.codes)}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    # ---------- 对齐 ---------- #
+    def align(self, codes: Iterable[str]) -> None:
+        """就地按 codes 重排，缺失的股票为空状态"""
+        out = type(self)(codes)
+        pos = np.array([self._code_pos.get(c, -1) for c in out.codes], dtype=np.int64)
+        hit = pos >= 0
+        for name in _ARRAYS:
+            getattr(out, name)[hit] = getattr(self, name)[pos[hit]]
+        self.__dict__.update(out.__dict__)
+
+    def matches(self, rows: np.ndarray, count: np.ndarray, last_date: np.ndarray) -> np.ndarray:
+        """rows 的状态是否恰好推进到第 count 根K线（日期为 last_date）且可继续递推"""
+        return (self.count[rows] == count) & (
+            (count == 0) | (self.last_date[rows] == last_date)
+        ) & np.isfinite(self.sums[rows]).all(axis=1)
+
+    def take(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """rows 的状态副本（配合 put 回退到某根K线之前）"""
+        return {name: getattr(self, name)[rows].copy() for name in _ARRAYS}
+
+    def put(self, rows: np.ndarray, saved: Dict[str, np.ndarray]) -> None:
+        for name in _ARRAYS:
+            getattr(self, name)[rows] = saved[name]
+
+    # ---------- 重建 ---------- #
+    def rebuild(self, row: int, close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                last_date) -> None:
+        """由单只股票的完整历史重建状态（全量重算后调用）"""
+        # 紧凑面板的K线为 float32，滚动和等须按 float64 累加
+        close, high, low = (np.asarray(a, dtype=np.float64) for a in (close, high, low))
+        n = len(close)
+        self.count[row] = n
+        self.last_date[row] = last_date if n else np.datetime64("NaT")
+        if n == 0:
+            self.K[row] = self.D[row] = 50.0
+            self.ema[row] = np.nan
+            self.sums[row] = self.comp[row] = 0.0
+            self.close_ring[row] = self.high_ring[row] = self.low_ring[row] = np.nan
+            return
+        K, D, _ = kernels.kdj(close, high, low, KDJ_N)
+        self.K[row], self.D[row] = K[-1], D[-1]
+        ema10 = kernels.ema(close, 10)
+        self.ema[row] = [ema10[-1], kernels.ema(ema10, 10)[-1],
+                         kernels.ema(close, 12)[-1], kernels.ema(close, 26)[-1]]
+        self.sums[row] = [close[-w:].sum() for w in MA_WINDOWS]
+        self.comp[row] = 0.0
+        for ring, values in ((self.close_ring, close), (self.high_ring, high), (self.low_ring, low)):
+            cap = ring.shape[1]
+            ring[row] = np.nan
+            tail = np.arange(max(n - cap, 0), n)
+            ring[row, tail % cap] = values[tail]
+
+    # ---------- 递推 ---------- #
+    def update(self, rows: np.ndarray, close: np.ndarray, high: np.ndarray, low: np.ndarray,
+               date: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        rows 中每只股票各追加一根K线，返回这一根的指标（键同 INDICATOR_FIELDS）
+
+        rows 不可重复；口径与 kernels 在全历史上的结果一致（浮点误差以内）。
+        """
+        count = self.count[rows]
+        first = count == 0
+
+        # 环形缓冲：写入新值，并取出离开各均线窗口的旧值
+        leaving = np.zeros((len(rows), len(MA_WINDOWS)))
+        for j, w in enumerate(MA_WINDOWS):
+            old = count >= w
+            leaving[old, j] = self.close_ring[rows[old], (count[old] - w) % RING]
+        self.close_ring[rows, count % RING] = close
+        self.high_ring[rows, count % KDJ_N] = high
+        self.low_ring[rows, count % KDJ_N] = low
+
+        # 滚动和：加入新值、减去离开值，各用一次 Kahan 补偿
+        sums, comp = self.sums[rows], self.comp[rows]
+        for delta in (np.broadcast_to(close[:, None], sums.shape), -leaving):
+            y = delta - comp
+            t = sums + y
+            comp = (t - sums) - y
+            sums = t
+        self.sums[rows], self.comp[rows] = sums, comp
+        filled = (count + 1)[:, None] >= np.asarray(MA_WINDOWS)
+        ma = dict(zip(MA_WINDOWS, np.where(filled, sums / np.asarray(MA_WINDOWS), np.nan).T))
+
+        # KDJ：窗口不足 KDJ_N 根时用已有部分（环形缓冲未写入处为 NaN）
+        low_n = np.fmin.reduce(self.low_ring[rows], axis=1)
+        high_n = np.fmax.reduce(self.high_ring[rows], axis=1)
+        rsv = (close - low_n) / (high_n - low_n + 1e-9) * 100
+        # 与 kernels.smooth（lfilter）相同的运算顺序
+        K = np.where(first, 50.0, rsv * (1 / 3) + self.K[rows] * (2 / 3))
+        D = np.where(first, 50.0, K * (1 / 3) + self.D[rows] * (2 / 3))
+        self.K[rows], self.D[rows] = K, D
+
+        # EMA：首根取原值，之后按 pandas ewm(adjust=False) 的运算顺序
+        ema = self.ema[rows]
+        for j, (name, span) in enumerate(EMA_SPANS.items()):
+            x = ema[:, 0] if name == "zxdq" else close
+            a = _alpha(span)
+            ema[:, j] = np.where(first, x, ((1 - a) * ema[:, j] + a * x) / ((1 - a) + a))
+        self.ema[rows] = ema
+
+        self.count[rows] = count + 1
+        self.last_date[rows] = date
+        return {
+            "K": K,
+            "D": D,
+            "J": 3 * K - 2 * D,
+            "BBI": (ma[3] + ma[6] + ma[12] + ma[24]) / 4,
+            "MA60": ma[60],
+            "ZXDQ": ema[:, 1],
+            "ZXDKX": (ma[14] + ma[28] + ma[57] + ma[114]) / 4.0,
+            "DIF": ema[:, 2] - ema[:, 3],
+        }
+
+    # ---------- 持久化 ---------- #
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in _ARRAYS}
+        arrays["last_date"] = self.last_date.astype("int64")
+        np.savez(path, codes=self.codes, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "IndicatorState":
+        with np.load(path, allow_pickle=False) as z:
+            codes = z["codes"]
+            arrays = {name: z[name] for name in _ARRAYS}
+        arrays["last_date"] = arrays["last_date"].astype("datetime64[D]")
+        return cls(codes, **arrays)
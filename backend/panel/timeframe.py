@@ -0,0 +1,141 @@
+"""
+周线 / 月线面板
+
+由日线面板聚合：每只股票每个自然周（周一至周日）/ 自然月一根K线，open 取首日、close 取末日、
+high / low 取极值、volume 求和，日期记为该股票在该周期内的最后一个交易日。
+行已按（股票, 日期）有序，全部股票在一次 reduceat 中完成。
+
+    weekly = resample_panel(daily, "W")
+    daily, first_new = daily.refresh_from_csv_dir(data_dir)
+    weekly, _ = update_resampled(weekly, daily, first_new, "W")   # 只重算新K线所在周期及之后
+    rows = align_rows(daily, weekly, "W")                         # 每行日线对应的周线行
+
+对齐只用已走完的周期：日线每一行（包括最新交易日）只看到所在周期之前的最后一根，所在周期的K线
+即使已有（本周至今）也不使用。某日看到的高周期K线不随之后K线的到来而变化，实盘当日选股与事后
+按历史重算同一天的结果一致；面板中晚于该日的K线也不会被用到。
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .panel import FIELDS, Panel
+
+TIMEFRAMES = {"W": "weekly", "M": "monthly"}
+
+
+def period_ids(dates: np.ndarray, freq: str) -> np.ndarray:
+    """日期所属周期的整数编号（周以周一为起点）"""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if freq == "W":
+        # 1970-01-01 为周四，+3 后整除 7 使周一成为周期起点
+        return (days.astype(np.int64) + 3) // 7
+    if freq == "M":
+        return days.astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"未知周期 {freq!r}，可选：{', '.join(TIMEFRAMES)}")
+
+
+def period_start(ids: np.ndarray, freq: str) -> np.ndarray:
+    """period_ids 的周期编号 -> 周期第一天"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if freq == "W":
+        return (ids * 7 - 3).astype("datetime64[D]")
+    return ids.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _aggregate(daily: Panel, rows: np.ndarray, freq: str, fields) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """把日线行 rows（按股票、日期有序）聚合为高周期K线，返回 (股票号, 日期, 各字段)"""
+    if len(rows) == 0:
+        return (np.array([], dtype=np.int64), np.array([], dtype="datetime64[D]"),
+                {f: np.array([], dtype=daily.fields[f].dtype) for f in fields})
+    code = daily.row_code[rows].astype(np.int64)
+    dates = daily.calendar[daily.date_idx[rows]]
+    pid = period_ids(dates, freq)
+    starts = np.flatnonzero(np.concatenate([[True], (code[1:] != code[:-1]) | (pid[1:] != pid[:-1])]))
+    ends = np.concatenate([starts[1:], [len(rows)]]) - 1
+    agg = {
+        "open": lambda v: v[starts],
+        "close": lambda v: v[ends],
+        "high": lambda v: np.maximum.reduceat(v, starts),
+        "low": lambda v: np.minimum.reduceat(v, starts),
+        "volume": lambda v: np.add.reduceat(v, starts),
+    }
+    values = {f: agg[f](daily.fields[f][rows]) for f in fields}
+    return code[starts], dates[ends], values
+
+
+def _build(codes: np.ndarray, code: np.ndarray, dates: np.ndarray, values: Dict[str, np.ndarray]) -> Panel:
+    counts = np.bincount(code, minlength=len(codes))
+    calendar, date_idx = np.unique(dates, return_inverse=True)
+    return Panel(codes, calendar.astype("datetime64[D]"), np.concatenate([[0], np.cumsum(counts)]),
+                 date_idx.astype(np.int32), values)
+
+
+def resample_panel(daily: Panel, freq: str, fields=FIELDS) -> Panel:
+    """日线面板聚合为周线（"W"）或月线（"M"）面板，股票顺序与日线相同"""
+    fields = tuple(f for f in fields if f in daily.fields)
+    code, dates, values = _aggregate(daily, np.arange(daily.n_rows), freq, fields)
+    return _build(daily.codes, code, dates, values)
+
+
+def update_resampled(tf: Panel, daily: Panel, first_new: np.ndarray, freq: str) -> Tuple[Panel, np.ndarray]:
+    """
+    日线追加新K线（Panel.append 返回的 first_new）后增量更新高周期面板，返回 (新面板, tf_first_new)
+
+    有新行的股票从首个新行所在周期的第一根日线起重新聚合（未走完的最后一周/月被替换），
+    其余股票的K线原样保留；tf_first_new 为各股票首个重算行的行号，没有为 -1。
+    股票顺序与日线不衔接时（如面板重建）退回全量聚合。
+    """
+    fields = tuple(tf.fields)
+    n_tf = tf.n_codes
+    if n_tf > daily.n_codes or not np.array_equal(tf.codes, daily.codes[:n_tf]):
+        out = resample_panel(daily, freq, fields)
+        return out, np.where(np.diff(out.offsets) > 0, out.offsets[:-1], -1)
+
+    pending = np.flatnonzero(first_new >= 0)
+
+    # 每只待更新股票：首个新行所在周期的第一天，及该股票在此之后的第一根日线
+    cut = np.full(daily.n_codes, np.datetime64("9999-12-31"), dtype="datetime64[D]")
+    cut[pending] = period_start(period_ids(daily.calendar[daily.date_idx[first_new[pending]]], freq), freq)
+    stride = np.int64(daily.n_dates + 1)
+    key = daily.row_code.astype(np.int64) * stride + daily.date_idx
+    start = np.searchsorted(key, pending * stride + np.searchsorted(daily.calendar, cut[pending]))
+    stop = daily.offsets[pending + 1]
+    lengths = stop - start
+    rows = np.repeat(start - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+    new_code, new_dates, new_values = _aggregate(daily, rows, freq, fields)
+
+    old_code = tf.row_code.astype(np.int64)
+    old_dates = tf.calendar[tf.date_idx]
+    keep = old_dates < cut[old_code]
+    code = np.concatenate([old_code[keep], new_code])
+    order = np.argsort(code, kind="stable")  # 同一股票内：保留的旧K线都早于重算的K线
+    out = _build(
+        daily.codes,
+        code[order],
+        np.concatenate([old_dates[keep], new_dates])[order],
+        {f: np.concatenate([tf.fields[f][keep], new_values[f]])[order] for f in fields},
+    )
+    kept = np.bincount(old_code[keep], minlength=daily.n_codes)
+    tf_first_new = np.full(daily.n_codes, -1, dtype=np.int64)
+    has_new = np.bincount(new_code, minlength=daily.n_codes) > 0
+    tf_first_new[has_new] = out.offsets[:-1][has_new] + kept[has_new]
+    return out, tf_first_new
+
+
+def align_rows(daily: Panel, tf: Panel, freq: str) -> np.ndarray:
+    """
+    日线每一行对应的高周期行号：同一股票中所属周期早于该日所在周期的最后一根，没有为 -1
+
+    tf 为 freq 周期的面板，股票顺序可以与日线不同（按代码对应），日线中有而 tf 中没有的股票为 -1。
+    """
+    pos = np.array([daily.code_pos(c) if c in daily else -1 for c in tf.codes], dtype=np.int64)
+    tf_code = pos[tf.row_code] if tf.n_rows else np.array([], dtype=np.int64)
+    stride = np.int64(1) << 32
+    key = tf_code * stride + period_ids(tf.calendar[tf.date_idx], freq)
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    q = daily.row_code.astype(np.int64) * stride + period_ids(daily.calendar[daily.date_idx], freq)
+    idx = np.searchsorted(key, q, side="left") - 1
+    ok = idx >= 0
+    ok[ok] = (key[idx[ok]] // stride) == daily.row_code[ok]
+    return np.where(ok, order[np.maximum(idx, 0)], -1)
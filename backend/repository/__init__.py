@@ -0,0 +1,12 @@
+"""选股与回测结果持久化"""
+from .backends import DatabaseBackend, MySQLBackend, SQLiteBackend, create_backend
+from .results import AsyncResultsWriter, ResultsRepository
+
+__all__ = [
+    "AsyncResultsWriter",
+    "DatabaseBackend",
+    "MySQLBackend",
+    "ResultsRepository",
+    "SQLiteBackend",
+    "create_backend",
+]
@@ -0,0 +1,282 @@
+"""
+结果仓库
+
+把选股结果、批量回测结果与交易明细写入 init_DDL.sql 定义的表。
+ResultsRepository 为同步实现，每类数据一条（分块的）多行 INSERT；
+AsyncResultsWriter 在单独的写线程中执行这些操作，调用方只拿到 Future，不会被数据库阻塞。
+"""
+import datetime as dt
+import json
+import logging
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from .backends import DatabaseBackend, create_backend, to_db_value
+
+logger = logging.getLogger(__name__)
+
+SELECTION_COLUMNS = (
+    "execution_id", "stock_code", "stock_name", "match_score",
+    "match_reasons", "selection_time", "extra_data",
+)
+
+BACKTEST_COLUMNS = (
+    "execution_id", "stock_code", "stock_name", "total_return", "annual_return",
+    "sharpe_ratio", "max_drawdown", "win_rate", "profit_loss_ratio", "total_trades",
+    "winning_trades", "losing_trades", "backtest_start_date", "backtest_end_date", "extra_data",
+)
+
+TRADE_COLUMNS = (
+    "result_id", "stock_code", "trade_type", "trade_date", "trade_price", "trade_quantity",
+    "trade_amount", "profit_loss", "profit_loss_rate", "trade_reason", "extra_data",
+)
+
+# 回测结果中映射到表字段的键（batch_backtest 的 return_rate 即 total_return）
+_BACKTEST_KEYS = {
+    "total_return": "return_rate",
+    "annual_return": "annual_return",
+    "sharpe_ratio": "sharpe_ratio",
+    "max_drawdown": "max_drawdown",
+    "win_rate": "win_rate",
+    "profit_loss_ratio": "profit_loss_ratio",
+    "total_trades": "total_trades",
+    "winning_trades": "winning_trades",
+    "losing_trades": "losing_trades",
+    "backtest_start_date": "backtest_start_date",
+    "backtest_end_date": "backtest_end_date",
+}
+# total_return 与 return_rate 同值（后者已映射到表字段），不再重复存入 extra_data
+_BACKTEST_SKIP = set(_BACKTEST_KEYS.values()) | {"stock_code", "stock_name", "status", "trades", "total_return"}
+
+
+def _json(obj: Any) -> Optional[str]:
+    if obj is None:
+        return None
+    return json.dumps(obj, ensure_ascii=False, default=lambda v: to_db_value(v) if not isinstance(v, np.ndarray) else v.tolist())
+
+
+def _now() -> str:
+    return dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ResultsRepository:
+    """
+    结果仓库（同步）
+
+    使用方式：
+        repo = ResultsRepository("sqlite:///results.db")
+        execution_id = repo.start_execution("daily_selection", "stock_selection")
+        repo.save_selection_results(execution_id, picks, selection_time=trade_date)
+        repo.finish_execution(execution_id)
+    """
+
+    def __init__(self, backend: Union[str, DatabaseBackend]):
+        self.backend = create_backend(backend) if isinstance(backend, str) else backend
+
+    def close(self) -> None:
+        self.backend.close()
+
+    # ---------- 任务执行记录 ---------- #
+    def start_execution(
+        self,
+        task_name: str,
+        task_type: str,
+        task_id: Optional[str] = None,
+        execution_id: Optional[str] = None,
+        created_by: Optional[str] = None,
+    ) -> str:
+        """登记一次任务执行（任务不存在时一并创建），返回 execution_id"""
+        task_id = task_id or str(uuid.uuid5(uuid.NAMESPACE_URL, f"{task_type}:{task_name}"))
+        execution_id = execution_id or str(uuid.uuid4())
+        now = _now()
+        self.backend.execute(
+            self.backend.insert_ignore_sql("tasks", ("task_id", "task_name", "task_type", "status")),
+            (task_id, task_name, task_type, "running"),
+        )
+        self.backend.execute(
+            "UPDATE tasks SET status = ?, last_run_time = ? WHERE task_id = ?",
+            ("running", now, task_id),
+        )
+        self.backend.insert_many(
+            "task_executions",
+            ("execution_id", "task_id", "status", "started_at", "created_by"),
+            [(execution_id, task_id, "running", now, created_by)],
+        )
+        return execution_id
+
+    def update_progress(self, execution_id: str, progress: int, current_stage: Optional[str] = None) -> None:
+        self.backend.execute(
+            "UPDATE task_executions SET progress = ?, current_stage = ? WHERE execution_id = ?",
+            (int(progress), current_stage, execution_id),
+        )
+
+    def finish_execution(
+        self,
+        execution_id: str,
+        status: str = "completed",
+        error_message: Optional[str] = None,
+        result_file_path: Optional[str] = None,
+    ) -> None:
+        rows = self.backend.query(
+            "SELECT task_id, started_at FROM task_executions WHERE execution_id = ?", (execution_id,)
+        )
+        now = dt.datetime.now()
+        duration = None
+        if rows and rows[0][1]:
+            started = rows[0][1]
+            if isinstance(started, str):
+                started = dt.datetime.strptime(started, "%Y-%m-%d %H:%M:%S")
+            duration = int((now - started).total_seconds())
+        self.backend.execute(
+            "UPDATE task_executions SET status = ?, progress = COALESCE(?, progress), finished_at = ?, duration = ?, "
+            "error_message = ?, result_file_path = ? WHERE execution_id = ?",
+            (status, 100 if status == "completed" else None, now, duration,
+             error_message, result_file_path, execution_id),
+        )
+        if rows:
+            self.backend.execute("UPDATE tasks SET status = ? WHERE task_id = ?", (status, rows[0][0]))
+
+    # ---------- 选股结果 ---------- #
+    def save_selection_results(
+        self,
+        execution_id: str,
+        picks: Iterable[Union[str, Dict[str, Any]]],
+        selection_time=None,
+        match_reasons: Optional[List[str]] = None,
+        extra_data: Optional[Dict[str, Any]] = None,
+        stock_names: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        批量写入选股结果
+
+        picks 可以是股票代码列表，也可以是含 stock_code / stock_name / match_score /
+        match_reasons / extra_data 的字典列表。返回写入行数。
+        """
+        selection_time = selection_time or _now()
+        stock_names = stock_names or {}
+        rows = []
+        for pick in picks:
+            if isinstance(pick, dict):
+                code = pick["stock_code"]
+                rows.append((
+                    execution_id, code, pick.get("stock_name", stock_names.get(code)),
+                    pick.get("match_score"), _json(pick.get("match_reasons", match_reasons)),
+                    pick.get("selection_time", selection_time), _json(pick.get("extra_data", extra_data)),
+                ))
+            else:
+                rows.append((
+                    execution_id, pick, stock_names.get(pick), None,
+                    _json(match_reasons), selection_time, _json(extra_data),
+                ))
+        self.backend.insert_many("stock_selection_results", SELECTION_COLUMNS, rows)
+        return len(rows)
+
+    # ---------- 回测结果 ---------- #
+    def save_backtest_results(
+        self,
+        execution_id: str,
+        results: List[Dict[str, Any]],
+        stock_names: Optional[Dict[str, str]] = None,
+    ) -> List[int]:
+        """
+        批量写入回测结果及其交易明细
+
+        results 为 batch_backtest 返回的 results 列表：绩效字段按 backtest_results 表映射，
+        其余标量字段存入 extra_data；若包含 "trades"（交易记录字典列表）则写入 trade_details。
+
+        返回：
+        - 每条回测结果的 ID
+        """
+        stock_names = stock_names or {}
+        rows = []
+        for r in results:
+            code = r["stock_code"]
+            extra = {
+                k: v for k, v in r.items()
+                if k not in _BACKTEST_SKIP and not isinstance(v, (list, dict, np.ndarray))
+            }
+            rows.append(
+                (execution_id, code, r.get("stock_name", stock_names.get(code)))
+                + tuple(r.get(key) for key in _BACKTEST_KEYS.values())
+                + (_json(extra) if extra else None,)
+            )
+        ids = self.backend.insert_many("backtest_results", BACKTEST_COLUMNS, rows)
+
+        trade_rows = []
+        for result_id, r in zip(ids, results):
+            for t in r.get("trades") or ():
+                trade_rows.append((
+                    result_id, r["stock_code"], t["trade_type"], t["trade_date"],
+                    t["trade_price"], t["trade_quantity"],
+                    t.get("trade_amount", t["trade_price"] * t["trade_quantity"]),
+                    t.get("profit_loss"), t.get("profit_loss_rate"), t.get("trade_reason"),
+                    _json(t.get("extra_data")),
+                ))
+        self.backend.insert_many("trade_details", TRADE_COLUMNS, trade_rows)
+        return ids
+
+
+class AsyncResultsWriter:
+    """
+    异步结果写入器
+
+    所有数据库操作都提交到单个写线程顺序执行，保证同一连接上的写入有序；
+    调用立即返回 Future，需要结果（如 execution_id）时再 .result()。
+    """
+
+    def __init__(self, repository: Union[str, DatabaseBackend, ResultsRepository]):
+        self.repository = (
+            repository if isinstance(repository, ResultsRepository) else ResultsRepository(repository)
+        )
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="results-writer")
+        self._pending: List[Future] = []
+
+    def _submit(self, fn, *args, **kwargs) -> Future:
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._log_error)
+        # 只保留未完成或失败的 Future，避免长时间运行时无限增长
+        self._pending = [f for f in self._pending if not f.done() or f.exception() is not None]
+        self._pending.append(future)
+        return future
+
+    @staticmethod
+    def _log_error(future: Future) -> None:
+        if future.exception() is not None:
+            logger.error("结果写入失败: %s", future.exception())
+
+    def start_execution(self, *args, **kwargs) -> Future:
+        return self._submit(self.repository.start_execution, *args, **kwargs)
+
+    def update_progress(self, *args, **kwargs) -> Future:
+        return self._submit(self.repository.update_progress, *args, **kwargs)
+
+    def finish_execution(self, *args, **kwargs) -> Future:
+        return self._submit(self.repository.finish_execution, *args, **kwargs)
+
+    def save_selection_results(self, *args, **kwargs) -> Future:
+        return self._submit(self.repository.save_selection_results, *args, **kwargs)
+
+    def save_backtest_results(self, *args, **kwargs) -> Future:
+        return self._submit(self.repository.save_backtest_results, *args, **kwargs)
+
+    def flush(self) -> None:
+        """等待已提交的写入全部完成，并抛出其中的第一个异常"""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.repository.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,228 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from fetcher import config
+from jobs import get_job_manager
+from jobs.manager import FINISHED_STATES
+from jobs.tasks import (
+    BACKTEST_CACHE_DIR,
+    BUY_STRATEGIES,
+    ROOT_DIR,
+    SELECTION_CACHE_DIR,
+    SELL_STRATEGIES,
+    chunked,
+    latest_trade_date,
+    list_codes,
+    merge_backtest,
+    merge_selection,
+    run_backtest_chunk,
+    run_selection_chunk,
+)
+from panel import FIELDS, Panel, SharedPanel
+
+router = APIRouter()
+
+
+class SelectionJobRequest(BaseModel):
+    data_dir: Optional[str] = None
+    config: Optional[str] = None
+    date: Optional[str] = Field(None, description="交易日 YYYY-MM-DD；缺省=数据最新日期")
+    tickers: Optional[List[str]] = Field(None, description="股票代码列表；缺省=全部")
+    chunk_size: int = Field(500, ge=1)
+    panel_path: Optional[str] = Field(None, description="面板缓存文件 panel.npz；提供时发布到共享内存供各执行单元读取")
+    use_cache: bool = Field(True, description="使用选股结果缓存：配置与行情未变的股票直接复用上次结果")
+
+
+class BacktestJobRequest(BaseModel):
+    data_dir: Optional[str] = None
+    stock_codes: Optional[List[str]] = Field(None, description="股票代码列表；缺省=全部")
+    start_date: str = "2024-09-24"
+    end_date: str = "2026-02-12"
+    initial_cash: float = 500000
+    commission: float = 0.0002
+    buy_strategies: List[str] = ["B1"]
+    sell_strategies: List[str] = list(SELL_STRATEGIES)
+    min_data_rows: int = 100
+    chunk_size: int = Field(50, ge=1)
+    panel_path: Optional[str] = Field(None, description="面板缓存文件 panel.npz；提供时发布到共享内存供各执行单元读取")
+    use_cache: bool = Field(True, description="使用回测结果缓存：K线、策略与参数都没变的股票直接复用上次结果")
+
+
+class JobCreated(BaseModel):
+    job_id: str
+    total: int
+
+
+def _publish_panel(panel_path: Optional[str], compact: bool = False) -> Optional[SharedPanel]:
+    """
+    加载面板缓存并发布到共享内存（在线程中调用）；未提供时各单元照旧读取 CSV
+
+    compact=True 时K线转为 float32 发布（选股）；回测的价格直接交给 backtrader 撮合，按面板文件原样发布。
+    """
+    if not panel_path:
+        return None
+    panel = Panel.load(panel_path)
+    return SharedPanel(panel.compact() if compact else panel, fields=FIELDS)
+
+
+def _get_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@router.post("/selection", response_model=JobCreated)
+async def submit_selection(request: SelectionJobRequest):
+    data_dir = request.data_dir or str(config.out_dir)
+    cfg_path = request.config or str(ROOT_DIR / "configs.json")
+    try:
+        with open(cfg_path, encoding="utf-8") as f:
+            cfg_raw = json.load(f)
+        # 扫描数据目录放到线程中，避免阻塞事件循环
+        codes = request.tickers or await asyncio.to_thread(list_codes, data_dir)
+        trade_date = request.date or await asyncio.to_thread(latest_trade_date, data_dir)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cfgs = cfg_raw["selectors"] if isinstance(cfg_raw, dict) and "selectors" in cfg_raw else cfg_raw
+    cfgs = cfgs if isinstance(cfgs, list) else [cfgs]
+    selectors = [c for c in cfgs if c.get("activate", True) is not False]
+    if not codes or not selectors:
+        raise HTTPException(status_code=400, detail="股票池或 Selector 配置为空")
+
+    try:
+        shared = await asyncio.to_thread(_publish_panel, request.panel_path, True)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    units = [
+        (run_selection_chunk, dict(codes=part, data_dir=data_dir, selectors=selectors, trade_date=trade_date,
+                                   shared=shared.name if shared else None,
+                                   cache_dir=str(SELECTION_CACHE_DIR) if request.use_cache else None))
+        for part in chunked(codes, request.chunk_size)
+    ]
+    total = len(codes) * (1 + len(selectors))
+    job = get_job_manager().submit(
+        "selection",
+        units,
+        total=total,
+        params={"data_dir": data_dir, "trade_date": trade_date, "selectors": [c.get("alias") for c in selectors]},
+        combine=merge_selection,
+        on_finish=shared.close if shared else None,
+    )
+    return {"job_id": job.job_id, "total": job.total}
+
+
+@router.post("/backtest", response_model=JobCreated)
+async def submit_backtest(request: BacktestJobRequest):
+    unknown = [s for s in request.buy_strategies if s not in BUY_STRATEGIES]
+    unknown += [s for s in request.sell_strategies if s not in SELL_STRATEGIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知策略: {', '.join(unknown)}")
+
+    data_dir = request.data_dir or str(config.out_dir)
+    codes = request.stock_codes or await asyncio.to_thread(list_codes, data_dir)
+    if not codes:
+        raise HTTPException(status_code=400, detail="股票池为空")
+
+    params = request.model_dump(exclude={"stock_codes", "chunk_size", "data_dir", "panel_path", "use_cache"})
+    cache_dir = str(BACKTEST_CACHE_DIR) if request.use_cache else None
+    try:
+        shared = await asyncio.to_thread(_publish_panel, request.panel_path)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    units = [
+        (run_backtest_chunk, dict(codes=part, data_dir=data_dir, shared=shared.name if shared else None,
+                                  cache_dir=cache_dir, **params))
+        for part in chunked(codes, request.chunk_size)
+    ]
+    job = get_job_manager().submit(
+        "backtest",
+        units,
+        total=len(codes),
+        params={"data_dir": data_dir, "n_stocks": len(codes), **params},
+        combine=merge_backtest,
+        on_finish=shared.close if shared else None,
+    )
+    return {"job_id": job.job_id, "total": job.total}
+
+
+@router.get("")
+async def list_jobs():
+    return [job.to_dict() for job in get_job_manager().list()]
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    return _get_job(job_id).to_dict(include_result=True)
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    if not get_job_manager().cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"任务已结束: {job.status}")
+    return job.to_dict()
+
+
+async def iter_job_events(job, since: int = 0):
+    """按顺序产出任务事件（先补发 since 之后的历史事件），任务结束后停止"""
+    manager = get_job_manager()
+    history, queue = manager.subscribe(job, since)
+    try:
+        for event in history:
+            yield event
+        if queue is None:
+            return
+        last_seq = history[-1]["seq"] if history else since - 1
+        while True:
+            event = await queue.get()
+            if event["seq"] <= last_seq:
+                continue
+            yield event
+            if event["type"] == "done":
+                return
+    finally:
+        manager.unsubscribe(job, queue)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """SSE 推送任务进度与部分结果，支持 Last-Event-ID 断线续传"""
+    job = _get_job(job_id)
+    since = int(request.headers.get("last-event-id", -1)) + 1
+
+    async def event_stream():
+        async for event in iter_job_events(job, since):
+            if await request.is_disconnected():
+                return
+            data = json.dumps(event, ensure_ascii=False, default=str)
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{job_id}/ws")
+async def job_events_ws(websocket: WebSocket, job_id: str):
+    """WebSocket 推送任务事件"""
+    await websocket.accept()
+    job = get_job_manager().get(job_id)
+    if job is None:
+        await websocket.close(code=4404, reason="任务不存在")
+        return
+    try:
+        async for event in iter_job_events(job):
+            await websocket.send_text(json.dumps(event, ensure_ascii=False, default=str))
+        if job.status in FINISHED_STATES:
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
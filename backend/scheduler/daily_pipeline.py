@@ -0,0 +1,271 @@
+"""
+每日收盘流水线
+
+fetch（增量抓取K线）→ update_panel（面板追加新K线并只为新行计算指标，周线 / 月线面板随之增量更新）
+→ select（日线与周线 / 月线面板发布到共享内存，所有启用的 Selector 按股票分块在进程池中并行运行）
+→ persist（写入结果库）
+
+每个阶段单独计时；失败后用同一 run_id 重跑只会执行失败及其下游的阶段。
+抓取阶段每次都执行，并记录行情的最新交易日：同一 run_id 早些时候（数据落地前）已完成的运行，
+在有了新K线后再次运行时下游阶段会重跑，而不是沿用旧的选股结果。
+"""
+import argparse
+import contextlib
+import datetime as dt
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from fetcher import config, fetch_latest_kline
+from jobs.manager import ProgressReporter
+from jobs.tasks import ROOT_DIR, chunked, list_codes, merge_selection, run_selection_chunk
+from panel import (
+    FIELDS, TIMEFRAMES, IndicatorState, Panel, SharedPanel, refresh_indicators, resample_panel, update_resampled,
+)
+from repository import ResultsRepository
+from screening import SelectionCache
+
+from .pipeline import Pipeline, Stage
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_NAME = "daily"
+DEFAULT_STATE_DIR = Path(os.environ.get("PIPELINE_STATE_DIR", config.out_dir.parent / "pipeline"))
+DEFAULT_CONFIG_PATH = ROOT_DIR / "configs.json"
+
+
+def _latest_trade_date(data_dir: Path) -> Optional[str]:
+    """CSV 目录中最新的K线日期（只读每个文件的表头与末尾），没有数据为 None"""
+    latest = None
+    for fp in Path(data_dir).glob("*.csv"):
+        with fp.open("rb") as f:
+            header = f.readline().decode("utf-8").strip().split(",")
+            if "date" not in header:
+                continue
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 4096, 0))
+            lines = [ln for ln in f.read().decode("utf-8", errors="ignore").splitlines() if ln.strip()]
+        if not lines or (size <= 4096 and len(lines) == 1):  # 只有表头
+            continue
+        value = lines[-1].split(",")[header.index("date")]
+        try:
+            day = pd.Timestamp(value).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+        latest = day if latest is None or day > latest else latest
+    return latest
+
+
+def _load_selectors(config_path: Path):
+    with Path(config_path).open(encoding="utf-8") as f:
+        cfg_raw = json.load(f)
+    if isinstance(cfg_raw, dict) and "selectors" in cfg_raw:
+        cfgs = cfg_raw["selectors"]
+    elif isinstance(cfg_raw, list):
+        cfgs = cfg_raw
+    else:
+        cfgs = [cfg_raw]
+    return [c for c in cfgs if c.get("activate", True) is not False]
+
+
+def build_daily_pipeline(
+    data_dir: Optional[Path] = None,
+    state_dir: Optional[Path] = None,
+    config_path: Optional[Path] = None,
+    db_url: Optional[str] = None,
+    fetch: bool = True,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 300,
+) -> Pipeline:
+    """
+    构建每日流水线
+
+    参数：
+    - data_dir: CSV 行情目录，缺省为 fetcher 的输出目录
+    - state_dir: 面板缓存、运行状态与选股结果的存放目录
+    - db_url: 结果库连接串，缺省为 state_dir/results.db（SQLite）
+    - fetch: 为 False 时跳过抓取（数据由其它途径落地）
+    """
+    data_dir = Path(data_dir or config.out_dir)
+    state_dir = Path(state_dir or DEFAULT_STATE_DIR)
+    config_path = Path(config_path or DEFAULT_CONFIG_PATH)
+    db_url = db_url or os.environ.get("RESULTS_DB_URL") or f"sqlite:///{state_dir / 'results.db'}"
+    panel_path = state_dir / "panel.npz"
+    indicator_state_path = state_dir / "indicator_state.npz"
+    # 周线 / 月线面板（选股阶段发布给 ExpressionSelector，表达式中的 J_weekly 等直接使用）
+    timeframe_paths = {freq: state_dir / f"panel_{freq}.npz" for freq in TIMEFRAMES}
+    # 选股结果缓存：重跑或当日只有部分股票更新时，只重算数据有变化的股票
+    selection_cache_dir = state_dir / "selection_cache"
+
+    # ---------- 阶段 ---------- #
+    def stage_fetch(ctx: Dict[str, Any]) -> Dict[str, Any]:
+        # Tushare 初始化失败、股票列表缺失时 fetch_latest_kline 直接返回，不能当作抓取完成
+        if fetch and not fetch_latest_kline():
+            raise RuntimeError("行情抓取未执行（Tushare 初始化失败或股票列表缺失），详见日志")
+        # 最新交易日计入输出：与上次不同时下游阶段重跑（见 scheduler.pipeline）
+        return {"fetched": fetch, "trade_date": _latest_trade_date(data_dir)}
+
+    def stage_update_panel(ctx: Dict[str, Any]) -> Dict[str, Any]:
+        # 指标状态与面板成对保存；状态缺失或与面板衔接不上的股票全量重算并重建状态
+        if indicator_state_path.exists():
+            ind_state = IndicatorState.load(indicator_state_path)
+        else:
+            ind_state = IndicatorState([])
+        # 面板按紧凑形式（K线 float32）保存与发布，内存约减半；指标内核按 float64 计算
+        if panel_path.exists():
+            panel = Panel.load(panel_path).compact()
+            n_before = panel.n_rows
+            panel, first_new = panel.refresh_from_csv_dir(data_dir)
+            indicator_rows = refresh_indicators(panel, first_new, ind_state)
+            updated = int((first_new >= 0).sum())
+        else:
+            panel = Panel.from_csv_dir(data_dir, dtype=np.float32)
+            n_before = 0
+            first_new = None
+            indicator_rows = refresh_indicators(panel, state=ind_state)
+            updated = panel.n_codes
+        if panel.n_dates == 0:
+            raise RuntimeError(f"数据目录 {data_dir} 中没有行情数据")
+        if indicator_rows or not panel_path.exists():
+            panel.save(panel_path)
+        if indicator_rows or not indicator_state_path.exists():
+            ind_state.save(indicator_state_path)
+
+        # 高周期面板只重算有新K线股票的最后一个周期起；缓存缺失或面板重建时全量聚合
+        timeframe_bars = {}
+        for freq, path in timeframe_paths.items():
+            if not indicator_rows and path.exists():
+                continue
+            if first_new is not None and path.exists():
+                tf, _ = update_resampled(Panel.load(path), panel, first_new, freq)
+            else:
+                tf = resample_panel(panel, freq)
+            tf = tf.compact()
+            tf.save(path)
+            timeframe_bars[freq] = tf.n_rows
+        return {
+            "trade_date": str(panel.calendar[-1]),
+            "new_rows": panel.n_rows - n_before,
+            "updated_codes": updated,
+            "indicator_rows": indicator_rows,
+            "timeframe_bars": timeframe_bars,
+        }
+
+    def stage_select(ctx: Dict[str, Any]) -> Dict[str, Any]:
+        trade_date = ctx["update_panel"]["trade_date"]
+        selectors = _load_selectors(config_path)
+        codes = list_codes(str(data_dir))
+        reporter = ProgressReporter()
+        # 上一阶段刚落盘的日线与周线 / 月线面板各发布一次，各子进程按名字挂载，
+        # 不再各自读取 CSV，表达式中的 J_weekly 等也不再由日线重新聚合
+        with contextlib.ExitStack() as stack:
+            # 以紧凑形式发布（旧版本留下的 float64 面板文件在此转换）
+            shared = stack.enter_context(SharedPanel(Panel.load(panel_path).compact(), fields=FIELDS))
+            timeframes = {
+                freq: stack.enter_context(SharedPanel(Panel.load(path).compact(), fields=FIELDS)).name
+                for freq, path in timeframe_paths.items()
+            }
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+            futures = [
+                executor.submit(run_selection_chunk, reporter, part, str(data_dir), selectors, trade_date,
+                                shared.name, str(selection_cache_dir), timeframes)
+                for part in chunked(codes, chunk_size)
+            ]
+            picks = merge_selection([f.result() for f in futures])
+        # 各分块并发写入的 part 合并为一个，超出保留窗口的交易日删除
+        cache = SelectionCache(selection_cache_dir)
+        cache.compact()
+        cache.prune()
+        for alias, codes_picked in picks.items():
+            logger.info("[%s] %s 选出 %d 只: %s", trade_date, alias, len(codes_picked), ", ".join(codes_picked) or "无")
+        return {"trade_date": trade_date, "picks": picks}
+
+    def stage_persist(ctx: Dict[str, Any]) -> Dict[str, Any]:
+        trade_date = ctx["select"]["trade_date"]
+        picks = ctx["select"]["picks"]
+
+        out_dir = state_dir / "picks"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out_file = out_dir / f"{trade_date}.json"
+        with out_file.open("w", encoding="utf-8") as f:
+            json.dump(picks, f, ensure_ascii=False, indent=2)
+
+        # execution_id 由 run_id 确定，重跑本阶段时先清掉上次写入的部分结果
+        execution_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{PIPELINE_NAME}:{ctx['run_id']}"))
+        repo = ResultsRepository(db_url)
+        try:
+            repo.backend.execute("DELETE FROM stock_selection_results WHERE execution_id = ?", (execution_id,))
+            repo.backend.execute("DELETE FROM task_executions WHERE execution_id = ?", (execution_id,))
+            repo.start_execution("daily_pipeline", "stock_selection", execution_id=execution_id)
+            rows = 0
+            for alias, codes_picked in picks.items():
+                rows += repo.save_selection_results(
+                    execution_id, codes_picked, selection_time=trade_date, match_reasons=[alias],
+                    extra_data={"selector": alias},
+                )
+            repo.finish_execution(execution_id, result_file_path=str(out_file))
+        finally:
+            repo.close()
+        return {"execution_id": execution_id, "rows": rows, "file": str(out_file)}
+
+    stages = [
+        Stage("fetch", stage_fetch, retries=1, retry_delay=60, always_run=True),
+        Stage("update_panel", stage_update_panel, depends_on=["fetch"]),
+        Stage("select", stage_select, depends_on=["update_panel"]),
+        Stage("persist", stage_persist, depends_on=["select"], retries=2, retry_delay=5),
+    ]
+    return Pipeline(PIPELINE_NAME, stages, state_dir)
+
+
+def run_daily_pipeline(run_id: Optional[str] = None, force: bool = False, **kwargs) -> Dict[str, Any]:
+    """
+    执行当日流水线；run_id 缺省为当天日期，同一天重复调用即续跑
+
+    抓取阶段每次都执行；行情的最新交易日与上次运行不同时，已完成的下游阶段也会重跑。
+    """
+    run_id = run_id or dt.date.today().strftime("%Y%m%d")
+    pipeline = build_daily_pipeline(**kwargs)
+    state = pipeline.run(run_id, force=force)
+    durations = ", ".join(
+        f"{name}={st.get('duration', '-')}s({st.get('status')})" for name, st in state["stages"].items()
+    )
+    logger.info("每日流水线 %s 结束: %s | %s", run_id, state["status"], durations)
+    return state
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    p = argparse.ArgumentParser(description="每日收盘流水线：抓取 → 更新面板 → 选股 → 入库")
+    p.add_argument("--run-id", help="运行 ID，缺省为当天日期；传入失败的 run_id 即只重跑未完成的阶段")
+    p.add_argument("--data-dir", help="CSV 行情目录")
+    p.add_argument("--state-dir", help="面板缓存与运行状态目录")
+    p.add_argument("--config", help="Selector 配置文件")
+    p.add_argument("--db", help="结果库连接串")
+    p.add_argument("--skip-fetch", action="store_true", help="跳过抓取阶段")
+    p.add_argument("--force", action="store_true", help="忽略已完成阶段，全部重跑")
+    args = p.parse_args()
+
+    state = run_daily_pipeline(
+        run_id=args.run_id,
+        force=args.force,
+        data_dir=args.data_dir,
+        state_dir=args.state_dir,
+        config_path=args.config,
+        db_url=args.db,
+        fetch=not args.skip_fetch,
+    )
+    print(json.dumps(
+        {k: {kk: vv for kk, vv in v.items() if kk != "output"} for k, v in state["stages"].items()},
+        ensure_ascii=False, indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    main()
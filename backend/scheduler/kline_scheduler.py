@@ -1,13 +1,42 @@
+import datetime as dt
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 
-from fetcher import fetch_latest_kline
+from .daily_pipeline import run_daily_pipeline
 
 logger = logging.getLogger(__name__)
 
 _scheduler: BackgroundScheduler | None = None
 
+# 流水线失败后的自动续跑次数与间隔
+PIPELINE_MAX_ATTEMPTS = 3
+PIPELINE_RETRY_MINUTES = 10
+
+
+def run_daily_pipeline_job(run_id: str | None = None, attempt: int = 1):
+    """执行每日流水线；失败时安排稍后续跑（只重跑未完成的阶段）"""
+    run_id = run_id or dt.date.today().strftime("%Y%m%d")
+    try:
+        state = run_daily_pipeline(run_id=run_id)
+        failed = state["status"] != "completed"
+    except Exception as e:
+        logger.exception("每日流水线 %s 执行异常: %s", run_id, e)
+        failed = True
+
+    if failed and attempt < PIPELINE_MAX_ATTEMPTS and _scheduler is not None and _scheduler.running:
+        run_at = dt.datetime.now() + dt.timedelta(minutes=PIPELINE_RETRY_MINUTES)
+        _scheduler.add_job(
+            run_daily_pipeline_job,
+            trigger=DateTrigger(run_date=run_at),
+            args=[run_id, attempt + 1],
+            id=f"daily_pipeline_retry_{run_id}",
+            name=f"每日流水线续跑 {run_id}（第 {attempt + 1} 次）",
+            replace_existing=True,
+        )
+        logger.warning("每日流水线 %s 未完成，将于 %s 续跑", run_id, run_at.strftime("%H:%M"))
+
 
 def start_scheduler():
     """启动定时任务调度器"""
@@ -19,18 +48,18 @@ def start_scheduler():
     
     _scheduler = BackgroundScheduler()
     
-    # todo  添加每天20点执行的任务
-    # _scheduler.add_job(
-    #     fetch_latest_kline,
-    #     trigger=CronTrigger(hour=20, minute=0),
-    #     id="fetch_kline_daily",
-    #     name="每日获取最新股票K线",
-    #     replace_existing=True,
-    #     misfire_grace_time=3600,  # 1小时的容错时间
-    # )
+    # 每个交易日20点执行：抓取K线 → 更新面板与指标 → 选股 → 入库
+    _scheduler.add_job(
+        run_daily_pipeline_job,
+        trigger=CronTrigger(day_of_week="mon-fri", hour=20, minute=0),
+        id="daily_pipeline",
+        name="每日收盘流水线",
+        replace_existing=True,
+        misfire_grace_time=3600,  # 1小时的容错时间
+    )
     
     _scheduler.start()
-    logger.info("定时任务调度器已启动，每天20:00执行K线获取任务")
+    logger.info("定时任务调度器已启动，每个交易日20:00执行收盘流水线")
 
 
 def stop_scheduler():
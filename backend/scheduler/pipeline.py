@@ -0,0 +1,171 @@
+"""
+DAG 式流水线
+
+每个阶段声明依赖，按拓扑顺序执行；每次运行的阶段状态、耗时与输出写入
+state_dir/runs/{run_id}.json。用同一个 run_id 重新运行时，已完成的阶段直接跳过、
+复用其输出，只重跑失败或未执行的阶段。
+
+always_run 的阶段（如抓取行情）每次都执行；某阶段本次重新执行且输出与上次不同时（如行情的最新交易日变了），
+依赖它的已完成阶段也会重跑，而不是沿用旧输出。
+"""
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+class Stage:
+    """
+    流水线阶段
+
+    func 接收上下文字典 context（包含 run_id 及所有已完成阶段的输出，键为阶段名），
+    返回值须可 JSON 序列化，作为本阶段输出。always_run 为 True 时续跑也会重新执行。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        depends_on: Iterable[str] = (),
+        retries: int = 0,
+        retry_delay: float = 0.0,
+        always_run: bool = False,
+    ):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.always_run = always_run
+
+
+class Pipeline:
+    """按依赖顺序执行各阶段，并持久化每次运行的状态"""
+
+    def __init__(self, name: str, stages: List[Stage], state_dir: Path):
+        self.name = name
+        self.stages = self._toposort(stages)
+        self.state_dir = Path(state_dir)
+
+    @staticmethod
+    def _toposort(stages: List[Stage]) -> List[Stage]:
+        by_name = {s.name: s for s in stages}
+        ordered: List[Stage] = []
+        visiting, done = set(), set()
+
+        def visit(stage: Stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"阶段依赖存在环: {stage.name}")
+            visiting.add(stage.name)
+            for dep in stage.depends_on:
+                if dep not in by_name:
+                    raise ValueError(f"阶段 {stage.name} 依赖未定义的阶段 {dep}")
+                visit(by_name[dep])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    # ---------- 运行状态 ---------- #
+    def state_path(self, run_id: str) -> Path:
+        return self.state_dir / "runs" / f"{self.name}_{run_id}.json"
+
+    def load_state(self, run_id: str) -> Dict[str, Any]:
+        path = self.state_path(run_id)
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                return json.load(f)
+        return {"pipeline": self.name, "run_id": run_id, "stages": {}}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        path = self.state_path(state["run_id"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+        tmp.replace(path)
+
+    # ---------- 执行 ---------- #
+    def run(self, run_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        执行（或续跑）一次流水线
+
+        参数：
+        - force: 为 True 时忽略已完成的阶段，全部重跑
+
+        返回：
+        - 运行状态字典，state["status"] 为 completed / failed
+        """
+        state = {"pipeline": self.name, "run_id": run_id, "stages": {}} if force else self.load_state(run_id)
+        stages_state = state["stages"]
+        context: Dict[str, Any] = {"run_id": run_id}
+        run_start = time.perf_counter()
+        changed = set()  # 本次执行后输出与上次不同的阶段
+
+        for stage in self.stages:
+            st = stages_state.setdefault(stage.name, {"attempts": 0})
+            # 上游本次输出有变化或本次执行失败时，已完成的下游不能沿用旧输出
+            stale = [d for d in stage.depends_on
+                     if d in changed or stages_state.get(d, {}).get("status") != COMPLETED]
+            if st.get("status") == COMPLETED and not stage.always_run and not stale:
+                logger.info("[%s] 阶段 %s 已完成，跳过", self.name, stage.name)
+                context[stage.name] = st.get("output")
+                continue
+            if stale and st.get("status") == COMPLETED:
+                logger.info("[%s] 上游 %s 已重新执行，阶段 %s 不再沿用上次的输出", self.name, stale, stage.name)
+            rerun, previous = st.get("status") == COMPLETED, st.get("output")
+
+            blocked = [d for d in stage.depends_on if stages_state.get(d, {}).get("status") != COMPLETED]
+            if blocked:
+                st.update(status=BLOCKED, error=f"依赖未完成: {', '.join(blocked)}")
+                logger.warning("[%s] 阶段 %s 未执行：依赖 %s 未完成", self.name, stage.name, blocked)
+                continue
+
+            for attempt in range(stage.retries + 1):
+                st["attempts"] += 1
+                st.update(status="running", started_at=time.strftime("%Y-%m-%d %H:%M:%S"), error=None)
+                self._save_state(state)
+                t0 = time.perf_counter()
+                try:
+                    output = stage.func(context)
+                except Exception as e:
+                    st.update(status=FAILED, duration=round(time.perf_counter() - t0, 3),
+                              error=f"{type(e).__name__}: {e}")
+                    logger.exception("[%s] 阶段 %s 第 %d 次执行失败", self.name, stage.name, attempt + 1)
+                    if attempt < stage.retries:
+                        time.sleep(stage.retry_delay)
+                    continue
+                # 按落盘后的形式比较，与从状态文件读回的上次输出口径一致
+                output = json.loads(json.dumps(output, ensure_ascii=False, default=str))
+                if not rerun or output != previous:
+                    changed.add(stage.name)
+                st.update(status=COMPLETED, duration=round(time.perf_counter() - t0, 3), output=output)
+                context[stage.name] = output
+                logger.info("[%s] 阶段 %s 完成，耗时 %.2f 秒", self.name, stage.name, st["duration"])
+                break
+            self._save_state(state)
+
+        ok = all(stages_state[s.name].get("status") == COMPLETED for s in self.stages)
+        state["status"] = COMPLETED if ok else FAILED
+        state["last_run_duration"] = round(time.perf_counter() - run_start, 3)
+        self._save_state(state)
+        return state
+
+    def failed_stages(self, run_id: str) -> List[str]:
+        state = self.load_state(run_id)
+        return [
+            s.name for s in self.stages
+            if state["stages"].get(s.name, {}).get("status") != COMPLETED
+        ]
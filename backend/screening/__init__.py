@@ -0,0 +1,22 @@
+"""全市场前置过滤、基于代价的过滤流水线、过滤阶段剖析与选股结果缓存"""
+from . import prescreens
+from .cache import SelectionCache, data_version, data_versions, run_cached, selector_key
+from .pipeline import FilterPipeline, Stage, screened_select, select_window
+from .profiler import PROFILER, SelectorProfiler
+from .window import MarketWindow
+
+__all__ = [
+    "FilterPipeline",
+    "MarketWindow",
+    "PROFILER",
+    "SelectionCache",
+    "SelectorProfiler",
+    "Stage",
+    "data_version",
+    "data_versions",
+    "prescreens",
+    "run_cached",
+    "screened_select",
+    "select_window",
+    "selector_key",
+]
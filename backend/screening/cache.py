@@ -0,0 +1,210 @@
+"""
+选股结果缓存
+
+同一配置、同一交易日、行情未变时重复选股（如前端刷新）直接返回上次的结果。
+缓存按股票粒度记录：键为 (Selector 类, 参数哈希, 交易日)，每只股票保存计算时的数据版本与是否入选；
+数据版本是该股票 CSV 的 文件大小 + 全文哈希，行情增量更新或历史K线被修正后只有被改动的股票需要重算
+（选股窗口内任一根K线变化都会失效；原样重写的文件仍然命中）。
+
+    cache = SelectionCache("./.select_cache")
+    versions = data_versions(data_dir, codes)
+    picks = run_cached(cache, selector_cfgs, trade_date, versions, compute)   # compute(codes, cfgs) -> {alias: [...]}
+
+布局（各进程只追加自己的 part，多个执行单元可同时写入同一交易日）：
+
+    root/
+      BBIKDJSelector-3f2a.../
+        2025-06-30/
+          part-<纳秒时间戳>-<pid>.json      {code: [数据版本, 是否入选]}
+
+选股结束后 compact() 合并各交易日的 part，prune() 删除保留窗口（KEEP_DAYS 个交易日）之前的交易日目录，
+参数或源码变化后不再使用的旧键随其交易日过期一并删除。
+
+选股逻辑所在源文件（SELECTION_MODULES：Selector.py 及指标库、前置过滤、表达式引擎、面板等包）的哈希
+也计入键，修改其中任一文件后旧结果自然失效。
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+
+import pandas as pd
+
+from fingerprint import module_digest
+
+logger = logging.getLogger(__name__)
+
+# 选股结果依赖的模块 / 包
+SELECTION_MODULES = ("Selector", "indicators", "screening.prescreens", "screening.pipeline",
+                     "screening.window", "dsl", "panel")
+
+# 缓存保留的最近交易日数
+KEEP_DAYS = 20
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def data_version(path: Union[str, Path]) -> str:
+    """一只股票 CSV 的数据版本：文件大小 + 全文哈希"""
+    h = hashlib.blake2b(digest_size=8)
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+            size += len(chunk)
+    return f"{size:x}-{h.hexdigest()}"
+
+
+def data_versions(data_dir: Union[str, Path], codes: Iterable[str]) -> Dict[str, str]:
+    """{code: 数据版本}；CSV 不存在的股票不在结果中"""
+    data_dir = Path(data_dir)
+    versions: Dict[str, str] = {}
+    for code in codes:
+        try:
+            versions[code] = data_version(data_dir / f"{code}.csv")
+        except FileNotFoundError:
+            continue
+    return versions
+
+
+def selector_key(cfg: Dict[str, Any], modules: Iterable[str] = SELECTION_MODULES) -> str:
+    """缓存键：类名 + 参数与选股相关源文件的哈希（alias、activate 不影响结果，不计入）"""
+    payload = json.dumps(cfg.get("params", {}), sort_keys=True, ensure_ascii=False, default=str)
+    payload += "".join(module_digest(m) for m in modules)
+    return f"{cfg['class']}-{_digest(payload.encode('utf-8'))}"
+
+
+def _day(date) -> str:
+    return pd.Timestamp(date).strftime("%Y-%m-%d")
+
+
+class SelectionCache:
+    """按股票记录的选股结果缓存（见模块说明）"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _dir(self, key: str, trade_date) -> Path:
+        return self.root / key / _day(trade_date)
+
+    def _read(self, key: str, trade_date) -> Dict[str, list]:
+        """合并一个交易日的全部 part，同一股票以后写入的为准"""
+        entries: Dict[str, list] = {}
+        part_dir = self._dir(key, trade_date)
+        for path in sorted(part_dir.glob("part-*.json")) if part_dir.exists() else []:
+            try:
+                with path.open(encoding="utf-8") as f:
+                    entries.update(json.load(f))
+            except (OSError, ValueError):
+                # 并发 compact 删掉的或损坏的 part：少了的股票按未命中重算
+                continue
+        return entries
+
+    def lookup(self, key: str, trade_date, versions: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """返回 (缓存中入选的股票, 需要重算的股票)；数据版本不一致或没有记录的股票需要重算"""
+        entries = self._read(key, trade_date)
+        picks: List[str] = []
+        missing: List[str] = []
+        for code, version in versions.items():
+            entry = entries.get(code)
+            if entry is None or entry[0] != version:
+                missing.append(code)
+            elif entry[1]:
+                picks.append(code)
+        return picks, missing
+
+    def store(self, key: str, trade_date, versions: Dict[str, str], picks: Iterable[str]) -> Path:
+        """记录一组股票（versions 中的全部）的结果：picks 中的为入选（写临时文件后改名）"""
+        picked = set(picks)
+        part_dir = self._dir(key, trade_date)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        name = f"part-{time.time_ns():020d}-{os.getpid()}"
+        path, tmp = part_dir / f"{name}.json", part_dir / f".{name}.tmp"
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({code: [v, int(code in picked)] for code, v in versions.items()}, f)
+        os.replace(tmp, path)
+        return path
+
+    def compact(self) -> int:
+        """把多 part 的交易日合并为一个 part，返回合并的交易日数"""
+        merged = 0
+        for part_dir in sorted(self.root.glob("*/*")) if self.root.exists() else []:
+            parts = sorted(part_dir.glob("part-*.json"))
+            if len(parts) < 2:
+                continue
+            entries: Dict[str, list] = {}
+            for path in parts:
+                with path.open(encoding="utf-8") as f:
+                    entries.update(json.load(f))
+            # 合并结果沿用最后一个 part 的名字：之后写入的 part 仍排在它后面
+            tmp = part_dir / ".compact.tmp"
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            for path in parts[:-1]:
+                path.unlink()
+            os.replace(tmp, parts[-1])
+            merged += 1
+        return merged
+
+    def prune(self, keep_days: int = KEEP_DAYS) -> int:
+        """只保留全部键中最近 keep_days 个交易日的目录，删空的键目录一并删除；返回删除的交易日目录数"""
+        if keep_days < 1:
+            raise ValueError("keep_days 应 ≥ 1")
+        day_dirs = [p for p in self.root.glob("*/*") if p.is_dir()] if self.root.exists() else []
+        keep = set(sorted({p.name for p in day_dirs})[-keep_days:])
+        removed = 0
+        for part_dir in day_dirs:
+            if part_dir.name not in keep:
+                shutil.rmtree(part_dir, ignore_errors=True)
+                removed += 1
+        for key_dir in {p.parent for p in day_dirs}:
+            if not any(key_dir.iterdir()):
+                key_dir.rmdir()
+        return removed
+
+
+def run_cached(
+    cache: SelectionCache,
+    selectors: List[Dict[str, Any]],
+    trade_date,
+    versions: Dict[str, str],
+    compute: Callable[[List[str], List[Dict[str, Any]]], Dict[str, List[str]]],
+) -> Dict[str, List[str]]:
+    """
+    带缓存地运行一组 Selector 配置，返回 {alias: [code, ...]}
+
+    先逐个配置查缓存；有未命中股票的配置一起交给 compute(codes, cfgs) 在未命中股票的并集上重算，
+    重算结果写回缓存。全部命中时不调用 compute（也就不需要加载行情）。
+    """
+    cached: Dict[str, Tuple[str, List[str]]] = {}
+    pending: List[Dict[str, Any]] = []
+    todo = set()
+    for cfg in selectors:
+        alias = cfg.get("alias", cfg["class"])
+        key = selector_key(cfg)
+        picks, missing = cache.lookup(key, trade_date, versions)
+        cached[alias] = (key, picks)
+        if missing:
+            pending.append(cfg)
+            todo.update(missing)
+
+    codes = sorted(todo)
+    fresh = compute(codes, pending) if pending else {}
+    logger.info("选股缓存：%d 个配置全部命中，%d 个配置重算 %d 只股票",
+                len(selectors) - len(pending), len(pending), len(codes))
+
+    results: Dict[str, List[str]] = {}
+    for cfg in selectors:
+        alias = cfg.get("alias", cfg["class"])
+        key, picks = cached[alias]
+        if alias in fresh:
+            cache.store(key, trade_date, {c: versions[c] for c in codes}, fresh[alias])
+            picks = [c for c in picks if c not in todo] + list(fresh[alias])
+        results[alias] = sorted(picks)
+    return results
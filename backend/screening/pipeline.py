@@ -0,0 +1,103 @@
+"""
+基于代价的过滤流水线
+
+Selector 把可以全市场向量化判断的条件声明为 :class:`Stage`（附代价估计），
+:class:`FilterPipeline` 按“代价 / 淘汰率”从小到大依次在当前幸存股票上求值，
+最后只对幸存者调用 Selector 原有的逐股 ``_passes_filters`` 做精确判断。
+淘汰率先取声明的先验值，每次运行后用实测通过率更新，因此顺序会随行情自适应。
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .profiler import PROFILER
+
+from .window import MarketWindow
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[MarketWindow, np.ndarray], np.ndarray]
+
+
+class Stage:
+    """
+    一个前置过滤条件
+
+    - func(window, rows) -> 与 rows 等长的布尔数组（True 保留）
+    - cost: 单只股票的相对计算代价
+    - pass_rate: 通过率的先验估计
+    """
+
+    def __init__(self, name: str, func: StageFunc, cost: float = 1.0, pass_rate: float = 0.5):
+        self.name = name
+        self.func = func
+        self.cost = float(cost)
+        self.pass_rate = float(pass_rate)
+
+    @property
+    def rank(self) -> float:
+        # 独立条件串联时，按 cost / (1 - 通过率) 升序求值期望代价最小
+        return self.cost / max(1.0 - self.pass_rate, 1e-3)
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, cost={self.cost}, pass_rate={self.pass_rate:.2f})"
+
+
+class FilterPipeline:
+    def __init__(self, stages: Sequence[Stage], learning_rate: float = 0.5):
+        self.stages = list(stages)
+        self.learning_rate = learning_rate
+        self.enabled = True
+
+    def ordered(self) -> List[Stage]:
+        return sorted(self.stages, key=lambda s: s.rank)
+
+    def run(self, mw: MarketWindow, selector: Any = None) -> np.ndarray:
+        """返回通过全部前置条件的行号（升序）"""
+        rows = np.arange(len(mw))
+        if not self.enabled:
+            return rows
+        for stage in self.ordered():
+            if len(rows) == 0:
+                break
+            t0 = time.perf_counter()
+            keep = np.asarray(stage.func(mw, rows), dtype=bool)
+            reached = len(rows)
+            rows = rows[keep]
+            observed = len(rows) / reached
+            stage.pass_rate += self.learning_rate * (observed - stage.pass_rate)
+            if PROFILER.enabled and selector is not None:
+                PROFILER.record_prescreen(
+                    selector, stage.name, reached, reached - len(rows), time.perf_counter() - t0
+                )
+        return rows
+
+
+def screened_select(
+    selector: Any,
+    date: pd.Timestamp,
+    data: Dict[str, pd.DataFrame],
+    window: int,
+    min_len: int = 1,
+    pipeline: Optional[FilterPipeline] = None,
+) -> List[str]:
+    """
+    前置过滤 + 逐股精确判断的通用 select 实现
+
+    window/min_len 与原 select 中的 ``tail(window)`` 和长度判断一致；
+    返回的股票顺序与 data 的遍历顺序相同。
+    """
+    mw = MarketWindow.build(data, date, window, min_len=min_len)
+    return select_window(selector, mw, pipeline)
+
+
+def select_window(selector: Any, mw: MarketWindow, pipeline: Optional[FilterPipeline] = None) -> List[str]:
+    """在已构造好的截面窗口上执行前置过滤 + 逐股精确判断（流式选股直接传入窗口）"""
+    if pipeline is None:
+        pipeline = getattr(selector, "prescreen", None)
+    rows = pipeline.run(mw, selector) if pipeline is not None else np.arange(len(mw))
+    logger.debug("%s 前置过滤：%d → %d", type(selector).__name__, len(mw), len(rows))
+    return [mw.codes[r] for r in rows if selector._passes_filters(mw.hist(r))]
@@ -0,0 +1,123 @@
+"""
+向量化前置过滤
+
+每个函数接收 (MarketWindow, rows)，返回与 rows 等长的布尔数组，True 表示保留。
+前置过滤只剔除“确定不满足”的股票：与 Selector 中对应条件口径一致，
+涉及浮点累加（均线、KDJ 递推）的比较留有微小容差，边界情况交给逐股精确判断，
+因此选股结果与逐股实现完全相同。
+"""
+import numpy as np
+
+from indicators import kernels, peaks
+
+from .window import MarketWindow
+
+KDJ_N = 9
+J_TOL = 1e-6
+MA_RTOL = 1e-9
+
+
+def day_constraints(mw: MarketWindow, rows: np.ndarray, pct_limit: float = 0.02,
+                    amp_limit: float = 0.07) -> np.ndarray:
+    """同 passes_day_constraints_today：涨跌幅与振幅约束"""
+    close_today = mw.last("close")[rows]
+    close_yest = mw.last("close", 1)[rows]
+    high_today = mw.last("high")[rows]
+    low_today = mw.last("low")[rows]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct_chg = np.abs(close_today / close_yest - 1.0)
+        amplitude = (high_today - low_today) / low_today
+        return (
+            (mw.lengths[rows] >= 2)
+            & (close_yest > 0) & (low_today > 0)
+            & (pct_chg < pct_limit) & (amplitude < amp_limit)
+        )
+
+
+def price_range(mw: MarketWindow, rows: np.ndarray, window: int, pct: float) -> np.ndarray:
+    """最近 window 根收盘价的 max/min - 1 不超过 pct"""
+    seg = mw.field("close")[rows, -window:]
+    high = np.fmax.reduce(seg, axis=1)
+    low = np.fmin.reduce(seg, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ~((low <= 0) | (high / low - 1 > pct))
+
+
+def price_drop(mw: MarketWindow, rows: np.ndarray, drop_pct: float) -> np.ndarray:
+    """当日相对前一日跌幅 ≥ drop_pct"""
+    close_today = mw.last("close")[rows]
+    close_prev = mw.last("close", 1)[rows]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ~((close_prev <= 0) | ((close_prev - close_today) / close_prev < drop_pct))
+
+
+def bullish_close(mw: MarketWindow, rows: np.ndarray) -> np.ndarray:
+    """当日收阳（NaN 交给逐股判断）"""
+    return ~(mw.last("close")[rows] < mw.last("open")[rows])
+
+
+def pct_change_above(mw: MarketWindow, rows: np.ndarray, threshold: float) -> np.ndarray:
+    """当日涨幅 > threshold（NaN 交给逐股判断）"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = mw.last("close")[rows] / mw.last("close", 1)[rows] - 1.0
+    return ~(pct <= threshold)
+
+
+def close_above_ma(mw: MarketWindow, rows: np.ndarray, n: int = 60) -> np.ndarray:
+    """当日收盘 ≥ n 日均线（min_periods=1 口径）"""
+    seg = mw.field("close")[rows, -n:]
+    valid = ~np.isnan(seg)
+    cnt = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ma = np.where(valid, seg, 0.0).sum(axis=1) / cnt
+        close = seg[:, -1]
+        return ~(close < ma - MA_RTOL * np.abs(ma))
+
+
+def kdj_j(mw: MarketWindow, rows: np.ndarray, j_threshold: float, j_q_threshold: float,
+          q_window: int) -> np.ndarray:
+    """
+    J < j_threshold 或 J ≤ 最近 q_window 根 J 的 j_q_threshold 分位
+
+    KDJ 以窗口首行为起点递推（与 Selector 对截取后的 hist 调用 compute_kdj 一致），
+    因此只对满长度且无缺失值的窗口判断，其余一律保留。
+    """
+    keep = np.ones(len(rows), dtype=bool)
+    close = mw.field("close")[rows]
+    high = mw.field("high")[rows]
+    low = mw.field("low")[rows]
+    ok = mw.full_rows(rows) & ~np.isnan(close).any(axis=1) \
+        & ~np.isnan(high).any(axis=1) & ~np.isnan(low).any(axis=1)
+    if not ok.any() or mw.window < 2:
+        return keep
+    close, high, low = close[ok], high[ok], low[ok]
+
+    # 内核沿 axis=0 计算，转置为“K线 × 股票”
+    J = kernels.kdj(close.T, high.T, low.T, KDJ_N)[2].T
+
+    j_today = J[:, -1]
+    j_q = np.quantile(J[:, -q_window:], j_q_threshold, axis=1)
+    keep[ok] = (j_today < j_threshold + J_TOL) | (j_today <= j_q + J_TOL)
+    return keep
+
+
+def peak_pattern(mw: MarketWindow, rows: np.ndarray, distance: int, prominence: float,
+                 gap_threshold: float, fluc_threshold: float) -> np.ndarray:
+    """
+    同 PeakKDJSelector 的找峰、回溯 peak_(t-n) 与当日波动率条件
+
+    oc_max 面板一次找峰，区间最低收盘价由稀疏表 O(1) 给出；口径与逐股判断逐位一致。
+    """
+    close = mw.field("close")[rows]
+    oc_max = np.fmax(mw.field("open")[rows], close).T
+    found = peaks.find_peaks(oc_max, distance=distance, prominence=prominence)
+    low = peaks.SparseTable(close.T, np.fmin)
+    keep = np.zeros(len(rows), dtype=bool)
+    for i, idx in enumerate(found):
+        target = peaks.prior_peak(oc_max[:, i], idx, low, gap_threshold, col=i)
+        if target < 0:
+            continue
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fluc = abs(close[i, -1] - close[i, target]) / close[i, target]
+        keep[i] = not fluc > fluc_threshold
+    return keep
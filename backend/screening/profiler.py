@@ -0,0 +1,222 @@
+"""
+Selector 过滤阶段剖析
+
+默认关闭，关闭时 :meth:`SelectorProfiler.track` 返回共享的空跟踪器，
+Selector 内的埋点只是几次空方法调用。开启后按 (配置别名, Selector 类) 汇总
+每个过滤阶段的到达次数、淘汰次数与耗时，用于把“便宜且淘汰率高”的条件往前排。
+
+埋点方式（每个阶段的耗时为距上一个埋点的时间，即该段计算 + 判断）::
+
+    prof = PROFILER.track(self)
+    ...
+    if not passes_day_constraints_today(hist):
+        return prof.reject("day_constraints")
+    prof.lap("day_constraints")
+    ...
+    return prof.accept()
+"""
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+class _StageStats:
+    __slots__ = ("reached", "rejected", "seconds")
+
+    def __init__(self) -> None:
+        self.reached = 0
+        self.rejected = 0
+        self.seconds = 0.0
+
+
+class _SelectorStats:
+    __slots__ = ("calls", "accepted", "seconds", "select_calls", "select_seconds", "stages", "prescreen")
+
+    def __init__(self) -> None:
+        self.calls = 0  # 单股过滤次数
+        self.accepted = 0
+        self.seconds = 0.0  # 各阶段耗时之和
+        self.select_calls = 0
+        self.select_seconds = 0.0  # select() 整体耗时（含切片等开销）
+        self.stages: Dict[str, _StageStats] = {}
+        self.prescreen: Dict[str, _StageStats] = {}  # 全市场向量化前置过滤
+
+
+class _NullTracker:
+    __slots__ = ()
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def reject(self, stage: str) -> bool:
+        return False
+
+    def accept(self) -> bool:
+        return True
+
+
+_NULL_TRACKER = _NullTracker()
+
+
+class _Tracker:
+    __slots__ = ("_stats", "_t")
+
+    def __init__(self, stats: _SelectorStats) -> None:
+        stats.calls += 1
+        self._stats = stats
+        self._t = time.perf_counter()
+
+    def _record(self, stage: str, rejected: int) -> None:
+        now = time.perf_counter()
+        st = self._stats.stages.get(stage)
+        if st is None:
+            st = self._stats.stages[stage] = _StageStats()
+        elapsed = now - self._t
+        st.reached += 1
+        st.rejected += rejected
+        st.seconds += elapsed
+        self._stats.seconds += elapsed
+        self._t = now
+
+    def lap(self, stage: str) -> None:
+        """阶段通过"""
+        self._record(stage, 0)
+
+    def reject(self, stage: str) -> bool:
+        """阶段淘汰，返回 False 以便直接 ``return prof.reject(...)``"""
+        self._record(stage, 1)
+        return False
+
+    def accept(self) -> bool:
+        self._stats.accepted += 1
+        return True
+
+
+class SelectorProfiler:
+    """按 Selector 汇总过滤阶段的计数与耗时（进程内，非线程安全）"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._label: Optional[str] = None
+        self._stats: Dict[Tuple[str, str], _SelectorStats] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+    def _get(self, label: str, cls_name: str) -> _SelectorStats:
+        key = (label, cls_name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _SelectorStats()
+        return stats
+
+    @contextmanager
+    def selector(self, label: str, cls_name: str) -> Iterator[None]:
+        """标记当前运行的 Selector 配置，并统计 select() 整体耗时"""
+        if not self.enabled:
+            yield
+            return
+        prev, self._label = self._label, label
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self._get(label, cls_name)
+            stats.select_calls += 1
+            stats.select_seconds += time.perf_counter() - t0
+            self._label = prev
+
+    def track(self, selector: Any) -> Union[_Tracker, _NullTracker]:
+        """开始一次单股过滤的跟踪；嵌套的 Selector 以自身类名单独汇总"""
+        if not self.enabled:
+            return _NULL_TRACKER
+        cls_name = type(selector).__name__
+        return _Tracker(self._get(self._label or cls_name, cls_name))
+
+    def record_prescreen(self, selector: Any, stage: str, reached: int, rejected: int,
+                         seconds: float) -> None:
+        """记录一次全市场前置过滤（reached 只股票中淘汰 rejected 只）"""
+        if not self.enabled:
+            return
+        cls_name = type(selector).__name__
+        stats = self._get(self._label or cls_name, cls_name)
+        st = stats.prescreen.get(stage)
+        if st is None:
+            st = stats.prescreen[stage] = _StageStats()
+        st.reached += reached
+        st.rejected += rejected
+        st.seconds += seconds
+
+    # ---------- 汇总 ---------- #
+    @staticmethod
+    def _stage_rows(stages: Dict[str, _StageStats], total: float) -> List[Dict[str, Any]]:
+        rows = []
+        for name, st in stages.items():
+            rows.append({
+                "stage": name,
+                "reached": st.reached,
+                "passed": st.reached - st.rejected,
+                "rejected": st.rejected,
+                "reject_rate": st.rejected / st.reached if st.reached else 0.0,
+                "seconds": st.seconds,
+                "us_per_call": st.seconds / st.reached * 1e6 if st.reached else 0.0,
+                "time_share": st.seconds / total if total else 0.0,
+            })
+        return rows
+
+    def summary(self) -> List[Dict[str, Any]]:
+        out = []
+        for (label, cls_name), s in self._stats.items():
+            out.append({
+                "selector": label,
+                "class": cls_name,
+                "calls": s.calls,
+                "accepted": s.accepted,
+                "filter_seconds": s.seconds,
+                "select_calls": s.select_calls,
+                "select_seconds": s.select_seconds,
+                "prescreen": self._stage_rows(s.prescreen, s.select_seconds),
+                "stages": self._stage_rows(s.stages, s.seconds),
+            })
+        return out
+
+    def format_summary(self) -> str:
+        lines = []
+        for s in self.summary():
+            title = s["selector"] if s["selector"] == s["class"] else f"{s['selector']} / {s['class']}"
+            lines.append(
+                f"[{title}] 过滤 {s['calls']} 次，入选 {s['accepted']}，"
+                f"过滤耗时 {s['filter_seconds']:.3f}s，select 耗时 {s['select_seconds']:.3f}s"
+            )
+            if not s["stages"] and not s["prescreen"]:
+                continue  # 未埋点的 Selector 只有 select 整体耗时
+            lines.append(
+                f"  {'stage':<24}{'reached':>9}{'rejected':>10}{'rej%':>8}"
+                f"{'us/call':>11}{'time%':>8}"
+            )
+            # 前置过滤的 time% 相对 select 整体耗时，逐股阶段相对过滤耗时
+            for prefix, key in (("pre:", "prescreen"), ("", "stages")):
+                for st in s[key]:
+                    lines.append(
+                        f"  {prefix + st['stage']:<24}{st['reached']:>9}{st['rejected']:>10}"
+                        f"{st['reject_rate'] * 100:>7.1f}%{st['us_per_call']:>11.1f}"
+                        f"{st['time_share'] * 100:>7.1f}%"
+                    )
+        return "\n".join(lines)
+
+    def dump_json(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+PROFILER = SelectorProfiler()
@@ -0,0 +1,101 @@
+"""
+全市场截面窗口
+
+把 {code: DataFrame} 在某个交易日的“最近 window 根K线”右对齐成 (股票 × window)
+的二维数组，供前置过滤向量化计算；历史不足 window 的股票左侧以 NaN 补齐。
+每只股票的窗口与 ``df[df["date"] <= date].tail(window)`` 完全相同（保留原索引），
+通过 :meth:`MarketWindow.hist` 取回交给 Selector 的逐股精确判断。
+"""
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+class MarketWindow:
+    def __init__(
+        self,
+        codes: List[str],
+        frames: List[pd.DataFrame],
+        windows: List[Union[slice, pd.DataFrame]],
+        lengths: np.ndarray,
+        window: int,
+    ):
+        self.codes = codes
+        self.window = window
+        self.lengths = lengths
+        self._frames = frames
+        self._windows = windows
+        self._fields: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def build(
+        cls,
+        data: Dict[str, pd.DataFrame],
+        date,
+        window: int,
+        min_len: int = 1,
+    ) -> "MarketWindow":
+        """
+        截取每只股票 <= date 的最近 window 根K线
+
+        min_len：窗口内K线少于该数的股票直接剔除（对应各 select 中的长度判断）
+        """
+        ts = np.datetime64(pd.Timestamp(date), "ns")
+        codes: List[str] = []
+        frames: List[pd.DataFrame] = []
+        windows: List[Union[slice, pd.DataFrame]] = []
+        lengths: List[int] = []
+        for code, df in data.items():
+            if df is None or df.empty:
+                continue
+            dates = df["date"].to_numpy()
+            if dates.dtype.kind == "M" and df["date"].is_monotonic_increasing:
+                stop = int(np.searchsorted(dates, ts, side="right"))
+                start = max(stop - window, 0)
+                win: Union[slice, pd.DataFrame] = slice(start, stop)
+                n = stop - start
+            else:
+                # 非有序或非日期类型：退回与原实现相同的布尔筛选
+                win = df[df["date"] <= date].tail(window)
+                n = len(win)
+            if n < min_len:
+                continue
+            codes.append(code)
+            frames.append(df)
+            windows.append(win)
+            lengths.append(n)
+        return cls(codes, frames, windows, np.asarray(lengths, dtype=np.int64), window)
+
+    def hist(self, row: int) -> pd.DataFrame:
+        win = self._windows[row]
+        if isinstance(win, slice):
+            return self._frames[row].iloc[win]
+        return win
+
+    def field(self, name: str) -> np.ndarray:
+        """(股票 × window) 的右对齐数组，按需构造并缓存"""
+        arr = self._fields.get(name)
+        if arr is None:
+            arr = np.full((len(self.codes), self.window), np.nan, dtype=np.float64)
+            for r, (df, win) in enumerate(zip(self._frames, self._windows)):
+                if isinstance(win, slice):
+                    values = df[name].to_numpy(dtype=np.float64)[win]
+                else:
+                    values = win[name].to_numpy(dtype=np.float64)
+                if len(values):
+                    arr[r, self.window - len(values):] = values
+            self._fields[name] = arr
+        return arr
+
+    def last(self, name: str, back: int = 0) -> np.ndarray:
+        """每只股票倒数第 back+1 根K线的字段值（不足时为 NaN）"""
+        return self.field(name)[:, self.window - 1 - back]
+
+    def full_rows(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """窗口满长度的行（用于依赖起点的递推指标，如 KDJ）"""
+        lengths = self.lengths if rows is None else self.lengths[rows]
+        return lengths == self.window
@@ -0,0 +1,6 @@
+"""流式选股：逐K线推进的选股引擎与历史回放"""
+from .buffer import BarBuffer
+from .engine import CROSSES, StreamingEngine, stream_window
+from .replay import replay, replay_bars, replay_csv
+
+__all__ = ["BarBuffer", "CROSSES", "StreamingEngine", "replay", "replay_bars", "replay_csv", "stream_window"]
@@ -0,0 +1,119 @@
+"""
+逐股K线环形缓冲
+
+每只股票只保留最近 capacity 根K线，全部股票存放在 (股票 × capacity × 字段) 的数组里，
+追加一批新K线是一次向量化写入，与已有历史的长短无关。
+
+    buf = BarBuffer(capacity=200)
+    buf.push(buf.rows(codes), dates, values)   # 每只股票一根；与最后一根同日期时视为盘中修订、覆盖
+    buf.field("close", rows, window=60)        # 右对齐的 (len(rows) × 60) 数组，不足处为 NaN
+    buf.frame(row)                             # 还原为 DataFrame（列与 CSV 一致）
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from panel import FIELDS
+
+
+class BarBuffer:
+    def __init__(self, capacity: int, fields: Sequence[str] = FIELDS, codes: Iterable[str] = ()):
+        if capacity < 1:
+            raise ValueError("capacity 必须为正整数")
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        self._field_pos = {f: j for j, f in enumerate(self.fields)}
+        self.codes: List[str] = []
+        self._code_pos: Dict[str, int] = {}
+        self.values = np.full((0, self.capacity, len(self.fields)), np.nan)
+        self.dates = np.full((0, self.capacity), np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.count = np.zeros(0, dtype=np.int64)
+        self.rows(codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._code_pos
+
+    def index(self, code: str) -> int:
+        """代码所在行，未登记为 -1"""
+        return self._code_pos.get(code, -1)
+
+    # ---------- 股票 ---------- #
+    def rows(self, codes: Iterable[str]) -> np.ndarray:
+        """代码对应的行号；新代码追加到末尾（容量按倍数扩展）"""
+        out = []
+        for code in codes:
+            pos = self._code_pos.get(code)
+            if pos is None:
+                pos = self._code_pos[code] = len(self.codes)
+                self.codes.append(code)
+            out.append(pos)
+        n = len(self.codes)
+        if n > len(self.count):
+            grow = max(n, 2 * len(self.count)) - len(self.count)
+            self.values = np.concatenate(
+                [self.values, np.full((grow, self.capacity, len(self.fields)), np.nan)])
+            self.dates = np.concatenate(
+                [self.dates, np.full((grow, self.capacity), np.datetime64("NaT"), dtype="datetime64[ns]")])
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+        return np.asarray(out, dtype=np.int64)
+
+    # ---------- 写入 ---------- #
+    def last_date(self, rows: np.ndarray) -> np.ndarray:
+        """各行最后一根K线的日期（空行为 NaT）"""
+        count = self.count[rows]
+        out = self.dates[rows, (count - 1) % self.capacity]
+        out[count == 0] = np.datetime64("NaT")
+        return out
+
+    def push(self, rows: np.ndarray, dates: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        rows 各追加一根K线（values 为 len(rows) × 字段），返回“覆盖最后一根”的布尔掩码
+
+        日期等于最后一根的视为盘中修订，原位覆盖；早于最后一根的报错。rows 不可重复。
+        """
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        last = self.last_date(rows)
+        if (dates < last).any():
+            bad = [self.codes[r] for r in rows[dates < last]]
+            raise ValueError(f"K线日期早于已有数据：{', '.join(bad[:5])}")
+        revise = dates == last
+        count = self.count[rows]
+        slot = np.where(revise, count - 1, count) % self.capacity
+        self.values[rows, slot] = values
+        self.dates[rows, slot] = dates
+        self.count[rows] = np.where(revise, count, count + 1)
+        return revise
+
+    # ---------- 读取 ---------- #
+    def lengths(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        count = self.count[: len(self.codes)] if rows is None else self.count[rows]
+        return np.minimum(count, self.capacity)
+
+    def _slots(self, rows: np.ndarray, window: int) -> np.ndarray:
+        """(len(rows) × window) 的槽位下标，右对齐到各行最后一根"""
+        back = np.arange(window - 1, -1, -1)
+        return (self.count[rows][:, None] - 1 - back) % self.capacity
+
+    def field(self, name: str, rows: np.ndarray, window: int) -> np.ndarray:
+        """最近 window 根K线的字段值，右对齐；不足 window 根的左侧为 NaN"""
+        if window > self.capacity:
+            raise ValueError(f"window={window} 超过缓冲容量 {self.capacity}")
+        out = self.values[rows[:, None], self._slots(rows, window), self._field_pos[name]]
+        missing = np.arange(window) < (window - self.lengths(rows))[:, None]
+        out[missing] = np.nan
+        return out
+
+    def frame(self, row: int, window: Optional[int] = None) -> pd.DataFrame:
+        """单只股票最近 window 根（缺省为全部缓冲）K线的 DataFrame"""
+        n = int(self.lengths(np.array([row]))[0])
+        if window is not None:
+            n = min(n, window)
+        slots = (self.count[row] - n + np.arange(n)) % self.capacity
+        data = {"date": self.dates[row, slots]}
+        for f, j in self._field_pos.items():
+            data[f] = self.values[row, slots, j]
+        return pd.DataFrame(data)
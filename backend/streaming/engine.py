@@ -0,0 +1,202 @@
+"""
+流式选股引擎
+
+行情每到一根新K线（收盘后来自 fetcher，或盘中来自本地行情源）就推进一次，K线写入逐股环形缓冲。
+评估时各 Selector 的前置过滤直接在缓冲的最近 window 根K线上向量化执行，只为幸存股票还原
+DataFrame 交给 ``_passes_filters``，代价与股票数 × window 成正比，与历史长度无关。
+结果与在全部历史上调用 ``select`` 相同。
+
+另外逐根递推各股票的最新指标（KDJ、BBI、MA60 等）与交叉标记，供 ``snapshot()`` 盘中监控。
+它们以全部历史为起点递推，而 Selector 在截取的窗口上计算（如 KDJ 以窗口首行为起点、
+MA60 在窗口开头按 min_periods=1 取均值），口径不同，因此不参与 evaluate 的选股判断。
+
+    engine = StreamingEngine({"少妇战法": BBIKDJSelector(**params)})
+    engine.on_bars(bars)                  # 长表：code, date, open, close, high, low, volume
+    engine.evaluate()                     # {"少妇战法": [...]}
+    engine.on_bars(intraday_bars)         # 同一交易日再次推送视为盘中修订，覆盖当日K线
+    engine.snapshot()                     # 各股票最新指标与交叉标记
+
+Selector 通过 ``history_window()`` 声明所需窗口；没有声明的（依赖全部历史的 select）
+须在 windows 中指定，结果等同于在最近 window 根K线上调用 select。
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from panel import INDICATOR_FIELDS, IndicatorState
+from screening import MarketWindow, select_window
+
+from .buffer import BarBuffer
+
+logger = logging.getLogger(__name__)
+
+# 交叉标记：名称 -> (快线, 慢线)，记录距最近一次上穿的K线数（没有为 -1）
+CROSSES = {
+    "close_ma60": ("close", "MA60"),
+    "zxdq_zxdkx": ("ZXDQ", "ZXDKX"),
+}
+
+
+def stream_window(selector: Any, window: Optional[int] = None) -> Tuple[int, int]:
+    """Selector 在流式模式下需要的 (窗口长度, 最少K线数)"""
+    if hasattr(selector, "history_window"):
+        need, min_len = selector.history_window()
+        return int(need), int(min_len)
+    if window is None:
+        window = getattr(selector, "window", None)
+    if not window:
+        raise ValueError(f"{type(selector).__name__} 的 select 依赖全部历史，流式模式须指定 window")
+    return int(window), 1
+
+
+class _BufferWindow(MarketWindow):
+    """直接读取环形缓冲的截面窗口：字段按需向量化取出，hist 只为幸存股票还原"""
+
+    def __init__(self, buffer: BarBuffer, rows: np.ndarray, window: int):
+        super().__init__([buffer.codes[r] for r in rows], [], [],
+                         np.minimum(buffer.lengths(rows), window), window)
+        self._buffer = buffer
+        self._rows = rows
+
+    def field(self, name: str) -> np.ndarray:
+        arr = self._fields.get(name)
+        if arr is None:
+            arr = self._fields[name] = self._buffer.field(name, self._rows, self.window)
+        return arr
+
+    def hist(self, row: int) -> pd.DataFrame:
+        return self._buffer.frame(int(self._rows[row]), self.window)
+
+
+class StreamingEngine:
+    def __init__(
+        self,
+        selectors: Mapping[str, Any],
+        windows: Optional[Mapping[str, int]] = None,
+        codes: Iterable[str] = (),
+    ):
+        windows = windows or {}
+        self.selectors = dict(selectors)
+        self._windows = {alias: stream_window(sel, windows.get(alias)) for alias, sel in self.selectors.items()}
+        capacity = max((w for w, _ in self._windows.values()), default=1)
+        self.buffer = BarBuffer(capacity)
+        self.date: Optional[pd.Timestamp] = None
+
+        # 递推状态，以及各股票最后一根K线之前的副本（盘中修订时回退到这里重新推进）；
+        # 指标与交叉标记只用于 snapshot()，选股在缓冲窗口上判断
+        self.state = IndicatorState([])
+        self._saved = IndicatorState([])
+        self.indicators: Dict[str, np.ndarray] = {}
+        self._prev: Dict[str, np.ndarray] = {}
+        self.since_cross: Dict[str, np.ndarray] = {}
+        self._since_saved: Dict[str, np.ndarray] = {}
+        self.register(codes)
+
+    # ---------- 股票 ---------- #
+    def register(self, codes: Iterable[str]) -> np.ndarray:
+        """登记股票（决定 evaluate 结果中的顺序），返回缓冲中的行号"""
+        rows = self.buffer.rows(codes)
+        n = len(self.buffer)
+        if n > len(self.state):
+            self.state.align(self.buffer.codes)
+            self._saved.align(self.buffer.codes)
+            for store, fill, names in (
+                (self.indicators, np.nan, ("close",) + tuple(INDICATOR_FIELDS)),
+                (self._prev, np.nan, ("close",) + tuple(INDICATOR_FIELDS)),
+                (self.since_cross, -1, tuple(CROSSES)),
+                (self._since_saved, -1, tuple(CROSSES)),
+            ):
+                for name in names:
+                    old = store.get(name, np.full(0, fill, dtype=type(fill)))
+                    store[name] = np.concatenate([old, np.full(n - len(old), fill, dtype=old.dtype)])
+        return rows
+
+    # ---------- 推进 ---------- #
+    def push(self, codes: Iterable[str], date, values: np.ndarray) -> None:
+        """
+        codes 各推进一根 date 日的K线（values 为 len(codes) × buffer.fields）
+
+        已有 date 日K线的股票视为盘中修订：缓冲覆盖当日K线，指标从前一日状态重新推进。
+        """
+        codes = list(codes)
+        if len(set(codes)) != len(codes):
+            raise ValueError("同一批K线中股票代码重复")
+        date = pd.Timestamp(date).normalize()
+        if self.date is not None and date < self.date:
+            raise ValueError(f"K线日期 {date.date()} 早于引擎当前日期 {self.date.date()}")
+        rows = self.register(codes)
+        values = np.asarray(values, dtype=np.float64).reshape(len(rows), len(self.buffer.fields))
+        revise = self.buffer.push(rows, np.full(len(rows), np.datetime64(date, "ns")), values)
+        self.date = date
+
+        new, old = rows[~revise], rows[revise]
+        self._saved.put(new, self.state.take(new))
+        self.state.put(old, self._saved.take(old))
+        for name in self.indicators:
+            self._prev[name][new] = self.indicators[name][new]
+        for name in self.since_cross:
+            self._since_saved[name][new] = self.since_cross[name][new]
+
+        col = {f: values[:, j] for j, f in enumerate(self.buffer.fields)}
+        out = self.state.update(rows, col["close"], col["high"], col["low"],
+                                np.full(len(rows), np.datetime64(date, "D")))
+        out["close"] = col["close"]
+        for name, arr in out.items():
+            self.indicators[name][rows] = arr
+        for name, (fast, slow) in CROSSES.items():
+            up = (self._prev[fast][rows] < self._prev[slow][rows]) & (out[fast] >= out[slow])
+            since = self._since_saved[name][rows]
+            self.since_cross[name][rows] = np.where(up, 0, np.where(since >= 0, since + 1, -1))
+
+    def on_bars(self, bars: pd.DataFrame) -> None:
+        """
+        推进一批K线（长表，列 code / date / buffer.fields），可跨多个交易日
+
+        date 按交易日取整：盘中快照（带时刻）覆盖当日K线；同一股票同一交易日多行时取最后一行。
+        """
+        if bars.empty:
+            return
+        bars = bars.assign(
+            code=bars["code"].astype(str).str.zfill(6),
+            date=pd.to_datetime(bars["date"]).dt.normalize(),
+        ).drop_duplicates(["code", "date"], keep="last")
+        fields = list(self.buffer.fields)
+        for date, group in bars.groupby("date", sort=True):
+            self.push(group["code"].tolist(), date, group[fields].to_numpy(dtype=np.float64))
+
+    # ---------- 评估 ---------- #
+    def evaluate(self, codes: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        以当前日期评估全部（或指定）股票，返回 {alias: 入选代码}
+
+        与 ``selector.select(date, data)`` 一致：当日停牌的股票按其最后一根K线参与评估。
+        判断只读取环形缓冲中的K线，不使用递推的指标状态（口径见模块说明）。
+        """
+        if codes is None:
+            rows = np.arange(len(self.buffer))
+        else:
+            rows = np.array([self.buffer.index(c) for c in codes], dtype=np.int64)
+            rows = rows[rows >= 0]
+        rows = rows[self.buffer.lengths(rows) > 0]
+        picks: Dict[str, List[str]] = {}
+        for alias, selector in self.selectors.items():
+            window, min_len = self._windows[alias]
+            if hasattr(selector, "history_window"):
+                keep = rows[np.minimum(self.buffer.lengths(rows), window) >= min_len]
+                picks[alias] = select_window(selector, _BufferWindow(self.buffer, keep, window))
+            else:
+                data = {self.buffer.codes[r]: self.buffer.frame(r, window) for r in rows}
+                picks[alias] = selector.select(self.date, data)
+        return picks
+
+    def snapshot(self) -> pd.DataFrame:
+        """各股票最新一根K线的日期、指标与交叉标记（距最近一次上穿的K线数，没有为 -1）"""
+        rows = np.arange(len(self.buffer))
+        df = pd.DataFrame({"date": self.buffer.last_date(rows)}, index=pd.Index(self.buffer.codes, name="code"))
+        for name, arr in self.indicators.items():
+            df[name] = arr
+        for name, arr in self.since_cross.items():
+            df[f"since_{name}_up"] = arr
+        return df
@@ -0,0 +1,73 @@
+"""
+历史回放
+
+把行情按时间顺序逐根喂给 StreamingEngine，在 [start, end] 内每推进一次评估一次：
+
+    for date, picks in replay_csv("./data", {"少妇战法": selector}, start="2024-01-01"):
+        ...
+
+- replay：按交易日回放面板（replay_csv 先由 CSV 目录构造面板）
+- replay_bars：回放长表K线文件（code, date, open, close, high, low, volume）；
+  同一交易日的多个时刻视为盘中快照，每个时刻评估一次
+start 之前的K线只用于预热缓冲与指标，不评估。
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from panel import Panel
+
+from .engine import StreamingEngine
+
+Picks = Dict[str, List[str]]
+
+
+def _in_range(ts: pd.Timestamp, start, end) -> bool:
+    return (start is None or ts >= pd.Timestamp(start)) and (end is None or ts <= pd.Timestamp(end))
+
+
+def replay(engine: StreamingEngine, panel: Panel, start=None, end=None) -> Iterator[Tuple[pd.Timestamp, Picks]]:
+    """逐交易日把面板的K线推给引擎；结果中的股票顺序与 panel.codes 一致"""
+    engine.register(panel.codes.tolist())
+    codes = np.asarray(panel.codes)
+    order = np.argsort(panel.date_idx, kind="stable")
+    bounds = np.searchsorted(panel.date_idx[order], np.arange(panel.n_dates + 1))
+    values = np.column_stack([np.asarray(panel.fields[f], dtype=np.float64) for f in engine.buffer.fields])
+    row_code = panel.row_code
+    for d in range(panel.n_dates):
+        rows = order[bounds[d]:bounds[d + 1]]
+        date = pd.Timestamp(panel.calendar[d])
+        engine.push(codes[row_code[rows]], date, values[rows])
+        if _in_range(date, start, end):
+            yield date, engine.evaluate()
+
+
+def replay_csv(
+    data_dir: Union[str, Path],
+    selectors: Mapping[str, Any],
+    start=None,
+    end=None,
+    codes: Optional[Iterable[str]] = None,
+    windows: Optional[Mapping[str, int]] = None,
+) -> Iterator[Tuple[pd.Timestamp, Picks]]:
+    """在 CSV 行情目录上回放 selectors（{alias: Selector}）"""
+    panel = Panel.from_csv_dir(data_dir, codes)
+    return replay(StreamingEngine(selectors, windows), panel, start, end)
+
+
+def replay_bars(
+    engine: StreamingEngine,
+    bars: Union[str, Path, pd.DataFrame],
+    start=None,
+    end=None,
+) -> Iterator[Tuple[pd.Timestamp, Picks]]:
+    """按时刻回放长表K线（文件或 DataFrame），每个时刻推进后评估一次"""
+    if not isinstance(bars, pd.DataFrame):
+        bars = pd.read_csv(bars, dtype={"code": str}, parse_dates=["date"])
+    bars = bars.assign(date=pd.to_datetime(bars["date"])).sort_values("date", kind="stable")
+    for ts, group in bars.groupby("date", sort=True):
+        engine.on_bars(group)
+        if _in_range(ts.normalize(), start, end):
+            yield ts, engine.evaluate()
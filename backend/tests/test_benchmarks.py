@@ -0,0 +1,43 @@
+"""测试合成行情与基准框架"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks import generate_market
+from benchmarks.run import compare, run_benchmarks
+
+
+def test_generate_market_is_deterministic_with_gaps():
+    a = generate_market(n_stocks=20, n_days=300, seed=7, suspension_rate=0.01)
+    b = generate_market(n_stocks=25, n_days=300, seed=7, suspension_rate=0.01)
+    for code in a:
+        pd.testing.assert_frame_equal(a[code], b[code])
+
+    lengths = [len(df) for df in a.values()]
+    assert max(lengths) <= 300 and min(lengths) < 300  # 存在停牌/晚上市
+    df = next(iter(a.values()))
+    assert list(df.columns) == ["date", "open", "close", "high", "low", "volume"]
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert (df["close"].pct_change().abs().dropna() < 0.2).all()
+    # 节假日：日历不是连续的工作日
+    cal = pd.bdate_range(df["date"].iloc[0], df["date"].iloc[-1])
+    assert len(cal) > 300
+
+
+def test_run_benchmarks_report(tmp_path):
+    report = run_benchmarks(n_stocks=5, n_days=200, repeat=1, groups=("indicators", "loaders"))
+    assert set(report["results"]) == {"indicators", "loaders"}
+    assert {"compute_kdj", "compute_bbi", "bbi_deriv_uptrend", "scipy.find_peaks", "peaks.find_peaks"} <= set(report["results"]["indicators"])
+    assert report["results"]["loaders"]["load_data"]["stocks"] == 5
+    loaders = report["results"]["loaders"]
+    assert loaders["load_data_compact"]["memory_mb"] < loaders["load_data"]["memory_mb"]
+    assert report["meta"]["params"]["stocks"] == 5
+
+    rows = compare(report, report)
+    assert rows and all(abs(r["ratio"] - 1) < 1e-12 for r in rows)
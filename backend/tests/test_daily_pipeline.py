@@ -0,0 +1,139 @@
+"""测试每日流水线"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import Selector
+from panel import Panel, resample_panel
+from repository import ResultsRepository
+from scheduler import daily_pipeline
+from scheduler import pipeline as pipeline_module
+from scheduler.daily_pipeline import run_daily_pipeline
+from scheduler.pipeline import Pipeline, Stage
+
+
+def test_pipeline_resumes_failed_stages(tmp_path):
+    calls = {"a": 0, "b": 0, "c": 0}
+    fail = {"b": True}
+
+    def make(name):
+        def func(ctx):
+            calls[name] += 1
+            if fail.get(name):
+                raise RuntimeError("boom")
+            return {"from": name, "upstream": sorted(k for k in ctx if k != "run_id")}
+        return func
+
+    stages = [
+        Stage("c", make("c"), depends_on=["b"]),
+        Stage("a", make("a")),
+        Stage("b", make("b"), depends_on=["a"], retries=1),
+    ]
+    pipeline = Pipeline("test", stages, tmp_path)
+
+    state = pipeline.run("r1")
+    assert state["status"] == "failed"
+    assert calls == {"a": 1, "b": 2, "c": 0}
+    assert state["stages"]["c"]["status"] == "blocked"
+    assert pipeline.failed_stages("r1") == ["b", "c"]
+
+    fail["b"] = False
+    state = pipeline.run("r1")
+    assert state["status"] == "completed"
+    assert calls == {"a": 1, "b": 3, "c": 1}
+    assert state["stages"]["c"]["output"]["upstream"] == ["a", "b"]
+    assert all("duration" in st for st in state["stages"].values())
+
+
+def _write_csv(path: Path, n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    pd.DataFrame({
+        "date": pd.bdate_range("2023-01-02", periods=n).strftime("%Y-%m-%d"),
+        "open": close, "close": close, "high": close * 1.01, "low": close * 0.99,
+        "volume": rng.uniform(1e5, 1e6, n),
+    }).to_csv(path, index=False)
+
+
+EXPR = "J_weekly < 50 & J < 90"
+
+
+def test_daily_pipeline_incremental(tmp_path, monkeypatch):
+    data_dir, state_dir = tmp_path / "data", tmp_path / "state"
+    data_dir.mkdir()
+    codes = ["000001", "000002", "600000"]
+    for i, code in enumerate(codes):
+        _write_csv(data_dir / f"{code}.csv", 200, i)
+    cfg = tmp_path / "configs.json"
+    params = {"j_threshold": 100, "bbi_min_window": 5, "max_window": 60,
+              "price_range_pct": 100, "bbi_q_threshold": 1, "j_q_threshold": 1}
+    cfg.write_text(json.dumps({"selectors": [
+        {"class": "BBIKDJSelector", "alias": "少妇战法", "activate": True, "params": params},
+        {"class": "ExpressionSelector", "alias": "周线", "activate": True, "params": {"expr": EXPR}},
+        {"class": "BBIKDJSelector", "alias": "停用", "activate": False, "params": {}},
+    ]}), encoding="utf-8")
+    kwargs = dict(data_dir=data_dir, state_dir=state_dir, config_path=cfg, fetch=False, max_workers=2)
+
+    state = run_daily_pipeline(run_id="d1", **kwargs)
+    assert state["status"] == "completed"
+    assert state["stages"]["update_panel"]["output"]["indicator_rows"] == 600
+    picks = state["stages"]["select"]["output"]["picks"]
+    assert list(picks) == ["少妇战法", "周线"]
+    # 紧凑面板（K线 float32）与发布的周线 / 月线面板上的选股结果，与按 float64 读取 CSV 逐股计算相同
+    data = {c: pd.read_csv(data_dir / f"{c}.csv", parse_dates=["date"]) for c in codes}
+    date = pd.Timestamp(state["stages"]["select"]["output"]["trade_date"])
+    assert picks["少妇战法"] == sorted(Selector.BBIKDJSelector(**params).select(date, data))
+    assert picks["周线"] == sorted(Selector.ExpressionSelector(EXPR).select(date, data)) == ["000001", "600000"]
+
+    # 追加一根新K线：只为新增行计算指标
+    for i, code in enumerate(codes):
+        df = pd.read_csv(data_dir / f"{code}.csv")
+        last = df.iloc[[-1]].copy()
+        last["date"] = "2023-10-23"
+        last.to_csv(data_dir / f"{code}.csv", mode="a", header=False, index=False)
+    state = run_daily_pipeline(run_id="d2", **kwargs)
+    out = state["stages"]["update_panel"]["output"]
+    bars = out.pop("timeframe_bars")
+    assert out == {"trade_date": "2023-10-23", "new_rows": 3, "updated_codes": 3, "indicator_rows": 3}
+    # 周线 / 月线随日线增量更新，与全量聚合一致
+    daily = Panel.load(state_dir / "panel.npz")
+    assert daily.fields["close"].dtype == np.float32        # 以紧凑形式保存与发布
+    for freq in ("W", "M"):
+        tf = Panel.load(state_dir / f"panel_{freq}.npz")
+        full = resample_panel(daily, freq)
+        assert tf.fields["close"].dtype == np.float32
+        assert bars[freq] == tf.n_rows == full.n_rows and str(tf.calendar[-1]) == "2023-10-23"
+        np.testing.assert_array_equal(tf.fields["close"], full.fields["close"])
+
+    repo = ResultsRepository(f"sqlite:///{state_dir / 'results.db'}")
+    n_rows = repo.backend.query("SELECT COUNT(*) FROM stock_selection_results")[0][0]
+    assert n_rows == sum(len(v) for v in picks.values()) + state["stages"]["persist"]["output"]["rows"]
+    repo.close()
+
+    # 同一 run_id 再次运行：行情没变时只重新执行抓取；之后有了新K线，下游阶段全部重跑
+    attempts = {k: v["attempts"] for k, v in state["stages"].items()}
+    state = run_daily_pipeline(run_id="d2", **kwargs)
+    assert {k: v["attempts"] for k, v in state["stages"].items()} == dict(attempts, fetch=attempts["fetch"] + 1)
+    for code in codes:
+        last = pd.read_csv(data_dir / f"{code}.csv").iloc[[-1]].assign(date="2023-10-24")
+        last.to_csv(data_dir / f"{code}.csv", mode="a", header=False, index=False)
+    state = run_daily_pipeline(run_id="d2", **kwargs)
+    assert state["status"] == "completed" and state["stages"]["fetch"]["output"]["trade_date"] == "2023-10-24"
+    assert state["stages"]["select"]["output"]["trade_date"] == "2023-10-24"
+    assert {k: v["attempts"] for k, v in state["stages"].items()} == dict(
+        {k: n + 1 for k, n in attempts.items()}, fetch=attempts["fetch"] + 2)
+
+    # 抓取没有执行（如 Tushare 初始化失败）时阶段失败，下游不会沿用旧数据
+    monkeypatch.setattr(daily_pipeline, "fetch_latest_kline", lambda: False)
+    monkeypatch.setattr(pipeline_module.time, "sleep", lambda s: None)
+    state = run_daily_pipeline(run_id="d2", **dict(kwargs, fetch=True))
+    assert state["status"] == "failed" and state["stages"]["fetch"]["status"] == "failed"
+    assert {state["stages"][k]["status"] for k in ("update_panel", "select", "persist")} == {"blocked"}
@@ -0,0 +1,176 @@
+"""测试选股表达式的解析、公共子表达式复用与向量化求值"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from benchmarks import generate_market
+from dsl import EvalContext, ExpressionError, compile_expr, engine, parse
+from panel import Panel, resample_panel
+from panel.timeframe import period_ids
+import Selector
+
+
+@pytest.fixture(scope="module")
+def market():
+    data = generate_market(n_stocks=25, n_days=260, seed=5)
+    return data, Panel.from_frames(data)
+
+
+def test_parse_precedence_and_canonical_form():
+    a = parse("J < 15 & close > ZXDKX")
+    b = parse("(ZXDKX < close) and J < 15")
+    assert a == b
+    assert a[0] == "op" and a[1] == "&"
+    assert parse("MA60 <= close") == parse("close >= MA60")
+    assert parse("-3 + close * 2")[1] == "+"
+
+    for bad, msg in [
+        ("J < ", "此处应为"),
+        ("J < 15 < 20", "连续比较"),
+        ("foo > 1", "未知指标"),
+        ("slope(MA60, x) > 0", "正整数常量"),
+        ("any(close, 5)", "参数类型"),
+        ("close + 1", "必须是条件"),
+        ("J < 15 $", "无法识别"),
+    ]:
+        with pytest.raises(ExpressionError, match=msg):
+            compile_expr(bad)
+
+
+def test_indicators_match_selector(market):
+    data, panel = market
+    ctx = EvalContext(panel)
+    ctx.evaluate("J < 1000 & ZXDKX > 0 & BBI > 0 & DIF > -1000 & MA60 > 0")
+    for code in list(data)[:5]:
+        df = panel.frame(code)
+        j = panel.code_pos(code)
+        n = len(df)
+        kdj = Selector.compute_kdj(df)
+        zxdq, zxdkx = Selector.compute_zx_lines(df)
+        for name, expected in [
+            ("J", kdj["J"]),
+            ("ZXDKX", zxdkx),
+            ("ZXDQ", zxdq),
+            ("BBI", Selector.compute_bbi(df)),
+            ("DIF", Selector.compute_dif(df)),
+            ("MA60", df["close"].rolling(60, min_periods=1).mean()),
+        ]:
+            got = ctx._eval(("var", name))[:n, j]
+            np.testing.assert_allclose(got, expected.to_numpy(), rtol=1e-9, atol=1e-9, err_msg=name)
+
+        # slope 与 np.polyfit 一致
+        got = ctx._eval(parse("slope(MA60, 5)"))[n - 1, j]
+        ma60 = df["close"].rolling(60, min_periods=1).mean().to_numpy()
+        assert got == pytest.approx(np.polyfit(np.arange(5.0), ma60[-5:], 1)[0], rel=1e-6)
+
+
+def test_select_matches_per_stock_loop_and_shares_subexpressions(market):
+    data, panel = market
+    text = "J < 40 & close > ZXDKX & slope(MA60, 5) > 0 & any(cross_up(close, MA60), 25)"
+    ctx = EvalContext(panel)
+    date = panel.calendar[-6]
+
+    picks = ctx.select(text, date)
+    expected = []
+    for code, df in data.items():
+        hist = df[df["date"] <= pd.Timestamp(date)]
+        close = hist["close"]
+        ma60 = close.rolling(60, min_periods=1).mean()
+        _, zxdkx = Selector.compute_zx_lines(hist)
+        j = Selector.compute_kdj(hist)["J"].iloc[-1]
+        slope = np.polyfit(np.arange(5.0), ma60.iloc[-5:].to_numpy(), 1)[0]
+        crossed = Selector.last_valid_ma_cross_up(close, ma60, lookback_n=25) is not None
+        if j < 40 and close.iloc[-1] > zxdkx.iloc[-1] and slope > 0 and crossed:
+            expected.append(code)
+    assert picks == sorted(expected) and picks
+
+    # 第二条表达式复用已算好的 MA60、cross_up 等子表达式
+    before = ctx.cache_size
+    ctx.evaluate("any(cross_up(close, MA60), 25) & MA60 < close")
+    assert ctx.cache_size - before == 2  # 仅新增 “MA60 < close” 与整体的 &
+
+    # all / any / count：最近 n 根全部、至少一根为真，及为真的根数（all 要求历史满 n 根）
+    up = ctx._eval(parse("close > MA60"))
+    cnt = ctx._eval(parse("count(close > MA60, 3)"))
+    full = ctx._eval(parse("all(close > MA60, 3)"))
+    seen = ctx._eval(parse("any(close > MA60, 3)"))
+    for code in list(data)[:5]:
+        j, n = panel.code_pos(code), len(data[code])
+        flags = pd.Series(up[:n, j].astype(float))
+        expected_cnt = flags.rolling(3, min_periods=1).sum().to_numpy()
+        np.testing.assert_array_equal(cnt[:n, j], expected_cnt)
+        np.testing.assert_array_equal(full[:n, j], flags.rolling(3).sum().to_numpy() >= 3)
+        np.testing.assert_array_equal(seen[:n, j], expected_cnt > 0)
+        assert not full[:2, j].any()
+
+    sig = ctx.signal_table(text)
+    assert set(sig.columns) == {"date", "stock_code"}
+    day = sig[sig["date"] == pd.Timestamp(date)]["stock_code"].tolist()
+    on_date = [c for c in picks if (data[c]["date"] == pd.Timestamp(date)).any()]
+    assert sorted(day) == on_date
+
+
+def test_expression_selector_and_definitions(market):
+    data, _ = market
+    date = max(df["date"].iloc[-1] for df in data.values())
+    sel = Selector.ExpressionSelector(
+        "LOWJ & close > ZXDQ",
+        definitions={"LOWJ": "J < 30", "GAP": "close / ref(close, 1) - 1"},
+    )
+    picks = sel.select(date, data)
+    same = Selector.ExpressionSelector("J < 30 & ZXDQ < close").select(date, data)
+    assert picks == same
+    windowed = Selector.ExpressionSelector("J < 30 & close > ZXDQ", window=140).select(date, data)
+    assert set(windowed) <= set(data)
+
+
+def test_timeframe_variables_use_completed_periods(market):
+    data, panel = market
+    ctx = EvalContext(panel)
+    weekly = ctx.timeframe("W").panel
+    j_weekly = ctx._eval(("var", "J_weekly"))
+    code = list(data)[0]
+    df, wdf = panel.frame(code), weekly.frame(code)
+    j, n = panel.code_pos(code), len(panel.frame(code))
+    expected = Selector.compute_kdj(wdf)["J"].to_numpy()
+    got = j_weekly[:n, j]
+
+    # 每行（含最新交易日）只看到所在周之前已走完的最后一根周线
+    prev = np.searchsorted(period_ids(wdf["date"], "W"), period_ids(df["date"], "W"), side="left") - 1
+    seen = prev >= 0
+    np.testing.assert_allclose(got[seen], expected[prev[seen]], rtol=1e-9)
+    assert np.isnan(got[~seen]).all()
+
+    # 截至某个周中日期重新求值（如当日实盘），该日的 J_weekly 与事后按全部历史求值一致
+    mid = np.flatnonzero(~df["date"].isin(wdf["date"]).to_numpy() & seen)[-1]
+    day = df["date"].iloc[mid]
+    live = EvalContext(Panel.from_frames({c: f[f["date"] <= day] for c, f in data.items()}))
+    assert live._eval(("var", "J_weekly"))[mid, live.panel.code_pos(code)] == got[mid]
+
+    date = max(df["date"].iloc[-1] for df in data.values())
+    picks = Selector.ExpressionSelector("J_weekly < 50 & J < 80").select(date, data)
+    last = ctx._eval(parse("J_weekly < 50 & J < 80"))
+    assert picks == [c for c in panel.codes if last[len(panel.frame(c)) - 1, panel.code_pos(c)]]
+
+
+def test_expression_selector_uses_cached_timeframe_panels(market, monkeypatch):
+    data, panel = market
+    subset = {code: data[code] for code in list(data)[:10]}
+    date = max(df["date"].iloc[-1] for df in data.values())
+    expr = "J_weekly < 50 & J < 80"
+    expected = Selector.ExpressionSelector(expr, window=120).select(date, subset)
+    assert compile_expr(expr).timeframes == {"W"}
+
+    # 传入全市场的缓存周线面板（如每日流水线的 panel_W）时不再由日线聚合，结果与聚合时一致
+    sel = Selector.ExpressionSelector(expr, window=120)
+    sel.timeframes = {"W": resample_panel(panel, "W"), "M": resample_panel(panel, "M")}
+    monkeypatch.setattr(engine, "resample_panel", lambda *args, **kwargs: pytest.fail("不应重新聚合"))
+    assert sel.select(date, subset) == expected
@@ -0,0 +1,389 @@
+"""测试共享指标库：内核、pandas 适配层、backtrader 适配层与原实现的一致性"""
+
+import sys
+from pathlib import Path
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks as scipy_find_peaks
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks import generate_market
+from indicators import (
+    CrossEvents,
+    bbi_deriv_uptrend,
+    compute_bbi,
+    compute_dif,
+    compute_kdj,
+    compute_rsv,
+    compute_zx_lines,
+    followed_by,
+    kernels,
+    last_valid_ma_cross_up,
+    peaks,
+)
+from backtrader4Lu.strategy.indicator import DoubleLineIndicator, KDJIndicator, TDXEMA, TDXSMA
+from indicators.lines import MovingAverage, RollingSlope, SlopeSums
+
+
+# ---------- 原实现（逐行递推 / pandas），作为参照 ---------- #
+def ref_kdj(df, n=9):
+    low_n = df["low"].rolling(window=n, min_periods=1).min()
+    high_n = df["high"].rolling(window=n, min_periods=1).max()
+    rsv = (df["close"] - low_n) / (high_n - low_n + 1e-9) * 100
+    K = np.zeros(len(df))
+    D = np.zeros(len(df))
+    for i in range(len(df)):
+        if i == 0:
+            K[i] = D[i] = 50.0
+        else:
+            K[i] = 2 / 3 * K[i - 1] + 1 / 3 * rsv.iloc[i]
+            D[i] = 2 / 3 * D[i - 1] + 1 / 3 * K[i]
+    return df.assign(K=K, D=D, J=3 * K - 2 * D)
+
+
+def ref_bbi_deriv_uptrend(bbi, *, min_window, max_window=None, q_threshold=0.0):
+    bbi = bbi.dropna()
+    if len(bbi) < min_window:
+        return False
+    longest = min(len(bbi), max_window or len(bbi))
+    for w in range(longest, min_window - 1, -1):
+        seg = bbi.iloc[-w:]
+        if np.quantile(np.diff((seg / seg.iloc[0]).values), q_threshold) >= 0:
+            return True
+    return False
+
+
+def ref_last_cross_up(close, ma, lookback_n=None):
+    n = len(close)
+    start = 1 if lookback_n is None else max(1, n - lookback_n)
+    for i in range(n - 1, start - 1, -1):
+        c_prev, c_now, m_prev, m_now = close[i - 1], close[i], ma[i - 1], ma[i]
+        if not np.isnan([c_prev, c_now, m_prev, m_now]).any() and c_prev < m_prev and c_now >= m_now:
+            return i
+    return None
+
+
+def ref_prior_peak(oc, close, idx, gap):
+    """原 PeakKDJSelector 的逐峰回溯（布尔掩码取区间最低收盘价）"""
+    t = idx[-1]
+    for k in range(len(idx) - 2, -1, -1):
+        p = idx[k]
+        if oc[t] <= oc[p]:
+            continue
+        if len(idx) >= 3 and k < len(idx) - 2 and not (oc[idx[k + 1:-1]] < oc[p]).all():
+            continue
+        min_close = pd.Series(close[p + 1:t]).min()
+        if pd.isna(min_close) or oc[p] <= min_close * (1 + gap):
+            continue
+        return p
+    return -1
+
+
+class RefSMA(bt.Indicator):
+    lines = ("sma",)
+    params = (("period", 14),)
+
+    def next(self):
+        n = min(len(self), self.p.period)
+        self.lines.sma[0] = sum(self.data[-i] for i in range(1, n + 1)) / n
+
+
+class RefKDJ(bt.Indicator):
+    lines = ("K", "D", "J")
+    params = (("period", 9),)
+
+    def __init__(self):
+        self.low_n = bt.indicators.Lowest(self.data.low, period=self.p.period)
+        self.high_n = bt.indicators.Highest(self.data.high, period=self.p.period)
+
+    def next(self):
+        lo, hi = self.low_n[0], self.high_n[0]
+        rsv = 50.0 if hi == lo else (self.data.close[0] - lo) / (hi - lo) * 100
+        if len(self) == self.p.period:
+            self.lines.K[0] = self.lines.D[0] = rsv
+        else:
+            self.lines.K[0] = (rsv + 2 * self.lines.K[-1]) / 3
+            self.lines.D[0] = (self.lines.K[0] + 2 * self.lines.D[-1]) / 3
+        self.lines.J[0] = 3 * self.lines.K[0] - 2 * self.lines.D[0]
+
+
+def _frames():
+    data = generate_market(n_stocks=4, n_days=260, seed=3)
+    frames = list(data.values())
+    flat = frames[0].copy()
+    flat.loc[flat.index[30:45], ["open", "high", "low", "close"]] = 10.0
+    return frames + [flat, frames[1].head(5), frames[2].head(1)]
+
+
+# ---------- pandas 适配层 ---------- #
+@pytest.mark.parametrize("case", range(7))
+def test_frame_adapters_match_reference(case):
+    df = _frames()[case]
+    close = df["close"]
+
+    got = compute_kdj(df)
+    exp = ref_kdj(df)
+    for col in "KDJ":
+        np.testing.assert_allclose(got[col], exp[col], rtol=1e-10, atol=1e-9, err_msg=col)
+
+    refs = {
+        "bbi": (compute_bbi(df), (close.rolling(3).mean() + close.rolling(6).mean()
+                                  + close.rolling(12).mean() + close.rolling(24).mean()) / 4),
+        "dif": (compute_dif(df), close.ewm(span=12, adjust=False).mean()
+                - close.ewm(span=26, adjust=False).mean()),
+        "rsv": (compute_rsv(df, 5), (close - df["low"].rolling(5, min_periods=1).min())
+                / (close.rolling(5, min_periods=1).max() - df["low"].rolling(5, min_periods=1).min() + 1e-9)
+                * 100.0),
+    }
+    zxdq, zxdkx = compute_zx_lines(df)
+    refs["zxdq"] = (zxdq, close.ewm(span=10, adjust=False).mean().ewm(span=10, adjust=False).mean())
+    refs["zxdkx"] = (zxdkx, sum(close.rolling(m, min_periods=m).mean() for m in (14, 28, 57, 114)) / 4.0)
+    for name, (a, b) in refs.items():
+        pd.testing.assert_series_equal(a, b, check_names=False, obj=name)
+
+
+def test_compute_kdj_empty_frame():
+    empty = _frames()[0].iloc[:0]
+    assert list(compute_kdj(empty).columns[-3:]) == ["K", "D", "J"]
+
+
+def test_bbi_deriv_uptrend_matches_reference():
+    rng = np.random.default_rng(0)
+    cases = [compute_bbi(df) for df in _frames()[:5]]
+    # 平台与微小回撤：差分为 0 或接近 0 的窗口
+    plateau = np.r_[np.linspace(10, 11, 40), np.full(20, 11.0), 11 - 1e-13, np.linspace(11, 12, 30)]
+    cases.append(pd.Series(plateau))
+    cases.append(pd.Series(np.cumsum(rng.normal(0.02, 0.1, 200)) + 20))
+    checked = 0
+    for bbi in cases:
+        for q in (0.0, 0.05, 0.2, 0.5, 1.0):
+            for min_w, max_w in ((2, None), (5, 30), (20, 120), (60, 60)):
+                got = bbi_deriv_uptrend(bbi, min_window=min_w, max_window=max_w, q_threshold=q)
+                exp = ref_bbi_deriv_uptrend(bbi, min_window=min_w, max_window=max_w, q_threshold=q)
+                assert got == exp, (q, min_w, max_w)
+                checked += got
+    assert checked > 0
+    with pytest.raises(ValueError):
+        bbi_deriv_uptrend(cases[0], min_window=5, q_threshold=1.5)
+
+
+def test_kernels_on_panel_match_per_column():
+    frames = _frames()[:4]
+    n = max(len(df) for df in frames)
+    close = np.full((n, len(frames)), np.nan)
+    for j, df in enumerate(frames):
+        close[:len(df), j] = df["close"]
+    zxdq, zxdkx = kernels.zx_lines(close)
+    for j, df in enumerate(frames):
+        a, b = compute_zx_lines(df)
+        np.testing.assert_array_equal(zxdq[:len(df), j], a.to_numpy())
+        np.testing.assert_array_equal(zxdkx[:len(df), j], b.to_numpy())
+
+
+# ---------- backtrader 适配层 ---------- #
+@pytest.mark.parametrize("runonce", [True, False])
+def test_backtrader_lines_match_reference(runonce):
+    df = _frames()[4].set_index("date")
+    df.iloc[60:75, :4] = 10.0  # 连续一字，RSV 取 50
+
+    class Probe(bt.Strategy):
+        def __init__(self):
+            self.new = [TDXSMA(self.data.close, period=5), TDXEMA(TDXEMA(self.data.close)),
+                        KDJIndicator(self.data), DoubleLineIndicator(self.data),
+                        MovingAverage(self.data.volume, period=5)]
+            self.ref = [RefSMA(self.data.close, period=5), RefKDJ(self.data),
+                        RefSMA(self.data.close, period=60), bt.indicators.SMA(self.data.volume, period=5)]
+            self.rows = []
+
+        def next(self):
+            sma, ema, kdj, dl, vma = self.new
+            rsma, rkdj, rma60, rvma = self.ref
+            self.rows.append([
+                sma[0], rsma[0], kdj.K[0], rkdj.K[0], kdj.J[0], rkdj.J[0], dl.ma1[0], rma60[0],
+                ema[0], dl.trend_line[0], dl.duokong_line[0], vma[0], rvma[0],
+            ])
+
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(Probe)
+    strat = cerebro.run()[0]
+    rows = np.array(strat.rows)
+    first = len(df) - len(rows)
+    assert first == 8  # KDJ 的最小周期保持为 9
+
+    # 原 TDXSMA 在历史不足 period 根时会取到数组末尾的数据，只比较满周期之后
+    full = rows[60:]
+    for a, b in ((0, 1), (2, 3), (4, 5), (6, 7)):
+        np.testing.assert_allclose(full[:, a], full[:, b], rtol=1e-10, atol=1e-9)
+    np.testing.assert_allclose(rows[:, 2], rows[:, 3], rtol=1e-10, atol=1e-9)
+
+    close = df["close"].to_numpy()
+    zxdq, _ = compute_zx_lines(df)
+    np.testing.assert_allclose(rows[:, 8], zxdq.to_numpy()[first:], rtol=1e-12)
+    np.testing.assert_allclose(rows[:, 9], zxdq.to_numpy()[first:], rtol=1e-12)
+    np.testing.assert_allclose(rows[:, 10], sum(kernels.tdx_sma(close, m) for m in (14, 28, 57, 114))[first:] / 4)
+    np.testing.assert_array_equal(rows[:, 11], rows[:, 12])  # 成交量均线与 bt SMA 逐位一致
+
+
+# ---------- 回归斜率 ---------- #
+def _polyfit_slope(y):
+    return np.polyfit(np.arange(len(y)), y, 1)[0]
+
+
+def test_rolling_slope_matches_polyfit():
+    x = _frames()[0]["close"].to_numpy().copy()
+    x[50] = np.nan
+    for n in (2, 5, 10):
+        got = kernels.slope(x, n)
+        for i in range(len(x)):
+            seg = x[max(i - n + 1, 0):i + 1]
+            if i < n - 1 or np.isnan(seg).any():
+                assert np.isnan(got[i])
+            else:
+                assert got[i] == pytest.approx(_polyfit_slope(seg), rel=1e-8, abs=1e-10)
+
+    # 面板逐列与单列一致；可变窗口 O(1) 取斜率
+    panel = np.stack([x, x[::-1] * 1e4], axis=1)
+    np.testing.assert_allclose(kernels.slope(panel, 5)[:, 0], kernels.slope(x, 5), rtol=1e-9)
+    sums = kernels.slope_sums(x)
+    ends, ns = np.array([30, 40, 120, 2]), np.array([3, 7, 20, 5])
+    got = kernels.window_slope(sums, ends, ns)
+    assert np.isnan(got[-1])
+    for e, n, g in zip(ends[:-1], ns[:-1], got[:-1]):
+        assert g == pytest.approx(_polyfit_slope(x[e - n + 1:e + 1]), rel=1e-8)
+
+
+@pytest.mark.parametrize("runonce", [True, False])
+def test_slope_lines_match_polyfit(runonce):
+    df = _frames()[1].set_index("date")
+
+    class Probe(bt.Strategy):
+        def __init__(self):
+            self.ma = bt.indicators.SMA(self.data.volume, period=5)
+            self.fixed = RollingSlope(self.data.close, period=6)
+            self.sums = SlopeSums(self.ma)
+            self.pairs = []
+
+        def next(self):
+            if len(self) >= 6:
+                closes = [self.data.close[-i] for i in range(5, -1, -1)]
+                self.pairs.append((self.fixed[0], _polyfit_slope(closes)))
+            for t in (2, 4, 9):
+                if len(self) >= t + 5:
+                    vols = [self.ma[-i] for i in range(t, 0, -1)]
+                    self.pairs.append((self.sums.window_slope(t, ago=1), _polyfit_slope(vols)))
+
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(Probe)
+    pairs = np.array(cerebro.run()[0].pairs)
+    assert len(pairs) > 500
+    np.testing.assert_allclose(pairs[:, 0], pairs[:, 1], rtol=1e-7, atol=1e-6)
+
+
+# ---------- 交叉事件 ---------- #
+def test_cross_events_match_reference():
+    frames = _frames()[:5]
+    for df in frames:
+        close = df["close"].to_numpy()
+        ma = df["close"].rolling(20).mean().to_numpy()
+        for lookback in (None, 0, 1, 10, 25, 1000):
+            got = last_valid_ma_cross_up(df["close"], df["close"].rolling(20).mean(), lookback_n=lookback)
+            assert got == ref_last_cross_up(close, ma, lookback)
+
+        ev = CrossEvents(close, ma)
+        ups, downs = ev.positions("up"), ev.positions("down")
+        assert len(ups) and len(downs)
+        for at in (30, 100, len(close) - 1):
+            prior = ups[ups <= at]
+            assert ev.last("up", at=at) == (prior[-1] if len(prior) else -1)
+            assert ev.count("down", 20, at) == ((downs >= 20) & (downs <= at)).sum()
+        i, j = ups[0], ups[-1]
+        assert ev.none_between("down", i, j) == (not ((downs > i) & (downs < j)).any())
+
+    # 面板逐列与单列一致
+    n = max(len(df) for df in frames)
+    close = np.full((n, len(frames)), np.nan)
+    for j, df in enumerate(frames):
+        close[:len(df), j] = df["close"]
+    ma = kernels.rolling_mean(close, 20)
+    panel = CrossEvents(close, ma)
+    at = np.array([len(df) - 1 for df in frames])
+    lasts = panel.last("up", at=at, within=40)
+    for j, df in enumerate(frames):
+        assert lasts[j] == CrossEvents(close[:len(df), j], ma[:len(df), j]).last("up", within=40)
+
+
+def test_followed_by_matches_loop():
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        a, b = rng.random(6) < 0.3, rng.random(6) < 0.3
+        exp = any(a[i] and b[i + 1:].any() for i in range(6))
+        assert followed_by(a, b) == exp
+    panel = rng.random((6, 50)) < 0.3
+    np.testing.assert_array_equal(followed_by(panel, panel[::-1]),
+                                  [followed_by(panel[:, k], panel[::-1, k]) for k in range(50)])
+
+
+# ---------- 找峰与稀疏表 ---------- #
+def test_find_peaks_matches_scipy():
+    rng = np.random.default_rng(5)
+    for trial in range(120):
+        n, m = int(rng.integers(1, 130)), int(rng.integers(1, 6))
+        # 一位小数的随机游走，制造平台与等高峰
+        panel = np.round(rng.normal(0, 1, (n, m)).cumsum(axis=0), 1)
+        if trial % 3 == 0:
+            panel[rng.random((n, m)) < 0.05] = np.nan
+            panel[:int(rng.integers(0, n)), 0] = np.nan
+        for distance in (None, 1, 6, 7.5):
+            for prominence in (None, 0.5, 2.0):
+                got = peaks.find_peaks(panel, distance=distance, prominence=prominence)
+                for j in range(m):
+                    exp = scipy_find_peaks(panel[:, j], distance=distance, prominence=prominence)[0]
+                    np.testing.assert_array_equal(got[j], exp)
+                np.testing.assert_array_equal(
+                    peaks.find_peaks(panel[:, 0], distance=distance, prominence=prominence), got[0])
+    with pytest.raises(ValueError):
+        peaks.find_peaks(np.arange(5.0), distance=0)
+
+
+def test_sparse_table_matches_brute_force():
+    rng = np.random.default_rng(6)
+    panel = rng.normal(size=(77, 3))
+    panel[rng.random(panel.shape) < 0.1] = np.nan
+    for func, ref in ((np.fmin, np.nanmin), (np.fmax, np.nanmax)):
+        table = peaks.SparseTable(panel, func)
+        lo, hi = rng.integers(-3, 80, 400), rng.integers(-3, 80, 400)
+        col = rng.integers(0, 3, 400)
+        got = table.query(lo, hi, col)
+        for a, b, c, v in zip(lo, hi, col, got):
+            seg = panel[max(a, 0):max(min(b, 76) + 1, 0), c]
+            if max(a, 0) > min(b, 76) or np.isnan(seg).all():
+                assert np.isnan(v)
+            else:
+                assert v == ref(seg)
+
+
+def test_prior_peak_matches_reference():
+    hits = 0
+    for df in _frames():
+        close = df["close"].to_numpy()
+        oc = np.fmax(df["open"].to_numpy(), close)
+        low = peaks.SparseTable(close)
+        for end in range(40, len(df), 7):
+            idx = peaks.find_peaks(oc[:end], distance=6, prominence=0.5)
+            if len(idx) < 2:
+                continue
+            low_end = peaks.SparseTable(close[:end])
+            for gap in (0.0, 0.01, 0.05):
+                exp = ref_prior_peak(oc, close, idx, gap)
+                assert peaks.prior_peak(oc[:end], idx, low_end, gap) == exp
+                # 更长序列上建的稀疏表同样适用（只查询峰之间的区间）
+                assert peaks.prior_peak(oc, idx, low, gap) == exp
+                hits += exp >= 0
+    assert hits > 0
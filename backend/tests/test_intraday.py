@@ -0,0 +1,86 @@
+"""测试分钟线存储、导入与重采样"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks import generate_minute_feed
+from intraday import MinuteStore, ingest_csv, ingest_frames, iter_resampled_frames, resample_day, resample_frames
+
+AGG = {"open": "first", "close": "last", "high": "max", "low": "min", "volume": "sum"}
+
+
+def _feed(n_stocks=6, n_days=3):
+    return list(generate_minute_feed(n_stocks=n_stocks, n_days=n_days, seed=3))
+
+
+def test_resample_matches_pandas(tmp_path):
+    feed = _feed()
+    store = MinuteStore(tmp_path / "minute")
+    # 按 500 行分块推送：每个交易日写出多个 part，读取时合并
+    chunks = (df.iloc[i:i + 500] for df in feed for i in range(0, len(df), 500))
+    assert ingest_frames(store, chunks, batch_rows=500) == sum(len(df) for df in feed)
+    assert len(store.dates()) == 3 and len(list((tmp_path / "minute").glob("*/part-*.npz"))) > 3
+
+    bars = pd.concat(feed)
+    day = store.read(bars["datetime"].iloc[0])
+    assert len(day) == 6 * 240 and day.codes.tolist() == sorted(day.codes.tolist())
+
+    # 30 分钟线：(左开, 右闭] 分桶、以右端标记，去掉午休的空桶
+    for code, g in bars.groupby("code"):
+        ref = g.set_index("datetime").resample("30min", closed="right", label="right").agg(AGG).dropna()
+        got = resample_frames(store, "30min", codes=[code])[code]
+        assert len(got) == 3 * 8
+        np.testing.assert_array_equal(got["date"].to_numpy(), ref.index.to_numpy())
+        for f in AGG:
+            np.testing.assert_allclose(got[f].to_numpy(), ref[f].to_numpy(), rtol=1e-6)
+
+    daily = resample_frames(store, "D")
+    ref = bars.assign(date=bars["datetime"].dt.normalize()).groupby(["code", "date"]).agg(AGG)
+    got = pd.concat(daily, names=["code", None]).reset_index(level=1, drop=True).set_index("date", append=True)
+    pd.testing.assert_frame_equal(got.astype("float64"), ref.astype("float64"), rtol=1e-6)
+
+    # 按股票分批：每批最多 4 只，合起来与一次性结果一致
+    batches = list(iter_resampled_frames(store, "5min", batch_size=4))
+    assert [len(b) for b in batches] == [4, 2] and store.codes().tolist() == sorted(bars["code"].unique())
+    whole = resample_frames(store, "5min")
+    merged = {code: df for b in batches for code, df in b.items()}
+    assert list(merged) == list(whole)
+    for code, df in whole.items():
+        pd.testing.assert_frame_equal(merged[code], df)
+    with pytest.raises(ValueError):
+        next(iter_resampled_frames(store, "5min", batch_size=0))
+
+    hourly = resample_day(day, "60min").to_frame()
+    assert hourly["date"].dt.strftime("%H:%M").unique().tolist() == ["10:30", "11:30", "14:00", "15:00"]
+    with pytest.raises(ValueError):
+        resample_day(day, 7)
+
+
+def test_ingest_csv_per_code_files_and_compact(tmp_path):
+    bars = pd.concat(_feed(n_stocks=3, n_days=2))
+    src = tmp_path / "csv"
+    src.mkdir()
+    for code, g in bars.groupby("code"):
+        g.drop(columns="code").rename(columns={"datetime": "trade_time", "volume": "vol"}).to_csv(
+            src / f"{code}.csv", index=False)
+    store = MinuteStore(tmp_path / "minute")
+    assert ingest_csv(store, src, chunksize=100, batch_rows=200) == len(bars)
+
+    # 同一 (股票, 时刻) 重复写入：以后写入的为准
+    date = store.dates()[0]
+    fix = bars[bars["datetime"].dt.normalize() == date].head(1).assign(close=99.0)
+    ingest_frames(store, [fix])
+    before = store.read(date).to_frame()
+    assert store.compact() == 2
+    assert len(list((tmp_path / "minute" / date.strftime("%Y-%m-%d")).glob("part-*.npz"))) == 1
+    after = store.read(date).to_frame()
+    pd.testing.assert_frame_equal(after, before)
+    row = after[(after["code"] == fix["code"].iloc[0]) & (after["date"] == fix["datetime"].iloc[0])]
+    assert row["close"].tolist() == [99.0] and len(after) == 3 * 240
@@ -0,0 +1,208 @@
+"""测试进程池任务管理与进度推送"""
+
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backtest import BacktestCache, backtest_key, checkpoint_slot, simulate
+from backtest import cache as backtest_cache
+from benchmarks import generate_market
+from jobs import start_job_manager, stop_job_manager
+from jobs.manager import ProgressReporter
+from backtrader4Lu.strategy.double_line_b1_strategy import DoubleLineStrategy
+from jobs.tasks import BUY_STRATEGIES, SELL_STRATEGIES, merge_backtest, run_backtest_chunk, run_selection_chunk
+from panel import FIELDS, TIMEFRAMES, Panel, SharedPanel, resample_panel
+from routers.jobs import iter_job_events
+
+
+def _write_csvs(data_dir: Path, codes, n=300):
+    rng = np.random.default_rng(1)
+    for code in codes:
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        pd.DataFrame({
+            "date": pd.bdate_range("2023-01-02", periods=n).strftime("%Y-%m-%d"),
+            "open": close, "close": close, "high": close * 1.01, "low": close * 0.99,
+            "volume": rng.uniform(1e5, 1e6, n),
+        }).to_csv(data_dir / f"{code}.csv", index=False)
+
+
+def test_backtest_job_streams_progress(tmp_path):
+    codes = ["000001", "000002", "000003"]
+    _write_csvs(tmp_path, codes)
+    manager = start_job_manager(max_workers=2)
+    try:
+        units = [
+            (run_backtest_chunk, dict(codes=part, data_dir=str(tmp_path),
+                                      start_date="2023-06-01", end_date="2024-02-01"))
+            for part in (codes[:2], codes[2:] + ["999999"])
+        ]
+        job = manager.submit("backtest", units, total=4, combine=merge_backtest)
+
+        async def collect():
+            return [e async for e in iter_job_events(job)]
+
+        events = asyncio.run(asyncio.wait_for(collect(), timeout=60))
+    finally:
+        stop_job_manager()
+
+    assert events[-1]["type"] == "done" and events[-1]["status"] == "completed"
+    assert [e["seq"] for e in events] == list(range(len(events)))
+    progress = [e for e in events if e["type"] == "progress"]
+    assert progress[-1]["done"] == 4 and progress[-1]["progress"] == 100
+    assert any(e["type"] == "partial" for e in events)
+
+    results = {r["stock_code"]: r for r in job.result["results"]}
+    assert results["999999"]["status"] == "skipped"
+    assert results["000001"]["status"] == "success"
+    assert "sharpe_ratio" in results["000001"]
+    assert job.result["statistics"]["valid_stocks"] == 3
+
+
+def test_backtest_chunk_reads_shared_panel(tmp_path):
+    codes = ["000001", "000002"]
+    _write_csvs(tmp_path, codes)
+    kwargs = dict(codes=codes + ["999999"], data_dir=str(tmp_path), start_date="2023-06-01", end_date="2024-02-01")
+    expected = run_backtest_chunk(ProgressReporter(), **kwargs)
+    # 共享面板在子进程中挂载，结果与逐只读取 CSV 相同
+    with SharedPanel(Panel.from_csv_dir(tmp_path), fields=FIELDS) as shared:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            got = executor.submit(run_backtest_chunk, ProgressReporter(), shared=shared.name, **kwargs).result()
+    assert got == expected
+    assert [r["status"] for r in got] == ["success", "success", "skipped"]
+
+
+def test_selection_chunk_uses_shared_timeframe_panels(tmp_path):
+    codes = ["000001", "000002", "000003"]
+    _write_csvs(tmp_path, codes)
+    selectors = [{"class": "ExpressionSelector", "alias": "周线", "params": {"expr": "J_weekly < 50"}}]
+    kwargs = dict(codes=codes[:2], data_dir=str(tmp_path), selectors=selectors, trade_date="2024-02-23")
+    expected = run_selection_chunk(ProgressReporter(), **kwargs)
+    # 全市场的周线 / 月线面板发布一次，子进程挂载后交给 ExpressionSelector
+    panel = Panel.from_csv_dir(tmp_path)
+    with contextlib.ExitStack() as stack:
+        names = {freq: stack.enter_context(SharedPanel(resample_panel(panel, freq))).name for freq in TIMEFRAMES}
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            got = executor.submit(run_selection_chunk, ProgressReporter(), timeframes=names, **kwargs).result()
+    assert got == expected == {"周线": ["000001"]}
+
+
+def test_backtest_cache_reuses_unchanged_stocks(tmp_path, monkeypatch):
+    data_dir, cache_dir = tmp_path / "data", tmp_path / "cache"
+    data_dir.mkdir()
+    codes = ["000001", "000002", "000003"]
+    _write_csvs(data_dir, codes)
+    kwargs = dict(codes=codes, data_dir=str(data_dir), start_date="2023-06-01", end_date="2024-02-01")
+    expected = run_backtest_chunk(ProgressReporter(), **kwargs)
+    assert run_backtest_chunk(ProgressReporter(), cache_dir=str(cache_dir), **kwargs) == expected
+    assert len(BacktestCache(cache_dir)._entries()) == 6  # 每只股票一个结果 + 一个接续回测的检查点
+
+    # 重跑命中缓存（条目数不变、结果相同）；只改动一只股票的K线或改变参数才会重新回测
+    assert run_backtest_chunk(ProgressReporter(), cache_dir=str(cache_dir), **kwargs) == expected
+    assert len(BacktestCache(cache_dir)._entries()) == 6
+    df = pd.read_csv(data_dir / "000002.csv")
+    df.loc[df.index[-1], "close"] *= 1.1
+    df.to_csv(data_dir / "000002.csv", index=False)
+    got = run_backtest_chunk(ProgressReporter(), cache_dir=str(cache_dir), **kwargs)
+    assert got == run_backtest_chunk(ProgressReporter(), **kwargs)
+    assert len(BacktestCache(cache_dir)._entries()) == 7
+    run_backtest_chunk(ProgressReporter(), cache_dir=str(cache_dir), commission=0.001, **kwargs)
+    assert len(BacktestCache(cache_dir)._entries()) == 13
+
+    # 结果与检查点的键都包含策略包与指标库的源码哈希：改动其中任一文件即不再命中
+    df = pd.read_csv(data_dir / "000001.csv", parse_dates=["date"]).set_index("date")
+    buy = {"B1": BUY_STRATEGIES["B1"]}
+    keys = lambda: (backtest_key(df, DoubleLineStrategy, buy, SELL_STRATEGIES, commission=0.0002),
+                    checkpoint_slot("000001", DoubleLineStrategy, buy, SELL_STRATEGIES, commission=0.0002))
+    before = keys()
+    digest = backtest_cache.module_digest
+    monkeypatch.setattr(backtest_cache, "module_digest", lambda m: digest(m) + ("-edited" if m == "indicators" else ""))
+    assert all(a != b for a, b in zip(keys(), before))
+
+    # 超过容量上限时按最久未用淘汰
+    cache = BacktestCache(cache_dir, max_bytes=BacktestCache(cache_dir).size // 2)
+    cache.put("f" * 32, {"final_value": 1.0})
+    assert cache.size <= cache.max_bytes and cache.get("f" * 32) == {"final_value": 1.0}
+
+
+def test_incremental_backtest_matches_full_run():
+    buy = {"B1": BUY_STRATEGIES["B1"]}
+    args = dict(strategy=DoubleLineStrategy, buy_strategies=buy, sell_strategies=dict(SELL_STRATEGIES),
+                initial_cash=500000, commission=0.0002, start_date="2021-06-01")
+
+    def run(df, **kw):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return simulate(df, end_date=df.index[-1], **args, **kw)
+
+    def same(a, b):
+        assert a.keys() == b.keys()
+        for k in a:
+            if isinstance(a[k], np.ndarray):
+                np.testing.assert_array_equal(a[k], b[k])
+            else:
+                assert a[k] == b[k], k
+
+    n_trades = 0
+    for df in generate_market(n_stocks=4, n_days=400, seed=7).values():
+        df = df.set_index("date")
+        # 每次追加 10 根K线，从上一轮的检查点接续，结果与整段回测逐位一致
+        _, checkpoint = run(df.iloc[:-40])
+        for end in (-30, -20, -10, None):
+            part = df.iloc[:end]
+            full, _ = run(part)
+            assert checkpoint is not None
+            got, checkpoint = run(part, checkpoint=checkpoint)
+            same(got, full)
+        n_trades += len(full["trade_records"])
+        # 卖出记录的盈亏为扣除手续费后的净值：每笔交易（可分批卖出）之和与 trade_pnls 一致
+        closed, pos, pnl = [], 0, 0.0
+        for r in full["trade_records"]:
+            pos += r["trade_quantity"] if r["trade_type"] == "buy" else -r["trade_quantity"]
+            if r["trade_type"] == "sell":
+                pnl += r["profit_loss"]
+                if pos == 0:
+                    closed.append(pnl)
+                    pnl = 0.0
+        np.testing.assert_allclose(closed, full["trade_pnls"], rtol=0, atol=1e-6)
+
+        # 检查点之前的K线被改写（如除权）时不再适用，退回整段回测
+        fixed = df.copy()
+        fixed.iloc[:200, :4] *= 0.9
+        got, _ = run(fixed, checkpoint=checkpoint)
+        same(got, run(fixed)[0])
+    assert n_trades > 20
+
+
+def _slow_unit(reporter, seconds):
+    time.sleep(seconds)
+    reporter.progress(1)
+    return seconds
+
+
+def test_cancel_and_replay(tmp_path):
+    manager = start_job_manager(max_workers=1)
+    try:
+        blocker = manager.submit("test", [(_slow_unit, {"seconds": 0.5})], total=1)
+        job = manager.submit("test", [(_slow_unit, {"seconds": 0.1})] * 3, total=3)
+        assert manager.cancel(job.job_id)
+        assert job.status == "cancelled"
+
+        async def collect(j, since=0):
+            return [e async for e in iter_job_events(j, since)]
+
+        events = asyncio.run(asyncio.wait_for(collect(blocker), timeout=30))
+        assert blocker.status == "completed" and blocker.result == [0.5]
+        # 已结束的任务可从任意位置补发事件
+        replay = asyncio.run(collect(blocker, since=1))
+        assert replay == events[1:]
+    finally:
+        stop_job_manager()
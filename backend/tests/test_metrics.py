@@ -0,0 +1,68 @@
+"""测试回测绩效指标"""
+
+import sys
+from pathlib import Path
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backtest import compute_metrics
+from backtrader4Lu.strategy.buy import B1BuyStrategy
+from backtrader4Lu.strategy.double_line_b1_strategy import DoubleLineStrategy
+from backtrader4Lu.strategy.sell import CloseBelowDuokongSellStrategy
+
+
+def test_compute_metrics_matches_scalar_formulas():
+    curves = [
+        np.array([100.0, 110.0, 99.0, 121.0]),
+        np.array([100.0, 100.0]),
+    ]
+    pnls = [np.array([30.0, -10.0, 5.0]), np.array([])]
+    m = compute_metrics(curves, pnls, initial_cash=100.0)
+
+    assert np.isclose(m.loc[0, "total_return"], 21.0)
+    assert np.isclose(m.loc[0, "annual_return"], (1.21 ** (252 / 3) - 1) * 100)
+    rets = np.diff(curves[0]) / curves[0][:-1]
+    assert np.isclose(m.loc[0, "sharpe_ratio"], rets.mean() / rets.std(ddof=1) * np.sqrt(252))
+    assert np.isclose(m.loc[0, "max_drawdown"], 10.0)
+    assert m.loc[0, "total_trades"] == 3
+    assert m.loc[0, "winning_trades"] == 2
+    assert np.isclose(m.loc[0, "win_rate"], 200 / 3)
+    assert np.isclose(m.loc[0, "profit_loss_ratio"], 3.5)
+
+    assert m.loc[1, "total_return"] == 0
+    assert m.loc[1, "sharpe_ratio"] == 0
+    assert m.loc[1, "max_drawdown"] == 0
+    assert m.loc[1, "total_trades"] == 0
+
+
+def test_strategy_records_equity_curve():
+    rng = np.random.default_rng(0)
+    n = 300
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    df = pd.DataFrame({
+        "open": close, "high": close * 1.01, "low": close * 0.99,
+        "close": close, "volume": rng.uniform(1e5, 1e6, n),
+    }, index=pd.bdate_range("2023-01-02", periods=n))
+
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(
+        DoubleLineStrategy,
+        start_date="2023-06-01",
+        end_date="2024-02-01",
+        buy_strategies={"B1": B1BuyStrategy},
+        sell_strategies={"close_below_duokong": CloseBelowDuokongSellStrategy},
+    )
+    cerebro.broker.setcash(100000)
+    strat = cerebro.run()[0]
+
+    curve = np.frombuffer(strat.equity_curve, dtype=np.float64)
+    in_window = (df.index >= "2023-06-01") & (df.index <= "2024-02-01")
+    assert len(curve) <= in_window.sum()
+    assert np.isclose(curve[-1], cerebro.broker.getvalue())
+    assert len(strat.trade_pnls) == strat.signal_generator.buy_strategy.total_trades
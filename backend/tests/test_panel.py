@@ -0,0 +1,299 @@
+"""测试面板缓存指标的增量递推、截面查询、价格索引、进程间共享与紧凑存储"""
+
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from benchmarks import generate_market
+from indicators import compute_kdj
+from panel import (
+    INDICATOR_FIELDS, CrossSection, IndicatorState, Panel, PriceIndex, SharedPanel, attach_panel,
+    align_rows, refresh_indicators, resample_panel, update_resampled,
+)
+from panel.timeframe import period_ids
+from panel.memory import categorize, compact_frame, frames_nbytes
+import SectorShift
+import find_stock_by_price_concurrent as price_finder
+
+
+def _split(frames, cut):
+    """每只股票留最后 cut 根作为“之后几天”的新K线；最后一只当作新上市"""
+    codes = list(frames)
+    head = {c: df.iloc[:-cut] for c, df in frames.items() if c != codes[-1]}
+    return head, frames
+
+
+def _assert_fields_close(panel, full):
+    for f in INDICATOR_FIELDS:
+        np.testing.assert_allclose(panel.fields[f], full.fields[f], rtol=1e-10, atol=1e-9, err_msg=f)
+
+
+def test_state_refresh_matches_full_recompute(tmp_path):
+    frames = generate_market(n_stocks=6, n_days=260, seed=4)
+    head, frames = _split(frames, 5)
+    panel = Panel.from_frames(head)
+    state = IndicatorState([])
+    assert refresh_indicators(panel, state=state) == panel.n_rows
+
+    # 状态随面板一起落盘，逐日追加K线
+    path = tmp_path / "indicator_state.npz"
+    dates = sorted({d for df in frames.values() for d in df["date"].iloc[-5:]})
+    for date in dates:
+        state.save(path)
+        state = IndicatorState.load(path)
+        n_before = panel.n_rows
+        panel, first_new = panel.append({c: df[df["date"] <= date] for c, df in frames.items()})
+        computed = refresh_indicators(panel, first_new, state)
+        if date != dates[0]:
+            # 新股票已在首日重建状态，之后每只股票只递推新增的一行
+            assert computed == panel.n_rows - n_before
+
+    full = Panel.from_frames(frames)
+    refresh_indicators(full)
+    assert list(panel.codes) == list(full.codes)
+    _assert_fields_close(panel, full)
+    # KDJ 与 EMA 递推的运算顺序与内核相同，结果逐位一致
+    for f in ("K", "D", "ZXDQ"):
+        np.testing.assert_array_equal(panel.fields[f], full.fields[f])
+
+
+@pytest.mark.parametrize("freq, rule", [("W", "W-SUN"), ("M", "ME")])
+def test_resampled_panel_matches_pandas_and_updates_incrementally(freq, rule):
+    frames = generate_market(n_stocks=5, n_days=160, seed=6)
+    head, frames = _split(frames, 12)
+    panel = Panel.from_frames(head)
+    tf = resample_panel(panel, freq)
+
+    # 逐日追加：增量结果与全量聚合逐位一致
+    dates = sorted({d for df in frames.values() for d in df["date"].iloc[-12:]})
+    for date in dates:
+        panel, first_new = panel.append({c: df[df["date"] <= date] for c, df in frames.items()})
+        tf, _ = update_resampled(tf, panel, first_new, freq)
+    full = resample_panel(panel, freq)
+    np.testing.assert_array_equal(tf.offsets, full.offsets)
+    np.testing.assert_array_equal(tf.calendar[tf.date_idx], full.calendar[full.date_idx])
+    for f in tf.fields:
+        np.testing.assert_array_equal(tf.fields[f], full.fields[f])
+
+    agg = {"open": "first", "close": "last", "high": "max", "low": "min", "volume": "sum"}
+    for code, df in frames.items():
+        g = df.set_index("date")
+        ref = g[list(agg)].resample(rule).agg(agg).dropna()
+        ref.index = g.index.to_series().resample(rule).last().dropna()  # 以周期内最后一个交易日标记
+        got = tf.frame(code)
+        np.testing.assert_array_equal(got["date"].to_numpy(), ref.index.to_numpy())
+        for f in agg:
+            np.testing.assert_allclose(got[f].to_numpy(), ref[f].to_numpy(), rtol=1e-12)
+
+    # 对齐：每行日线（含最新交易日）取所在周期之前的最后一根，所在周期的K线不使用
+    rows = align_rows(panel, tf, freq)
+    tf_period = period_ids(tf.calendar[tf.date_idx], freq)
+    period = period_ids(panel.calendar[panel.date_idx], freq)
+    ok = rows >= 0
+    assert (tf_period[rows[ok]] < period[ok]).all() and (tf.row_code[rows[ok]] == panel.row_code[ok]).all()
+    # 取到的是最后一根：同一股票的下一根属于当前或之后的周期
+    nxt = rows[ok] + 1
+    has_next = nxt < tf.offsets[tf.row_code[rows[ok]] + 1]
+    assert (tf_period[nxt[has_next]] >= period[ok][has_next]).all()
+    # 只有首个周期之内看不到高周期K线
+    np.testing.assert_array_equal(ok, period > tf_period[tf.offsets[:-1]][panel.row_code])
+
+
+def test_stale_state_falls_back_to_full_recompute():
+    frames = generate_market(n_stocks=4, n_days=200, seed=5)
+    head, frames = _split(frames, 3)
+    panel = Panel.from_frames(head)
+    state = IndicatorState([])
+    refresh_indicators(panel, state=state)
+    state.count[0] -= 1                       # 状态与面板衔接不上
+
+    panel, first_new = panel.append(frames)
+    computed = refresh_indicators(panel, first_new, state)
+    lengths = np.diff(panel.offsets)
+    # 第 0 只与新上市的最后一只全量重算，其余只算新增 3 行
+    assert computed == lengths[0] + lengths[-1] + 3 * (len(lengths) - 2)
+
+    full = Panel.from_frames(frames)
+    refresh_indicators(full)
+    _assert_fields_close(panel, full)
+    np.testing.assert_array_equal(state.count, lengths)
+
+
+# ---------- 截面查询 ---------- #
+def _market_with_gaps():
+    frames = generate_market(n_stocks=40, n_days=150, seed=7)
+    for k, code in enumerate(frames):
+        if k % 5 == 0:                        # 部分股票停牌若干天 / 晚上市
+            df = frames[code]
+            frames[code] = df.drop(index=df.index[-4:-1] if k % 10 else df.index[:30])
+    return frames
+
+
+def test_cross_section_matches_per_code_lookup():
+    frames = _market_with_gaps()
+    panel = Panel.from_frames(frames)
+    refresh_indicators(panel)
+    groups = {c: "AB"[k % 2] for k, c in enumerate(frames) if k % 3}
+    cs = CrossSection(panel, groups=groups)
+
+    dates = sorted({d for df in frames.values() for d in df["date"]})
+    probe = [dates[0] - pd.Timedelta(days=1), dates[0], dates[20], dates[-3], None]
+    for date in probe:
+        got = cs.values("J", date)
+        for j, (code, df) in enumerate(frames.items()):
+            hist = df if date is None else df[df["date"] <= date]
+            exp = compute_kdj(hist)["J"].iloc[-1] if len(hist) else np.nan
+            np.testing.assert_allclose(got[j], exp, rtol=1e-12, atol=1e-12, equal_nan=True)
+
+        mask = got < 20
+        labels = pd.Series([groups.get(c, "未知") for c in frames])[mask]
+        ranked = cs.ranked_groups(mask)
+        exp = labels.value_counts()
+        assert list(ranked["group"]) == list(exp.index)
+        assert list(ranked["count"]) == list(exp)
+
+    # 区间一次取出，与逐日查询一致
+    hist_dates, hist = cs.history("J", dates[10], dates[40])
+    assert len(hist_dates) == 31
+    for d, row in zip(hist_dates, hist):
+        np.testing.assert_array_equal(row, cs.values("J", d))
+    counts = cs.group_counts(hist < 20)
+    np.testing.assert_array_equal(counts[5], cs.group_counts(hist[5] < 20))
+
+
+def test_sector_shift_history_matches_single_dates(tmp_path):
+    frames = _market_with_gaps()
+    for code, df in frames.items():
+        df.to_csv(tmp_path / f"{code}.csv", index=False)
+    pd.DataFrame({"ts_code": [f"{c}.SZ" for c in frames],
+                  "industry": ["银行", "医药", None, "电子"] * (len(frames) // 4)}
+                 ).to_csv(tmp_path / "stocklist.csv", index=False)
+    kwargs = dict(data_dir=tmp_path, stocklist_path=tmp_path / "stocklist.csv", j_threshold=20)
+    cs = SectorShift.build_j_cross_section(data_dir=tmp_path, stocklist_path=tmp_path / "stocklist.csv")
+
+    result = SectorShift.compute_j_industry_history(start_date="20200101", cross_section=cs, **kwargs)
+    assert len(result["history"]) == cs.panel.n_dates
+    for day in result["history"][::17]:
+        single = SectorShift.compute_j_industry_distribution(trade_date=day["trade_date"], **kwargs)
+        assert single["industry_counts"] == day["industry_counts"]
+        assert single["meta"]["selected_count"] == day["selected_count"]
+
+
+# ---------- 价格索引 ---------- #
+def test_price_index_matches_per_stock_scan(tmp_path):
+    frames = {c: df.round(2) for c, df in _market_with_gaps().items()}
+    index = PriceIndex.from_frames(frames)
+    index.save(tmp_path / "price_index.npz")
+    loaded = PriceIndex.load(tmp_path / "price_index.npz")
+
+    cases = [
+        (10.0, 0.05, "close", None, None),
+        (10.5, 0.0, "high", None, None),
+        (9.8, 0.3, "low", "2021-03-01", None),        # 只给开始日期即只查当天
+        (10.0, 0.5, "close", "2021-02-01", "2021-05-31"),
+        (1e6, 1.0, "close", None, None),
+    ]
+    hits = 0
+    for target, tol, field, start, end in cases:
+        exp = sorted(
+            (r for item in frames.items()
+             for r in price_finder.find_by_price_single_stock(item, target, field, start, end, tol)),
+            key=lambda x: (x[0], x[2]),
+        )
+        for ix in (index, loaded):
+            got = price_finder.find_by_price_concurrent(ix, target, field, start, end, tol)
+            assert got == exp
+        hits += len(exp)
+    assert hits > 0
+
+
+def test_price_index_file_rebuilt_when_data_changes(tmp_path):
+    data_dir, index_path = tmp_path / "data", str(tmp_path / "price_index.npz")
+    data_dir.mkdir()
+    for code, df in _market_with_gaps().items():
+        df.round(2).to_csv(data_dir / f"{code}.csv", index=False)
+    first = price_finder.load_price_index(data_dir, index_path)
+    assert first.source == price_finder.source_version(data_dir)
+    saved_at = Path(index_path).stat().st_mtime_ns
+    assert price_finder.load_price_index(data_dir, index_path).source == first.source
+    assert Path(index_path).stat().st_mtime_ns == saved_at        # 数据未变：直接加载，不重建
+
+    # 追加一根新K线：落盘的索引过期，重建后能查到新价格
+    fp = sorted(data_dir.glob("*.csv"))[0]
+    df = pd.read_csv(fp)
+    new_row = df.iloc[[-1]].assign(date="2030-01-02", close=12345.67)
+    pd.concat([df, new_row]).to_csv(fp, index=False)
+    rebuilt = price_finder.load_price_index(data_dir, index_path)
+    assert rebuilt.source != first.source
+    for ix in (rebuilt, PriceIndex.load(index_path)):
+        assert price_finder.find_by_price_concurrent(ix, 12345.67, "close", None, None, 0.0) == [
+            (fp.stem, 12345.67, "2030-01-02")
+        ]
+
+
+# ---------- 进程间共享 ---------- #
+def _shared_checksum(name, code):
+    panel = attach_panel(name)
+    assert attach_panel(name) is panel                    # 同一进程内按名字复用
+    assert isinstance(panel.fields["close"], np.memmap)   # 映射而非复制
+    return float(panel.series(code, "close").sum()), panel.frame(code).shape
+
+
+def test_shared_panel_attach_and_release(tmp_path):
+    panel = Panel.from_frames(_market_with_gaps())
+    refresh_indicators(panel)
+    codes = list(panel.codes[:4])
+    with SharedPanel(panel, fields=("close", "J")) as shared:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            got = list(executor.map(_shared_checksum, [shared.name] * len(codes), codes))
+        for code, (total, shape) in zip(codes, got):
+            assert total == panel.series(code, "close").sum()
+            assert shape == (len(panel.series(code, "close")), 3)
+        attached = attach_panel(shared.name)
+        np.testing.assert_array_equal(attached.fields["J"], panel.fields["J"])
+        np.testing.assert_array_equal(attached.calendar, panel.calendar)
+        assert not attached.fields["J"].flags.writeable
+    assert shared.closed and not Path(shared.name).exists()
+    with pytest.raises(FileNotFoundError):
+        attach_panel(shared.name + "-missing")
+
+
+# ---------- 紧凑存储 ---------- #
+def test_compact_panel_keeps_float64_indicators():
+    frames = generate_market(n_stocks=5, n_days=240, seed=9)
+    head, frames = _split(frames, 2)
+    full = Panel.from_frames(frames)
+    refresh_indicators(full)
+
+    panel = Panel.from_frames(head, dtype=np.float32)
+    assert panel.memory_usage()["close"] * 2 == Panel.from_frames(head).memory_usage()["close"]
+    state = IndicatorState([])
+    refresh_indicators(panel, state=state)
+    panel, first_new = panel.append(frames)
+    refresh_indicators(panel, first_new, state)
+    assert panel.fields["close"].dtype == np.float32 and panel.fields["J"].dtype == np.float64
+    # 只有输入的 float32 舍入误差，计算过程不损失精度
+    for f in INDICATOR_FIELDS:
+        np.testing.assert_allclose(panel.fields[f], full.fields[f], rtol=1e-5, atol=1e-3, err_msg=f)
+
+    compact = full.compact()
+    assert compact.fields["K"] is full.fields["K"]
+    assert compact.memory_usage()["total"] < full.memory_usage()["total"]
+
+
+def test_compact_frames_and_categories():
+    frames = generate_market(n_stocks=3, n_days=100, seed=2)
+    small = {c: compact_frame(df) for c, df in frames.items()}
+    assert all(df["volume"].dtype == np.float32 for df in small.values())
+    assert frames_nbytes(small) < frames_nbytes(frames)
+    sl = pd.DataFrame({"code": ["000001", "000002", "000003"], "industry": ["银行", "银行", "电子"]})
+    cat = categorize(sl, ["industry", "market"])
+    assert cat["industry"].dtype == "category" and cat["code"].dtype == object
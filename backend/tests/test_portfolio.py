@@ -0,0 +1,106 @@
+"""测试组合回测引擎"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backtest import run_portfolio_backtest
+from panel import Panel
+
+
+def _make_panel():
+    dates = pd.bdate_range("2024-01-01", periods=6)
+    prices = {
+        "000001": [10, 11, 12, 13, 14, 15],
+        "000002": [20, 20, 18, 16, 16, 16],
+        "000003": [5, 5, 5, 5, 5, 5],
+    }
+    frames = {}
+    for code, close in prices.items():
+        close = np.asarray(close, dtype=float)
+        frames[code] = pd.DataFrame({
+            "date": dates, "open": close, "close": close,
+            "high": close, "low": close, "volume": np.full(6, 1e6),
+        })
+    # 000003 第 3 天停牌
+    frames["000003"] = frames["000003"].drop(index=2).reset_index(drop=True)
+    return Panel.from_frames(frames), dates
+
+
+def test_panel_dense_and_roundtrip(tmp_path):
+    panel, dates = _make_panel()
+    close = panel.dense("close")
+    assert close.shape == (6, 3)
+    assert np.isnan(close[2, 2])
+    assert panel.dense("close", ffill=True)[2, 2] == 5
+
+    path = tmp_path / "panel.npz"
+    panel.save(path)
+    loaded = Panel.load(path)
+    pd.testing.assert_frame_equal(loaded.frame("000003"), panel.frame("000003"))
+
+
+def test_shared_cash_and_ranking():
+    panel, dates = _make_panel()
+    signals = pd.DataFrame({
+        "date": [dates[0]] * 3,
+        "stock_code": ["000001", "000002", "000003"],
+        "score": [3.0, 2.0, 1.0],
+    })
+    result = run_portfolio_backtest(
+        panel, signals, initial_cash=100_000, commission=0.0,
+        max_positions=2, max_hold_days=2,
+    )
+    trades = result["trades"]
+    # 仓位上限为 2，得分最低的 000003 不应买入
+    assert sorted(trades["stock_code"]) == ["000001", "000002"]
+    assert (trades["reason"] == "max_hold_days").all()
+    assert (trades["exit_date"] == dates[2]).all()
+
+    # 每仓 5 万：000001 买 5000 股 10→12，000002 买 2500 股 20→18
+    profit = trades.set_index("stock_code")["profit"]
+    assert profit["000001"] == 5000 * 2
+    assert profit["000002"] == 2500 * -2
+    final = result["statistics"]["final_value"]
+    assert final == 100_000 + 10_000 - 5_000
+    assert result["equity_curve"]["positions"].tolist() == [2, 2, 0, 0, 0, 0]
+
+
+def test_stop_loss_and_suspension():
+    panel, dates = _make_panel()
+    signals = pd.DataFrame({"date": [dates[0], dates[1]], "stock_code": ["000002", "000003"]})
+    result = run_portfolio_backtest(
+        panel, signals, initial_cash=100_000, commission=0.0,
+        max_positions=2, stop_loss=0.15, rank_by=None,
+    )
+    trades = result["trades"]
+    assert trades["stock_code"].tolist() == ["000002"]
+    assert trades["reason"].iloc[0] == "stop_loss"
+    assert trades["exit_date"].iloc[0] == dates[3]
+    assert result["statistics"]["open_positions"] == ["000003"]
+
+
+def test_unaffordable_candidate_is_skipped():
+    dates = pd.bdate_range("2024-01-01", periods=3)
+    frames = {
+        code: pd.DataFrame({"date": dates, "open": close, "close": close, "high": close, "low": close,
+                            "volume": np.full(3, 1e6)})
+        for code, close in (("000001", [10.0, 11.0, 11.0]), ("000004", [20.0] * 3), ("000005", [300.0] * 3))
+    }
+    signals = pd.DataFrame({
+        "date": [dates[0], dates[1], dates[1]],
+        "stock_code": ["000001", "000004", "000005"],
+        "score": [3.0, 2.0, 1.0],
+    })
+    result = run_portfolio_backtest(
+        Panel.from_frames(frames), signals, initial_cash=100_000, commission=0.0, max_positions=2,
+    )
+    # 第 2 天每仓目标 (5 万现金 + 5.5 万市值) / 2 = 5.25 万：排名靠前的 000004 需 2600 股 × 20 = 5.2 万，
+    # 超过剩余现金而跳过，不占用现金；排在后面的 000005 买 100 股 × 300 = 3 万补上空余仓位
+    assert result["statistics"]["open_positions"] == ["000001", "000005"]
+    assert result["equity_curve"]["cash"].tolist() == [50_000, 20_000, 20_000]
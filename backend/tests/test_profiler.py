@@ -0,0 +1,71 @@
+"""测试 Selector 过滤阶段剖析"""
+
+import json
+import sys
+from pathlib import Path
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from benchmarks import generate_market
+from screening.profiler import PROFILER
+from Selector import BBIKDJSelector, BigBullishVolumeSelector
+
+
+def test_profiler_counts_and_picks_unchanged(tmp_path):
+    data = generate_market(n_stocks=30, n_days=260, seed=3)
+    date = max(df["date"].iloc[-1] for df in data.values())
+    selectors = {"少妇战法": BBIKDJSelector(j_threshold=15), "长阳": BigBullishVolumeSelector()}
+
+    baseline = {alias: sel.select(date, data) for alias, sel in selectors.items()}
+    for sel in selectors.values():
+        sel.prescreen.enabled = False  # 让全部股票走逐股过滤
+
+    PROFILER.reset()
+    PROFILER.enable()
+    try:
+        for alias, sel in selectors.items():
+            with PROFILER.selector(alias, type(sel).__name__):
+                assert sel.select(date, data) == baseline[alias]
+    finally:
+        PROFILER.disable()
+
+    summary = {s["selector"]: s for s in PROFILER.summary()}
+    assert set(summary) == set(selectors)
+    for alias, s in summary.items():
+        assert s["accepted"] == len(baseline[alias])
+        assert s["select_calls"] == 1 and s["select_seconds"] >= s["filter_seconds"] > 0
+        rejected = sum(st["rejected"] for st in s["stages"])
+        assert rejected + s["accepted"] == s["calls"]
+        for st in s["stages"]:
+            assert st["passed"] + st["rejected"] == st["reached"]
+
+    stages = [st["stage"] for st in summary["少妇战法"]["stages"]]
+    assert stages[:3] == ["day_constraints", "price_range", "compute_bbi"]
+
+    out = tmp_path / "profile.json"
+    PROFILER.dump_json(out)
+    assert json.loads(out.read_text(encoding="utf-8"))[0]["stages"]
+    assert "day_constraints" in PROFILER.format_summary()
+
+    # 前置过滤按阶段单独汇总
+    PROFILER.reset()
+    PROFILER.enable()
+    try:
+        sel = selectors["少妇战法"]
+        sel.prescreen.enabled = True
+        with PROFILER.selector("少妇战法", "BBIKDJSelector"):
+            assert sel.select(date, data) == baseline["少妇战法"]
+    finally:
+        PROFILER.disable()
+    s = PROFILER.summary()[0]
+    pre = s["prescreen"]
+    assert pre[0]["reached"] == len(data)
+    assert pre[-1]["passed"] == s["calls"]
+    assert "pre:day_constraints" in PROFILER.format_summary()
+
+    # 关闭后不再计数
+    PROFILER.reset()
+    selectors["长阳"].select(date, data)
+    assert PROFILER.summary() == []
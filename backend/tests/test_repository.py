@@ -0,0 +1,81 @@
+"""测试结果仓库"""
+
+import sys
+import time
+from pathlib import Path
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from repository import AsyncResultsWriter, ResultsRepository
+
+
+def _fake_results(n_stocks, n_trades):
+    results = []
+    for i in range(n_stocks):
+        trades = []
+        for j in range(n_trades):
+            trades.append({
+                "trade_type": "buy" if j % 2 == 0 else "sell",
+                "trade_date": f"2025-01-{j + 1:02d}",
+                "trade_price": 10.0 + j,
+                "trade_quantity": 100,
+                "profit_loss": None if j % 2 == 0 else 12.5,
+            })
+        results.append({
+            "stock_code": f"{i:06d}",
+            "status": "success",
+            "initial_cash": 500000,
+            "final_value": 510000.0,
+            "return_rate": 2.0,
+            "total_return": 2.0,
+            "annual_return": 3.1,
+            "sharpe_ratio": 0.8,
+            "max_drawdown": 5.2,
+            "win_rate": 50.0,
+            "profit_loss_ratio": float("inf"),
+            "total_trades": n_trades // 2,
+            "winning_trades": 1,
+            "losing_trades": n_trades // 2 - 1,
+            "trades": trades,
+        })
+    return results
+
+
+def test_backtest_results_bulk_insert(tmp_path):
+    repo = ResultsRepository(f"sqlite:///{tmp_path / 'results.db'}")
+    execution_id = repo.start_execution("batch_backtest", "batch_backtest")
+
+    start = time.perf_counter()
+    ids = repo.save_backtest_results(execution_id, _fake_results(5000, 10))
+    elapsed = time.perf_counter() - start
+    repo.finish_execution(execution_id)
+
+    q = repo.backend.query
+    assert len(ids) == 5000
+    assert q("SELECT COUNT(*) FROM backtest_results")[0][0] == 5000
+    assert q("SELECT COUNT(*) FROM trade_details")[0][0] == 50000
+    # 交易明细关联到正确的回测结果
+    code = q("SELECT stock_code FROM backtest_results WHERE id = ?", (ids[1234],))[0][0]
+    assert code == "001234"
+    assert q("SELECT COUNT(*) FROM trade_details WHERE result_id = ? AND stock_code = ?", (ids[1234], code))[0][0] == 10
+    # inf 记为 NULL，其余字段进入 extra_data
+    pl, extra = q("SELECT profit_loss_ratio, extra_data FROM backtest_results WHERE id = ?", (ids[0],))[0]
+    assert pl is None and '"final_value": 510000.0' in extra and "total_return" not in extra
+    assert q("SELECT status, progress FROM task_executions")[0] == ("completed", 100)
+    # 55000 行批量写入约 0.5 秒；退化为逐行提交会超出
+    assert elapsed < 1
+    repo.close()
+
+
+def test_async_writer_selection(tmp_path):
+    with AsyncResultsWriter(str(tmp_path / "results.db")) as writer:
+        execution_id = writer.start_execution("select_stock", "stock_selection").result()
+        writer.save_selection_results(execution_id, ["000001", "600000"], match_reasons=["少妇战法"])
+        writer.save_selection_results(execution_id, [{"stock_code": "000002", "match_score": 88.5}])
+        writer.flush()
+        rows = writer.repository.backend.query(
+            "SELECT stock_code, match_score, match_reasons FROM stock_selection_results ORDER BY id"
+        )
+    assert rows[0] == ("000001", None, '["少妇战法"]')
+    assert rows[2][:2] == ("000002", 88.5)
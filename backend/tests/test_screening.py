@@ -0,0 +1,188 @@
+"""测试全市场前置过滤与基于代价的过滤流水线"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from benchmarks import generate_market
+from jobs.manager import ProgressReporter
+from jobs.tasks import run_selection_chunk
+from screening import (
+    FilterPipeline,
+    MarketWindow,
+    SelectionCache,
+    Stage,
+    data_versions,
+    prescreens,
+    run_cached,
+    selector_key,
+)
+import Selector
+
+B1_PARAMS = dict(j_threshold=15, bbi_min_window=20, max_window=120, price_range_pct=1,
+                 bbi_q_threshold=0.2, j_q_threshold=0.10)
+
+SELECTORS = {
+    "BBIKDJSelector": B1_PARAMS,
+    "PeakKDJSelector": dict(j_threshold=30, max_window=100, fluc_threshold=0.05,
+                            gap_threshold=0.01, j_q_threshold=0.2),
+    "BBIShortLongSelector": dict(m=5, bbi_min_window=2, max_window=60, bbi_q_threshold=0.3),
+    "MA60CrossVolumeWaveSelector": dict(lookback_n=25, vol_multiple=1.0, j_threshold=30,
+                                        j_q_threshold=0.3, max_window=120),
+    "BigBullishVolumeSelector": dict(up_pct_threshold=0.03, upper_wick_pct_max=0.02, vol_multiple=1.2),
+    "SuperB1Selector": dict(lookback_n=5, close_vol_pct=0.05, price_drop_pct=0.01, j_threshold=20,
+                            j_q_threshold=0.3, B1_params=B1_PARAMS),
+}
+
+
+def _market():
+    data = generate_market(n_stocks=60, n_days=320, seed=11)
+    dates = sorted({d for df in data.values() for d in df["date"].iloc[-5:]})[-3:]
+    return data, dates
+
+
+def test_prescreen_picks_identical():
+    data, dates = _market()
+    total = 0
+    for name, params in SELECTORS.items():
+        sel = getattr(Selector, name)(**params)
+        for date in dates:
+            sel.prescreen.enabled = True
+            fast = sel.select(date, data)
+            sel.prescreen.enabled = False
+            slow = sel.select(date, data)
+            assert fast == slow, (name, date)
+            total += len(slow)
+    assert total > 0
+
+
+def test_market_window_matches_boolean_slice():
+    data, dates = _market()
+    # 打乱一只股票的行顺序，走布尔筛选的兜底路径
+    code = next(iter(data))
+    data[code] = data[code].sample(frac=1.0, random_state=0)
+    mw = MarketWindow.build(data, dates[0], window=50, min_len=30)
+    for r, c in enumerate(mw.codes):
+        expected = data[c][data[c]["date"] <= dates[0]].tail(50)
+        pd.testing.assert_frame_equal(mw.hist(r), expected)
+        n = len(expected)
+        np.testing.assert_array_equal(mw.field("close")[r, 50 - n:], expected["close"].to_numpy())
+        assert np.isnan(mw.field("close")[r, :50 - n]).all()
+
+
+def test_kdj_prescreen_never_drops_exact_pass():
+    data, dates = _market()
+    mw = MarketWindow.build(data, dates[-1], window=140)
+    rows = np.arange(len(mw))
+    for q in (0.1, 0.5):
+        keep = prescreens.kdj_j(mw, rows, j_threshold=10, j_q_threshold=q, q_window=120)
+        for r in rows:
+            kdj = Selector.compute_kdj(mw.hist(r))
+            j = kdj["J"].to_numpy()
+            exact = j[-1] < 10 or j[-1] <= np.quantile(j[-120:], q)
+            assert keep[r] or not exact
+        assert not keep.all()
+
+
+def test_pipeline_orders_by_cost_and_learns_pass_rate():
+    data, dates = _market()
+    mw = MarketWindow.build(data, dates[-1], window=10)
+    calls = []
+
+    def everything(mw, rows):
+        calls.append(("everything", len(rows)))
+        return np.ones(len(rows), dtype=bool)
+
+    def half(mw, rows):
+        calls.append(("half", len(rows)))
+        return rows % 2 == 0
+
+    pipeline = FilterPipeline([
+        Stage("everything", everything, cost=1, pass_rate=0.99),
+        Stage("half", half, cost=2, pass_rate=0.5),
+    ])
+    assert [s.name for s in pipeline.ordered()] == ["half", "everything"]
+    rows = pipeline.run(mw)
+    assert calls == [("half", len(mw)), ("everything", len(rows))]
+    np.testing.assert_array_equal(rows, np.arange(0, len(mw), 2))
+    assert pipeline.stages[0].pass_rate == 0.995
+
+
+def test_selection_cache_recomputes_only_changed_codes(tmp_path):
+    data = generate_market(n_stocks=20, n_days=260, seed=12)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for code, df in data.items():
+        df.assign(date=df["date"].dt.strftime("%Y-%m-%d")).to_csv(data_dir / f"{code}.csv", index=False)
+    date = max(df["date"].iloc[-1] for df in data.values())
+    cfgs = [{"class": cls, "alias": cls, "params": params} for cls, params in SELECTORS.items()]
+    calls = []
+
+    def compute(codes, pending):
+        calls.append((list(codes), [c["alias"] for c in pending]))
+        frames = {c: pd.read_csv(data_dir / f"{c}.csv", parse_dates=["date"]) for c in codes}
+        return {c["alias"]: getattr(Selector, c["class"])(**c["params"]).select(date, frames) for c in pending}
+
+    def run():
+        return run_cached(cache, cfgs, date, data_versions(data_dir, data), compute)
+
+    cache = SelectionCache(tmp_path / "cache")
+    first = run()
+    expected = {c["alias"]: sorted(getattr(Selector, c["class"])(**c["params"]).select(date, data)) for c in cfgs}
+    assert first == expected and len(calls) == 1
+
+    # 行情与配置都没变：不调用 compute；原样重写文件仍然命中
+    codes = sorted(data)
+    (data_dir / f"{codes[0]}.csv").write_bytes((data_dir / f"{codes[0]}.csv").read_bytes())
+    assert run() == first and len(calls) == 1
+
+    # 两只股票的最后一根被改写：只重算这两只，结果与全部重算一致
+    for code in codes[:2]:
+        df = pd.read_csv(data_dir / f"{code}.csv")
+        df.loc[df.index[-1], "close"] *= 1.05
+        df.to_csv(data_dir / f"{code}.csv", index=False)
+    second = run()
+    assert calls[-1] == (codes[:2], list(SELECTORS))
+    assert second == compute(codes, cfgs)
+
+    # 窗口内较早的一根被修正（文件大小不变）：同样只重算这一只
+    df = pd.read_csv(data_dir / f"{codes[2]}.csv", dtype={"close": str})
+    df.loc[df.index[-150], "close"] = df.loc[df.index[-150], "close"][::-1]
+    df.to_csv(data_dir / f"{codes[2]}.csv", index=False)
+    run()
+    assert calls[-1] == ([codes[2]], list(SELECTORS))
+
+    # 键包含选股相关源文件（指标库、前置过滤、表达式引擎等）的哈希
+    assert selector_key(cfgs[0]) != selector_key(cfgs[0], modules=("Selector",))
+
+    # 参数变化只让该配置失效；多个执行单元各写一个 part，compact 后结果不变
+    cfgs[0] = dict(cfgs[0], params=dict(B1_PARAMS, j_threshold=20))
+    before = {p.parent.parent.name for p in cache.root.glob("*/*/part-*.json")}
+    picks = {}
+    for part in (codes[:10], codes[10:]):
+        got = run_selection_chunk(ProgressReporter(), part, str(data_dir), cfgs, str(date.date()),
+                                  cache_dir=str(cache.root))
+        for alias, chosen in got.items():
+            picks.setdefault(alias, []).extend(chosen)
+    touched = {p.parent.parent.name for p in cache.root.glob("*/*/part-*.json")} - before
+    assert len(touched) == 1 and next(iter(touched)).startswith("BBIKDJSelector-")
+    assert cache.compact() == len(SELECTORS) + 1  # 各配置都有多个 part
+    n_calls = len(calls)
+    assert run() == {alias: sorted(v) for alias, v in picks.items()} and len(calls) == n_calls
+
+    # 只保留最近的交易日：更早交易日的目录与只剩旧交易日的键一并删除
+    stale = cache.root / "BBIKDJSelector-old" / "2020-01-02"
+    stale.mkdir(parents=True)
+    (stale / "part-0.json").write_text("{}", encoding="utf-8")
+    assert cache.prune(keep_days=1) == 1
+    assert not stale.parent.exists() and {p.name for p in cache.root.glob("*/*")} == {str(date.date())}
+    assert run() == {alias: sorted(v) for alias, v in picks.items()} and len(calls) == n_calls
+    with pytest.raises(ValueError):
+        cache.prune(keep_days=0)
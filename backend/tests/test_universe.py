@@ -0,0 +1,74 @@
+"""测试股票池位图与集合运算"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加backend目录到Python搜索路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fetcher.processor import load_codes_from_stocklist
+from fetcher.utils import _filter_by_boards_stocklist
+from jobs.tasks import list_codes
+from universe import Universe
+
+
+def _stocklist():
+    return pd.DataFrame({
+        "ts_code": ["000001.SZ", "300750.SZ", "688981.SH", "830799.BJ", "000858.SZ",
+                    "600048.SH", "920001.BJ", "000001.SZ", "900901.SH"],
+        "symbol": ["000001", "300750", "688981", "830799", "000858",
+                   "600048", "920001", "000001", "900901"],
+        "industry": ["银行", "电气设备", "半导体", "化工", "白酒", "全国地产", "化工", "银行", None],
+    })
+
+
+def test_boards_and_set_algebra():
+    u = Universe.from_stocklist(_stocklist())
+    assert u.codes.tolist() == ["000001", "300750", "688981", "830799", "000858", "600048", "920001", "900901"]
+    assert u.board("gem").codes() == ["300750"]
+    assert u.board("bj").codes() == ["830799", "920001"]
+    assert u.board("b").codes() == ["900901"]
+
+    pool = u.exclude_boards({"gem", "star", "bj", "b"})
+    assert pool.codes() == ["000001", "000858", "600048"]
+    assert len(pool) == 3 and "000858" in pool and 858 in pool and "300750" not in pool
+    assert (~pool | pool) == u.all and (pool & ~pool) == u.empty
+    assert len(~pool) == len(u) - 3
+    assert (pool ^ u.board("main")) == u.empty
+
+    realty = u.industry_matching("地产", "银")
+    assert realty.codes() == ["000001", "600048"]
+    assert (pool - realty).codes() == ["000858"]
+    assert u.industry("化工").codes() == ["830799", "920001"]
+    assert u.industry_of("900901") == "" and "900901" not in u.industry_matching("")
+
+    np.testing.assert_array_equal(pool.align(["600048", "999999", "000001", 1]), [True, False, True, True])
+    assert u.select(["000858", "123456"]).codes() == ["000858"]
+    with pytest.raises(ValueError):
+        pool & Universe.from_codes(["000001"]).all
+    with pytest.raises(ValueError):
+        u.board("nasdaq")
+
+
+def test_board_filter_keeps_leading_zero_codes(tmp_path):
+    # pd.read_csv 默认把 symbol 读成整数：000858 会变成 "858" 而被误判为北交所
+    path = tmp_path / "stocklist.csv"
+    _stocklist().to_csv(path, index=False)
+    codes = load_codes_from_stocklist(path, {"gem", "star", "bj"})
+    assert codes == ["000001", "000858", "600048", "900901"]
+
+    df = pd.read_csv(path)
+    kept = _filter_by_boards_stocklist(df, {"bj"})
+    assert kept["symbol"].tolist() == [1, 300750, 688981, 858, 600048, 1, 900901]
+
+
+def test_list_codes_excludes_bj_and_b_shares(tmp_path):
+    for code in ("000001", "430047", "600000", "830799", "900901", "200002", "688001"):
+        (tmp_path / f"{code}.csv").write_text("date,open,close,high,low,volume\n")
+    assert list_codes(str(tmp_path)) == ["000001", "600000", "688001"]
+    assert list_codes(str(tmp_path), exclude_boards=()) == sorted(
+        ["000001", "430047", "600000", "830799", "900901", "200002", "688001"])
@@ -0,0 +1,4 @@
+"""股票池：板块 / 行业 / 关键词位图与集合运算"""
+from .universe import BOARDS, CodeSet, Universe, board_of, normalize_code
+
+__all__ = ["BOARDS", "CodeSet", "Universe", "board_of", "normalize_code"]
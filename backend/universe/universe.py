@@ -0,0 +1,282 @@
+"""
+股票池位图
+
+由 stocklist.csv（或一组代码）一次性建好全体股票的位图：板块、行业、行业关键词匹配
+都是定长的 bit 数组，股票池的交、并、差、补只是几次按字节的位运算。
+
+    universe = Universe.from_stocklist("stocklist.csv")
+    pool = universe.exclude_boards({"gem", "star", "bj"}) - universe.industry_matching("地产")
+    pool.codes()                      # 代码列表（保持 stocklist 中的顺序）
+    "600000" in pool                  # O(1) 判断
+    pool.align(panel.codes)           # 任意顺序的代码 -> 布尔掩码
+
+板块按代码前缀划分（与 fetch_kline 的 exclude_boards 口径一致）：
+- gem  : 创业板 300/301
+- star : 科创板 688
+- bj   : 北交所（ts_code 为 .BJ，或 4/8/92 开头）
+- b    : B 股 200/900
+- main : 其余沪深主板
+"""
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+BOARDS = ("main", "gem", "star", "bj", "b")
+_BOARD_PREFIXES = {
+    "bj": ("4", "8", "92"),
+    "gem": ("300", "301"),
+    "star": ("688",),
+    "b": ("200", "900"),
+}
+_CODE_RE = re.compile(r"(\d{6})")
+
+
+def normalize_code(code) -> Optional[str]:
+    """提取 6 位代码：'000001.SZ' / 'sz000001' / 1 -> '000001'；无法解析返回 None"""
+    if code is None or (isinstance(code, float) and np.isnan(code)):
+        return None
+    s = str(code).strip()
+    if s.isdigit() and len(s) <= 6:
+        return s.zfill(6)
+    m = _CODE_RE.search(s)
+    return m.group(1) if m else None
+
+
+def board_of(code: str, ts_code: Optional[str] = None) -> str:
+    """单只股票所属板块（见模块说明）"""
+    if (ts_code or "").upper().endswith(".BJ"):
+        return "bj"
+    for board, prefixes in _BOARD_PREFIXES.items():
+        if code.startswith(prefixes):
+            return board
+    return "main"
+
+
+class CodeSet:
+    """
+    Universe 上的一个子集（bit 数组，按字节打包）
+
+    支持 & | - ^ ~ 与 len / in / 迭代；参与运算的两个集合须来自同一个 Universe。
+    """
+
+    __slots__ = ("universe", "bits")
+
+    def __init__(self, universe: "Universe", bits: np.ndarray):
+        self.universe = universe
+        self.bits = bits
+
+    @classmethod
+    def from_mask(cls, universe: "Universe", mask: np.ndarray) -> "CodeSet":
+        return cls(universe, np.packbits(np.asarray(mask, dtype=bool), bitorder="little"))
+
+    # ---------- 集合运算 ---------- #
+    def _check(self, other: "CodeSet") -> None:
+        if not isinstance(other, CodeSet) or other.universe is not self.universe:
+            raise ValueError("只能与同一 Universe 上的 CodeSet 运算")
+
+    def __and__(self, other: "CodeSet") -> "CodeSet":
+        self._check(other)
+        return CodeSet(self.universe, self.bits & other.bits)
+
+    def __or__(self, other: "CodeSet") -> "CodeSet":
+        self._check(other)
+        return CodeSet(self.universe, self.bits | other.bits)
+
+    def __sub__(self, other: "CodeSet") -> "CodeSet":
+        self._check(other)
+        return CodeSet(self.universe, self.bits & ~other.bits)
+
+    def __xor__(self, other: "CodeSet") -> "CodeSet":
+        self._check(other)
+        return CodeSet(self.universe, self.bits ^ other.bits)
+
+    def __invert__(self) -> "CodeSet":
+        # 补集不含末字节的填充位
+        return CodeSet(self.universe, ~self.bits & self.universe.all.bits)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CodeSet) and other.universe is self.universe and np.array_equal(self.bits, other.bits)
+
+    __hash__ = None
+
+    # ---------- 查询 ---------- #
+    def mask(self) -> np.ndarray:
+        """按 universe.codes 顺序的布尔数组"""
+        return np.unpackbits(self.bits, count=len(self.universe), bitorder="little").astype(bool)
+
+    def __len__(self) -> int:
+        return int(np.unpackbits(self.bits).sum())
+
+    def __bool__(self) -> bool:
+        return bool(self.bits.any())
+
+    def __contains__(self, code) -> bool:
+        i = self.universe.index(code)
+        return i >= 0 and bool((self.bits[i >> 3] >> (i & 7)) & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes())
+
+    def codes(self) -> List[str]:
+        return self.universe.codes[self.mask()].tolist()
+
+    def align(self, codes: Iterable) -> np.ndarray:
+        """任意顺序的一组代码是否属于本集合（不在 Universe 中的为 False）"""
+        pos = self.universe.positions(codes)
+        hit = pos >= 0
+        out = np.zeros(len(pos), dtype=bool)
+        out[hit] = self.mask()[pos[hit]]
+        return out
+
+    def __repr__(self) -> str:
+        return f"CodeSet({len(self)}/{len(self.universe)})"
+
+
+class Universe:
+    """
+    全体股票及其板块 / 行业位图
+
+    codes 为 6 位代码（重复的只保留第一次出现）；ts_codes 用于识别北交所，缺省按代码前缀；
+    industries 为各股票的行业，缺失记为空串（不属于任何行业）。
+    """
+
+    def __init__(
+        self,
+        codes: Iterable,
+        ts_codes: Optional[Iterable] = None,
+        industries: Optional[Iterable] = None,
+    ):
+        codes = [normalize_code(c) for c in codes]
+        n_in = len(codes)
+        ts_codes = list(ts_codes) if ts_codes is not None else [None] * n_in
+        industries = list(industries) if industries is not None else [None] * n_in
+
+        keep: Dict[str, int] = {}
+        for i, c in enumerate(codes):
+            if c is not None and c not in keep:
+                keep[c] = i
+        rows = list(keep.values())
+        self.codes: np.ndarray = np.array(list(keep), dtype="<U6")
+        self._pos = {c: i for i, c in enumerate(self.codes.tolist())}
+
+        # 行业：编码为 行业号，各行业一个位图
+        labels = [industries[i] if isinstance(industries[i], str) else "" for i in rows]
+        names, ids = np.unique(np.asarray(labels, dtype=str), return_inverse=True) if rows else (
+            np.array([], dtype=str), np.array([], dtype=np.int64))
+        self.industry_names: np.ndarray = names
+        self.industry_ids: np.ndarray = ids.astype(np.int64)
+        self._industries = {
+            name: CodeSet.from_mask(self, self.industry_ids == k)
+            for k, name in enumerate(names.tolist()) if name
+        }
+        self._keywords: Dict[str, CodeSet] = {}
+
+        self.all = CodeSet.from_mask(self, np.ones(len(self.codes), dtype=bool))
+        self.empty = CodeSet.from_mask(self, np.zeros(len(self.codes), dtype=bool))
+        boards = np.array([board_of(c, ts_codes[i] if isinstance(ts_codes[i], str) else None)
+                           for c, i in zip(self.codes.tolist(), rows)], dtype=object)
+        self._boards = {b: CodeSet.from_mask(self, boards == b) for b in BOARDS}
+
+    # ---------- 构造 ---------- #
+    @classmethod
+    def from_codes(cls, codes: Iterable) -> "Universe":
+        """只有代码时按前缀划分板块，没有行业信息"""
+        return cls(codes)
+
+    @classmethod
+    def from_data_dir(cls, data_dir: Union[str, Path]) -> "Universe":
+        """行情目录下的 {code}.csv（按代码排序）"""
+        return cls(sorted(f.stem for f in Path(data_dir).glob("*.csv") if f.stem.isdigit()))
+
+    @classmethod
+    def from_stocklist(cls, stocklist: Union[str, Path, pd.DataFrame]) -> "Universe":
+        """
+        由 stocklist.csv（或已读取的 DataFrame）构造
+
+        代码取 symbol / ts_code / code 列中第一个存在的；行业取 industry / 行业 列（可缺失）。
+        """
+        if isinstance(stocklist, pd.DataFrame):
+            df = stocklist
+        else:
+            path = Path(stocklist)
+            if not path.exists():
+                raise FileNotFoundError(f"stocklist.csv 不存在：{path}")
+            df = pd.read_csv(path, dtype=str)
+        code_col = next((c for c in ("symbol", "ts_code", "code") if c in df.columns), None)
+        if code_col is None:
+            raise ValueError("stocklist.csv 缺少代码列（需要 symbol / ts_code / code）")
+        industry_col = next((c for c in ("industry", "行业") if c in df.columns), None)
+        return cls(
+            df[code_col].tolist(),
+            ts_codes=df["ts_code"].tolist() if "ts_code" in df.columns else None,
+            industries=df[industry_col].tolist() if industry_col else None,
+        )
+
+    # ---------- 基本属性 ---------- #
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code) -> bool:
+        return self.index(code) >= 0
+
+    def index(self, code) -> int:
+        """代码在 codes 中的位置，不存在为 -1"""
+        pos = self._pos.get(code) if isinstance(code, str) else None
+        return pos if pos is not None else self._pos.get(normalize_code(code), -1)
+
+    def positions(self, codes: Iterable) -> np.ndarray:
+        return np.array([self.index(c) for c in codes], dtype=np.int64)
+
+    @property
+    def has_industries(self) -> bool:
+        return bool(self._industries)
+
+    def industry_of(self, code) -> str:
+        i = self.index(code)
+        return str(self.industry_names[self.industry_ids[i]]) if i >= 0 else ""
+
+    def industry_map(self) -> Dict[str, str]:
+        """代码 -> 行业（只含有行业的股票）"""
+        labels = self.industry_names[self.industry_ids] if len(self) else np.array([], dtype=str)
+        return {c: s for c, s in zip(self.codes.tolist(), labels.tolist()) if s}
+
+    # ---------- 子集 ---------- #
+    def board(self, *boards: str) -> CodeSet:
+        """若干板块的并集"""
+        out = self.empty
+        for b in boards:
+            if b not in self._boards:
+                raise ValueError(f"未知板块 {b!r}，可选：{', '.join(BOARDS)}")
+            out = out | self._boards[b]
+        return out
+
+    def exclude_boards(self, boards: Iterable[str]) -> CodeSet:
+        return self.all - self.board(*boards)
+
+    def industry(self, *names: str) -> CodeSet:
+        """若干行业（精确名称）的并集；不存在的行业为空"""
+        out = self.empty
+        for name in names:
+            out = out | self._industries.get(name, self.empty)
+        return out
+
+    def industry_matching(self, *keywords: str) -> CodeSet:
+        """行业名包含任一关键词的股票（每个关键词只在行业名上匹配一次并缓存）"""
+        out = self.empty
+        for kw in keywords:
+            hit = self._keywords.get(kw)
+            if hit is None:
+                hit = self.industry(*(name for name in self._industries if kw in name))
+                self._keywords[kw] = hit
+            out = out | hit
+        return out
+
+    def select(self, codes: Iterable) -> CodeSet:
+        """给定代码中属于本 Universe 的部分"""
+        mask = np.zeros(len(self), dtype=bool)
+        pos = self.positions(codes)
+        mask[pos[pos >= 0]] = True
+        return CodeSet.from_mask(self, mask)
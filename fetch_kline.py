@@ -16,6 +16,12 @@ import pandas as pd
 import tushare as ts
 from tqdm import tqdm
 
+_BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.append(str(_BACKEND_DIR))
+
+from universe import Universe  # noqa: E402
+
 warnings.filterwarnings("ignore")
 
 # --------------------------- 全局日志配置 --------------------------- #
@@ -111,31 +117,15 @@ def validate(df: pd.DataFrame) -> pd.DataFrame:
 
 # --------------------------- 读取 stocklist.csv & 过滤板块 --------------------------- #
 
-def _filter_by_boards_stocklist(df: pd.DataFrame, exclude_boards: set[str]) -> pd.DataFrame:
+def load_codes_from_stocklist(stocklist_csv: Path, exclude_boards: set[str]) -> List[str]:
     """
     exclude_boards 子集：{'gem','star','bj'}
     - gem  : 创业板 300/301（.SZ）
     - star : 科创板 688（.SH）
-    - bj   : 北交所（.BJ 或 4/8 开头）
+    - bj   : 北交所（.BJ 或 4/8/92 开头）
     """
-    code = df["symbol"].astype(str)
-    ts_code = df["ts_code"].astype(str).str.upper()
-    mask = pd.Series(True, index=df.index)
-
-    if "gem" in exclude_boards:
-        mask &= ~code.str.startswith(("300", "301"))
-    if "star" in exclude_boards:
-        mask &= ~code.str.startswith(("688",))
-    if "bj" in exclude_boards:
-        mask &= ~(ts_code.str.endswith(".BJ") | code.str.startswith(("4", "8")))
-
-    return df[mask].copy()
-
-def load_codes_from_stocklist(stocklist_csv: Path, exclude_boards: set[str]) -> List[str]:
-    df = pd.read_csv(stocklist_csv)    
-    df = _filter_by_boards_stocklist(df, exclude_boards)
-    codes = df["symbol"].astype(str).str.zfill(6).tolist()
-    codes = list(dict.fromkeys(codes))  # 去重保持顺序
+    universe = Universe.from_stocklist(stocklist_csv)
+    codes = universe.exclude_boards(exclude_boards).codes()  # 已去重，保持 stocklist 顺序
     logger.info("从 %s 读取到 %d 只股票（排除板块：%s）",
                 stocklist_csv, len(codes), ",".join(sorted(exclude_boards)) or "无")
     return codes
@@ -2,19 +2,26 @@
 """
 查找指定历史价格的股票 - 并发版本
 支持按时间区间查找，支持收盘价、最高价、最低价
-使用多进程和多线程提高查找性能
+查找在 PriceIndex（按价格排序的全市场索引，二分定位）上完成；CSV 用线程池并发加载
 """
 import argparse
+import hashlib
 import pandas as pd
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Union
 import logging
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-from functools import partial
+import sys
 import time
 
+_BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.append(str(_BACKEND_DIR))
+
+from panel import Panel, PriceIndex  # noqa: E402
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -48,8 +55,8 @@ def load_stock_data_concurrent(data_dir: Path, max_workers: Optional[int] = None
     
     stock_data = []
     
-    # 使用进程池并发读取文件
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    # 使用线程池并发读取文件（read_csv 解析时释放 GIL；DataFrame 留在本进程，不必 pickle 传回）
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # 提交所有任务
         future_to_file = {executor.submit(load_single_stock_data, csv_file): csv_file 
                          for csv_file in csv_files}
@@ -117,8 +124,56 @@ def find_by_price_single_stock(
     
     return results
 
+def build_price_index(stock_data: List[Tuple[str, pd.DataFrame]]) -> PriceIndex:
+    """由已加载的股票数据构建价格索引（收盘价、最高价、最低价各一组有序数组）"""
+    frames = {code: df for code, df in stock_data if not df.empty}
+    index = PriceIndex.from_frames(frames)
+    logger.info(f"价格索引构建完成: {len(index.codes)} 只股票")
+    return index
+
+def source_version(data_dir: Path, panel_path: Optional[str] = None) -> str:
+    """索引数据源的版本：面板文件（或数据目录下每个 CSV）的路径、大小与修改时间的哈希"""
+    paths = [Path(panel_path)] if panel_path else sorted(data_dir.glob("**/*.csv"))
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        stat = path.stat()
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return f"{'panel' if panel_path else 'csv'}-{digest.hexdigest()}"
+
+def load_price_index(
+    data_dir: Path,
+    index_path: Optional[str] = None,
+    panel_path: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> Optional[PriceIndex]:
+    """
+    加载价格索引：index_path 处的索引与当前数据版本一致时直接加载，
+    否则由面板文件或 CSV 重新构建并保存到 index_path（数据有更新时自动重建）
+    """
+    version = source_version(data_dir, panel_path)
+    if index_path and Path(index_path).exists():
+        index = PriceIndex.load(index_path)
+        if index.source == version:
+            logger.info(f"已加载价格索引: {index_path}")
+            return index
+        logger.info(f"价格索引已过期（数据有更新），重新构建: {index_path}")
+
+    if panel_path:
+        index = PriceIndex.from_panel(Panel.load(panel_path))
+    else:
+        logger.info("开始并发加载股票数据...")
+        loaded = load_stock_data_concurrent(data_dir, max_workers)
+        if not loaded:
+            return None
+        index = build_price_index(loaded)
+    index.source = version
+    if index_path:
+        index.save(index_path)
+        logger.info(f"价格索引已保存: {index_path}")
+    return index
+
 def find_by_price_concurrent(
-    stock_data: List[Tuple[str, pd.DataFrame]], 
+    stock_data: Union[List[Tuple[str, pd.DataFrame]], PriceIndex],
     target_price: float,
     price_type: str = 'close',
     start_date: Optional[str] = None,
@@ -127,16 +182,16 @@ def find_by_price_concurrent(
     max_workers: Optional[int] = None
 ) -> List[Tuple[str, float, str]]:
     """
-    并发查找历史价格等于指定价格的股票
+    查找历史价格等于指定价格的股票
     
     Args:
-        stock_data: 股票数据列表
+        stock_data: 股票数据列表，或已构建的 PriceIndex（反复查找时复用，单次查找为微秒级）
         target_price: 目标价格
         price_type: 价格类型 ('close', 'high', 'low')
         start_date: 开始日期 (YYYY-MM-DD)
         end_date: 结束日期 (YYYY-MM-DD)
         tolerance: 价格容差
-        max_workers: 最大并发数
+        max_workers: 保留参数（查找改为索引上的 searchsorted，不再分发到进程池）
         
     Returns:
         符合条件的股票列表 (代码, 价格, 日期)
@@ -146,43 +201,20 @@ def find_by_price_concurrent(
     if price_type not in valid_price_types:
         raise ValueError(f"价格类型必须是: {', '.join(valid_price_types)}")
     
-    if not stock_data:
-        return []
-    
-    # 确定并发数量
-    if max_workers is None:
-        max_workers = min(mp.cpu_count(), len(stock_data))
-    
-    logger.info(f"使用 {max_workers} 个并发进程进行查找")
+    if not isinstance(stock_data, PriceIndex):
+        if not stock_data:
+            return []
+        stock_data = build_price_index(stock_data)
     
-    # 创建偏函数，固定其他参数
-    search_func = partial(
-        find_by_price_single_stock,
-        target_price=target_price,
-        price_type=price_type,
-        start_date=start_date,
-        end_date=end_date,
-        tolerance=tolerance
-    )
-    
-    all_results = []
-    
-    # 使用进程池并发查找
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        # 提交所有任务
-        future_to_stock = {executor.submit(search_func, stock_item): stock_item[0] 
-                          for stock_item in stock_data}
-        
-        # 收集结果
-        for future in as_completed(future_to_stock):
-            stock_code = future_to_stock[future]
-            try:
-                result = future.result()
-                all_results.extend(result)
-            except Exception as e:
-                logger.warning(f"处理股票 {stock_code} 时出错: {e}")
+    # 如果只指定了开始时间，将开始时间作为结束时间；只指定了结束时间同理
+    if start_date and end_date is None:
+        end_date = start_date
+    elif end_date and start_date is None:
+        start_date = end_date
     
-    return sorted(all_results, key=lambda x: (x[0], x[2]))  # 按股票代码和日期排序
+    found = stock_data.query(target_price, tolerance, price_type, start_date or None, end_date or None)
+    dates = found['date'].dt.strftime('%Y-%m-%d')
+    return list(zip(found['code'].tolist(), found[price_type].tolist(), dates.tolist()))  # 已按股票代码和日期排序
 
 def print_results(results: List[Tuple[str, float, str]], price_type: str):
     """打印搜索结果"""
@@ -213,19 +245,18 @@ def main():
     parser.add_argument("--start-date", help="开始日期 (YYYY-MM-DD)")
     parser.add_argument("--end-date", help="结束日期 (YYYY-MM-DD)")
     parser.add_argument("--tolerance", type=float, default=0.00, help="价格容差 (默认: 0.01)")
-    parser.add_argument("--max-workers", type=int, help="最大并发数 (默认: CPU核心数)")
+    parser.add_argument("--max-workers", type=int, help="加载 CSV 的线程数 (默认: CPU核心数；查找走价格索引，不受此影响)")
+    parser.add_argument("--index", help="价格索引文件 (.npz)；存在且数据未更新则直接加载，否则构建后保存到该路径")
+    parser.add_argument("--panel", help="由已缓存的面板文件 panel.npz 构建索引，代替读取 CSV")
     parser.add_argument("--benchmark", action="store_true", help="显示性能基准测试")
     
     args = parser.parse_args()
     
     start_time = time.time()
     
-    # 加载数据
-    data_dir = Path(args.data_dir)
-    logger.info("开始并发加载股票数据...")
-    stock_data = load_stock_data_concurrent(data_dir, args.max_workers)
-    
-    if not stock_data:
+    # 加载数据（优先使用已落盘且未过期的价格索引）
+    stock_data = load_price_index(Path(args.data_dir), args.index, args.panel, args.max_workers)
+    if stock_data is None:
         logger.error("没有找到可用的股票数据")
         return
     
@@ -235,7 +266,7 @@ def main():
     # 执行搜索
     try:
         search_start_time = time.time()
-        logger.info("开始并发查找...")
+        logger.info("开始查找...")
         results = find_by_price_concurrent(
             stock_data, 
             args.price, 
@@ -256,7 +287,7 @@ def main():
             print(f"数据加载时间: {load_time:.2f}秒")
             print(f"查找时间: {search_time:.2f}秒")
             print(f"总耗时: {total_time:.2f}秒")
-            print(f"处理股票数量: {len(stock_data)}")
+            print(f"处理股票数量: {len(stock_data.codes)}")
             print(f"找到结果数量: {len(results)}")
             
     except ValueError as e:
@@ -35,4 +35,14 @@ export const authAPI = {
   },
 };
 
+export const jobAPI = {
+  submitSelection: (params = {}) => api.post('/jobs/selection', params),
+  submitBacktest: (params = {}) => api.post('/jobs/backtest', params),
+  list: () => api.get('/jobs'),
+  get: (jobId) => api.get(`/jobs/${jobId}`),
+  cancel: (jobId) => api.delete(`/jobs/${jobId}`),
+  // 进度与部分结果通过 SSE 推送：new EventSource(jobAPI.eventsUrl(jobId))
+  eventsUrl: (jobId) => `/api/jobs/${jobId}/events`,
+};
+
 export default api;